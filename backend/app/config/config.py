@@ -3,6 +3,7 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.svm import SVC
 from skactiveml.pool import UncertaintySampling, RandomSampling, QueryByCommittee, ValueOfInformationEER, Clue
 from skactiveml.utils import MISSING_LABEL
+from app.core.thread_budget import THREAD_BUDGET
 import os
 
 RANDOM_STATE = 42
@@ -18,7 +19,7 @@ qs_dict = {
 }
 
 model_dict = {
-    'random forest': RandomForestClassifier(random_state=RANDOM_STATE),
+    'random forest': RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=THREAD_BUDGET.model_n_jobs),
     'logistic regression': LogisticRegression(random_state=RANDOM_STATE),
     'svm': SVC(random_state=RANDOM_STATE, probability=True)
 }
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.thread_budget import THREAD_BUDGET, ThreadBudget
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for CPU-bound work (0 = run it on the threads of the API process)
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", "0"))
+# Seconds to wait for the workers to load their models at startup
+COMPUTE_WARMUP_TIMEOUT = float(os.getenv("COMPUTE_WARMUP_TIMEOUT", "600"))
+# Threads of each worker for torch, BLAS and n_jobs (0 = the cores divided between the workers)
+COMPUTE_WORKER_THREADS = int(os.getenv("COMPUTE_WORKER_THREADS", "0"))
+
+
+def _init_worker(thread_budget: ThreadBudget, initializer: Optional[Callable[..., None]], initargs: Tuple) -> None:
+    """Apply the thread budget of the worker before its initializer loads the models."""
+    thread_budget.apply()
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _ready() -> int:
+    """Runs in a worker once its initializer (model loading) finished."""
+    return os.getpid()
+
+
+def progress_reporter(progress_queue: Any) -> Optional[Callable[..., None]]:
+    """Progress callback of a task: forwards the calls to the API process through progress_queue."""
+    if progress_queue is None:
+        return None
+
+    def _progress(*args, **kwargs):
+        progress_queue.put((args, kwargs))
+
+    return _progress
+
+
+class ComputeExecutor:
+    """
+    Runs CPU-bound calls (embedding, model fitting, LIME, DistilBERT) in a pool of worker processes.
+
+    Sync endpoints run on Starlette's threadpool, so sentence encoding, `clf.fit` and LIME compete
+    for the GIL with every other request. With `max_workers > 0` these calls are sent to worker
+    processes instead: the calling thread (or coroutine) only waits for the result, so lightweight
+    endpoints stay responsive. The workers are spawned once by `start()` and run `initializer`
+    first, which loads their models, so no request pays for the model loading.
+
+    Every worker applies `thread_budget` first (by default the cores are divided between the
+    workers, see ThreadBudget.for_workers), so the workers do not oversubscribe the machine.
+
+    With `max_workers=0` the executor is disabled and the services run their usual in-process code.
+    Tasks must be module-level functions whose arguments and results can be pickled.
+    """
+
+    def __init__(
+            self,
+            max_workers: int = COMPUTE_WORKERS,
+            initializer: Optional[Callable[..., None]] = None,
+            initargs: Tuple = (),
+            warmup_timeout: float = COMPUTE_WARMUP_TIMEOUT,
+            thread_budget: Optional[ThreadBudget] = None
+            ):
+        self.max_workers = max(0, max_workers)
+        self.initializer = initializer
+        self.initargs = initargs
+        self.warmup_timeout = warmup_timeout
+        if thread_budget is None:
+            thread_budget = THREAD_BUDGET.for_workers(self.max_workers, COMPUTE_WORKER_THREADS or None)
+        self.thread_budget = thread_budget
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_workers > 0
+
+    def start(self) -> None:
+        """Spawn the workers and wait until all of them have loaded their models."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._pool is None:
+                self._pool = self._new_pool()
+            pool = self._pool
+
+        # The pool spawns all its workers on the first submit, one ping per worker waits for them
+        pings = [pool.submit(_ready) for _ in range(self.max_workers)]
+        pids = {ping.result(timeout=self.warmup_timeout) for ping in pings}
+        logger.info(f"Compute executor ready: {len(pids)} warm worker process(es)")
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+            manager, self._manager = self._manager, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+        if manager is not None:
+            manager.shutdown()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Submit a task to the workers (starting them if needed); a crashed pool is replaced once."""
+        if not self.enabled:
+            raise RuntimeError("The compute executor is disabled (COMPUTE_WORKERS=0)")
+        with self._lock:
+            if self._pool is None:
+                self._pool = self._new_pool()
+            pool = self._pool
+        try:
+            return pool.submit(fn, *args, **kwargs)
+        except BrokenProcessPool:
+            logger.warning("Compute worker pool is broken, starting new workers")
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = self._new_pool()
+                pool = self._pool
+            return pool.submit(fn, *args, **kwargs)
+
+    def call(self, fn: Callable[..., Any], *args: Any, progress: Optional[Callable[..., None]] = None, **kwargs: Any) -> Any:
+        """
+        Run a task in a worker and wait for its result (from a thread of the API process).
+
+        If progress is given, the task receives a `progress_queue` keyword argument; the calls the
+        task reports through it (see `progress_reporter`) are replayed on progress in the calling thread.
+        """
+        if progress is None:
+            return self.submit(fn, *args, **kwargs).result()
+
+        progress_queue = self._progress_queue()
+        future = self.submit(fn, *args, progress_queue=progress_queue, **kwargs)
+        while True:
+            try:
+                call_args, call_kwargs = progress_queue.get(timeout=0.1)
+            except queue.Empty:
+                if future.done():
+                    break
+                continue
+            progress(*call_args, **call_kwargs)
+        # Progress reported just before the task ended
+        while True:
+            try:
+                call_args, call_kwargs = progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            progress(*call_args, **call_kwargs)
+        return future.result()
+
+    async def run(self, fn: Callable[..., Any], *args: Any, inline: Optional[Callable[..., Any]] = None, **kwargs: Any) -> Any:
+        """
+        Await a task from a coroutine.
+
+        When the executor is disabled, `inline` (the in-process counterpart of the task, e.g. the
+        service method) or else the task itself runs on the threadpool.
+        """
+        if not self.enabled:
+            return await run_in_threadpool(inline or fn, *args, **kwargs)
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # spawn: the workers must not inherit the DuckDB handle, locks or threads of the API process
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.thread_budget, self.initializer, self.initargs),
+        )
+
+    def _progress_queue(self):
+        with self._lock:
+            if self._manager is None:
+                self._manager = multiprocessing.get_context("spawn").Manager()
+            return self._manager.Queue()
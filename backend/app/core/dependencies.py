@@ -2,36 +2,56 @@
 from fastapi import Depends
 from app.core.storage import ActiveLearningStorage
 from app.services.active_learning_svc import ActiveLearningService
+from app.services.instance_job_svc import InstanceJobService
+from app.services.instance_sync_svc import InstanceSyncService
 from app.services.inference_svc import InferenceService
 from app.services.config_svc import ConfigService
 from app.services.data_service import DataService
 from app.services.xai_svc import XaiService
+from app.services.explanation_cache import ExplanationCache
 from app.services.ticket_vectorizer_svc import TicketVectorizerService
-from app.services.resolution_svc import ResolutionService
+from app.services.resolution_svc import ResolutionService, create_resolution_service
 from app.persistence.duckdb import DuckDbPersistenceService
+from app.persistence.duckdb.writer import DuckDbWriterClient
 from app.persistence.local_artifacts import LocalArtifactsStore
 from app.persistence import MinioService
 from app.services.startup_svc import StartupService
 from app.core.minio_client import MinioClient
 from app.core.rabbitmq_client import RabbitMQClient
+from app.core.compute_executor import ComputeExecutor
+from app.services import compute_tasks
 from pathlib import Path
 import os
 
 # Create instances
 storage = ActiveLearningStorage()
-duckdb_persistence_service = DuckDbPersistenceService(
-    db_path=os.getenv("DUCKDB_PATH", "storage/db/humal.duckdb")
-)
+if os.getenv("DUCKDB_WRITER_ADDRESS"):
+    # Multi-worker deployment: the database is owned by the writer process
+    # (authenticated with DUCKDB_WRITER_AUTHKEY, which must be set as well)
+    duckdb_persistence_service = DuckDbWriterClient(address=os.getenv("DUCKDB_WRITER_ADDRESS"))
+else:
+    duckdb_persistence_service = DuckDbPersistenceService(
+        db_path=os.getenv("DUCKDB_PATH", "storage/db/humal.duckdb")
+    )
 local_artifacts_store = LocalArtifactsStore(
     models_dir=Path(os.getenv("MODELS_DIR", "storage/models")),
-    encoders_dir=Path(os.getenv("ENCODERS_DIR", "storage/encoders"))
+    encoders_dir=Path(os.getenv("ENCODERS_DIR", "storage/encoders")),
+    vectorized_data_dir=Path(os.getenv("VECTORIZED_DATA_DIR", "storage/vectorized_data")),
+    export_linear_scorers=os.getenv("LINEAR_SCORER_EXPORT", "1") == "1"
+)
+# Worker processes for the CPU-bound work (COMPUTE_WORKERS=0 keeps it in the API process)
+compute_executor = ComputeExecutor(
+    initializer=compute_tasks.init_worker,
+    initargs=(local_artifacts_store, os.getenv("COMPUTE_PRELOAD_RESOLUTION", "0") == "1")
 )
 minio_client = MinioClient()
 minio_service = MinioService(client=minio_client)
 if os.getenv("USE_RABBITMQ", "0") == "1":
     rabbitmq_client = RabbitMQClient(url=os.getenv("RABBIT_URL", ""))
-al_service = ActiveLearningService(storage, duckdb_persistence_service, local_artifacts_store, minio_service)
-inference_service = InferenceService(storage, local_artifacts_store)
+al_service = ActiveLearningService(storage, duckdb_persistence_service, local_artifacts_store, minio_service, compute_executor=compute_executor)
+instance_job_service = InstanceJobService(al_service)
+instance_sync_service = InstanceSyncService(al_service)
+inference_service = InferenceService(storage, local_artifacts_store, duckdb_service=duckdb_persistence_service, compute_executor=compute_executor)
 config_service = ConfigService()
 data_service = DataService(duckdb_service=duckdb_persistence_service)
 ticket_vectorizer_service = TicketVectorizerService(minio_service=minio_service)
@@ -42,7 +62,9 @@ xai_service = XaiService(
     minio_service=minio_service,
     duckdb_service=duckdb_persistence_service,
     rabbitmq_client=rabbitmq_client if os.getenv("USE_RABBITMQ", "0") == "1" else None,
-    ticket_vectorizer_service=ticket_vectorizer_service
+    ticket_vectorizer_service=ticket_vectorizer_service,
+    explanation_cache=ExplanationCache(duckdb_persistence_service),
+    data_service=data_service
 )
 startup_service = StartupService(
     duckdb_service=duckdb_persistence_service,
@@ -57,6 +79,12 @@ def get_storage():
 def get_al_service():
     return al_service
 
+def get_instance_job_service():
+    return instance_job_service
+
+def get_instance_sync_service():
+    return instance_sync_service
+
 def get_inference_service():
     return inference_service
 
@@ -78,6 +106,9 @@ def get_duckdb_persistence_service() -> DuckDbPersistenceService:
 def get_local_artifacts_store() -> LocalArtifactsStore:
     return local_artifacts_store
 
+def get_compute_executor() -> ComputeExecutor:
+    return compute_executor
+
 def get_startup_service() -> StartupService:
     return startup_service
 
@@ -93,18 +124,5 @@ def get_resolution_service() -> ResolutionService:
     """Get or create resolution service instance (lazy-loaded due to heavy ML models)"""
     global _resolution_service_instance
     if _resolution_service_instance is None:
-        _resolution_service_instance = ResolutionService(
-            knowledge_base_path=os.getenv(
-                "KNOWLEDGE_BASE_PATH",
-                "backend/data/tickets_large_first_reply_label.csv"
-            ),
-            ticket_classifier_path=os.getenv(
-                "TICKET_CLASSIFIER_PATH",
-                "./ticket_classifier_model"
-            ),
-            team_classifier_path=os.getenv(
-                "TEAM_CLASSIFIER_PATH",
-                "./perfect_team_classifier"
-            )
-        )
+        _resolution_service_instance = create_resolution_service()
     return _resolution_service_instance
\ No newline at end of file
@@ -0,0 +1,59 @@
+import bisect
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
+
+class HashRing:
+    """
+    Consistent hash ring placing AL instances on backend nodes.
+
+    Every node is hashed onto the ring `vnodes` times; an instance belongs to the first node
+    point at or after the hash of its id. Adding or removing a node only moves the instances
+    of the ring segments that node gains or loses.
+    """
+
+    def __init__(self, nodes: Optional[Iterable[str]] = None, vnodes: int = 64):
+        self.vnodes = vnodes
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        self.nodes: List[str] = []
+        for node in nodes or []:
+            self.add_node(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def add_node(self, node: str) -> None:
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for i in range(self.vnodes):
+            point = self._hash(f"{node}#{i}")
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove_node(self, node: str) -> None:
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        for i in range(self.vnodes):
+            point = self._hash(f"{node}#{i}")
+            if self._owners.get(point) == node:
+                del self._owners[point]
+                self._points.remove(point)
+
+    def node_for(self, al_instance_id: int) -> str:
+        if not self._points:
+            raise LookupError("The hash ring has no nodes")
+        index = bisect.bisect_left(self._points, self._hash(str(al_instance_id)))
+        return self._owners[self._points[index % len(self._points)]]
+
+    def moves(self, other: "HashRing", instance_ids: Iterable[int]) -> Dict[int, tuple]:
+        """Instances whose owner differs between this ring and `other`: {id: (old node, new node)}."""
+        moved = {}
+        for instance_id in instance_ids:
+            old, new = self.node_for(instance_id), other.node_for(instance_id)
+            if old != new:
+                moved[instance_id] = (old, new)
+        return moved
@@ -0,0 +1,121 @@
+import threading
+from typing import Any, Hashable, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class LabeledVectorIndex:
+    """
+    Cosine similarity index over the labeled rows of the train features of an AL instance.
+
+    The labeled rows are kept L2-normalized in one float32 matrix, so a search is a single matrix
+    product of the (normalized) queries with the labeled rows instead of a cosine_similarity over
+    a fresh X_train[labeled_mask] copy. Labeling updates the index in place: new rows are appended
+    (the matrix grows by doubling), relabeled rows keep their place and unlabeled rows are replaced
+    by the last one. Rows with a zero norm get a similarity of 0, as with cosine_similarity.
+    """
+
+    def __init__(self, dims: int, capacity: int = 0):
+        self._vectors = np.zeros((max(capacity, 1), dims), dtype=np.float32)
+        self._labels = np.zeros(max(capacity, 1), dtype=np.int64)
+        self._refs = np.empty(max(capacity, 1), dtype=object)
+        self._positions: dict = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dataset(cls, X_train: pd.DataFrame, y_train: pd.Series) -> "LabeledVectorIndex":
+        """Index of the rows of X_train whose label in y_train (aligned with X_train) is not missing."""
+        labeled_mask = y_train.notna().to_numpy()
+        index = cls(X_train.shape[1], capacity=int(labeled_mask.sum()))
+        index._append(X_train.index[labeled_mask], X_train.to_numpy()[labeled_mask], y_train.to_numpy()[labeled_mask])
+        return index
+
+    @property
+    def dims(self) -> int:
+        return self._vectors.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self._vectors.nbytes + self._labels.nbytes + self._refs.nbytes
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, ref: Hashable) -> bool:
+        return ref in self._positions
+
+    def update(self, refs: Sequence[Hashable], vectors: Any, labels: Sequence[Any]) -> None:
+        """Set the label of rows (given by their ref and features); a missing label removes the row."""
+        vectors = np.asarray(vectors)
+        labels = list(labels)
+        # Last occurrence of a ref wins, as with y_train.loc[refs] = labels
+        rows = {ref: row for row, ref in enumerate(refs)}
+        with self._lock:
+            new_refs, new_rows = [], []
+            for ref, row in rows.items():
+                label = labels[row]
+                position = self._positions.get(ref)
+                if pd.isna(label):
+                    if position is not None:
+                        self._remove(ref, position)
+                elif position is not None:
+                    self._labels[position] = int(label)
+                else:
+                    new_refs.append(ref)
+                    new_rows.append(row)
+            if new_refs:
+                self._append(new_refs, vectors[new_rows], [labels[row] for row in new_rows])
+
+    def search(self, queries: Any, k: int = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        k most similar labeled rows of each query row, most similar first.
+
+        Returns (refs, labels, similarities) of shape (n_queries, min(k, len(self))).
+        """
+        queries = _normalized(np.asarray(queries, dtype=np.float32).reshape(-1, self.dims))
+        with self._lock:
+            k = min(k, self._size)
+            similarities = queries @ self._vectors[:self._size].T
+            if k < self._size:
+                top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(self._size), (len(queries), self._size))
+            top_similarities = np.take_along_axis(similarities, top, axis=1)
+            order = np.argsort(-top_similarities, axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+            return self._refs[top], self._labels[top], np.take_along_axis(top_similarities, order, axis=1)
+
+    def _append(self, refs: Sequence[Hashable], vectors: np.ndarray, labels: Sequence[Any]) -> None:
+        count = len(refs)
+        if self._size + count > len(self._vectors):
+            capacity = max(self._size + count, 2 * len(self._vectors))
+            for name in ("_vectors", "_labels", "_refs"):
+                old = getattr(self, name)
+                grown = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+                grown[:self._size] = old[:self._size]
+                setattr(self, name, grown)
+        end = self._size + count
+        self._vectors[self._size:end] = _normalized(np.asarray(vectors, dtype=np.float32).reshape(count, self.dims))
+        self._labels[self._size:end] = np.asarray(labels, dtype=np.float64).astype(np.int64)
+        for offset, ref in enumerate(refs):
+            self._refs[self._size + offset] = ref
+            self._positions[ref] = self._size + offset
+        self._size = end
+
+    def _remove(self, ref: Hashable, position: int) -> None:
+        last = self._size - 1
+        if position != last:
+            self._vectors[position] = self._vectors[last]
+            self._labels[position] = self._labels[last]
+            self._refs[position] = self._refs[last]
+            self._positions[self._refs[position]] = position
+        self._refs[last] = None
+        del self._positions[ref]
+        self._size = last
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
@@ -0,0 +1,93 @@
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+
+class LinearScorer:
+    """
+    NumPy scorer of a trained linear model (coefficients and intercepts only).
+
+    Drop-in for the `predict`, `predict_proba` and `classes_` of a SklearnClassifier wrapping a
+    fitted LogisticRegression, without the input validation of both on every call: the decision
+    function is `X @ coef.T + intercept`, with expit for two classes and softmax otherwise.
+    The probabilities are ordered by the wrapper classes; classes the estimator never saw during
+    fit get a probability of 0 (as in SklearnClassifier.predict_proba).
+    """
+
+    def __init__(self, coef: np.ndarray, intercept: np.ndarray, classes: np.ndarray, estimator_classes: np.ndarray):
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        self.estimator_classes = np.asarray(estimator_classes)
+        # Columns of the estimator classes in the wrapper probabilities
+        self._columns = np.searchsorted(self.classes_, self.estimator_classes)
+        self._identity = np.array_equal(self.classes_, self.estimator_classes)
+
+    @property
+    def n_features_in_(self) -> int:
+        return self.coef.shape[1]
+
+    @classmethod
+    def from_model(cls, model: Any) -> Optional["LinearScorer"]:
+        """Scorer of a fitted SklearnClassifier(LogisticRegression), None for any other model."""
+        estimator = getattr(model, "estimator_", None)
+        if not isinstance(estimator, LogisticRegression) or not getattr(model, "is_fitted_", False):
+            return None
+        if getattr(model, "cost_matrix", None) is not None:
+            return None
+        # One-vs-rest models (removed from LogisticRegression in recent scikit-learn) normalize differently
+        if getattr(estimator, "multi_class", "auto") == "ovr" and len(estimator.classes_) > 2:
+            return None
+
+        classes = np.asarray(model.classes_)
+        estimator_classes = np.asarray(estimator.classes_)
+        if classes.dtype.kind not in "iuf" or not np.isin(estimator_classes, classes).all():
+            return None
+        return cls(estimator.coef_, estimator.intercept_, classes, estimator_classes)
+
+    def decision_function(self, X: Any) -> np.ndarray:
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[-1]} features, but the model expects {self.n_features_in_} features")
+        return X @ self.coef.T + self.intercept
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        scores = self.decision_function(X)
+        if len(self.estimator_classes) <= 2:
+            positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            proba = np.column_stack([1.0 - positive, positive])
+        else:
+            scores = scores - scores.max(axis=1, keepdims=True)
+            np.exp(scores, out=scores)
+            proba = scores / scores.sum(axis=1, keepdims=True)
+
+        if self._identity:
+            return proba
+        P = np.zeros((len(proba), len(self.classes_)))
+        P[:, self._columns] = proba
+        return P
+
+    def predict(self, X: Any) -> np.ndarray:
+        scores = self.decision_function(X)
+        if len(self.estimator_classes) <= 2:
+            indices = (scores[:, 0] > 0).astype(int)
+        else:
+            indices = scores.argmax(axis=1)
+        return self.estimator_classes[indices].astype(self.classes_.dtype)
+
+    def save(self, path: Union[str, Path]) -> None:
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                coef=self.coef,
+                intercept=self.intercept,
+                classes=self.classes_,
+                estimator_classes=self.estimator_classes,
+            )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "LinearScorer":
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls(arrays["coef"], arrays["intercept"], arrays["classes"], arrays["estimator_classes"])
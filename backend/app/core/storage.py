@@ -1,18 +1,266 @@
-# app/core/storage.py
 from dataclasses import dataclass, field
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Iterable, Optional
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
 import joblib
+import logging
 import os
+import threading
 from pathlib import Path
 
+import pandas as pd
+
+from app.core.labeled_index import LabeledVectorIndex
+
+logger = logging.getLogger(__name__)
+
+# Memory budget for the loaded datasets of all AL instances (0 = unlimited)
+DATASET_MEMORY_BUDGET_MB = float(os.getenv("AL_DATASET_MEMORY_BUDGET_MB", "0"))
+# Number of instances loaded in parallel when several are requested at once
+LOAD_WORKERS = int(os.getenv("AL_LOAD_WORKERS", "4"))
+
+
+class LazyInstanceDict(MutableMapping):
+    """
+    Dictionary keyed by AL instance id whose values are loaded on first access.
+
+    Instances known to persistence are registered (cheap) and their value is produced by
+    `loader(instance_id)` the first time it is requested. Concurrent requests for the same
+    instance share one load, requests for different instances load in parallel.
+
+    If `memory_budget_bytes` is set, loaded values are kept in least-recently-used order and
+    the least recently used ones are dropped when the budget is exceeded. Dropped values are
+    loaded again on their next access; values that cannot be reloaded (no loader) are never dropped.
+    """
+
+    def __init__(
+            self,
+            loader: Optional[Callable[[int], Any]] = None,
+            memory_budget_bytes: Optional[float] = None,
+            sizeof: Optional[Callable[[Any], int]] = None
+            ):
+        self.loader = loader
+        self.memory_budget_bytes = memory_budget_bytes or None
+        self.sizeof = sizeof or (lambda value: 0)
+        self._loaded: OrderedDict = OrderedDict()
+        self._sizes: Dict[int, int] = {}
+        self._registered: set = set()
+        self._lock = threading.RLock()
+        self._load_locks: Dict[int, threading.Lock] = {}
+
+    # --- Registration / loading ---
+    def register(self, instance_id: int) -> None:
+        """Mark an instance as loadable on first access."""
+        with self._lock:
+            self._registered.add(instance_id)
+
+    def is_loaded(self, instance_id: int) -> bool:
+        with self._lock:
+            return instance_id in self._loaded
+
+    def prefetch(self, instance_ids: Iterable[int], max_workers: int = LOAD_WORKERS) -> None:
+        """Load several instances in parallel (instances that fail to load are skipped)."""
+        pending = [i for i in instance_ids if i in self and not self.is_loaded(i)]
+        if not pending:
+            return
+
+        def _load(instance_id):
+            try:
+                self[instance_id]
+            except KeyError:
+                pass
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending))), thread_name_prefix="al-load") as executor:
+            list(executor.map(_load, pending))
+
+    def evict(self, instance_id: int) -> None:
+        """Drop the loaded value of an instance, it is loaded again on the next access."""
+        with self._lock:
+            if instance_id in self._registered and self.loader is not None:
+                self._loaded.pop(instance_id, None)
+                self._sizes.pop(instance_id, None)
+
+    def memory_usage(self) -> int:
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def _load(self, instance_id: int) -> Any:
+        with self._lock:
+            load_lock = self._load_locks.setdefault(instance_id, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                if instance_id in self._loaded:
+                    self._loaded.move_to_end(instance_id)
+                    return self._loaded[instance_id]
+                if instance_id not in self._registered:
+                    raise KeyError(instance_id)
+
+            value = self.loader(instance_id)
+
+            with self._lock:
+                if instance_id not in self._registered:
+                    # Deleted while loading
+                    raise KeyError(instance_id)
+                self._store(instance_id, value)
+            return value
+
+    def _store(self, instance_id: int, value: Any) -> None:
+        self._loaded[instance_id] = value
+        self._loaded.move_to_end(instance_id)
+        self._sizes[instance_id] = self.sizeof(value)
+        self._evict_over_budget(keep=instance_id)
+
+    def _evict_over_budget(self, keep: int) -> None:
+        if self.memory_budget_bytes is None or self.loader is None:
+            return
+        for candidate in list(self._loaded.keys()):
+            if sum(self._sizes.values()) <= self.memory_budget_bytes:
+                break
+            if candidate == keep or candidate not in self._registered:
+                continue
+            logger.info(f"Evicting AL instance {candidate} from memory (budget {self.memory_budget_bytes / 1e6:.0f} MB)")
+            self._loaded.pop(candidate)
+            self._sizes.pop(candidate, None)
+
+    # --- MutableMapping interface ---
+    def __getitem__(self, instance_id):
+        with self._lock:
+            if instance_id in self._loaded:
+                self._loaded.move_to_end(instance_id)
+                return self._loaded[instance_id]
+            if instance_id not in self._registered or self.loader is None:
+                raise KeyError(instance_id)
+        return self._load(instance_id)
+
+    def __setitem__(self, instance_id, value) -> None:
+        with self._lock:
+            self._registered.add(instance_id)
+            self._store(instance_id, value)
+
+    def __delitem__(self, instance_id) -> None:
+        with self._lock:
+            if instance_id not in self._registered and instance_id not in self._loaded:
+                raise KeyError(instance_id)
+            self._registered.discard(instance_id)
+            self._loaded.pop(instance_id, None)
+            self._sizes.pop(instance_id, None)
+            self._load_locks.pop(instance_id, None)
+
+    def pop(self, instance_id, *default):
+        """Remove an instance without loading it; returns the loaded value (or default)."""
+        with self._lock:
+            known = instance_id in self._registered or instance_id in self._loaded
+            if not known:
+                if default:
+                    return default[0]
+                raise KeyError(instance_id)
+            value = self._loaded.get(instance_id, default[0] if default else None)
+            del self[instance_id]
+            return value
+
+    def __contains__(self, instance_id) -> bool:
+        with self._lock:
+            return instance_id in self._registered or instance_id in self._loaded
+
+    def __iter__(self):
+        with self._lock:
+            return iter(sorted(self._registered | set(self._loaded.keys())))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._registered | set(self._loaded.keys()))
+
+
+def dataset_nbytes(dataset: Dict[str, Any]) -> int:
+    """Approximate memory footprint of a dataset_dict entry (features and labels)."""
+    total = 0
+    for key in ("X_train", "X_test", "y_train", "y_test"):
+        value = dataset.get(key)
+        if isinstance(value, pd.DataFrame):
+            total += int(value.memory_usage(index=True, deep=True).sum())
+        elif isinstance(value, pd.Series):
+            total += int(value.memory_usage(index=True, deep=True))
+    return total
+
+
 class ActiveLearningStorage:
-    def __init__(self):
+    def __init__(self, id_allocator: Optional[Callable[[], int]] = None):
+        # id_allocator draws instance ids from a source shared by all API workers (e.g. a DuckDB
+        # sequence); without it ids are derived from the instances known to this process
+        self.id_allocator = id_allocator
         self.al_instances_dict = {}
-        self.model_paths_dict = {}
-        self.results_dict = {}
-        self.dataset_dict = {}
-    
+        self.model_paths_dict = LazyInstanceDict()
+        self.results_dict = LazyInstanceDict()
+        self.dataset_dict = LazyInstanceDict(
+            memory_budget_bytes=DATASET_MEMORY_BUDGET_MB * 1024 * 1024,
+            sizeof=dataset_nbytes
+        )
+        self._reserved_instance_ids = set()
+        self._id_lock = threading.Lock()
+        # Model versions, bumped whenever a model file changes (keys of the inference cache)
+        self._model_versions: Dict[tuple, int] = {}
+        self._instance_versions: Dict[int, int] = {}
+        self._version_counter = 0
+        self._version_lock = threading.Lock()
+        # Guards the build and the updates of the labeled vector indexes (see labeled_index)
+        self._labeled_index_lock = threading.Lock()
+
     # Get the next available instance ID
     def get_next_instance_id(self) -> int:
-        return 1 if not self.al_instances_dict else max(self.al_instances_dict.keys()) + 1
-    
\ No newline at end of file
+        if self.id_allocator is not None:
+            return self.id_allocator()
+        taken = set(self.al_instances_dict.keys()) | self._reserved_instance_ids
+        return 1 if not taken else max(taken) + 1
+
+    # Reserve an instance ID for an instance that is still being created (background jobs)
+    # (a specific id can be requested, e.g. by the shard router that assigns ids to nodes)
+    def reserve_instance_id(self, instance_id: Optional[int] = None) -> int:
+        with self._id_lock:
+            if instance_id is None:
+                instance_id = self.get_next_instance_id()
+            elif instance_id in self.al_instances_dict or instance_id in self._reserved_instance_ids:
+                raise ValueError(f"Instance id {instance_id} is already in use")
+            self._reserved_instance_ids.add(instance_id)
+            return instance_id
+
+    # Release a reserved instance ID once the instance was created (or its creation failed)
+    def release_instance_id(self, instance_id: int) -> None:
+        with self._id_lock:
+            self._reserved_instance_ids.discard(instance_id)
+
+    # Version of a model of an instance; changes whenever the model is retrained or replaced
+    def model_version(self, instance_id: int, model_id: int = 0) -> tuple:
+        with self._version_lock:
+            return (self._instance_versions.get(instance_id, 0), self._model_versions.get((instance_id, model_id), 0))
+
+    # Mark a model (or all models of an instance if model_id is None) as changed
+    def bump_model_version(self, instance_id: int, model_id: Optional[int] = None) -> None:
+        with self._version_lock:
+            self._version_counter += 1
+            if model_id is None:
+                self._instance_versions[instance_id] = self._version_counter
+            else:
+                self._model_versions[(instance_id, model_id)] = self._version_counter
+
+    # Nearest-neighbour index of the labeled train rows of an instance, built on first use
+    # (kept in the dataset entry, so it is dropped and rebuilt with the dataset when it is reloaded)
+    def labeled_index(self, instance_id: int) -> LabeledVectorIndex:
+        dataset = self.dataset_dict[instance_id]
+        with self._labeled_index_lock:
+            index = dataset.get("labeled_index")
+            if index is None:
+                index = LabeledVectorIndex.from_dataset(dataset["X_train"], dataset["y_train"])
+                dataset["labeled_index"] = index
+            return index
+
+    # Apply new labels of train rows (already set in y_train) to the index, if it was built
+    def update_labeled_index(self, instance_id: int, refs: list) -> None:
+        dataset = self.dataset_dict.get(instance_id) if self.dataset_dict.is_loaded(instance_id) else None
+        if dataset is None:
+            return
+        with self._labeled_index_lock:
+            index = dataset.get("labeled_index")
+            if index is not None:
+                index.update(refs, dataset["X_train"].loc[refs].to_numpy(), dataset["y_train"].loc[refs].to_numpy())
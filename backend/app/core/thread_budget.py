@@ -0,0 +1,118 @@
+import logging
+import os
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Environment variables read by the native thread pools when they start (OpenMP, MKL, OpenBLAS)
+_BLAS_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def _env_threads(name: str) -> Optional[int]:
+    """Thread count from the environment, None if unset or 0 (library default)."""
+    value = int(os.getenv(name, "0") or 0)
+    return value if value > 0 else None
+
+
+def _env_flag(name: str) -> Optional[bool]:
+    value = os.getenv(name, "")
+    return None if value == "" else value.lower() in ("1", "true")
+
+
+@dataclass(frozen=True)
+class ThreadBudget:
+    """
+    Threads one process may use for its native parallelism.
+
+    The sentence model, the DistilBERT classifiers (torch), the BLAS calls of NumPy and
+    scikit-learn and the tokenizers each start their own thread pool sized to the machine.
+    Concurrent requests (and the compute worker processes) then oversubscribe the cores.
+    None keeps the library default.
+    """
+    # torch intra-op threads (torch.set_num_threads)
+    torch_threads: Optional[int] = None
+    # torch inter-op threads, only settable before torch runs parallel work
+    torch_interop_threads: Optional[int] = None
+    # OpenMP / MKL / OpenBLAS threads (threadpoolctl)
+    blas_threads: Optional[int] = None
+    # Rust thread pool of the HuggingFace tokenizers
+    tokenizers_parallelism: Optional[bool] = None
+    # n_jobs of the scikit-learn models that support it (random forest)
+    model_n_jobs: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "ThreadBudget":
+        return cls(
+            torch_threads=_env_threads("THREAD_BUDGET_TORCH"),
+            torch_interop_threads=_env_threads("THREAD_BUDGET_TORCH_INTEROP"),
+            blas_threads=_env_threads("THREAD_BUDGET_BLAS"),
+            tokenizers_parallelism=_env_flag("THREAD_BUDGET_TOKENIZERS_PARALLELISM"),
+            model_n_jobs=_env_threads("THREAD_BUDGET_MODEL_N_JOBS"),
+        )
+
+    def for_workers(self, workers: int, threads: Optional[int] = None) -> "ThreadBudget":
+        """
+        Budget of one of `workers` processes sharing the machine.
+
+        Each worker gets `threads` (default: the cores divided between the workers) for every
+        pool the budget leaves at the library default, and the tokenizers run single-threaded.
+        """
+        if threads is None:
+            threads = max(1, (os.cpu_count() or 1) // max(1, workers))
+        return replace(
+            self,
+            torch_threads=self.torch_threads or threads,
+            torch_interop_threads=self.torch_interop_threads or 1,
+            blas_threads=self.blas_threads or threads,
+            tokenizers_parallelism=False if self.tokenizers_parallelism is None else self.tokenizers_parallelism,
+            model_n_jobs=self.model_n_jobs or threads,
+        )
+
+    def environ(self) -> Dict[str, str]:
+        """Environment variables of the budget (inherited by the processes spawned afterwards)."""
+        env = {}
+        if self.blas_threads is not None:
+            env.update({name: str(self.blas_threads) for name in _BLAS_ENV_VARS})
+        if self.tokenizers_parallelism is not None:
+            env["TOKENIZERS_PARALLELISM"] = "true" if self.tokenizers_parallelism else "false"
+        return env
+
+    def apply(self) -> None:
+        """Apply the budget to the current process (at startup and in every compute worker)."""
+        os.environ.update(self.environ())
+
+        if self.blas_threads is not None:
+            from threadpoolctl import threadpool_limits
+            threadpool_limits(limits=self.blas_threads)
+
+        if self.torch_threads is not None or self.torch_interop_threads is not None:
+            import torch
+            if self.torch_threads is not None:
+                torch.set_num_threads(self.torch_threads)
+            if self.torch_interop_threads is not None and torch.get_num_interop_threads() != self.torch_interop_threads:
+                try:
+                    torch.set_num_interop_threads(self.torch_interop_threads)
+                except RuntimeError as e:
+                    # torch refuses once its inter-op pool is running
+                    logger.warning(f"Could not set the torch inter-op threads: {e}")
+
+        global _applied
+        _applied = self
+        logger.info(f"Thread budget applied: {self}")
+
+    def apply_to_model(self, model):
+        """Set n_jobs on a scikit-learn estimator that supports it (returns the estimator)."""
+        if self.model_n_jobs is not None and "n_jobs" in model.get_params(deep=False):
+            model.set_params(n_jobs=self.model_n_jobs)
+        return model
+
+
+# Budget of the API process (see .env.example)
+THREAD_BUDGET = ThreadBudget.from_env()
+_applied: Optional[ThreadBudget] = None
+
+
+def current_thread_budget() -> ThreadBudget:
+    """Budget last applied in this process (THREAD_BUDGET if none was applied)."""
+    return _applied or THREAD_BUDGET
@@ -9,6 +9,16 @@ class NewInstance(BaseModel):
     train_data_path: str
     test_data_path: str
 
+# Data model for moving an instance between backend nodes (sharding)
+class InstanceExport(BaseModel):
+    model_name: str
+    qs: str
+    classes: list[int]
+    train_data_path: str
+    test_data_path: str
+    metrics: list[dict] = []
+    model_ids: list[int] = []
+
 # Data model for the label request
 class LabelRequest(BaseModel):
     query_idx: list[int | str]
@@ -12,13 +12,18 @@ logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 
+# Size the torch, BLAS and tokenizer thread pools before the models are loaded
+from app.core.thread_budget import THREAD_BUDGET
+THREAD_BUDGET.apply()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.routers import inference_router, active_learning_router, config_router, data_router, xai_router, resolution_router
 
 from contextlib import asynccontextmanager
-from app.core.dependencies import get_startup_service, get_xai_service, get_rabbitmq_client
+from app.core.dependencies import get_startup_service, get_xai_service, get_rabbitmq_client, get_instance_job_service, get_instance_sync_service, get_compute_executor
+from app.persistence.duckdb.connection import close_all as close_duckdb_connections
 
 if os.getenv("USE_RABBITMQ", "0") == "1":
     rabbitmq_client = get_rabbitmq_client()
@@ -26,6 +31,10 @@ if os.getenv("USE_RABBITMQ", "0") == "1":
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     get_startup_service().load_data_from_minio_into_duckdb()
+    # Follow the instance changes of the other API workers (AL_SHARED_STATE=1 only)
+    get_instance_sync_service().start()
+    # Spawn the compute worker processes and let them load their models (COMPUTE_WORKERS > 0 only)
+    get_compute_executor().start()
     use_rabbitmq = os.getenv("USE_RABBITMQ", "0") == "1"
 
     # Establish connection to RabbitMQ at startup (if enabled)
@@ -46,10 +55,18 @@ async def lifespan(app: FastAPI):
     try:
         yield
     finally:
+        # Stop accepting queued instance creation jobs
+        get_instance_job_service().shutdown()
+        get_instance_sync_service().stop()
+        get_compute_executor().shutdown()
+
         # Close RabbitMQ connection on shutdown
         if use_rabbitmq:
             await rabbitmq_client.close()
 
+        # Close the process-wide DuckDB handle (flushes the WAL and releases the file lock)
+        close_duckdb_connections()
+
 app = FastAPI(
     title="HumAL API",
     description="Human-in-the-loop Active Learning API",
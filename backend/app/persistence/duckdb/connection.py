@@ -1,15 +1,23 @@
 from __future__ import annotations
 
 from contextlib import contextmanager
+import logging
 import os
+import threading
+import weakref
 from pathlib import Path
-from typing import Iterator, Optional
+from typing import Dict, Iterator, Optional
 
 import duckdb
 
+logger = logging.getLogger(__name__)
 
 DEFAULT_DB_PATH = "storage/db/humal.duckdb"
 
+# DuckDB pragmas applied when the database handle is opened (unset = DuckDB defaults)
+DUCKDB_THREADS = os.getenv("DUCKDB_THREADS")
+DUCKDB_MEMORY_LIMIT = os.getenv("DUCKDB_MEMORY_LIMIT")
+
 
 def resolve_db_path(db_path: Optional[str | Path]) -> Path:
     if db_path is None:
@@ -17,10 +25,108 @@ def resolve_db_path(db_path: Optional[str | Path]) -> Path:
     return Path(db_path)
 
 
+class _DatabaseHandle:
+    """One open DuckDB database; threads use their own cursor on it."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.conn = duckdb.connect(str(path), config=_database_config())
+        # Weak references: the cursor of a finished thread is released with its thread-local state
+        self.cursors: weakref.WeakSet = weakref.WeakSet()
+        self.lock = threading.Lock()
+
+    def cursor(self) -> duckdb.DuckDBPyConnection:
+        with self.lock:
+            cursor = self.conn.cursor()
+            self.cursors.add(cursor)
+            return cursor
+
+    def discard(self, cursor: duckdb.DuckDBPyConnection) -> None:
+        with self.lock:
+            self.cursors.discard(cursor)
+        cursor.close()
+
+    def close(self) -> None:
+        with self.lock:
+            for cursor in list(self.cursors):
+                cursor.close()
+            self.cursors.clear()
+            self.conn.close()
+
+
+def _database_config() -> Dict[str, str]:
+    config = {}
+    if DUCKDB_THREADS:
+        config["threads"] = DUCKDB_THREADS
+    if DUCKDB_MEMORY_LIMIT:
+        config["memory_limit"] = DUCKDB_MEMORY_LIMIT
+    return config
+
+
+_handles: Dict[str, _DatabaseHandle] = {}
+_handles_lock = threading.Lock()
+_local = threading.local()
+
+
+def _get_handle(path: Path) -> _DatabaseHandle:
+    key = str(path.resolve())
+    with _handles_lock:
+        handle = _handles.get(key)
+        if handle is not None and not path.exists():
+            # The database file was removed (e.g. reset of the storage folder): start over
+            logger.info(f"DuckDB file {path} disappeared, reopening it")
+            handle.close()
+            handle = None
+        if handle is None:
+            handle = _handles[key] = _DatabaseHandle(path)
+        return handle
+
+
 @contextmanager
 def connect(db_path: Optional[str | Path] = None) -> Iterator[duckdb.DuckDBPyConnection]:
+    """
+    Yield a cursor on the process-wide handle of the database.
+
+    The database is opened once per process and each thread reuses its own cursor, so calls
+    no longer pay for opening the file. Nested `connect` calls in the same thread get a
+    short-lived extra cursor to not interfere with the pending results of the outer one.
+    """
     path = resolve_db_path(db_path)
     path.parent.mkdir(parents=True, exist_ok=True)
+    handle = _get_handle(path)
+
+    cursors = getattr(_local, "cursors", None)
+    if cursors is None:
+        cursors = _local.cursors = {}
+
+    entry = cursors.get(handle.path)
+    if entry is not None and entry[0] is handle and not entry[2]:
+        cursor = entry[1]
+    elif entry is not None and entry[0] is handle:
+        # Cursor of this thread is already in use by an outer `connect`
+        cursor = handle.cursor()
+        try:
+            yield cursor
+        finally:
+            handle.discard(cursor)
+        return
+    else:
+        cursor = handle.cursor()
+
+    cursors[handle.path] = [handle, cursor, True]
+    try:
+        yield cursor
+    finally:
+        cursors[handle.path][2] = False
+
 
-    with duckdb.connect(str(path)) as conn:
-        yield conn
+def close_all() -> None:
+    """Close all database handles and their cursors (FastAPI shutdown)."""
+    with _handles_lock:
+        handles = list(_handles.values())
+        _handles.clear()
+    for handle in handles:
+        try:
+            handle.close()
+        except Exception:
+            logger.exception(f"Failed to close DuckDB database {handle.path}")
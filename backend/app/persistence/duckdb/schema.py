@@ -13,11 +13,16 @@ def init_database(db_path: Optional[str | Path] = None) -> None:
     with connect(db_path) as conn:
         _create_tables(conn)
         _create_indexes(conn)
+        _create_macros(conn)
         _populate_default_users(conn)
         _populate_default_al_instance(conn)
 
 
 def _create_tables(conn: duckdb.DuckDBPyConnection) -> None:
+    # Instance ids shared by all API workers (see DuckDbPersistenceService.next_al_instance_id)
+    conn.execute("CREATE SEQUENCE IF NOT EXISTS al_instance_id_seq START 1")
+    conn.execute("CREATE SEQUENCE IF NOT EXISTS instance_change_id_seq START 1")
+
     conn.execute(
         """
         CREATE TABLE IF NOT EXISTS al_instances (
@@ -127,6 +132,7 @@ def _create_tables(conn: duckdb.DuckDBPyConnection) -> None:
             al_instance_id INTEGER NOT NULL,
             model_id INTEGER NOT NULL,
             ticket_ref_or_sha VARCHAR NOT NULL,
+            ticket_content_sha VARCHAR,
             status VARCHAR NOT NULL CHECK (status IN ('queued','processing','completed','failed')),
             request_ticket_location VARCHAR NOT NULL,
             request_model_location VARCHAR NOT NULL,
@@ -141,7 +147,56 @@ def _create_tables(conn: duckdb.DuckDBPyConnection) -> None:
         )
         """
     )
-    
+    # SHA256 of the ticket content (also when the job is named after a ticket ref), for databases created before it
+    conn.execute("ALTER TABLE xai_jobs ADD COLUMN IF NOT EXISTS ticket_content_sha VARCHAR")
+
+    # Change feed of the AL instances, polled by the API workers to invalidate their cached state
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS instance_changes (
+            change_id BIGINT PRIMARY KEY DEFAULT nextval('instance_change_id_seq'),
+            al_instance_id INTEGER NOT NULL,
+            kind VARCHAR NOT NULL CHECK (kind IN ('created','labels','model','metrics','deleted')),
+            origin VARCHAR,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+    # Bulk scoring results, one row per ticket and model of an AL instance
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS predictions (
+            ref VARCHAR NOT NULL,
+            al_instance_id INTEGER NOT NULL,
+            model_id INTEGER NOT NULL,
+            prediction VARCHAR,
+            probabilities JSON,
+            scored_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (ref, al_instance_id, model_id)
+        )
+        """
+    )
+
+    # Explanations served again for the same ticket, model version, method and parameters
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS explanation_cache (
+            al_instance_id INTEGER NOT NULL,
+            model_id INTEGER NOT NULL,
+            model_version VARCHAR NOT NULL,
+            ticket_sha VARCHAR NOT NULL,
+            method VARCHAR NOT NULL,
+            params_sha VARCHAR NOT NULL,
+            explanation JSON NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            accessed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (al_instance_id, model_id, model_version, ticket_sha, method, params_sha)
+        )
+        """
+    )
+
 
 def _create_indexes(conn: duckdb.DuckDBPyConnection) -> None:
     conn.execute(
@@ -186,6 +241,43 @@ def _create_indexes(conn: duckdb.DuckDBPyConnection) -> None:
         """
     )
 
+    # Lookup of the existing jobs of a ticket (deduplicated XAI requests)
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_xai_jobs_ticket
+        ON xai_jobs(al_instance_id, model_id, ticket_ref_or_sha)
+        """
+    )
+
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_predictions_instance_model
+        ON predictions(al_instance_id, model_id)
+        """
+    )
+
+
+def _create_macros(conn: duckdb.DuckDBPyConnection) -> None:
+    # One label per ticket for an AL instance (ground truth labels included):
+    # the most frequent label wins, ties go to the label given most recently.
+    conn.execute(
+        """
+        CREATE OR REPLACE MACRO resolved_labels(instance_id, split_filter := NULL, user_filter := NULL) AS TABLE
+        WITH votes AS (
+            SELECT ref, label, COUNT(*) AS n, MAX(labeled_at) AS latest
+            FROM labels
+            WHERE al_instance_id IN (instance_id, 0)
+              AND label IS NOT NULL
+              AND (split_filter IS NULL OR split = split_filter)
+              AND (user_filter IS NULL OR user_id = user_filter::UUID)
+            GROUP BY ref, label
+        )
+        SELECT ref, label
+        FROM votes
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY ref ORDER BY n DESC, latest DESC NULLS LAST, label) = 1
+        """
+    )
+
 
 def _populate_default_users(conn: duckdb.DuckDBPyConnection) -> None:
     """Insert default system user for deployments without user authentication."""
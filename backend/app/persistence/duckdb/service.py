@@ -7,6 +7,7 @@ from pathlib import Path
 from typing import Any, Dict, Optional
 
 import pandas as pd
+import pyarrow as pa
 
 from .connection import connect
 from .schema import init_database
@@ -167,6 +168,50 @@ class DuckDbPersistenceService:
             }
         return instances
 
+    def next_al_instance_id(self) -> int:
+        """Draw a new instance id from the shared sequence (never returns an id already in use)."""
+        with connect(self.db_path) as conn:
+            max_id = conn.execute("SELECT COALESCE(MAX(al_instance_id), 0) FROM al_instances").fetchone()[0]
+            while True:
+                instance_id = conn.execute("SELECT nextval('al_instance_id_seq')").fetchone()[0]
+                if instance_id > max_id:
+                    return int(instance_id)
+
+    # --- Instance change feed ---
+    def record_instance_change(self, al_instance_id: int, kind: str, origin: Optional[str] = None) -> int:
+        """Append a change of an instance ('created', 'labels', 'model', 'metrics', 'deleted') to the feed."""
+        with connect(self.db_path) as conn:
+            return int(conn.execute(
+                """
+                INSERT INTO instance_changes (al_instance_id, kind, origin)
+                VALUES (?, ?, ?)
+                RETURNING change_id
+                """,
+                [al_instance_id, kind, origin],
+            ).fetchone()[0])
+
+    def load_instance_changes(self, after_change_id: int = 0) -> list[Dict[str, Any]]:
+        """Changes recorded after `after_change_id`, oldest first."""
+        with connect(self.db_path) as conn:
+            rows = conn.execute(
+                """
+                SELECT change_id, al_instance_id, kind, origin
+                FROM instance_changes
+                WHERE change_id > ?
+                ORDER BY change_id
+                """,
+                [after_change_id],
+            ).fetchall()
+
+        return [
+            {"change_id": int(row[0]), "al_instance_id": int(row[1]), "kind": row[2], "origin": row[3]}
+            for row in rows
+        ]
+
+    def get_latest_instance_change_id(self) -> int:
+        with connect(self.db_path) as conn:
+            return int(conn.execute("SELECT COALESCE(MAX(change_id), 0) FROM instance_changes").fetchone()[0])
+
     # --- Tickets ---
     def upsert_tickets_df(
         self,
@@ -340,6 +385,42 @@ class DuckDbPersistenceService:
 
         return result[0] if result and result[0] is not None else None
 
+    def load_tickets_page(
+            self,
+            split: Optional[str] = None,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            after_ref: Optional[str] = None,
+            limit: int = 10_000
+            ) -> pa.Table:
+        """
+        One page of tickets as an Arrow table of at most limit rows, ordered by ref (bulk scoring).
+
+        Tickets can be filtered by split and by dataset_timestamp (start inclusive, end exclusive).
+        Pages are read by keyset: pass the last ref of a page as after_ref to get the next one, an
+        empty table ends the iteration. Every page is a separate call, so paging also works through
+        the DuckDB writer. Columns keep their database names, which are the fields of the inference
+        Data model.
+        """
+        if split is not None and split not in ('train', 'test'):
+            raise ValueError("split must be 'train' or 'test'")
+
+        with connect(self.db_path) as conn:
+            return conn.execute(
+                """
+                SELECT ref, service_subcategory_name, service_name, last_team_id_name,
+                       title_anon, description_anon, public_log_anon
+                FROM tickets
+                WHERE (?::VARCHAR IS NULL OR split = ?)
+                  AND (?::TIMESTAMP IS NULL OR dataset_timestamp >= ?)
+                  AND (?::TIMESTAMP IS NULL OR dataset_timestamp < ?)
+                  AND (?::VARCHAR IS NULL OR ref > ?)
+                ORDER BY ref
+                LIMIT ?
+                """,
+                [split, split, start, start, end, end, after_ref, after_ref, limit],
+            ).to_arrow_table()
+
     # --- Labels ---
     def save_labels(self, al_instance_id: int, user_id: str | uuid.UUID, labels_dict: Dict[str, Any], split: str, timestamp: Optional[datetime] = None) -> int:
         """Persist non-null labels for a user/instance. Returns count saved."""
@@ -348,53 +429,58 @@ class DuckDbPersistenceService:
         if not labels_dict:
             return 0
 
-        saved = 0
-        with connect(self.db_path) as conn:
-            for ref, label in labels_dict.items():
-                if pd.isna(label):
-                    continue
+        labels = pd.Series(list(labels_dict.values()), index=list(labels_dict.keys()), dtype=object)
+        labels = labels[~labels.isna()]
+        if labels.empty:
+            return 0
 
-                conn.execute(
-                    """
-                    INSERT OR REPLACE INTO labels (al_instance_id, user_id, ref, label, split, labeled_at)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                    """,
-                    [al_instance_id, str(user_uuid), str(ref), str(label), split, timestamp],
-                )
-                saved += 1
+        df = pd.DataFrame({"ref": labels.index.map(str), "label": labels.map(str).to_numpy()})
+        # Keys that collide once converted to str behave like successive upserts: the last one wins
+        df = df.drop_duplicates(subset="ref", keep="last")
+
+        with connect(self.db_path) as conn:
+            conn.register("_labels_df", df)
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO labels (al_instance_id, user_id, ref, label, split, labeled_at)
+                SELECT ?, ?::UUID, ref, label, ?, ?::TIMESTAMP FROM _labels_df
+                """,
+                [al_instance_id, str(user_uuid), split, timestamp],
+            )
+            conn.unregister("_labels_df")
 
-        return saved
+        return int(len(labels))
 
     def load_labels(self, al_instance_id: int, user_id: Optional[str | uuid.UUID] = None, split: Optional[str] = None) -> pd.Series:
-        """Load labels for an instance, optionally filtered by user and/or split."""
-        query = "SELECT ref, label, labeled_at FROM labels WHERE al_instance_id IN (?, ?)"
-        params = [al_instance_id, GROUND_TRUTH_AL_INSTANCE_ID]
-        
-        if user_id is not None:
-            user_uuid = uuid.UUID(str(user_id))
-            query += " AND user_id = ?"
-            params.append(str(user_uuid))
-        
-        if split is not None:
-            if split not in ("train", "test"):
-                raise ValueError("split must be 'train' or 'test'")
-            query += " AND split = ?"
-            params.append(split)
-        
+        """
+        Load labels for an instance, optionally filtered by user and/or split.
+
+        Conflicting labels for the same ticket are resolved in DuckDB by the `resolved_labels`
+        macro (majority label, latest label on ties), so only one row per ticket is fetched.
+        """
+        user_filter = str(uuid.UUID(str(user_id))) if user_id is not None else None
+
+        if split is not None and split not in ("train", "test"):
+            raise ValueError("split must be 'train' or 'test'")
+
         with connect(self.db_path) as conn:
-            df = conn.execute(query, params).df()
+            table = conn.execute(
+                "SELECT ref, label FROM resolved_labels(?, split_filter := ?, user_filter := ?)",
+                [al_instance_id, split, user_filter],
+            ).to_arrow_table()
 
-        if df.empty:
+        if table.num_rows == 0:
             return pd.Series(dtype=object)
-        
-        df = self._keep_majority_or_latest_label(df)
 
-        df["ref"] = df["ref"].astype(str)
-        df = df.rename(columns={"label": TEAM_NAME})
-        return df.set_index("ref")[TEAM_NAME]
-    
+        index = pd.Index(table.column("ref").to_numpy(zero_copy_only=False), name="ref")
+        return pd.Series(table.column("label").to_numpy(zero_copy_only=False), index=index, name=TEAM_NAME)
+
     def _keep_majority_or_latest_label(self, labels: pd.DataFrame) -> pd.DataFrame:
-        """Helper to resolve label conflicts by keeping the majority label or latest if tie."""
+        """
+        Helper to resolve label conflicts by keeping the majority label or latest if tie.
+
+        Reference implementation of the `resolved_labels` SQL macro used by `load_labels`.
+        """
 
         if labels is None or labels.empty:
             return pd.DataFrame(columns=["ref", "label"])
@@ -429,11 +515,12 @@ class DuckDbPersistenceService:
 
     # --- Model paths ---
     def save_model_path(self, al_instance_id: int, model_id: int, path_to_model: str) -> None:
+        # created_at is the time the model was last saved (the XAI jobs of older models are not reused)
         with connect(self.db_path) as conn:
             conn.execute(
                 """
-                INSERT OR REPLACE INTO model_paths (al_instance_id, model_id, path_to_model)
-                VALUES (?, ?, ?)
+                INSERT OR REPLACE INTO model_paths (al_instance_id, model_id, path_to_model, created_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
                 """,
                 [al_instance_id, model_id, path_to_model],
             )
@@ -588,7 +675,8 @@ class DuckDbPersistenceService:
             request_preprocessor_location: Optional[str],
             request_one_hot_encoder_location: Optional[str],
             request_raw_tickets_locations: list[str],
-            status: str = "queued"
+            status: str = "queued",
+            ticket_content_sha: Optional[str] = None
             ) -> None:
 
         """Create a new XAI job entry in the database."""
@@ -601,11 +689,11 @@ class DuckDbPersistenceService:
             conn.execute(
                 """
                 INSERT INTO xai_jobs 
-                (job_id, al_instance_id, model_id, ticket_ref_or_sha, status, request_ticket_location, 
+                (job_id, al_instance_id, model_id, ticket_ref_or_sha, ticket_content_sha, status, request_ticket_location, 
                  request_model_location, request_preprocessor_location, request_one_hot_encoder_location, request_raw_tickets_locations)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                [str(job_id), al_instance_id, model_id, ticket_ref_or_sha, status, request_ticket_location,
+                [str(job_id), al_instance_id, model_id, ticket_ref_or_sha, ticket_content_sha, status, request_ticket_location,
                  request_model_location, request_preprocessor_location, request_one_hot_encoder_location, request_raw_tickets_locations_serialized]
             )
             
@@ -670,6 +758,200 @@ class DuckDbPersistenceService:
             "finished_at": row[12],
         }
 
+    def find_xai_job(
+            self,
+            al_instance_id: int,
+            model_id: int,
+            ticket_ref_or_sha: str,
+            ticket_content_sha: Optional[str] = None,
+            pending_max_age_seconds: Optional[float] = None
+            ) -> Optional[Dict[str, Any]]:
+        """
+        Latest job of a ticket that did not fail, created since the model was last saved
+        (save_model_path); None if there is none. With ticket_content_sha only jobs of the same
+        ticket content match (a ticket ref resubmitted with an edited ticket gets a new job).
+        Queued or processing jobs older than pending_max_age_seconds are ignored (their worker is
+        assumed lost).
+        """
+        query = """
+            SELECT j.job_id, j.status
+            FROM xai_jobs j
+            LEFT JOIN model_paths m ON m.al_instance_id = j.al_instance_id AND m.model_id = j.model_id
+            WHERE j.al_instance_id = ? AND j.model_id = ? AND j.ticket_ref_or_sha = ? AND j.status <> 'failed'
+              AND (m.created_at IS NULL OR j.created_at >= m.created_at)
+        """
+        params: list = [al_instance_id, model_id, ticket_ref_or_sha]
+        if ticket_content_sha is not None:
+            query += " AND j.ticket_content_sha = ?"
+            params.append(ticket_content_sha)
+        if pending_max_age_seconds is not None:
+            query += " AND (j.status = 'completed' OR j.created_at > CAST(CURRENT_TIMESTAMP AS TIMESTAMP) - to_seconds(?))"
+            params.append(pending_max_age_seconds)
+        query += " ORDER BY j.created_at DESC LIMIT 1"
+
+        with connect(self.db_path) as conn:
+            row = conn.execute(query, params).fetchone()
+
+        if not row:
+            return None
+        return {"job_id": str(row[0]), "status": row[1]}
+
+    # --- Predictions ---
+    def save_predictions(self, al_instance_id: int, model_id: int, predictions: pd.DataFrame) -> int:
+        """
+        Upsert bulk scoring results.
+
+        predictions has the columns ref, prediction and probabilities ({team: probability} or None).
+        Returns the number of rows saved.
+        """
+        if predictions.empty:
+            return 0
+
+        df = pd.DataFrame({
+            "ref": predictions["ref"].map(str).to_numpy(),
+            "prediction": predictions["prediction"].to_numpy(dtype=object),
+            "probabilities": [json.dumps(p) if p is not None else None for p in predictions["probabilities"]],
+        })
+
+        with connect(self.db_path) as conn:
+            conn.register("_predictions_df", df)
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO predictions (ref, al_instance_id, model_id, prediction, probabilities, scored_at)
+                SELECT ref, ?, ?, prediction, probabilities::JSON, CURRENT_TIMESTAMP FROM _predictions_df
+                """,
+                [al_instance_id, model_id],
+            )
+            conn.unregister("_predictions_df")
+
+        return int(len(df))
+
+    def load_predictions(
+            self,
+            al_instance_id: int,
+            model_id: int = 0,
+            refs: Optional[list[str]] = None,
+            after_ref: Optional[str] = None,
+            limit: Optional[int] = None
+            ) -> pd.DataFrame:
+        """
+        Load the stored predictions of a model (optionally only for the given refs), ordered by ref.
+
+        after_ref and limit read one page (keyset paging, as load_tickets_page).
+        """
+        query = """
+            SELECT ref, prediction, probabilities, scored_at
+            FROM predictions
+            WHERE al_instance_id = ? AND model_id = ?
+        """
+        params: list[Any] = [al_instance_id, model_id]
+        if refs is not None:
+            if not refs:
+                return pd.DataFrame(columns=["ref", "prediction", "probabilities", "scored_at"])
+            query += f" AND ref IN ({','.join(['?'] * len(refs))})"
+            params.extend(str(ref) for ref in refs)
+        if after_ref is not None:
+            query += " AND ref > ?"
+            params.append(str(after_ref))
+        query += " ORDER BY ref"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+
+        with connect(self.db_path) as conn:
+            df = conn.execute(query, params).df()
+
+        df["probabilities"] = [json.loads(p) if isinstance(p, str) else p for p in df["probabilities"]]
+        return df
+
+    # --- Explanation cache ---
+    def load_explanations(
+            self,
+            al_instance_id: int,
+            model_id: int,
+            model_version: str,
+            method: str,
+            params_sha: str,
+            ticket_shas: list[str],
+            max_age_seconds: Optional[float] = None
+            ) -> Dict[str, Any]:
+        """
+        Cached explanations of the tickets ({ticket_sha: explanation}), without the entries older
+        than max_age_seconds. The entries found are marked as accessed (see save_explanations).
+        """
+        if not ticket_shas:
+            return {}
+        where = f"""
+            WHERE al_instance_id = ? AND model_id = ? AND model_version = ? AND method = ? AND params_sha = ?
+              AND ticket_sha IN ({','.join(['?'] * len(ticket_shas))})
+        """
+        params: list[Any] = [al_instance_id, model_id, model_version, method, params_sha, *ticket_shas]
+        if max_age_seconds is not None:
+            where += " AND created_at > CAST(CURRENT_TIMESTAMP AS TIMESTAMP) - to_seconds(?)"
+            params.append(max_age_seconds)
+
+        with connect(self.db_path) as conn:
+            rows = conn.execute("SELECT ticket_sha, explanation FROM explanation_cache" + where, params).fetchall()
+            if rows:
+                conn.execute("UPDATE explanation_cache SET accessed_at = CURRENT_TIMESTAMP" + where, params)
+
+        return {ticket_sha: json.loads(explanation) for ticket_sha, explanation in rows}
+
+    def save_explanations(
+            self,
+            al_instance_id: int,
+            model_id: int,
+            model_version: str,
+            method: str,
+            params_sha: str,
+            explanations: Dict[str, Any],
+            max_entries: Optional[int] = None,
+            max_age_seconds: Optional[float] = None
+            ) -> int:
+        """
+        Upsert explanations ({ticket_sha: explanation}), then evict the entries older than
+        max_age_seconds and the least recently accessed ones beyond max_entries.
+        Returns the number of entries evicted.
+        """
+        rows = [
+            [al_instance_id, model_id, model_version, ticket_sha, method, params_sha, json.dumps(explanation, default=str)]
+            for ticket_sha, explanation in explanations.items()
+        ]
+        with connect(self.db_path) as conn:
+            if rows:
+                conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO explanation_cache
+                    (al_instance_id, model_id, model_version, ticket_sha, method, params_sha, explanation)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    rows,
+                )
+
+            evicted = 0
+            if max_age_seconds is not None:
+                evicted += conn.execute(
+                    "DELETE FROM explanation_cache WHERE created_at <= CAST(CURRENT_TIMESTAMP AS TIMESTAMP) - to_seconds(?)",
+                    [max_age_seconds],
+                ).fetchone()[0]
+            if max_entries is not None:
+                evicted += conn.execute(
+                    """
+                    DELETE FROM explanation_cache
+                    WHERE rowid IN (SELECT rowid FROM explanation_cache ORDER BY accessed_at DESC, created_at DESC OFFSET ?)
+                    """,
+                    [max_entries],
+                ).fetchone()[0]
+        return int(evicted)
+
+    def delete_explanations(self, al_instance_id: int, model_id: Optional[int] = None) -> None:
+        """Drop the cached explanations of a model (or of all the models of an instance if model_id is None)."""
+        with connect(self.db_path) as conn:
+            if model_id is None:
+                conn.execute("DELETE FROM explanation_cache WHERE al_instance_id = ?", [al_instance_id])
+            else:
+                conn.execute("DELETE FROM explanation_cache WHERE al_instance_id = ? AND model_id = ?", [al_instance_id, model_id])
+
     # --- Deletes ---
     def delete_instance(self, al_instance_id: int) -> None:
         if al_instance_id==GROUND_TRUTH_AL_INSTANCE_ID:
@@ -680,4 +962,6 @@ class DuckDbPersistenceService:
             conn.execute("DELETE FROM model_paths WHERE al_instance_id = ?", [al_instance_id])
             conn.execute("DELETE FROM metrics WHERE al_instance_id = ?", [al_instance_id])
             conn.execute("DELETE FROM xai_jobs WHERE al_instance_id = ?", [al_instance_id])
+            conn.execute("DELETE FROM predictions WHERE al_instance_id = ?", [al_instance_id])
+            conn.execute("DELETE FROM explanation_cache WHERE al_instance_id = ?", [al_instance_id])
             conn.execute("DELETE FROM al_instances WHERE al_instance_id = ?", [al_instance_id])
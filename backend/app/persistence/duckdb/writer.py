@@ -0,0 +1,179 @@
+"""
+Single-writer process for the DuckDB database.
+
+DuckDB allows one read-write process per database file, so `uvicorn --workers N` cannot open
+`storage/db/humal.duckdb` from every worker. In this mode one process owns the database and
+serves the `DuckDbPersistenceService` methods over a local `multiprocessing.connection` channel;
+the API workers use a `DuckDbWriterClient` in place of the service.
+
+The channel exchanges pickled calls, so both sides authenticate with DUCKDB_WRITER_AUTHKEY; the
+writer and the client refuse to start without it.
+
+Start the writer, then the API with the same DUCKDB_WRITER_ADDRESS / DUCKDB_WRITER_AUTHKEY:
+    python -m app.persistence.duckdb.writer
+    DUCKDB_WRITER_ADDRESS=127.0.0.1:6200 uvicorn app.main:app --workers 4
+"""
+from __future__ import annotations
+
+import logging
+import os
+import pickle
+import threading
+from multiprocessing.connection import Client, Connection, Listener
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from .connection import close_all, resolve_db_path
+from .service import DuckDbPersistenceService
+
+logger = logging.getLogger(__name__)
+
+# host:port (TCP) or a file system path (Unix socket); unset = workers open the database themselves
+DUCKDB_WRITER_ADDRESS = os.getenv("DUCKDB_WRITER_ADDRESS")
+
+# Methods of the persistence service that can be called remotely
+SERVICE_METHODS = frozenset(
+    name for name in dir(DuckDbPersistenceService)
+    if not name.startswith("_") and callable(getattr(DuckDbPersistenceService, name))
+)
+
+
+def parse_address(address: str) -> str | Tuple[str, int]:
+    """'host:port' -> TCP address, anything else is used as a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+def _require_authkey(authkey: Optional[str] = None) -> bytes:
+    """The given key or DUCKDB_WRITER_AUTHKEY; there is no default, anyone knowing it can run code in the writer."""
+    authkey = authkey or os.getenv("DUCKDB_WRITER_AUTHKEY")
+    if not authkey:
+        raise ValueError("DUCKDB_WRITER_AUTHKEY must be set when the DuckDB writer is used")
+    return authkey.encode()
+
+
+class DuckDbWriterServer:
+    """Owns the database and executes the calls of the API workers (one thread per client)."""
+
+    def __init__(self, address: str, authkey: Optional[str] = None, db_path: Optional[str | Path] = None):
+        authkey = _require_authkey(authkey)
+        self.service = DuckDbPersistenceService(db_path=resolve_db_path(db_path))
+        self.listener = Listener(parse_address(address), authkey=authkey)
+        self._closed = threading.Event()
+
+    @property
+    def address(self):
+        return self.listener.address
+
+    def serve_forever(self) -> None:
+        logger.info(f"DuckDB writer serving {self.service.db_path} on {self.address}")
+        while not self._closed.is_set():
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                if self._closed.is_set():
+                    break
+                logger.exception("DuckDB writer failed to accept a connection")
+                continue
+            threading.Thread(target=self._handle, args=(conn,), daemon=True, name="duckdb-writer-client").start()
+
+    def close(self) -> None:
+        self._closed.set()
+        self.listener.close()
+        close_all()
+
+    def _handle(self, conn: Connection) -> None:
+        with conn:
+            while True:
+                try:
+                    method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+
+                try:
+                    if method not in SERVICE_METHODS:
+                        raise AttributeError(f"Unknown persistence method '{method}'")
+                    response = (True, getattr(self.service, method)(*args, **kwargs))
+                except Exception as e:
+                    response = (False, e)
+
+                try:
+                    conn.send(response)
+                except (pickle.PicklingError, TypeError, AttributeError) as e:
+                    conn.send((False, RuntimeError(f"{method}: {response[1]!r} could not be sent ({e})")))
+
+
+class DuckDbWriterClient:
+    """
+    Drop-in replacement of `DuckDbPersistenceService` forwarding every call to the writer process.
+
+    Each thread keeps its own connection to the writer. Exceptions raised by the service
+    are raised again in the caller.
+    """
+
+    def __init__(self, address: str = DUCKDB_WRITER_ADDRESS, authkey: Optional[str] = None):
+        if not address:
+            raise ValueError("DUCKDB_WRITER_ADDRESS is not configured")
+        self.address = parse_address(address)
+        self._authkey = _require_authkey(authkey)
+        self._local = threading.local()
+
+    def __getattr__(self, name: str):
+        if name not in SERVICE_METHODS:
+            raise AttributeError(name)
+
+        def _method(*args, **kwargs):
+            return self._call(name, args, kwargs)
+
+        _method.__name__ = name
+        return _method
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _connection(self) -> Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = Client(self.address, authkey=self._authkey)
+        return conn
+
+    def _call(self, method: str, args: tuple, kwargs: dict) -> Any:
+        try:
+            self._connection().send((method, args, kwargs))
+        except (EOFError, OSError):
+            # Writer restarted since the last call: the request was not delivered, reconnect once
+            self.close()
+            self._connection().send((method, args, kwargs))
+
+        try:
+            ok, result = self._local.conn.recv()
+        except (EOFError, OSError) as e:
+            self.close()
+            raise ConnectionError(f"DuckDB writer at {self.address} closed the connection during '{method}'") from e
+
+        if not ok:
+            raise result
+        return result
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+
+    load_dotenv(Path(__file__).resolve().parents[4] / ".env")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    server = DuckDbWriterServer(os.getenv("DUCKDB_WRITER_ADDRESS", "127.0.0.1:6200"))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,23 @@
 from __future__ import annotations
 
+import uuid
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Tuple
+from typing import Any, Optional, Tuple
 
 import joblib
 
+from app.core.linear_scorer import LinearScorer
+from humal_vectorizer import CategoricalLookupEncoder
+
 # Top-level constants
 MODELS_BASE_DIR = Path("storage/models")
 ENCODERS_BASE_DIR = Path("storage/encoders")
 LABEL_ENCODER_FILENAME = "label_encoder.joblib"
 ONEHOT_ENCODER_FILENAME = "onehot_encoder.joblib"
+ONEHOT_LOOKUP_FILENAME = "onehot_lookup.joblib"
+LINEAR_SCORER_SUFFIX = ".linear.npz"
+MODEL_VERSION_SUFFIX = ".version"
 VECTORIZED_DATA_BASE_DIR = Path("storage/vectorized_data")
 
 
@@ -19,6 +26,9 @@ class LocalArtifactsStore:
     models_dir: Path = MODELS_BASE_DIR
     encoders_dir: Path = ENCODERS_BASE_DIR
     vectorized_data_dir: Path = VECTORIZED_DATA_BASE_DIR
+    # Also save the coefficients of linear models for the NumPy scorer (LinearScorer)
+    export_linear_scorers: bool = True
+
     def __post_init__(self) -> None:
         self.models_dir.mkdir(parents=True, exist_ok=True)
         self.encoders_dir.mkdir(parents=True, exist_ok=True)
@@ -31,6 +41,14 @@ class LocalArtifactsStore:
         joblib.dump(label_encoder, encoder_dir / LABEL_ENCODER_FILENAME)
         joblib.dump(one_hot_encoder, encoder_dir / ONEHOT_ENCODER_FILENAME)
 
+        # Precompiled one-hot encoder of the inference path (not for unsupported configurations)
+        try:
+            lookup = CategoricalLookupEncoder.from_one_hot_encoder(one_hot_encoder)
+        except ValueError:
+            (encoder_dir / ONEHOT_LOOKUP_FILENAME).unlink(missing_ok=True)
+        else:
+            joblib.dump(lookup, encoder_dir / ONEHOT_LOOKUP_FILENAME)
+
     def load_encoders(self, al_instance_id: int) -> Tuple[Any, Any]:
         encoder_dir = self.encoders_dir / str(al_instance_id)
 
@@ -39,6 +57,21 @@ class LocalArtifactsStore:
 
         return label_encoder, one_hot_encoder
 
+    def encoder_fingerprint(self, al_instance_id: int) -> Optional[str]:
+        """Modification time and size of the saved one-hot encoder of an instance (None if there is none)."""
+        try:
+            stat = (self.encoders_dir / str(al_instance_id) / ONEHOT_ENCODER_FILENAME).stat()
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def load_onehot_lookup(self, al_instance_id: int) -> Optional[CategoricalLookupEncoder]:
+        """Precompiled one-hot encoder of an instance, None if it was not saved."""
+        lookup_path = self.encoders_dir / str(al_instance_id) / ONEHOT_LOOKUP_FILENAME
+        if not lookup_path.exists():
+            return None
+        return joblib.load(lookup_path)
+
     def save_model(self, al_instance_id: int, model_id: int, model: Any) -> None:
         model_dir = self.models_dir / str(al_instance_id)
         model_dir.mkdir(parents=True, exist_ok=True)
@@ -46,6 +79,16 @@ class LocalArtifactsStore:
         model_path = model_dir / f"{model_id}.joblib"
 
         joblib.dump(model, model_path)
+        # New version of the model (keys the cached explanations of the model)
+        (model_dir / f"{model_id}{MODEL_VERSION_SUFFIX}").write_text(uuid.uuid4().hex)
+
+        # The scorer of a replaced linear model must not outlive it
+        scorer = LinearScorer.from_model(model) if self.export_linear_scorers else None
+        scorer_path = model_dir / f"{model_id}{LINEAR_SCORER_SUFFIX}"
+        if scorer is None:
+            scorer_path.unlink(missing_ok=True)
+        else:
+            scorer.save(scorer_path)
 
         return str(model_path)
 
@@ -53,6 +96,29 @@ class LocalArtifactsStore:
         model_path = self.models_dir / str(al_instance_id) / f"{model_id}.joblib"
         return joblib.load(model_path)
 
+    def model_fingerprint(self, al_instance_id: int, model_id: int) -> Optional[str]:
+        """
+        Version of a saved model, new whenever the model is saved again (None if there is no model).
+        Models saved without a version file get the modification time and size of the model file.
+        """
+        model_dir = self.models_dir / str(al_instance_id)
+        try:
+            return (model_dir / f"{model_id}{MODEL_VERSION_SUFFIX}").read_text().strip()
+        except FileNotFoundError:
+            pass
+        try:
+            stat = (model_dir / f"{model_id}.joblib").stat()
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def load_linear_scorer(self, al_instance_id: int, model_id: int) -> Optional[LinearScorer]:
+        """NumPy scorer of a linear model, None if the model has none (not linear or not exported)."""
+        scorer_path = self.models_dir / str(al_instance_id) / f"{model_id}{LINEAR_SCORER_SUFFIX}"
+        if not scorer_path.exists():
+            return None
+        return LinearScorer.load(scorer_path)
+
     def save_vectorized_dataset(self, al_instance_id: int, X: Any, split: str) -> None:
         """Save vectorized features for a given split ('train' or 'test')."""
         if split not in ("train", "test"):
@@ -63,15 +129,40 @@ class LocalArtifactsStore:
         
         joblib.dump(X, data_dir / f"X_{split}.joblib")
 
-    def load_vectorized_dataset(self, al_instance_id: int, split: str) -> Any:
-        """Load vectorized features for a given split ('train' or 'test')."""
+    def load_vectorized_dataset(self, al_instance_id: int, split: str, mmap_mode: Optional[str] = None) -> Any:
+        """
+        Load vectorized features for a given split ('train' or 'test').
+
+        With mmap_mode='r' the feature arrays are memory-mapped read-only, so processes loading the
+        same instance share the pages of the file instead of holding a copy each.
+        """
         if split not in ("train", "test"):
             raise ValueError("split must be 'train' or 'test'")
         
         data_dir = self.vectorized_data_dir / str(al_instance_id)
         data_path = data_dir / f"X_{split}.joblib"
         
-        return joblib.load(data_path)
+        return joblib.load(data_path, mmap_mode=mmap_mode)
+
+    def vectorized_dataset_fingerprint(self, al_instance_id: int, split: str) -> Optional[str]:
+        """Modification time and size of the saved vectorized features of a split (None if there are none)."""
+        try:
+            stat = (self.vectorized_data_dir / str(al_instance_id) / f"X_{split}.joblib").stat()
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def has_instance_artifacts(self, al_instance_id: int) -> bool:
+        """Check (without loading) that the encoders and vectorized datasets of an instance exist."""
+        encoder_dir = self.encoders_dir / str(al_instance_id)
+        data_dir = self.vectorized_data_dir / str(al_instance_id)
+        required = [
+            encoder_dir / LABEL_ENCODER_FILENAME,
+            encoder_dir / ONEHOT_ENCODER_FILENAME,
+            data_dir / "X_train.joblib",
+            data_dir / "X_test.joblib",
+        ]
+        return all(path.exists() for path in required)
 
     def delete_instance_artifacts(self, al_instance_id: int) -> None:
         # Delete encoders
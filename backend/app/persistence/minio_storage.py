@@ -232,6 +232,7 @@ class MinioService:
         *,
         al_instance_id: int,
         vectorizer,
+        encoder_fingerprint: Optional[str] = None,
     ):
         """
         Upload a TicketVectorizer as a portable cloudpickle file.
@@ -241,6 +242,9 @@ class MinioService:
         so cloudpickle won't include environment-specific module paths in the serialization.
         
         External machines only need: cloudpickle, pandas, scikit-learn, sentence-transformers
+
+        The object is content-addressed: its name holds the SHA256 of the serialized vectorizer and
+        of the encoder fingerprint, and an object already stored under that name is not uploaded again.
         
         IMPORTANT: The vectorizer must have one_hot_encoder=None before calling this method.
         The encoder is saved separately via save_one_hot_encoder().
@@ -258,23 +262,31 @@ class MinioService:
         # Register humal_vectorizer module to be serialized as bytecode
         cloudpickle.register_pickle_by_value(humal_vectorizer)
         
-        object_name = self._with_prefix(f"vectorizers/{al_instance_id}/ticket_vectorizer.pkl")
         vectorizer_bytes = self._to_cloudpickle(vectorizer)
-        self.client.upload_file_bytes(MODELS_BUCKET, object_name, vectorizer_bytes)
-        return {"bucket": MODELS_BUCKET, "object": object_name}
+        digest = hashlib.sha256(vectorizer_bytes)
+        digest.update((encoder_fingerprint or "").encode("utf-8"))
+        sha256 = digest.hexdigest()
+
+        object_name = self._with_prefix(f"vectorizers/{al_instance_id}/ticket_vectorizer-{sha256}.pkl")
+        uploaded = not self._object_exists(MODELS_BUCKET, object_name)
+        if uploaded:
+            self.client.upload_file_bytes(MODELS_BUCKET, object_name, vectorizer_bytes)
+        return {"bucket": MODELS_BUCKET, "object": object_name, "sha256": sha256, "uploaded": uploaded}
 
     def load_ticket_vectorizer(
         self,
         *,
         al_instance_id: int,
+        object_name: str,
     ):
         """
         Download and deserialize a TicketVectorizer from MinIO.
         
         Uses cloudpickle to load the complete vectorizer with all dependencies.
         Works on any machine with cloudpickle installed, no source code needed.
+        object_name is the content-addressed object returned by save_ticket_vectorizer (the
+        request_preprocessor_location of an XAI job).
         """
-        object_name = self._with_prefix(f"vectorizers/{al_instance_id}/ticket_vectorizer.pkl")
         downloaded = self.client.download_object(MODELS_BUCKET, object_name)
         return cloudpickle.loads(downloaded)
 
@@ -283,13 +295,20 @@ class MinioService:
         Save the original tickets for XAI purposes.
         The tickets are saved in json format.
         """
-        data_dict = X.model_dump()
-        ticket_sha = self._encode_ticket_to_sha(data_dict) if ticket_ref is None else ticket_ref
+        ticket_sha = self.xai_ticket_sha(X, ticket_ref)
         object_name = self._with_prefix(f"xai_tickets/{al_instance_id}/{ticket_sha}.json")
         tickets_bytes = X.model_dump_json().encode("utf-8")
         self.client.upload_file_bytes(DATA_BUCKET, object_name, tickets_bytes)
         return {"bucket": DATA_BUCKET, "object": object_name, "ticket_sha": ticket_sha}
     
+    def xai_ticket_sha(self, X: Data, ticket_ref: Optional[str] = None) -> str:
+        """Name of the XAI ticket object (ticket_ref if provided, otherwise the SHA256 of the ticket), without uploading it."""
+        return self._encode_ticket_to_sha(X.model_dump()) if ticket_ref is None else ticket_ref
+
+    def xai_ticket_content_sha(self, X: Data) -> str:
+        """SHA256 of the ticket content (also when the XAI ticket object is named after a ticket ref)."""
+        return self._encode_ticket_to_sha(X.model_dump())
+
     def load_xai_results(self, result_location: str, files: list[str]) -> Dict[str, Any]:
         """Load XAI results from a given MinIO location."""
         result = {}
@@ -329,6 +348,11 @@ class MinioService:
                     for obj_name in listing["matches"]:
                         self.client.delete_object(bucket, str(obj_name))
 
+    def _object_exists(self, bucket: str, object_name: str) -> bool:
+        """Check whether an object is stored under this exact name."""
+        listing = self.client.list_objects(bucket, prefix=object_name, filter_type="exact")
+        return bool(listing) and object_name in [str(match) for match in listing.get("matches") or []]
+
     def _to_joblib(self, obj: Any) -> bytes:
         """Serialize a Python object to joblib bytes."""
         buffer = BytesIO()
@@ -1,15 +1,36 @@
-from fastapi import APIRouter, HTTPException
-from app.core.dependencies import get_al_service
-from app.data_models.active_learning_dm import NewInstance, LabelRequest
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException
+from app.core.dependencies import get_al_service, get_instance_job_service
+from app.data_models.active_learning_dm import NewInstance, LabelRequest, InstanceExport
+from app.services.shard_router_svc import is_router_request
 
 router = APIRouter(prefix="/activelearning", tags=["active_learning"])
 al_service = get_al_service()
+instance_job_service = get_instance_job_service()
 
 
-@router.post("/new")
-def activelearning_init(new_instance: NewInstance):
-    instance_id = al_service.create_instance(new_instance)
-    return {"instance_id": instance_id}
+@router.post("/new", status_code=202)
+def activelearning_init(
+        new_instance: NewInstance,
+        instance_id: Optional[int] = Header(None, alias="X-HumAL-Instance-Id"),
+        router_secret: Optional[str] = Header(None, alias="X-HumAL-Router-Secret")
+        ):
+    # The instance is created in the background, the reserved id becomes usable once the job completes
+    # (the shard router assigns the id itself and passes it in the X-HumAL-Instance-Id header)
+    if instance_id is not None and not is_router_request(router_secret):
+        raise HTTPException(status_code=403, detail="X-HumAL-Instance-Id is only accepted from the shard router (SHARD_ROUTER_SECRET)")
+    try:
+        job = instance_job_service.submit(new_instance, instance_id=instance_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"instance_id": job["instance_id"], "job_id": job["job_id"], "status": job["status"]}
+
+@router.get("/jobs/{job_id}")
+def get_instance_job(job_id: str):
+    job = instance_job_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 @router.get("/{al_instance_id}/next")
 def next_instance(al_instance_id: int, batch_size: int = 1):                                                                                                                                                                                                                                                                                                                                                                                                                                      
@@ -52,4 +73,27 @@ def delete_instance(al_instance_id: int):
         raise HTTPException(status_code=404, detail="Instance not found")
     
     al_service.delete_instance(al_instance_id)
-    return {"message": "Instance deleted"}
\ No newline at end of file
+    return {"message": "Instance deleted"}
+
+# --- Moving instances between nodes (used by the shard router) ---
+@router.get("/{al_instance_id}/export")
+def export_instance(al_instance_id: int):
+    if al_instance_id not in al_service.storage.al_instances_dict:
+        raise HTTPException(status_code=404, detail="Instance not found")
+    return al_service.export_instance(al_instance_id)
+
+@router.post("/{al_instance_id}/restore")
+def restore_instance(al_instance_id: int, export: InstanceExport):
+    try:
+        al_service.restore_instance(al_instance_id, export.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"message": "Instance restored"}
+
+@router.post("/{al_instance_id}/release")
+def release_instance(al_instance_id: int):
+    if al_instance_id not in al_service.storage.al_instances_dict:
+        raise HTTPException(status_code=404, detail="Instance not found")
+
+    al_service.release_instance(al_instance_id)
+    return {"message": "Instance released"}
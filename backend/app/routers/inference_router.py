@@ -1,10 +1,25 @@
-from fastapi import APIRouter, HTTPException
+import json
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+import pandas as pd
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
 from app.core.dependencies import get_inference_service
 from app.data_models.active_learning_dm import Data
 
 router = APIRouter(prefix="/activelearning", tags=["inference"])
 inference_service = get_inference_service()
 
+_data_list = TypeAdapter(List[Data])
+
+@router.get("/inference/cache")
+def get_inference_cache_stats():
+    """Hits, misses and size of the inference result cache."""
+    return inference_service.cache.stats()
+
 @router.post("/{al_instance_id}/infer")
 def infer(al_instance_id: int, data: Data):
     # check if the instance id is valid
@@ -14,4 +29,92 @@ def infer(al_instance_id: int, data: Data):
     # check if the model is trained
     if al_instance_id not in inference_service.storage.model_paths_dict:
         raise HTTPException(status_code=404, detail="Model not trained yet, please train the model first")
-    return inference_service.infer(al_instance_id, data)
\ No newline at end of file
+    return inference_service.infer(al_instance_id, data)
+
+@router.post(
+    "/{al_instance_id}/infer_batch",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": Data.model_json_schema()}},
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def infer_batch(al_instance_id: int, request: Request, model_id: int = 0, return_proba: bool = False):
+    # check if the instance id is valid
+    if al_instance_id not in inference_service.storage.al_instances_dict:
+        raise HTTPException(status_code=404, detail="Instance not found")
+
+    # check if the model is trained
+    if al_instance_id not in inference_service.storage.model_paths_dict:
+        raise HTTPException(status_code=404, detail="Model not trained yet, please train the model first")
+
+    items = _parse_tickets(await request.body(), request.headers.get("content-type", ""))
+    try:
+        return await run_in_threadpool(inference_service.infer_batch, al_instance_id, items, model_id=model_id, return_proba=return_proba)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
+
+@router.post("/{al_instance_id}/score")
+def score_tickets(
+        al_instance_id: int,
+        model_id: int = 0,
+        split: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        chunk_size: Optional[int] = None
+        ):
+    """Score the stored tickets of a split / dataset_timestamp range, streamed as NDJSON while they are saved."""
+    # check if the instance id is valid
+    if al_instance_id not in inference_service.storage.al_instances_dict:
+        raise HTTPException(status_code=404, detail="Instance not found")
+
+    # check if the model is trained
+    if al_instance_id not in inference_service.storage.model_paths_dict:
+        raise HTTPException(status_code=404, detail="Model not trained yet, please train the model first")
+
+    kwargs = {"chunk_size": chunk_size} if chunk_size is not None else {}
+    try:
+        chunks = inference_service.score_tickets(al_instance_id, model_id=model_id, split=split, start=start, end=end, **kwargs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
+
+    return StreamingResponse(_ndjson(chunks), media_type="application/x-ndjson")
+
+@router.get("/{al_instance_id}/predictions")
+def get_predictions(al_instance_id: int, model_id: int = 0):
+    """Predictions saved by /score, as NDJSON."""
+    if al_instance_id not in inference_service.storage.al_instances_dict:
+        raise HTTPException(status_code=404, detail="Instance not found")
+
+    # Read and sent in pages, like /score, instead of loading every prediction at once
+    pages = inference_service.iter_predictions(al_instance_id, model_id=model_id)
+    return StreamingResponse(_ndjson(pages), media_type="application/x-ndjson")
+
+def _ndjson(chunks) -> Iterator[str]:
+    for chunk in chunks:
+        columns = [c for c in ("ref", "prediction", "probabilities", "scored_at") if c in chunk.columns]
+        lines = []
+        for row in chunk[columns].itertuples(index=False):
+            record = dict(zip(columns, row))
+            if "scored_at" in record:
+                record["scored_at"] = None if pd.isna(record["scored_at"]) else str(record["scored_at"])
+            lines.append(json.dumps(record))
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+def _parse_tickets(body: bytes, content_type: str) -> List[Data]:
+    """Tickets of a JSON array body or of a JSON lines body (one ticket per line)."""
+    try:
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            payload = [json.loads(line) for line in body.decode("utf-8").splitlines() if line.strip()]
+        else:
+            payload = json.loads(body or b"[]")
+        return _data_list.validate_python(payload)
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid tickets: {e}")
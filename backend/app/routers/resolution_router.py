@@ -1,6 +1,8 @@
 """Router for ticket resolution endpoints"""
 from fastapi import APIRouter, HTTPException
-from app.core.dependencies import get_resolution_service
+from fastapi.concurrency import run_in_threadpool
+from app.core.dependencies import get_resolution_service, get_compute_executor
+from app.services import compute_tasks
 from app.data_models.resolution_dm import (
     ResolutionRequest, 
     ResolutionResponse,
@@ -12,14 +14,18 @@ from app.data_models.resolution_dm import (
 router = APIRouter(prefix="/resolution", tags=["resolution"])
 
 @router.post("/process", response_model=ResolutionResponse)
-def process_ticket_resolution(request: ResolutionRequest):
+async def process_ticket_resolution(request: ResolutionRequest):
     """
     Generate first-reply response for IT support ticket.
     Uses RAG + GPT to generate contextually appropriate responses.
+    Runs in a compute worker if enabled (the classifiers are CPU-bound).
     """
     try:
-        resolution_service = get_resolution_service()
-        return resolution_service.process_new_ticket(request)
+        compute_executor = get_compute_executor()
+        if compute_executor.enabled:
+            return await compute_executor.run(compute_tasks.process_new_ticket, request)
+        # (the first call loads the models, so it runs on the threadpool as well)
+        return await run_in_threadpool(lambda: get_resolution_service().process_new_ticket(request))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
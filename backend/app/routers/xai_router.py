@@ -1,22 +1,163 @@
 from fastapi import APIRouter, HTTPException, Query, Body
-from app.core.dependencies import get_xai_service, get_data_service
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import StreamingResponse
+from app.core.dependencies import get_xai_service, get_data_service, get_compute_executor
+from app.services import compute_tasks
+from app.services.adaptive_lime import AdaptiveLimeConfig
 from app.data_models.active_learning_dm import Data
 import pandas as pd
-from typing import Optional
+from typing import AsyncIterator, Optional, Union
+import asyncio
+import json
+from dataclasses import asdict, replace
 import uuid
 import os
 
 router = APIRouter(prefix="/xai", tags=["xai"])
 xai_service = get_xai_service()
 data_service = get_data_service()
+compute_executor = get_compute_executor()
 
 @router.post("/{al_instance_id}/explain_lime")
-def explain_lime(
+async def explain_lime(
     al_instance_id: int, 
     ticket_data: Optional[Data] = Body(None), 
     query_idx: Optional[list[str]] = Query(None), 
+    model_id: int = Query(0),
+    adaptive: bool = Query(False),
+    max_samples: Optional[int] = Query(None, ge=2),
+    time_budget_ms: Optional[float] = Query(None),
+    tolerance: Optional[float] = Query(None)
+    ):
+    config = _adaptive_config(adaptive, max_samples, time_budget_ms, tolerance)
+    tickets = await _explain_request_tickets(al_instance_id, ticket_data, query_idx)
+    cache_params = _lime_cache_params(config)
+    model_version, explanations = await run_in_threadpool(
+        xai_service.cached_explanations, al_instance_id, model_id, tickets, "lime", cache_params
+    )
+    missing = [index for index, explanation in enumerate(explanations) if explanation is None]
+    if not missing:
+        return explanations
+    missing_tickets = [tickets[index] for index in missing]
+   
+    # explain the ticket_data (in a compute worker if enabled, LIME is CPU-bound)
+    computed = await compute_executor.run(
+        compute_tasks.explain_lime, al_instance_id, missing_tickets, model_id,
+        adaptive=config,
+        inline=xai_service.explain_lime
+    )
+    for index, explanation in zip(missing, computed):
+        explanations[index] = explanation
+    await run_in_threadpool(
+        xai_service.cache_explanations, al_instance_id, model_id, model_version, missing_tickets, "lime", cache_params, computed
+    )
+    return explanations
+
+@router.post("/{al_instance_id}/explain_lime/stream")
+async def explain_lime_stream(
+    al_instance_id: int, 
+    ticket_data: Optional[Data] = Body(None), 
+    query_idx: Optional[list[str]] = Query(None), 
+    model_id: int = Query(0),
+    adaptive: bool = Query(False),
+    max_samples: Optional[int] = Query(None, ge=2),
+    time_budget_ms: Optional[float] = Query(None),
+    tolerance: Optional[float] = Query(None)
+    ):
+    """LIME explanations of the tickets explained in parallel, streamed as NDJSON as each one completes."""
+    config = _adaptive_config(adaptive, max_samples, time_budget_ms, tolerance)
+    tickets = await _explain_request_tickets(al_instance_id, ticket_data, query_idx)
+    refs = query_idx if query_idx is not None else [None]
+    cache_params = _lime_cache_params(config)
+    model_version, cached = await run_in_threadpool(
+        xai_service.cached_explanations, al_instance_id, model_id, tickets, "lime", cache_params
+    )
+    missing = [index for index, explanation in enumerate(cached) if explanation is None]
+    missing_tickets = [tickets[index] for index in missing]
+
+    if compute_executor.enabled:
+        # One task per ticket, spread over the compute workers
+        computed = _worker_explanations(al_instance_id, missing_tickets, model_id, config)
+    else:
+        computed = iterate_in_threadpool(xai_service.iter_explain_lime(al_instance_id, missing_tickets, model_id, adaptive=config))
+
+    async def _explanations() -> AsyncIterator[tuple]:
+        # Cached explanations first, then the computed ones as they complete (cached at the end)
+        for index, explanation in enumerate(cached):
+            if explanation is not None:
+                yield index, explanation
+        if not missing:
+            return
+        done = [None] * len(missing)
+        async for position, explanation in computed:
+            done[position] = explanation
+            yield missing[position], explanation
+        await run_in_threadpool(
+            xai_service.cache_explanations, al_instance_id, model_id, model_version, missing_tickets, "lime", cache_params, done
+        )
+
+    return StreamingResponse(_ndjson_explanations(_explanations(), refs), media_type="application/x-ndjson")
+
+@router.post("/{al_instance_id}/explain_occlusion")
+async def explain_occlusion(
+    al_instance_id: int,
+    ticket_data: Optional[Data] = Body(None),
+    query_idx: Optional[list[str]] = Query(None),
+    model_id: int = Query(0),
+    ngram: int = Query(1, ge=1, le=3)
+    ):
+    """Leave-one-out explanations: each word (or n-gram) removed in turn, all the variants scored in one batch."""
+    tickets = await _explain_request_tickets(al_instance_id, ticket_data, query_idx)
+
+    return await compute_executor.run(
+        compute_tasks.explain_occlusion, al_instance_id, tickets, model_id,
+        ngram=ngram,
+        inline=xai_service.explain_occlusion
+    )
+
+@router.post("/{al_instance_id}/explain_shap")
+async def explain_shap(
+    al_instance_id: int,
+    ticket_data: Optional[Data] = Body(None),
+    query_idx: Optional[list[str]] = Query(None),
     model_id: int = Query(0)
     ):
+    """SHAP attributions of tree and linear models: the text (embedding) and each one-hot feature."""
+    tickets = await _explain_request_tickets(al_instance_id, ticket_data, query_idx)
+
+    # Milliseconds once the explainer of the model version is built: runs in the API process,
+    # which knows the model versions (the compute workers do not)
+    return await run_in_threadpool(xai_service.explain_shap, al_instance_id, tickets, model_id)
+
+def _adaptive_config(
+    adaptive: bool,
+    max_samples: Optional[int],
+    time_budget_ms: Optional[float],
+    tolerance: Optional[float]
+    ) -> Optional[AdaptiveLimeConfig]:
+    """Sampling of an adaptive explanation (None: the fixed 1000 samples of LIME)."""
+    if not adaptive:
+        if (max_samples, time_budget_ms, tolerance) != (None, None, None):
+            raise HTTPException(status_code=400, detail="max_samples, time_budget_ms and tolerance require adaptive=true")
+        return None
+
+    config = AdaptiveLimeConfig()
+    overrides = {"max_samples": max_samples, "time_budget_ms": time_budget_ms, "tolerance": tolerance}
+    overrides = {name: value for name, value in overrides.items() if value is not None}
+    if max_samples is not None:
+        overrides["initial_samples"] = min(config.initial_samples, max_samples)
+    try:
+        return replace(config, **overrides)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _lime_cache_params(adaptive: Optional[AdaptiveLimeConfig]) -> dict:
+    """Parameters of a LIME explanation in the explanation cache key."""
+    if adaptive is None:
+        return {"num_samples": 1000}
+    return {"adaptive": asdict(adaptive)}
+
+async def _explain_request_tickets(al_instance_id: int, ticket_data: Optional[Data], query_idx: Optional[list[str]]) -> list[Data]:
     # check if the instance id is valid
     if al_instance_id not in xai_service.storage.al_instances_dict:
         raise HTTPException(status_code=404, detail="Instance not found")
@@ -25,34 +166,67 @@ def explain_lime(
     if al_instance_id not in xai_service.storage.model_paths_dict:
         raise HTTPException(status_code=404, detail="Model not trained yet, please train the model first")
 
-    tickets = []
-
     # require exactly one source
     if (ticket_data is None) == (query_idx is None):
         raise HTTPException(status_code=400, detail="Provide exactly one of ticket_data or query_idx")
 
     if ticket_data is not None:
-        tickets.append(ticket_data)
-    else:
-        for idx in query_idx:
-            ticket = data_service.get_tickets(al_instance_id, [idx])['tickets'][0]
-            ticket_data_obj = Data(
-                title_anon = ticket['Title_anon'],
-                description_anon = ticket['Description_anon'],
-                service_name = ticket['Service->Name'],
-                service_subcategory_name = ticket['Service subcategory->Name']
-            )
-            tickets.append(ticket_data_obj)
-   
-    # explain the ticket_data
-    return xai_service.explain_lime(al_instance_id, tickets, model_id)
+        return [ticket_data]
+    return await run_in_threadpool(_load_query_tickets, query_idx)
+
+def _load_query_tickets(query_idx: list[str]) -> list[Data]:
+    """Tickets of the refs (in the order of query_idx), read with one DuckDB query."""
+    rows = {str(ticket['Ref']): ticket for ticket in data_service.get_tickets(query_idx)['tickets']}
+    missing = [idx for idx in query_idx if idx not in rows]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Tickets not found: {', '.join(missing)}")
+
+    tickets = []
+    for idx in query_idx:
+        ticket = rows[idx]
+        ticket_data_obj = Data(
+            title_anon = ticket['Title_anon'],
+            description_anon = ticket['Description_anon'],
+            service_name = ticket['Service->Name'],
+            service_subcategory_name = ticket['Service subcategory->Name']
+        )
+        tickets.append(ticket_data_obj)
+    return tickets
+
+async def _worker_explanations(
+    al_instance_id: int,
+    tickets: list[Data],
+    model_id: int,
+    adaptive: Optional[AdaptiveLimeConfig] = None
+    ) -> AsyncIterator[tuple]:
+    futures = [
+        asyncio.wrap_future(compute_executor.submit(compute_tasks.explain_lime, al_instance_id, [ticket], model_id, adaptive=adaptive))
+        for ticket in tickets
+    ]
+
+    async def _indexed(index: int, future):
+        return index, (await future)[0]
+
+    try:
+        for next_done in asyncio.as_completed([_indexed(index, future) for index, future in enumerate(futures)]):
+            yield await next_done
+    finally:
+        # Client gone: the tickets not started are not explained
+        for future in futures:
+            future.cancel()
+
+async def _ndjson_explanations(explanations: AsyncIterator[tuple], refs: list) -> AsyncIterator[str]:
+    async for index, explanation in explanations:
+        yield json.dumps({"index": index, "ref": refs[index], **explanation}) + "\n"
 
 @router.post("/{al_instance_id}/nearest_ticket")
 def find_nearest_ticket(
     al_instance_id: int, 
-    ticket_data: Optional[Data] = Body(None), 
+    ticket_data: Optional[Union[Data, list[Data]]] = Body(None), 
     query_idx: Optional[list[str]] = Query(None), 
-    model_id: int = Query(0)
+    model_id: int = Query(0),
+    k: Optional[int] = Query(None, ge=1, le=100),
+    include_tickets: bool = Query(False)
     ):
     # check if the instance id is valid
     if al_instance_id not in xai_service.storage.al_instances_dict:
@@ -67,10 +241,39 @@ def find_nearest_ticket(
     if (ticket_data is None) == (query_idx is None):
         raise HTTPException(status_code=400, detail="Provide exactly one of ticket_data or query_idx")
     
-    if ticket_data is not None:
-        return xai_service.find_nearest_by_ticket(al_instance_id, ticket_data, model_id)
-    else:
-        return xai_service.find_nearest_by_query_idx(al_instance_id, query_idx, model_id)
+    try:
+        # Single nearest ticket (original response)
+        if k is None and not include_tickets and not isinstance(ticket_data, list):
+            if ticket_data is not None:
+                return xai_service.find_nearest_by_ticket(al_instance_id, ticket_data, model_id)
+            else:
+                return xai_service.find_nearest_by_query_idx(al_instance_id, query_idx, model_id)
+
+        # k nearest tickets of every query ticket, one search for all of them
+        if ticket_data is not None:
+            tickets = ticket_data if isinstance(ticket_data, list) else [ticket_data]
+            refs = [None] * len(tickets)
+            neighbors = xai_service.find_nearest_tickets(al_instance_id, tickets=tickets, k=k or 1)
+        else:
+            missing = [idx for idx in query_idx if idx not in xai_service.storage.dataset_dict[al_instance_id]['X_train'].index]
+            if missing:
+                raise HTTPException(status_code=404, detail=f"Tickets not found: {', '.join(missing)}")
+            refs = query_idx
+            neighbors = xai_service.find_nearest_tickets(al_instance_id, indices=query_idx, k=k or 1)
+    except ValueError as e:
+        # No labeled ticket to compare with yet
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if include_tickets:
+        # Bodies of all the neighbours read with one DuckDB query
+        xai_service.attach_neighbor_tickets(neighbors)
+
+    return {
+        "results": [
+            {"index": index, "ref": ref, "neighbors": row}
+            for index, (ref, row) in enumerate(zip(refs, neighbors))
+        ]
+    }
 
 @router.post("/{al_instance_id}/requests")
 async def create_xai_request(
@@ -2,8 +2,14 @@ from skactiveml.classifier import SklearnClassifier
 from skactiveml.utils import MISSING_LABEL
 import numpy as np
 import joblib
+import logging
 import os
-from typing import Optional
+import socket
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
 import pandas as pd
 from sklearn.metrics import f1_score
 from scipy.stats import entropy
@@ -12,66 +18,89 @@ from app.core.storage import ActiveLearningStorage
 from app.data_models.active_learning_dm import NewInstance, LabelRequest
 from app.persistence.duckdb import DuckDbPersistenceService
 from app.persistence.local_artifacts import LocalArtifactsStore
-from app.services.data_preprocessing import dispatch_team
-from app.config.config import SYSTEM_USER_ID
+from app.core.compute_executor import ComputeExecutor
+from app.services import compute_tasks
+from app.services.data_preprocessing import preprocess_dataset
+from app.config.config import SYSTEM_USER_ID, TRAIN_SPLIT, TEST_SPLIT
 from app.persistence.minio_storage import MinioService
 
+logger = logging.getLogger(__name__)
+
+# Number of preprocessed datasets (features, labels, encoders) kept for reuse by create_instance;
+# each one is a full copy of the train and test data, outside of AL_DATASET_MEMORY_BUDGET_MB
+PREPROCESSING_CACHE_SIZE = int(os.getenv("AL_PREPROCESSING_CACHE_SIZE", "0"))
+# Number of parallel artifact writes/uploads when persisting a new instance
+UPLOAD_WORKERS = int(os.getenv("AL_UPLOAD_WORKERS", "6"))
+# Several API workers share the instances: ids come from DuckDB, features are memory-mapped and
+# changes are exchanged through the instance change feed (see sync_instance_changes)
+SHARED_STATE = os.getenv("AL_SHARED_STATE", "0") == "1"
+
 class ActiveLearningService:
     def __init__(
         self,
         storage: ActiveLearningStorage,
         duckdb_service: Optional[DuckDbPersistenceService] = None,
         local_artifacts_store: Optional[LocalArtifactsStore] = None,
-        minio_service: Optional[MinioService] = None
+        minio_service: Optional[MinioService] = None,
+        shared_state: bool = SHARED_STATE,
+        compute_executor: Optional[ComputeExecutor] = None
     ):
         self.storage = storage
         self.duckdb_service = duckdb_service
         self.local_artifacts_store = local_artifacts_store
         self.minio_service = minio_service
+        self.compute_executor = compute_executor
+        self._preprocessing_cache = OrderedDict()
+        self._preprocessing_key_locks = {}
+        self._preprocessing_lock = threading.Lock()
+        self._instance_data_paths = {}
+        self.shared_state = shared_state and self.duckdb_service is not None and self.local_artifacts_store is not None
+        # Identifies the changes published by this process in the change feed
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._change_feed_position = 0
+        self._change_feed_lock = threading.Lock()
+        if self.shared_state:
+            self.storage.id_allocator = self.duckdb_service.next_al_instance_id
         if self.duckdb_service is not None and self.local_artifacts_store is not None:
             self._load_from_persistence()
 
     # Logic for creating a new active learning instance
-    def create_instance(self, new_instance: NewInstance):
+    def create_instance(
+            self,
+            new_instance: NewInstance,
+            instance_id: Optional[int] = None,
+            progress_callback: Optional[Callable[..., None]] = None
+            ):
+        """
+        Create a new active learning instance.
+
+        instance_id may be reserved up front (see ActiveLearningStorage.reserve_instance_id)
+        when the instance is created in a background job. progress_callback is forwarded to
+        dispatch_team and additionally receives the 'persisting' phase.
+        """
         # Get next available instance ID
-        instance_id = self.storage.get_next_instance_id()
+        if instance_id is None:
+            instance_id = self.storage.get_next_instance_id()
         
         # Define the classes as integers
         new_instance.class_list = new_instance.class_list
         classes = list(range(len(new_instance.class_list)+1))
         
-        # Initialize active learning instance
-        self.storage.al_instances_dict[instance_id] = {
+        # Preprocess the data (indices stay as Ref); identical data is only embedded once
+        X_train, y_train, X_test, y_test, le, oh = self._preprocess(new_instance.class_list, progress_callback)
+        
+        al_instance_data = {
             'model': model_dict[new_instance.model_name],
             'model_name': new_instance.model_name,
             'qs': new_instance.qs_strategy,
             'classes': classes
         }
-        
-        # Preprocess the data (indices stay as Ref)
-        X_train, y_train, le, oh = dispatch_team(duckdb_service=self.duckdb_service, test_set=False, classes=new_instance.class_list)
-        X_test, y_test, _, _ = dispatch_team(duckdb_service=self.duckdb_service, test_set=True, le=le, oh=oh)
-        
-        # Get the index of np.nan in the LabelEncoder's classes
-        empty = le.transform([np.nan])[0]
-        # Replace missing values with MISSING_LABEL in y_train (indexed by Ref)
-        y_train = y_train.replace(empty, MISSING_LABEL)
-        
-        # save the data to the dataset dictionary
-        self.storage.dataset_dict[instance_id] = {
-            'X_train': X_train,
-            'y_train': y_train,
-            'X_test': X_test,
-            'y_test': y_test,
-            'le': le,
-            'oh': oh,
-            'train_data_path': new_instance.train_data_path,
-            'test_data_path': new_instance.test_data_path
-        }
+
+        if progress_callback is not None:
+            progress_callback("persisting", 0, 0)
 
         # Save the dictionary elements to persistence
         if self.duckdb_service is not None and self.local_artifacts_store is not None:
-            al_instance_data = self.storage.al_instances_dict[instance_id]
             al_instance_data["train_data_path"] = new_instance.train_data_path
             al_instance_data["test_data_path"] = new_instance.test_data_path
 
@@ -80,136 +109,300 @@ class ActiveLearningService:
                 instance_data = al_instance_data
             )
 
-            self.local_artifacts_store.save_encoders(
-                al_instance_id=instance_id,
-                label_encoder=le,
-                one_hot_encoder=oh
-            )
+        self._save_instance_artifacts(instance_id, X_train, y_train, X_test, y_test, le, oh)
 
-            self.local_artifacts_store.save_vectorized_dataset(
-                al_instance_id=instance_id,
-                X=X_train,
-                split="train"
-            )
-            self.local_artifacts_store.save_vectorized_dataset(
-                al_instance_id=instance_id,
-                X=X_test,
-                split="test"
-            )
-
-        # Save the datasets, encoders and labels to MinIO
-        if self.minio_service is not None:
-            self.minio_service.save_label_encoder(
-                al_instance_id=instance_id,
-                encoder=le
-            )
+        # save the data to the dataset dictionary (after persisting, so that it can be evicted and reloaded)
+        self._instance_data_paths[instance_id] = (new_instance.train_data_path, new_instance.test_data_path)
+        self.storage.dataset_dict[instance_id] = {
+            'X_train': X_train,
+            'y_train': y_train,
+            'X_test': X_test,
+            'y_test': y_test,
+            'le': le,
+            'oh': oh,
+            'train_data_path': new_instance.train_data_path,
+            'test_data_path': new_instance.test_data_path
+        }
 
-            self.minio_service.save_one_hot_encoder(
-                al_instance_id=instance_id,
-                encoder=oh
-            )
+        # Initialize active learning instance (only now the instance becomes visible to the routers)
+        self.storage.al_instances_dict[instance_id] = al_instance_data
+        self._publish_change(instance_id, "created")
 
-            self.minio_service.save_vectorized_tickets(
-                al_instance_id=instance_id,
-                tickets_version=0,
-                split="train",
-                df=X_train
-            )
+        return instance_id
 
-            self.minio_service.save_vectorized_tickets(
-                al_instance_id=instance_id,
-                tickets_version=0,
-                df=X_test,
-                split="test"
-            )
+    def _preprocess(self, class_list: list, progress_callback: Optional[Callable[..., None]] = None):
+        """
+        Run dispatch_team on the train and test split.
+
+        Results are cached by a fingerprint of the ticket data and the class list, so that creating
+        several instances on the same data embeds the tickets only once. Concurrent requests for the
+        same fingerprint wait for the first one instead of embedding in parallel.
+        """
+        key = self._dataset_fingerprint(class_list)
+        with self._preprocessing_lock:
+            key_lock = self._preprocessing_key_locks.setdefault(key, threading.Lock())
+
+        try:
+            with key_lock:
+                cached = self._preprocessing_cache.get(key)
+                if cached is None:
+                    if self._offload():
+                        # The tickets are read here, embedded and encoded by a warm worker process
+                        cached = self.compute_executor.call(
+                            compute_tasks.preprocess_dataset,
+                            compute_tasks.TicketFrames.load(self.duckdb_service),
+                            class_list,
+                            progress=progress_callback
+                        )
+                    else:
+                        cached = preprocess_dataset(self.duckdb_service, class_list, progress_callback=progress_callback)
+                    if PREPROCESSING_CACHE_SIZE > 0:
+                        with self._preprocessing_lock:
+                            self._preprocessing_cache[key] = cached
+                            while len(self._preprocessing_cache) > PREPROCESSING_CACHE_SIZE:
+                                evicted, _ = self._preprocessing_cache.popitem(last=False)
+                                self._preprocessing_key_locks.pop(evicted, None)
+                else:
+                    with self._preprocessing_lock:
+                        self._preprocessing_cache.move_to_end(key)
+        finally:
+            # Nothing cached (cache disabled or preprocessing failed): the lock is not needed anymore
+            with self._preprocessing_lock:
+                if key not in self._preprocessing_cache and self._preprocessing_key_locks.get(key) is key_lock:
+                    del self._preprocessing_key_locks[key]
+
+        X_train, y_train, X_test, y_test, le, oh = cached
+        # The features are never modified in place, the labels are (see label_instance)
+        return X_train, y_train.copy(), X_test, y_test.copy(), le, oh
+
+    def _dataset_fingerprint(self, class_list: list) -> tuple:
+        """Identify the ticket data (per split timestamp and size) and the requested classes."""
+        counts = self.duckdb_service.get_ticket_counts_by_split()
+        return (
+            str(self.duckdb_service.get_latest_dataset_timestamp(TRAIN_SPLIT)),
+            str(self.duckdb_service.get_latest_dataset_timestamp(TEST_SPLIT)),
+            str(counts.get(TRAIN_SPLIT)),
+            str(counts.get(TEST_SPLIT)),
+            tuple(repr(c) for c in class_list),
+        )
 
-            self.minio_service.save_labels(
-                al_instance_id=instance_id,
-                labels_version=0,
-                split="train",
-                df=y_train
-            )
+    def _save_instance_artifacts(self, instance_id: int, X_train, y_train, X_test, y_test, le, oh) -> None:
+        """Write the local artifacts and upload the MinIO objects of a new instance in parallel."""
+        tasks = []
 
-            self.minio_service.save_labels(
-                al_instance_id=instance_id,
-                labels_version=0,
-                split="test",
-                df=y_test
-            )
+        # Save the encoders and vectorized datasets locally
+        if self.duckdb_service is not None and self.local_artifacts_store is not None:
+            tasks += [
+                (self.local_artifacts_store.save_encoders, dict(al_instance_id=instance_id, label_encoder=le, one_hot_encoder=oh)),
+                (self.local_artifacts_store.save_vectorized_dataset, dict(al_instance_id=instance_id, X=X_train, split="train")),
+                (self.local_artifacts_store.save_vectorized_dataset, dict(al_instance_id=instance_id, X=X_test, split="test")),
+            ]
 
+        # Save the datasets, encoders and labels to MinIO
+        if self.minio_service is not None:
+            tasks += [
+                (self.minio_service.save_label_encoder, dict(al_instance_id=instance_id, encoder=le)),
+                (self.minio_service.save_one_hot_encoder, dict(al_instance_id=instance_id, encoder=oh)),
+                (self.minio_service.save_vectorized_tickets, dict(al_instance_id=instance_id, tickets_version=0, split="train", df=X_train)),
+                (self.minio_service.save_vectorized_tickets, dict(al_instance_id=instance_id, tickets_version=0, split="test", df=X_test)),
+                (self.minio_service.save_labels, dict(al_instance_id=instance_id, labels_version=0, split="train", df=y_train)),
+                (self.minio_service.save_labels, dict(al_instance_id=instance_id, labels_version=0, split="test", df=y_test)),
+            ]
+
+        if not tasks:
+            return
 
-        return instance_id
+        with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(tasks)), thread_name_prefix="al-upload") as executor:
+            futures = [executor.submit(fn, **kwargs) for fn, kwargs in tasks]
+            # Propagate the first failure (if any) after all tasks finished
+            for future in futures:
+                future.result()
+
+    def _offload(self) -> bool:
+        """CPU-bound steps run in the compute worker processes (they read the local artifacts)."""
+        return (
+            self.compute_executor is not None
+            and self.compute_executor.enabled
+            and self.duckdb_service is not None
+            and self.local_artifacts_store is not None
+        )
 
     def _load_from_persistence(self) -> None:
+        """
+        Register the persisted instances without loading their data.
+
+        Only the instance metadata is read here. Encoders, vectorized datasets, labels, metrics and
+        model paths are loaded on first access (see LazyInstanceDict) and the datasets are evicted
+        again when AL_DATASET_MEMORY_BUDGET_MB is exceeded. Instances listed in AL_WARM_INSTANCES
+        ("all" or comma separated ids) are preloaded in the background.
+        """
+        self.storage.dataset_dict.loader = self._load_instance_dataset
+        self.storage.results_dict.loader = self._load_instance_results
+        self.storage.model_paths_dict.loader = self.duckdb_service.load_model_paths
+
+        # Changes recorded from now on are replayed by sync_instance_changes
+        if self.shared_state:
+            self._change_feed_position = self.duckdb_service.get_latest_instance_change_id()
+
         instances = self.duckdb_service.get_all_instances()
         if not instances:
             return
 
         for instance_id, instance_data in instances.items():
-            model_name = instance_data.get("model_name")
-            qs_name = instance_data.get("qs")
-            classes = instance_data.get("classes")
-            train_data_path = instance_data.get("train_data_path")
-            test_data_path = instance_data.get("test_data_path")
-
-            model = model_dict.get(model_name)
-            if model is None or qs_name not in qs_dict:
-                print(f"Warning: Skipping instance {instance_id} - invalid model '{model_name}' or query strategy '{qs_name}'")
-                continue
-
-            if train_data_path is None or test_data_path is None:
-                print(f"Warning: Skipping instance {instance_id} - missing train or test data path")
-                continue
+            self._register_persisted_instance(instance_id, instance_data)
+
+        warm_instances = self._warm_instance_ids()
+        if warm_instances:
+            threading.Thread(
+                target=self.storage.dataset_dict.prefetch,
+                args=(warm_instances,),
+                name="al-warm-instances",
+                daemon=True
+            ).start()
+
+    def _register_persisted_instance(self, instance_id: int, instance_data: dict) -> bool:
+        """Make a persisted instance available (its data is loaded on first access)."""
+        model_name = instance_data.get("model_name")
+        qs_name = instance_data.get("qs")
+        classes = instance_data.get("classes")
+        train_data_path = instance_data.get("train_data_path")
+        test_data_path = instance_data.get("test_data_path")
+
+        model = model_dict.get(model_name)
+        if model is None or qs_name not in qs_dict:
+            print(f"Warning: Skipping instance {instance_id} - invalid model '{model_name}' or query strategy '{qs_name}'")
+            return False
+
+        if train_data_path is None or test_data_path is None:
+            print(f"Warning: Skipping instance {instance_id} - missing train or test data path")
+            return False
+
+        if not self.local_artifacts_store.has_instance_artifacts(instance_id):
+            print(f"Warning: Skipping instance {instance_id} - missing encoders or vectorized datasets")
+            return False
 
-            try:
-                le, oh = self.local_artifacts_store.load_encoders(instance_id)
-                X_train = self.local_artifacts_store.load_vectorized_dataset(
-                    instance_id,
-                    split="train",
-                )
-                X_test = self.local_artifacts_store.load_vectorized_dataset(
-                    instance_id,
-                    split="test",
-                )
-            except FileNotFoundError:
-                print(f"Warning: Skipping instance {instance_id} - missing encoders or vectorized datasets")
-                continue
-
-            y_train = self.duckdb_service.load_labels(instance_id, split="train")
-            y_train = self._align_labels(y_train, X_train.index, fill_missing=MISSING_LABEL)
-            y_train = self._encode_labels(y_train, le)
-
-            y_test = self.duckdb_service.load_labels(instance_id, split="test")
-            y_test = self._align_labels(y_test, X_test.index, fill_missing=np.nan)
-            #y_test = self._encode_labels(y_test, le)
-
-            self.storage.al_instances_dict[instance_id] = {
-                "model": model,
-                "model_name": model_name,
-                "qs": qs_name,
-                "classes": classes,
-            }
-
-            self.storage.dataset_dict[instance_id] = {
-                "X_train": X_train,
-                "y_train": y_train,
-                "X_test": X_test,
-                "y_test": y_test,
-                "le": le,
-                "oh": oh,
-                "train_data_path": train_data_path,
-                "test_data_path": test_data_path
-            }
+        self.storage.al_instances_dict[instance_id] = {
+            "model": model,
+            "model_name": model_name,
+            "qs": qs_name,
+            "classes": classes,
+        }
+        self._instance_data_paths[instance_id] = (train_data_path, test_data_path)
+
+        self.storage.dataset_dict.register(instance_id)
+        self.storage.results_dict.register(instance_id)
+        self.storage.model_paths_dict.register(instance_id)
+        return True
+
+    def _publish_change(self, instance_id: int, kind: str) -> None:
+        """Tell the other API workers that an instance changed (shared state only)."""
+        if self.shared_state:
+            self.duckdb_service.record_instance_change(instance_id, kind, origin=self.origin)
+
+    def sync_instance_changes(self) -> int:
+        """
+        Apply the changes published by other API workers since the last call.
+
+        The data of this process is never updated in place: the affected entries are dropped and
+        loaded again from DuckDB and the (memory-mapped) local artifacts on their next access.
+        Returns the number of changes applied.
+        """
+        if not self.shared_state:
+            return 0
+
+        with self._change_feed_lock:
+            changes = self.duckdb_service.load_instance_changes(self._change_feed_position)
+            applied = 0
+            for change in changes:
+                self._change_feed_position = change["change_id"]
+                if change["origin"] == self.origin:
+                    continue
+                self._apply_instance_change(change["al_instance_id"], change["kind"])
+                applied += 1
+            return applied
+
+    def _apply_instance_change(self, instance_id: int, kind: str) -> None:
+        if kind == "created":
+            instance_data = self.duckdb_service.load_al_instance(instance_id)
+            if instance_data is not None:
+                self._register_persisted_instance(instance_id, instance_data)
+        elif kind == "labels":
+            self.storage.dataset_dict.evict(instance_id)
+        elif kind == "model":
+            self.storage.model_paths_dict.evict(instance_id)
+            self.storage.bump_model_version(instance_id)
+        elif kind == "metrics":
+            self.storage.results_dict.evict(instance_id)
+        elif kind == "deleted":
+            self._unregister_instance(instance_id)
+            self.storage.bump_model_version(instance_id)
+            self._instance_data_paths.pop(instance_id, None)
+
+    def _warm_instance_ids(self) -> list[int]:
+        raw = os.getenv("AL_WARM_INSTANCES", "").strip()
+        if not raw:
+            return []
+        if raw.lower() == "all":
+            return list(self.storage.al_instances_dict.keys())
+        ids = [int(i) for i in raw.split(",") if i.strip()]
+        return [i for i in ids if i in self.storage.al_instances_dict]
+
+    def _load_instance_dataset(self, instance_id: int) -> dict:
+        """Load the encoders, vectorized datasets and labels of a persisted instance."""
+        try:
+            le, oh = self.local_artifacts_store.load_encoders(instance_id)
+            oh_lookup = self.local_artifacts_store.load_onehot_lookup(instance_id)
+            # With shared state the workers map the same feature files instead of copying them
+            load_kwargs = {"mmap_mode": "r"} if self.shared_state else {}
+            X_train = self.local_artifacts_store.load_vectorized_dataset(
+                instance_id,
+                split="train",
+                **load_kwargs,
+            )
+            X_test = self.local_artifacts_store.load_vectorized_dataset(
+                instance_id,
+                split="test",
+                **load_kwargs,
+            )
+        except FileNotFoundError:
+            print(f"Warning: Skipping instance {instance_id} - missing encoders or vectorized datasets")
+            self._unregister_instance(instance_id)
+            raise KeyError(instance_id)
+
+        y_train = self.duckdb_service.load_labels(instance_id, split="train")
+        y_train = self._align_labels(y_train, X_train.index, fill_missing=MISSING_LABEL)
+        y_train = self._encode_labels(y_train, le)
+
+        y_test = self.duckdb_service.load_labels(instance_id, split="test")
+        y_test = self._align_labels(y_test, X_test.index, fill_missing=np.nan)
+        #y_test = self._encode_labels(y_test, le)
+
+        train_data_path, test_data_path = self._instance_data_paths.get(instance_id, (None, None))
+        return {
+            "X_train": X_train,
+            "y_train": y_train,
+            "X_test": X_test,
+            "y_test": y_test,
+            "le": le,
+            "oh": oh,
+            "oh_lookup": oh_lookup,
+            "train_data_path": train_data_path,
+            "test_data_path": test_data_path
+        }
 
-            metrics = self.duckdb_service.load_all_metrics(instance_id)
-            self.storage.results_dict[instance_id] = {
-                "mean_entropies": [m["mean_entropy"] for m in metrics],
-                "f1_scores": [m["f1_score"] for m in metrics],
-                "num_labeled": [m["num_labeled"] for m in metrics],
-            }
+    def _load_instance_results(self, instance_id: int) -> dict:
+        metrics = self.duckdb_service.load_all_metrics(instance_id)
+        return {
+            "mean_entropies": [m["mean_entropy"] for m in metrics],
+            "f1_scores": [m["f1_score"] for m in metrics],
+            "num_labeled": [m["num_labeled"] for m in metrics],
+        }
 
-            model_paths = self.duckdb_service.load_model_paths(instance_id)
-            self.storage.model_paths_dict[instance_id] = model_paths
+    def _unregister_instance(self, instance_id: int) -> None:
+        """Forget an instance whose artifacts turned out to be unusable."""
+        self.storage.al_instances_dict.pop(instance_id, None)
+        for lazy_dict in (self.storage.dataset_dict, self.storage.results_dict, self.storage.model_paths_dict):
+            lazy_dict.pop(instance_id, None)
 
     def _align_labels(
         self,
@@ -245,6 +438,9 @@ class ActiveLearningService:
 
     # Logic for getting the next instances
     def get_next_instances(self, al_instance_id: int, batch_size: int = 1):        
+        # Labels given through other workers since the last poll must not be queried again
+        self.sync_instance_changes()
+
         # Get the data
         X = self.storage.dataset_dict[al_instance_id]['X_train']
         y = self.storage.dataset_dict[al_instance_id]['y_train']
@@ -277,6 +473,8 @@ class ActiveLearningService:
 
     # Logic for labeling instances
     def label_instance(self, al_instance_id: int, label_request: LabelRequest):
+        self.sync_instance_changes()
+
         # get the data
         # X = self.storage.dataset_dict[al_instance_id]['X_train']
         y = self.storage.dataset_dict[al_instance_id]['y_train']
@@ -301,6 +499,7 @@ class ActiveLearningService:
         # update the labels
         # use Ref-based labels directly against index
         y.loc[query_idx] = labels_encoded
+        self.storage.update_labeled_index(al_instance_id, list(query_idx))
 
         # Save the labels to persistence
         self.duckdb_service.save_labels(
@@ -309,6 +508,11 @@ class ActiveLearningService:
             labels_dict=dict(zip(query_idx, labels)),
             split="train"
         )
+        self._publish_change(al_instance_id, "labels")
+
+        if self.shared_state:
+            # Other workers may have labeled since the last sync: DuckDB holds all labels
+            self._refresh_train_labels(al_instance_id)
 
         # Save the labels to MinIO
         if self.minio_service is not None:
@@ -319,8 +523,25 @@ class ActiveLearningService:
                 df=y
             )
 
+    def _refresh_train_labels(self, al_instance_id: int) -> None:
+        """Take over the train labels stored in DuckDB where they differ from the ones in memory."""
+        dataset = self.storage.dataset_dict[al_instance_id]
+        y = dataset['y_train']
+        persisted = self.duckdb_service.load_labels(al_instance_id, split="train")
+        persisted = self._align_labels(persisted, dataset['X_train'].index, fill_missing=MISSING_LABEL)
+        persisted = self._encode_labels(persisted, dataset['le'])
+
+        changed = ~((persisted == y) | (persisted.isna() & y.isna()))
+        if changed.any():
+            refs = list(y.index[changed.to_numpy()])
+            y.loc[refs] = persisted.loc[refs]
+            self.storage.update_labeled_index(al_instance_id, refs)
+
     # Logic for updating the model
     def update_model(self, al_instance_id: int):
+        # Train on the labels given through other workers as well
+        self.sync_instance_changes()
+
         # Instance
         instance = self.storage.al_instances_dict[al_instance_id]
 
@@ -330,10 +551,14 @@ class ActiveLearningService:
         
         # get the model
         model = instance['model']
-        clf = SklearnClassifier(model, classes=instance['classes'])
 
         # Train the model
-        clf.fit(X, y)
+        if self._offload():
+            # The worker reads the (unchanged) features from the local artifacts, only the labels are sent
+            clf = self.compute_executor.call(compute_tasks.fit_model, al_instance_id, model, instance['classes'], y)
+        else:
+            clf = SklearnClassifier(model, classes=instance['classes'])
+            clf.fit(X, y)
         
         # save the model (the clf object)
         model_path = self.local_artifacts_store.save_model(
@@ -346,6 +571,9 @@ class ActiveLearningService:
         if al_instance_id not in self.storage.model_paths_dict:
             self.storage.model_paths_dict[al_instance_id] = {}
         self.storage.model_paths_dict[al_instance_id][0] = model_path
+        # Cached inference results and explanations of the previous model are outdated
+        self.storage.bump_model_version(al_instance_id, 0)
+        self.duckdb_service.delete_explanations(al_instance_id, 0)
 
         # Save the model path to persistence
         self.duckdb_service.save_model_path(
@@ -353,6 +581,7 @@ class ActiveLearningService:
             model_id=0,
             path_to_model=model_path
         )
+        self._publish_change(al_instance_id, "model")
 
         # Save the model to MinIO (original model, not the clf wrapper (easier integration with outside services))
         if self.minio_service is not None:
@@ -413,6 +642,7 @@ class ActiveLearningService:
             mean_entropy=mean_entropy,
             num_labeled=num_labeled
         )
+        self._publish_change(al_instance_id, "metrics")
 
     # Logic for saving the model
     def save_model(self, al_instance_id: int):
@@ -432,6 +662,8 @@ class ActiveLearningService:
         
         # Save the model path
         self.storage.model_paths_dict[al_instance_id][model_id] = model_path
+        self.storage.bump_model_version(al_instance_id, model_id)
+        self.duckdb_service.delete_explanations(al_instance_id, model_id)
 
         # Save the model path to persistence
         self.duckdb_service.save_model_path(
@@ -439,6 +671,7 @@ class ActiveLearningService:
             model_id=model_id,
             path_to_model=model_path
         )
+        self._publish_change(al_instance_id, "model")
 
         # Save the model, vectorized datasets and labels to MinIO
         if self.minio_service is not None:
@@ -480,19 +713,131 @@ class ActiveLearningService:
     
     # Logic for deleting an active learning instance
     def delete_instance(self, al_instance_id: int):
+        # Delete the instance from this node (dictionaries, local artifacts and persistence)
+        self.release_instance(al_instance_id)
+
+        # Delete the instance's objects from MinIO
+        if self.minio_service is not None:
+            self.minio_service.delete_instance_objects(al_instance_id)
+
+    # Logic for removing an instance from this node only (its MinIO objects are kept)
+    def release_instance(self, al_instance_id: int):
         # delete the instance from the dictionaries
         del self.storage.al_instances_dict[al_instance_id]
-        del self.storage.dataset_dict[al_instance_id]
-        del self.storage.results_dict[al_instance_id]
+        self.storage.dataset_dict.pop(al_instance_id, None)
+        # (no results or model paths yet if the instance was never trained)
+        self.storage.results_dict.pop(al_instance_id, None)
         
         # delete the model dictionary
-        del self.storage.model_paths_dict[al_instance_id]
+        self.storage.model_paths_dict.pop(al_instance_id, None)
+        self.storage.bump_model_version(al_instance_id)
+        self._instance_data_paths.pop(al_instance_id, None)
 
         # Delete the local artifacts
         self.local_artifacts_store.delete_instance_artifacts(al_instance_id)
 
         # Delete the instance from persistence
         self.duckdb_service.delete_instance(al_instance_id)
+        self._publish_change(al_instance_id, "deleted")
+
+    def discard_instance(self, al_instance_id: int) -> None:
+        """
+        Remove what a failed create_instance may have left behind for a reserved id: the in-memory
+        entries, the al_instances row, the local artifacts and the MinIO objects. Each step is
+        attempted even if a previous one fails.
+        """
+        self.storage.al_instances_dict.pop(al_instance_id, None)
+        self.storage.dataset_dict.pop(al_instance_id, None)
+        self._instance_data_paths.pop(al_instance_id, None)
+
+        cleanups = []
+        if self.local_artifacts_store is not None:
+            cleanups.append(("local artifacts", self.local_artifacts_store.delete_instance_artifacts))
+        if self.duckdb_service is not None:
+            cleanups.append(("DuckDB rows", self.duckdb_service.delete_instance))
+        if self.minio_service is not None:
+            cleanups.append(("MinIO objects", self.minio_service.delete_instance_objects))
+        for what, cleanup in cleanups:
+            try:
+                cleanup(al_instance_id)
+            except Exception:
+                logger.exception(f"Could not delete the {what} of discarded AL instance {al_instance_id}")
+
+    # Logic for moving an instance to another node (see app/shard_router.py)
+    def export_instance(self, al_instance_id: int) -> dict:
+        """
+        Make sure MinIO holds the current state of an instance and describe what the new owner
+        has to restore (metadata, metrics and saved model versions).
+        """
+        self.sync_instance_changes()
+        instance = self.storage.al_instances_dict[al_instance_id]
+        dataset = self.storage.dataset_dict[al_instance_id]
+
+        # The labels are the only artifact changed after creation without a new version
+        self.minio_service.save_labels(
+            al_instance_id=al_instance_id,
+            labels_version=0,
+            split="train",
+            df=dataset["y_train"]
+        )
+
+        model_paths = self.storage.model_paths_dict.get(al_instance_id) or {}
+        return {
+            "model_name": instance["model_name"],
+            "qs": instance["qs"],
+            "classes": list(instance["classes"]),
+            "train_data_path": dataset["train_data_path"],
+            "test_data_path": dataset["test_data_path"],
+            "metrics": self.duckdb_service.load_all_metrics(al_instance_id),
+            "model_ids": sorted(model_paths.keys()),
+        }
+
+    def restore_instance(self, al_instance_id: int, export: dict) -> None:
+        """Recreate an exported instance on this node from its MinIO objects."""
+        if al_instance_id in self.storage.al_instances_dict:
+            raise ValueError(f"Instance {al_instance_id} already exists on this node")
+
+        self.duckdb_service.save_al_instance(al_instance_id=al_instance_id, instance_data=export)
+
+        le = self.minio_service.load_label_encoder(al_instance_id=al_instance_id)
+        oh = self.minio_service.load_one_hot_encoder(al_instance_id=al_instance_id)
+        X_train = self.minio_service.load_vectorized_tickets(al_instance_id=al_instance_id, tickets_version=0, split="train")
+        X_test = self.minio_service.load_vectorized_tickets(al_instance_id=al_instance_id, tickets_version=0, split="test")
+        self.local_artifacts_store.save_encoders(al_instance_id=al_instance_id, label_encoder=le, one_hot_encoder=oh)
+        self.local_artifacts_store.save_vectorized_dataset(al_instance_id=al_instance_id, X=X_train, split="train")
+        self.local_artifacts_store.save_vectorized_dataset(al_instance_id=al_instance_id, X=X_test, split="test")
+
+        # Labels are stored encoded in MinIO and as class names in DuckDB
+        y_train = self.minio_service.load_labels(al_instance_id=al_instance_id, labels_version=0, split="train")
+        labeled = y_train.dropna()
+        if not labeled.empty:
+            self.duckdb_service.save_labels(
+                al_instance_id=al_instance_id,
+                user_id=SYSTEM_USER_ID,
+                labels_dict=dict(zip(labeled.index, le.inverse_transform(labeled.astype(int)))),
+                split="train"
+            )
+
+        for metrics in export.get("metrics", []):
+            self.duckdb_service.save_metrics(
+                al_instance_id,
+                iteration_id=metrics.get("iteration_id"),
+                f1_score=metrics.get("f1_score"),
+                mean_entropy=metrics.get("mean_entropy"),
+                num_labeled=metrics.get("num_labeled")
+            )
+
+        # Saved versions are stored as classifiers, the working model (0) is retrained below
+        for model_id in export.get("model_ids", []):
+            if model_id == 0:
+                continue
+            model = self.minio_service.load_model(al_instance_id=al_instance_id, model_version=model_id)
+            model_path = self.local_artifacts_store.save_model(al_instance_id=al_instance_id, model_id=model_id, model=model)
+            self.duckdb_service.save_model_path(al_instance_id=al_instance_id, model_id=model_id, path_to_model=model_path)
+
+        if not self._register_persisted_instance(al_instance_id, export):
+            raise ValueError(f"Instance {al_instance_id} could not be restored")
+        self._publish_change(al_instance_id, "created")
 
-        # Delete the instance's objects from MinIO        if self.minio_service is not None:
-        self.minio_service.delete_instance_objects(al_instance_id)
+        if 0 in export.get("model_ids", []):
+            self.update_model(al_instance_id)
@@ -0,0 +1,183 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from lime.lime_text import IndexedString, LimeTextExplainer
+from sklearn.metrics.pairwise import pairwise_distances
+
+# Perturbations scored first when there is a time budget, to estimate the cost of the ticket
+# before the rest of the first round
+PROBE_SAMPLES = 25
+
+
+@dataclass(frozen=True)
+class AdaptiveLimeConfig:
+    """
+    Sampling of an adaptive LIME explanation.
+
+    The perturbations are drawn in rounds: initial_samples first, then as many as drawn so far
+    (the sample doubles every round) until the top num_features words stay the same and
+    their weights move by at most tolerance (relative to the largest weight) between two
+    rounds, or until max_samples or time_budget_ms (None = no limit) is reached. A round that
+    would not finish within time_budget_ms (estimated from the rounds so far, for the first round
+    from a probe of PROBE_SAMPLES perturbations) is shrunk to the samples that fit, or not started.
+    """
+    initial_samples: int = 250
+    max_samples: int = 2000
+    time_budget_ms: Optional[float] = None
+    tolerance: float = 0.05
+    num_features: int = 10
+
+    def __post_init__(self):
+        if self.initial_samples < 2:
+            raise ValueError("initial_samples must be at least 2")
+        if self.max_samples < self.initial_samples:
+            raise ValueError("max_samples must be at least initial_samples")
+        if self.tolerance < 0:
+            raise ValueError("tolerance must not be negative")
+
+
+@dataclass
+class AdaptiveLimeResult:
+    top_words: List[Tuple[str, float]]
+    num_samples: int
+    rounds: int
+    # Largest change of a top word weight in the last round, relative to the largest weight
+    # (1.0 if the top words changed)
+    stability: float
+    converged: bool
+    # "converged", "sample_budget" or "time_budget"
+    stop_reason: str
+    elapsed_ms: float
+    config: AdaptiveLimeConfig = field(repr=False)
+
+    def sampling(self) -> Dict[str, Any]:
+        """Sampling report of the explanation (the `sampling` field of the response)."""
+        return {
+            "num_samples": self.num_samples,
+            "rounds": self.rounds,
+            "stability": self.stability,
+            "converged": self.converged,
+            "stop_reason": self.stop_reason,
+            "elapsed_ms": round(self.elapsed_ms, 1),
+            "sample_budget": self.config.max_samples,
+            "time_budget_ms": self.config.time_budget_ms,
+            "tolerance": self.config.tolerance,
+        }
+
+
+def _stability(previous: List[Tuple[str, float]], current: List[Tuple[str, float]]) -> float:
+    previous_weights, current_weights = dict(previous), dict(current)
+    if previous_weights.keys() != current_weights.keys():
+        return 1.0
+    scale = max((abs(s) for s in current_weights.values()), default=0.0)
+    if scale == 0:
+        return 0.0
+    return max(abs(previous_weights[w] - s) for w, s in current_weights.items()) / scale
+
+
+def explain_adaptive(
+        explainer: LimeTextExplainer,
+        text: str,
+        classifier_fn: Callable[[Sequence[str]], np.ndarray],
+        label: int,
+        config: AdaptiveLimeConfig = AdaptiveLimeConfig(),
+        clock: Callable[[], float] = time.perf_counter
+        ) -> AdaptiveLimeResult:
+    """
+    LIME explanation of `label` for `text`, sampled in rounds until it is stable.
+
+    Perturbations are drawn like LimeTextExplainer.explain_instance (random number of words
+    removed, the first sample is the text itself) with the random state of the explainer;
+    every round keeps the samples of the previous rounds and refits the weighted linear model
+    of the explainer on all of them, so only the new perturbations are scored.
+    """
+    start = clock()
+    indexed_string = IndexedString(
+        text, bow=explainer.bow, split_expression=explainer.split_expression, mask_string=explainer.mask_string
+    )
+    doc_size = indexed_string.num_words()
+    if doc_size == 0:
+        raise ValueError("The ticket has no words to explain")
+    random_state = explainer.random_state
+
+    masks = [np.ones(doc_size)]
+    labels = [np.asarray(classifier_fn([indexed_string.raw_string()]))]
+    top_words: List[Tuple[str, float]] = []
+    stability, rounds, stop_reason = 1.0, 0, "sample_budget"
+    num_samples = 1
+    target = config.initial_samples
+
+    def _score_perturbations(count: int) -> float:
+        """Draw and score count new perturbations (words removed at random, as in LIME); returns ms per sample."""
+        draw_start = clock()
+        sizes = random_state.randint(1, doc_size + 1, count)
+        data = np.ones((count, doc_size))
+        texts = []
+        for i, size in enumerate(sizes):
+            inactive = random_state.choice(range(doc_size), size, replace=False)
+            data[i, inactive] = 0
+            texts.append(indexed_string.inverse_removing(inactive))
+        masks.append(data)
+        labels.append(np.asarray(classifier_fn(texts)))
+        return (clock() - draw_start) * 1000 / count
+
+    while True:
+        count = target - num_samples
+        if rounds == 0 and config.time_budget_ms is not None and count > PROBE_SAMPLES:
+            # The first round is subject to the budget too: its size follows from a probe
+            score_ms = _score_perturbations(PROBE_SAMPLES)
+            num_samples += PROBE_SAMPLES
+            count -= PROBE_SAMPLES
+            if score_ms > 0:
+                remaining_ms = config.time_budget_ms - (clock() - start) * 1000
+                count = max(min(count, int(remaining_ms / score_ms)), 0)
+        if count > 0:
+            score_ms = _score_perturbations(count)
+            num_samples += count
+        rounds += 1
+
+        fit_start = clock()
+        all_data = np.vstack(masks)
+        distances = pairwise_distances(sp.csr_matrix(all_data), sp.csr_matrix(all_data[:1]), metric="cosine").ravel() * 100
+        _, local_exp, _, _ = explainer.base.explain_instance_with_data(
+            all_data, np.vstack(labels), distances, label, config.num_features,
+            feature_selection=explainer.feature_selection
+        )
+        current = [(indexed_string.word(feature), float(weight)) for feature, weight in local_exp]
+        fit_ms = (clock() - fit_start) * 1000 / num_samples
+
+        if rounds > 1:
+            stability = _stability(top_words, current)
+        top_words = current
+        if rounds > 1 and stability <= config.tolerance:
+            stop_reason = "converged"
+            break
+        if num_samples >= config.max_samples:
+            stop_reason = "sample_budget"
+            break
+        target = min(2 * num_samples, config.max_samples)
+        if config.time_budget_ms is not None:
+            # Next round: score the new samples and refit on all of them, at the cost per sample
+            # of the last round
+            remaining_ms = config.time_budget_ms - (clock() - start) * 1000
+            affordable = target - num_samples
+            if score_ms + fit_ms > 0:
+                affordable = int((remaining_ms - num_samples * fit_ms) / (score_ms + fit_ms))
+            if affordable < 1:
+                stop_reason = "time_budget"
+                break
+            target = min(target, num_samples + affordable)
+
+    return AdaptiveLimeResult(
+        top_words=top_words,
+        num_samples=num_samples,
+        rounds=rounds,
+        stability=stability,
+        converged=stop_reason == "converged",
+        stop_reason=stop_reason,
+        elapsed_ms=(clock() - start) * 1000,
+        config=config,
+    )
@@ -0,0 +1,188 @@
+"""
+Tasks run by the compute worker processes (see app/core/compute_executor.py).
+
+Every worker builds its own services once in `init_worker` (the sentence model, the resolution
+models if requested) and keeps them for all the tasks it runs. Workers never open DuckDB: they read
+the local artifacts of the instances (encoders, vectorized features and models, all written by the
+API process) and receive everything else as arguments; the API process persists the results.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from skactiveml.classifier import SklearnClassifier
+
+from app.config.config import GROUND_TRUTH_AL_INSTANCE_ID, TEST_SPLIT, TRAIN_SPLIT
+from app.core.compute_executor import progress_reporter
+from app.core.inference_cache import InferenceCache
+from app.core.thread_budget import current_thread_budget
+from app.core.storage import ActiveLearningStorage
+from app.data_models.active_learning_dm import Data
+from app.persistence.local_artifacts import LocalArtifactsStore
+from app.services.adaptive_lime import AdaptiveLimeConfig
+from app.services.data_preprocessing import preprocess_dataset as _preprocess_dataset
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TicketFrames:
+    """
+    Ticket data read by the API process for preprocessing in a worker.
+
+    Provides the two reads of dispatch_team (load_tickets and load_labels) in place of the DuckDB service.
+    """
+    tickets: Dict[str, pd.DataFrame]
+    labels: Dict[str, Optional[pd.Series]]
+
+    @classmethod
+    def load(cls, duckdb_service) -> "TicketFrames":
+        splits = (TRAIN_SPLIT, TEST_SPLIT)
+        return cls(
+            tickets={split: duckdb_service.load_tickets(split=split) for split in splits},
+            labels={split: duckdb_service.load_labels(al_instance_id=GROUND_TRUTH_AL_INSTANCE_ID, split=split) for split in splits},
+        )
+
+    def load_tickets(self, split: str) -> Optional[pd.DataFrame]:
+        df = self.tickets.get(split)
+        return None if df is None else df.copy()
+
+    def load_labels(self, al_instance_id: int, split: str) -> Optional[pd.Series]:
+        return self.labels.get(split)
+
+
+class _WorkerContext:
+    """Services of one worker process, created once by init_worker."""
+
+    def __init__(self, local_artifacts_store: LocalArtifactsStore, preload_resolution: bool = False):
+        self.local_artifacts_store = local_artifacts_store
+        self.storage = ActiveLearningStorage()
+        # Only the encoders are needed. An id can be reused by another instance (deleted instance,
+        # release/restore), so the encoders and features are kept with the fingerprint of their file
+        # and loaded again when it changed
+        self.storage.dataset_dict.loader = self._load_encoders
+        self._encoder_versions: Dict[int, Optional[str]] = {}
+        self._features: Dict[int, Tuple[Optional[str], pd.DataFrame]] = {}
+
+        # (imported here: the services import this module to submit their tasks)
+        from app.services.inference_svc import InferenceService
+
+        # Models are read from the local artifacts on every task, so the results are never cached here
+        self.inference_service = InferenceService(self.storage, local_artifacts_store, cache=InferenceCache(max_entries=0))
+
+        self._xai_service = None
+        self._resolution_service = None
+        if preload_resolution:
+            self.resolution_service()
+
+    def instance(self, al_instance_id: int) -> None:
+        """Register an instance for its task; its encoders are loaded again if the saved ones changed."""
+        version = self.local_artifacts_store.encoder_fingerprint(al_instance_id)
+        if al_instance_id not in self._encoder_versions or self._encoder_versions[al_instance_id] != version:
+            # New instance or another instance under this id: the loaded encoders are outdated
+            self._forget_deleted_instances()
+            self.storage.dataset_dict.pop(al_instance_id, None)
+            self._encoder_versions[al_instance_id] = version
+        self.storage.dataset_dict.register(al_instance_id)
+
+    def features(self, al_instance_id: int) -> pd.DataFrame:
+        """Vectorized train tickets of an instance (memory-mapped, shared with the other workers)."""
+        version = self.local_artifacts_store.vectorized_dataset_fingerprint(al_instance_id, TRAIN_SPLIT)
+        cached = self._features.get(al_instance_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        self._forget_deleted_instances()
+        X = self.local_artifacts_store.load_vectorized_dataset(al_instance_id, split=TRAIN_SPLIT, mmap_mode="r")
+        self._features[al_instance_id] = (version, X)
+        return X
+
+    def xai_service(self):
+        if self._xai_service is None:
+            from app.services.xai_svc import XaiService
+            # Shares the sentence model of the inference service, so creating it loads no model
+            self._xai_service = XaiService(
+                self.storage,
+                self.inference_service,
+                local_artifacts_store=self.local_artifacts_store,
+                sentence_model=self.inference_service.sentence_model
+            )
+        return self._xai_service
+
+    def resolution_service(self):
+        if self._resolution_service is None:
+            from app.services.resolution_svc import create_resolution_service
+            self._resolution_service = create_resolution_service()
+        return self._resolution_service
+
+    def _forget_deleted_instances(self) -> None:
+        """Drop the encoders and features of the instances whose artifacts were deleted."""
+        for al_instance_id in list(self._encoder_versions):
+            if self.local_artifacts_store.encoder_fingerprint(al_instance_id) is None:
+                del self._encoder_versions[al_instance_id]
+                self.storage.dataset_dict.pop(al_instance_id, None)
+        for al_instance_id in list(self._features):
+            if self.local_artifacts_store.vectorized_dataset_fingerprint(al_instance_id, TRAIN_SPLIT) is None:
+                del self._features[al_instance_id]
+
+    def _load_encoders(self, al_instance_id: int) -> dict:
+        le, oh = self.local_artifacts_store.load_encoders(al_instance_id)
+        return {"le": le, "oh": oh, "oh_lookup": self.local_artifacts_store.load_onehot_lookup(al_instance_id)}
+
+
+_context: Optional[_WorkerContext] = None
+
+
+def init_worker(local_artifacts_store: LocalArtifactsStore, preload_resolution: bool = False) -> None:
+    """Initializer of the worker processes: loads the models before the first task."""
+    global _context
+    _context = _WorkerContext(local_artifacts_store, preload_resolution=preload_resolution)
+
+
+def _worker() -> _WorkerContext:
+    if _context is None:
+        raise RuntimeError("Compute tasks run in worker processes started with init_worker")
+    return _context
+
+
+# --- Tasks ---
+def preprocess_dataset(frames: TicketFrames, class_list: list, progress_queue: Any = None) -> tuple:
+    """Embed and encode the tickets of a new instance (ActiveLearningService.create_instance)."""
+    return _preprocess_dataset(
+        frames,
+        class_list,
+        progress_callback=progress_reporter(progress_queue),
+        sentence_model=_worker().inference_service.sentence_model,
+    )
+
+
+def fit_model(al_instance_id: int, model: Any, classes: list, y: pd.Series) -> SklearnClassifier:
+    """Train the model of an instance on its train features and the current labels (update_model)."""
+    X = _worker().features(al_instance_id)
+    # n_jobs of the worker's thread budget (the model was configured for the API process)
+    clf = SklearnClassifier(current_thread_budget().apply_to_model(model), classes=classes)
+    clf.fit(X, y.reindex(X.index))
+    return clf
+
+
+def explain_lime(al_instance_id: int, tickets: List[Data], model_id: int = 0, adaptive: Optional[AdaptiveLimeConfig] = None) -> list:
+    context = _worker()
+    context.instance(al_instance_id)
+    return context.xai_service().explain_lime(al_instance_id, tickets, model_id, adaptive=adaptive)
+
+
+def explain_occlusion(al_instance_id: int, tickets: List[Data], model_id: int = 0, ngram: int = 1) -> dict:
+    context = _worker()
+    context.instance(al_instance_id)
+    return context.xai_service().explain_occlusion(al_instance_id, tickets, model_id, ngram=ngram)
+
+
+def score_records(al_instance_id: int, model_id: int, records: List[Dict[str, Any]]) -> tuple:
+    """Predictions and {team: probability} of ticket records (bulk scoring)."""
+    context = _worker()
+    context.instance(al_instance_id)
+    return context.inference_service.predict_records(al_instance_id, model_id, records)
+
+
+def process_new_ticket(request: Any) -> Any:
+    return _worker().resolution_service().process_new_ticket(request)
@@ -1,22 +1,47 @@
 import pandas as pd
 import numpy as np
 import warnings
+from typing import Callable, Optional
 warnings.filterwarnings("ignore")
 from sentence_transformers import SentenceTransformer
 from sklearn.preprocessing import LabelEncoder
 from sklearn.preprocessing import OneHotEncoder
+from skactiveml.utils import MISSING_LABEL
 
 from app.persistence.duckdb.service import DuckDbPersistenceService
+from humal_vectorizer.categorical_encoder import CategoricalLookupEncoder, combine_texts
 from app.config.config import TRAIN_SPLIT, TEST_SPLIT, TEAM_NAME, GROUND_TRUTH_AL_INSTANCE_ID
 
+# Number of sentences embedded per progress update
+EMBEDDING_BATCH_SIZE = 256
+
 # Data preprocessing for the dispatch team endpoint
-def dispatch_team(duckdb_service: DuckDbPersistenceService, test_set: bool = False, le: LabelEncoder = None, oh: OneHotEncoder = None, classes: list[int | str] = None):
+def dispatch_team(
+        duckdb_service: DuckDbPersistenceService,
+        test_set: bool = False,
+        le: LabelEncoder = None,
+        oh: OneHotEncoder = None,
+        classes: list[int | str] = None,
+        progress_callback: Optional[Callable[..., None]] = None,
+        sentence_model: SentenceTransformer = None
+        ):
     """
     This function preprocesses the data for the dispatch team endpoint.
     It takes the raw tabular text data and returs a dataframe with embeddings
     for the title and description and one-hot encoded service subcategory and service name.
+
+    If progress_callback is given, it is called as progress_callback(phase, done, total, split=split)
+    with phase one of 'loading', 'embedding' or 'encoding'.
+    duckdb_service only needs load_tickets and load_labels (see compute_tasks.TicketFrames).
     """
-    
+    split = TEST_SPLIT if test_set else TRAIN_SPLIT
+
+    def _report(phase: str, done: int = 0, total: int = 0):
+        if progress_callback is not None:
+            progress_callback(phase, done, total, split=split)
+
+    _report("loading")
+
     # Get the data
     if not test_set:
         df = duckdb_service.load_tickets(split=TRAIN_SPLIT)
@@ -29,7 +54,6 @@ def dispatch_team(duckdb_service: DuckDbPersistenceService, test_set: bool = Fal
     # In DB-backed datasets labels are stored in the labels table.
     # If Team->Name is not present on tickets, recover it from persisted ground truth labels.
     if TEAM_NAME not in df.columns:
-        split = TEST_SPLIT if test_set else TRAIN_SPLIT
         labels = duckdb_service.load_labels(
             al_instance_id=GROUND_TRUTH_AL_INSTANCE_ID,
             split=split,
@@ -64,13 +88,20 @@ def dispatch_team(duckdb_service: DuckDbPersistenceService, test_set: bool = Fal
         df = df.dropna(subset=['Title+Description'])
 
     # Embeddings for the Title+Description
-    sentence_model = SentenceTransformer("all-MiniLM-L6-v2")
+    if sentence_model is None:
+        sentence_model = SentenceTransformer("all-MiniLM-L6-v2")
     sentences = df['Title+Description'].astype(str).tolist()
-    embeddings = sentence_model.encode(sentences, show_progress_bar=False)
+    embeddings = _encode_in_batches(
+        sentence_model,
+        sentences,
+        on_batch=lambda done: _report("embedding", done, len(sentences))
+    )
     # Convert to a dataframe aligned to original index
     X = pd.DataFrame(embeddings, index=df.index)
     # Align features to Ref index for downstream .loc usage
     X.index = df.index
+
+    _report("encoding")
     
     if not test_set:
         # If train set, fit the one-hot encoder
@@ -102,13 +133,65 @@ def dispatch_team(duckdb_service: DuckDbPersistenceService, test_set: bool = Fal
     # Return the preprocessed data, the label encoder, and the one-hot encoder
     return X, y_true, le, oh
 
+def preprocess_dataset(
+        duckdb_service: DuckDbPersistenceService,
+        class_list: list,
+        progress_callback: Optional[Callable[..., None]] = None,
+        sentence_model: SentenceTransformer = None
+        ):
+    """
+    Run dispatch_team on the train and test split of a new AL instance.
+
+    Returns X_train, y_train (unlabeled tickets as MISSING_LABEL), X_test, y_test, le and oh.
+    """
+    X_train, y_train, le, oh = dispatch_team(duckdb_service=duckdb_service, test_set=False, classes=class_list, progress_callback=progress_callback, sentence_model=sentence_model)
+    X_test, y_test, _, _ = dispatch_team(duckdb_service=duckdb_service, test_set=True, le=le, oh=oh, progress_callback=progress_callback, sentence_model=sentence_model)
+
+    # Get the index of np.nan in the LabelEncoder's classes
+    empty = le.transform([np.nan])[0]
+    # Replace missing values with MISSING_LABEL in y_train (indexed by Ref)
+    y_train = y_train.replace(empty, MISSING_LABEL)
+
+    return X_train, y_train, X_test, y_test, le, oh
+
+def _encode_in_batches(sentence_model: SentenceTransformer, sentences: list[str], on_batch: Callable[[int], None], batch_size: int = EMBEDDING_BATCH_SIZE):
+    """
+    Embed the sentences in chunks of batch_size, calling on_batch with the number of
+    sentences embedded so far after each chunk.
+    """
+    if len(sentences) <= batch_size:
+        embeddings = sentence_model.encode(sentences, show_progress_bar=False)
+        on_batch(len(sentences))
+        return embeddings
+
+    chunks = []
+    for start in range(0, len(sentences), batch_size):
+        chunk = sentences[start:start + batch_size]
+        chunks.append(np.asarray(sentence_model.encode(chunk, show_progress_bar=False)))
+        on_batch(start + len(chunk))
+    return np.vstack(chunks)
+
 # Data preprocessing for the inference endpoint
-def inference(df: pd.DataFrame, le: LabelEncoder, oh: OneHotEncoder, sentence_model: SentenceTransformer = None):
+def inference(
+        df: pd.DataFrame,
+        le: LabelEncoder,
+        oh: OneHotEncoder,
+        sentence_model: SentenceTransformer = None,
+        batch_size: Optional[int] = None,
+        oh_lookup: Optional[CategoricalLookupEncoder] = None
+        ):
     """
     This function preprocesses the data for the inference endpoint.
     It takes the dataframe with pydantic Data model fields and returns a dataframe with embeddings
     for the title and description and one-hot encoded service subcategory and service name.
+
+    If batch_size is given, the sentences are embedded in chunks of batch_size (batch inference).
+    If oh_lookup (compiled from oh) is given, the features are built by inference_features instead.
     """
+    if oh_lookup is not None:
+        features = inference_features(df.to_dict("records"), oh_lookup, sentence_model, batch_size)
+        n_embedding = features.shape[1] - oh_lookup.n_features_out
+        return pd.DataFrame(features, index=df.index, columns=oh_lookup.feature_names(n_embedding))
 
     # Rename the columns to match the original column names
     df = df.rename(columns={'title_anon': 'Title_anon', 
@@ -123,10 +206,14 @@ def inference(df: pd.DataFrame, le: LabelEncoder, oh: OneHotEncoder, sentence_mo
     if sentence_model is None:
         sentence_model = SentenceTransformer("all-MiniLM-L6-v2")
         
-    sentences = df['Title+Description'].astype(str).tolist()
-    embeddings = sentence_model.encode(sentences, show_progress_bar=False)
+    # str() per value: missing texts become 'nan' also with the pandas string dtype
+    sentences = [str(s) for s in df['Title+Description'].tolist()]
+    if batch_size is None:
+        embeddings = sentence_model.encode(sentences, show_progress_bar=False)
+    else:
+        embeddings = _encode_in_batches(sentence_model, sentences, on_batch=lambda done: None, batch_size=batch_size)
     # Convert to a dataframe
-    X = pd.DataFrame(embeddings)
+    X = pd.DataFrame(embeddings, index=df.index)
 
     # One-hot encode the service subcategory and service name
     one_hot = oh.transform(df[['Service subcategory->Name', 'Service->Name']])
@@ -140,3 +227,47 @@ def inference(df: pd.DataFrame, le: LabelEncoder, oh: OneHotEncoder, sentence_mo
     X.columns = X.columns.astype(str)
     
     return X
+
+# Categorical fields of a Data payload, in the order of the one-hot encoder columns
+INFERENCE_CATEGORICAL_FIELDS = ['service_subcategory_name', 'service_name']
+
+def inference_categorical(
+        record: dict,
+        oh: OneHotEncoder,
+        oh_lookup: Optional[CategoricalLookupEncoder] = None
+        ) -> np.ndarray:
+    """One-hot columns of one Data payload (float64, the block following the embeddings in inference())."""
+    values = [record.get(field) for field in INFERENCE_CATEGORICAL_FIELDS]
+    if oh_lookup is not None:
+        return oh_lookup.transform([[value] for value in values])[0]
+    one_hot = oh.transform(pd.DataFrame([values], columns=['Service subcategory->Name', 'Service->Name']))
+    return np.asarray(one_hot.toarray(), dtype=np.float64)[0]
+
+def inference_features(
+        records: list[dict],
+        oh_lookup: CategoricalLookupEncoder,
+        sentence_model: SentenceTransformer = None,
+        batch_size: Optional[int] = None
+        ) -> np.ndarray:
+    """
+    Fast path of inference() for Data payloads (dicts): no DataFrame and no OneHotEncoder call.
+
+    The embeddings and the one-hot columns of the lookup encoder are written into one buffer,
+    the values equal those of inference().
+    """
+    if sentence_model is None:
+        sentence_model = SentenceTransformer("all-MiniLM-L6-v2")
+
+    sentences = combine_texts(
+        [r.get('title_anon') for r in records],
+        [r.get('description_anon') for r in records]
+    )
+    if batch_size is None:
+        embeddings = sentence_model.encode(sentences, show_progress_bar=False)
+    else:
+        embeddings = _encode_in_batches(sentence_model, sentences, on_batch=lambda done: None, batch_size=batch_size)
+
+    return oh_lookup.features(
+        embeddings,
+        [[r.get(field) for r in records] for field in INFERENCE_CATEGORICAL_FIELDS]
+    )
@@ -0,0 +1,87 @@
+import logging
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.core.inference_cache import payload_sha
+
+logger = logging.getLogger(__name__)
+
+# Explanations kept in DuckDB (0 = cache disabled) and their time to live in seconds (0 = no expiry)
+EXPLANATION_CACHE_SIZE = int(os.getenv("EXPLANATION_CACHE_SIZE", "10000"))
+EXPLANATION_CACHE_TTL = float(os.getenv("EXPLANATION_CACHE_TTL", "604800"))
+
+
+class ExplanationCache:
+    """
+    Explanations persisted in DuckDB, shared by the API workers and kept across restarts.
+
+    Entries are keyed by (al_instance_id, model_id, model version, ticket sha, method, parameters
+    sha). The model version is the fingerprint of the saved model file, so a retrained or replaced
+    model never serves the explanations of the previous one; update_model and save_model also drop
+    them (DuckDbPersistenceService.delete_explanations). Beyond max_entries the least recently
+    used entries are evicted, entries older than ttl_seconds are never served.
+
+    Only explanations without error are cached. A DuckDB failure is logged and treated as a miss,
+    an explanation is then computed as without the cache.
+    """
+
+    def __init__(self, duckdb_service: Any, max_entries: int = EXPLANATION_CACHE_SIZE, ttl_seconds: float = EXPLANATION_CACHE_TTL):
+        self.duckdb_service = duckdb_service
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+    @property
+    def enabled(self) -> bool:
+        return self.duckdb_service is not None and self.max_entries > 0
+
+    def get_many(
+            self,
+            al_instance_id: int,
+            model_id: int,
+            model_version: str,
+            method: str,
+            params: Dict[str, Any],
+            payloads: Sequence[Dict[str, Any]]
+            ) -> List[Optional[Dict[str, Any]]]:
+        """Cached explanation of each ticket payload (Data.model_dump()), None for the misses."""
+        if not self.enabled or not payloads:
+            return [None] * len(payloads)
+        shas = [payload_sha(payload) for payload in payloads]
+        try:
+            cached = self.duckdb_service.load_explanations(
+                al_instance_id, model_id, model_version, method, payload_sha(params), list(dict.fromkeys(shas)),
+                max_age_seconds=self.ttl_seconds if self.ttl_seconds > 0 else None
+            )
+        except Exception as e:
+            logger.warning(f"Explanation cache lookup failed: {e}")
+            return [None] * len(payloads)
+        return [cached.get(sha) for sha in shas]
+
+    def put_many(
+            self,
+            al_instance_id: int,
+            model_id: int,
+            model_version: str,
+            method: str,
+            params: Dict[str, Any],
+            payloads: Sequence[Dict[str, Any]],
+            explanations: Sequence[Optional[Dict[str, Any]]]
+            ) -> None:
+        """Cache the explanations of the ticket payloads (the ones with an error are skipped)."""
+        if not self.enabled:
+            return
+        entries = {
+            payload_sha(payload): explanation
+            for payload, explanation in zip(payloads, explanations)
+            if explanation is not None and not explanation.get("error")
+        }
+        if not entries:
+            return
+        try:
+            self.duckdb_service.save_explanations(
+                al_instance_id, model_id, model_version, method, payload_sha(params), entries,
+                max_entries=self.max_entries,
+                max_age_seconds=self.ttl_seconds if self.ttl_seconds > 0 else None
+            )
+        except Exception as e:
+            logger.warning(f"Explanation cache update failed: {e}")
@@ -1,41 +1,114 @@
+from app.core.compute_executor import ComputeExecutor
+from app.core.inference_cache import InferenceCache, payload_sha
 from app.core.storage import ActiveLearningStorage
 from app.data_models.active_learning_dm import Data
 import pandas as pd
 import joblib
-from app.services.data_preprocessing import inference
+import numpy as np
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from app.services import compute_tasks
+from app.services.data_preprocessing import inference, inference_features, EMBEDDING_BATCH_SIZE
+from humal_vectorizer import CategoricalLookupEncoder
+from app.config.config import TRAIN_SPLIT, TEST_SPLIT
 from sentence_transformers import SentenceTransformer
-from typing import Optional
+from typing import Any, Dict, Iterator, List, Optional
+from app.persistence.duckdb import DuckDbPersistenceService
 from app.persistence.local_artifacts import LocalArtifactsStore
 from app.persistence.minio_storage import MinioService
 
+# Tickets read from DuckDB and scored per chunk in bulk scoring (bounds the memory used)
+SCORING_CHUNK_SIZE = int(os.getenv("SCORING_CHUNK_SIZE", "2048"))
+# Cached inference results (0 = cache disabled) and their time to live in seconds (0 = no expiry)
+INFERENCE_CACHE_SIZE = int(os.getenv("INFERENCE_CACHE_SIZE", "10000"))
+INFERENCE_CACHE_TTL = float(os.getenv("INFERENCE_CACHE_TTL", "3600"))
+
 class InferenceService:
     def __init__(
             self, 
             storage: ActiveLearningStorage,
-            local_artifacts_store: Optional[LocalArtifactsStore] = None
+            local_artifacts_store: Optional[LocalArtifactsStore] = None,
+            duckdb_service: Optional[DuckDbPersistenceService] = None,
+            cache: Optional[InferenceCache] = None,
+            compute_executor: Optional[ComputeExecutor] = None
             ):
         self.storage = storage
         self.sentence_model = SentenceTransformer("all-MiniLM-L6-v2")
         self.local_artifacts_store = local_artifacts_store
+        self.duckdb_service = duckdb_service
+        self.cache = cache if cache is not None else InferenceCache(INFERENCE_CACHE_SIZE, INFERENCE_CACHE_TTL)
+        self.compute_executor = compute_executor
+
+    def _cache_key(self, al_instance_id: int, model_id: int, data_dict: Dict[str, Any]) -> tuple:
+        # infer, infer_batch (with or without probabilities) and the XAI predicted class share an
+        # entry, so its prediction must always be the one of model.predict (see _predict)
+        version = self.storage.model_version(al_instance_id, model_id)
+        return (al_instance_id, model_id, version, payload_sha(data_dict))
+
+    def _onehot_lookup(self, al_instance_id: int) -> Optional[CategoricalLookupEncoder]:
+        """Lookup encoder of the instance (persisted with its encoders, compiled if missing)."""
+        dataset = self.storage.dataset_dict[al_instance_id]
+        lookup = dataset.get('oh_lookup')
+        if lookup is None:
+            try:
+                lookup = CategoricalLookupEncoder.from_one_hot_encoder(dataset['oh'])
+            except ValueError:
+                # Unsupported encoder configuration: keep using OneHotEncoder.transform
+                lookup = False
+            dataset['oh_lookup'] = lookup
+        return lookup or None
+
+    def _features(self, al_instance_id: int, records: List[Dict[str, Any]], batch_size: Optional[int] = None) -> np.ndarray:
+        """Feature matrix of Data payloads (embeddings followed by the one-hot columns)."""
+        lookup = self._onehot_lookup(al_instance_id)
+        if lookup is not None:
+            return inference_features(records, lookup, sentence_model=self.sentence_model, batch_size=batch_size)
+
+        X = inference(
+            df=pd.DataFrame(records),
+            le=self.storage.dataset_dict[al_instance_id]['le'],
+            oh=self.storage.dataset_dict[al_instance_id]['oh'],
+            sentence_model=self.sentence_model,
+            batch_size=batch_size
+        )
+        # Embedding and one-hot columns share names ('0', '1', ...), predict on the plain matrix
+        return X.to_numpy()
+
+    def load_model(self, al_instance_id: int, model_id: int = 0) -> Any:
+        """
+        Model used for predictions: the NumPy scorer of a linear model if it was exported
+        (same predictions without the input validation of scikit-learn), else the saved model.
+        """
+        scorer = self.local_artifacts_store.load_linear_scorer(al_instance_id, model_id)
+        if scorer is not None:
+            return scorer
+        return self.local_artifacts_store.load_model(al_instance_id, model_id)
+
+    def predict_records(self, al_instance_id: int, model_id: int, records: List[Dict[str, Any]]):
+        """Teams and {team: probability} dicts of ticket records (Data fields), without the cache."""
+        X = self._features(al_instance_id, records)
+        model = self.load_model(al_instance_id, model_id)
+        return self._predict(model, self.storage.dataset_dict[al_instance_id]['le'], X, return_proba=True)
 
     # Logic for inference
     def infer(self, al_instance_id: int, X: Data, model_id: int = 0):
         # Convert Data object to pandas DataFrame with an index
         data_dict = X.model_dump()
-        
-        # Wrap the dictionary in a list to create a single row DataFrame
-        X = pd.DataFrame([data_dict])
 
+        # Same ticket already predicted by the current version of the model
+        key = self._cache_key(al_instance_id, model_id, data_dict)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return [cached["prediction"]]
+        
         # Preprocess the data for inference
-        X = inference(
-            df=X, 
-            le=self.storage.dataset_dict[al_instance_id]['le'], 
-            oh=self.storage.dataset_dict[al_instance_id]['oh'],
-            sentence_model=self.sentence_model
-        )
+        X = self._features(al_instance_id, [data_dict])
         
         # Load the model
-        model = self.local_artifacts_store.load_model(al_instance_id, model_id)
+        model = self.load_model(al_instance_id, model_id)
 
         # Load the label encoder
         le = self.storage.dataset_dict[al_instance_id]['le']
@@ -45,6 +118,204 @@ class InferenceService:
         # Transform the predictions to the original labels
         predictions = le.inverse_transform(predictions)
 
+        predictions = predictions.tolist()
+        self.cache.put(key, {"prediction": predictions[0], "probabilities": None})
+
         # Return the predictions
-        return predictions.tolist()
-        
+        return predictions
+
+    # Logic for batch inference
+    def infer_batch(
+            self,
+            al_instance_id: int,
+            items: List[Data],
+            model_id: int = 0,
+            return_proba: bool = False,
+            batch_size: int = EMBEDDING_BATCH_SIZE
+            ) -> Dict[str, Any]:
+        """
+        Predict the team of many tickets at once.
+
+        The tickets are embedded in chunks of batch_size, one-hot encoded together and
+        the model is loaded and called once. With return_proba, the class probabilities
+        of every ticket are returned as well ({team: probability}). Tickets found in the
+        inference cache are not predicted again.
+        """
+        if not items:
+            return {"predictions": [], "probabilities": []} if return_proba else {"predictions": []}
+
+        # Look up every ticket, only the tickets not cached yet (once each) are predicted
+        payloads = [item.model_dump() for item in items]
+        keys = [self._cache_key(al_instance_id, model_id, payload) for payload in payloads]
+        results = {}
+        missing = {}
+        for key, payload in zip(keys, payloads):
+            if key in results or key in missing:
+                continue
+            cached = self.cache.get(key)
+            if cached is not None and (not return_proba or cached["probabilities"] is not None):
+                results[key] = cached
+            else:
+                missing[key] = payload
+
+        if missing:
+            # Preprocess the data for inference
+            le = self.storage.dataset_dict[al_instance_id]['le']
+            X = self._features(al_instance_id, list(missing.values()), batch_size=batch_size)
+
+            # Load the model once for the whole batch
+            model = self.load_model(al_instance_id, model_id)
+
+            predictions, probabilities = self._predict(model, le, X, return_proba)
+            for i, key in enumerate(missing):
+                results[key] = {"prediction": predictions[i], "probabilities": probabilities[i] if return_proba else None}
+                self.cache.put(key, results[key])
+
+        response = {"predictions": [results[key]["prediction"] for key in keys]}
+        if return_proba:
+            response["probabilities"] = [dict(results[key]["probabilities"]) for key in keys]
+        return response
+
+    # Logic for bulk scoring of the tickets stored in DuckDB
+    def score_tickets(
+            self,
+            al_instance_id: int,
+            model_id: int = 0,
+            split: Optional[str] = None,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            chunk_size: int = SCORING_CHUNK_SIZE
+            ) -> Iterator[pd.DataFrame]:
+        """
+        Score the tickets of a split and/or dataset_timestamp range and save the predictions.
+
+        Tickets are read from DuckDB in Arrow pages of chunk_size rows. A background thread
+        reads, embeds and one-hot encodes the next chunk while the current one is predicted
+        and saved, at most one prepared chunk waits, so memory stays bounded by a few chunks.
+        With the compute executor the chunks are embedded and predicted by the worker processes
+        instead (one chunk in flight per worker), this process only reads and saves them.
+        Returns an iterator of one DataFrame (ref, prediction, probabilities) per chunk, a chunk
+        is yielded once it is saved. The arguments and the model are checked before returning.
+        """
+        if self.duckdb_service is None:
+            raise RuntimeError("Bulk scoring needs the DuckDB persistence service")
+        if split is not None and split not in (TRAIN_SPLIT, TEST_SPLIT):
+            raise ValueError(f"split must be '{TRAIN_SPLIT}' or '{TEST_SPLIT}'")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+
+        le = self.storage.dataset_dict[al_instance_id]['le']
+        model = self.load_model(al_instance_id, model_id)
+        return self._score_chunks(al_instance_id, model_id, model, le, split, start, end, chunk_size)
+
+    def _score_chunks(self, al_instance_id, model_id, model, le, split, start, end, chunk_size) -> Iterator[pd.DataFrame]:
+        offload = self.compute_executor is not None and self.compute_executor.enabled
+        prepared: queue.Queue = queue.Queue(maxsize=self.compute_executor.max_workers if offload else 1)
+        stop = threading.Event()
+        done = object()
+
+        def _put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    prepared.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def _prepare_chunks():
+            try:
+                for batch in self._iter_ticket_pages(split, start, end, chunk_size):
+                    if stop.is_set():
+                        return
+                    records = batch.to_pylist()
+                    if offload:
+                        X = self.compute_executor.submit(compute_tasks.score_records, al_instance_id, model_id, records)
+                    else:
+                        X = self._features(al_instance_id, records)
+                    if not _put(([str(r["ref"]) for r in records], X)):
+                        if offload:
+                            X.cancel()
+                        return
+                _put(done)
+            except BaseException as e:
+                _put(e)
+
+        producer = threading.Thread(target=_prepare_chunks, daemon=True, name=f"score-tickets-{al_instance_id}")
+        producer.start()
+        try:
+            while True:
+                item = prepared.get()
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+
+                refs, X = item
+                if isinstance(X, Future):
+                    predictions, probabilities = X.result()
+                else:
+                    predictions, probabilities = self._predict(model, le, X, return_proba=True)
+                result = pd.DataFrame({"ref": refs, "prediction": predictions, "probabilities": probabilities})
+                self.duckdb_service.save_predictions(al_instance_id, model_id, result)
+                yield result
+        finally:
+            # Consumer gone (end, error or client disconnected): let the producer finish
+            stop.set()
+            producer.join(timeout=5)
+            # Chunks submitted to the workers but not consumed
+            while not prepared.empty():
+                item = prepared.get_nowait()
+                if isinstance(item, tuple) and isinstance(item[1], Future):
+                    item[1].cancel()
+
+    def _iter_ticket_pages(self, split, start, end, page_size: int):
+        """Arrow pages of the tickets to score (one plain call per page, see load_tickets_page)."""
+        after_ref = None
+        while True:
+            page = self.duckdb_service.load_tickets_page(split=split, start=start, end=end, after_ref=after_ref, limit=page_size)
+            if page.num_rows == 0:
+                return
+            yield page
+            if page.num_rows < page_size:
+                return
+            after_ref = page.column("ref")[-1].as_py()
+
+    def iter_predictions(self, al_instance_id: int, model_id: int = 0, page_size: int = SCORING_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        """Predictions saved by score_tickets, read from DuckDB in pages of page_size rows."""
+        if self.duckdb_service is None:
+            raise RuntimeError("Stored predictions need the DuckDB persistence service")
+        after_ref = None
+        while True:
+            page = self.duckdb_service.load_predictions(al_instance_id, model_id=model_id, after_ref=after_ref, limit=page_size)
+            if page.empty:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after_ref = page["ref"].iloc[-1]
+
+    @staticmethod
+    def _predict(model: Any, le: Any, X: np.ndarray, return_proba: bool):
+        """
+        Teams predicted for X and, with return_proba, a {team: probability} dict per row.
+
+        The team always comes from model.predict: for some models (e.g. SVC with Platt scaling)
+        the most probable class can differ from the predicted one.
+        """
+        predictions = le.inverse_transform(model.predict(X))
+        if not return_proba:
+            return predictions.tolist(), None
+
+        proba = model.predict_proba(X)
+        classes = np.asarray(model.classes_)
+
+        # Column names of the probabilities (the missing label class, nan or 'nan' once
+        # encoded together with the team names, is left out)
+        teams = le.inverse_transform(classes.astype(int))
+        keep = [i for i, team in enumerate(teams) if not pd.isna(team) and str(team) != "nan"]
+        probabilities = [
+            {str(teams[i]): float(row[i]) for i in keep}
+            for row in proba
+        ]
+        return predictions.tolist(), probabilities
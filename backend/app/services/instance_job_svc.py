@@ -0,0 +1,105 @@
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.config.config import model_dict, qs_dict
+from app.data_models.active_learning_dm import NewInstance
+from app.services.active_learning_svc import ActiveLearningService
+
+logger = logging.getLogger(__name__)
+
+# Number of instances that can be created concurrently
+INSTANCE_JOB_WORKERS = int(os.getenv("AL_INSTANCE_JOB_WORKERS", "1"))
+# Number of finished jobs kept for status lookups
+MAX_FINISHED_JOBS = 100
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class InstanceJobService:
+    """
+    Runs the creation of active learning instances as background jobs.
+
+    POST /activelearning/new only reserves an instance id and submits a job; the embedding,
+    encoder fitting and artifact persistence run on a worker thread. Progress is reported per
+    phase ('loading', 'embedding' with rows done/total, 'encoding', 'persisting').
+    """
+
+    def __init__(self, al_service: ActiveLearningService, max_workers: int = INSTANCE_JOB_WORKERS):
+        self.al_service = al_service
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="al-instance-job")
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, new_instance: NewInstance, instance_id: Optional[int] = None) -> Dict[str, Any]:
+        """Validate the request, reserve an instance id (or the given one) and queue the creation job."""
+        if new_instance.model_name not in model_dict:
+            raise ValueError(f"Unknown model '{new_instance.model_name}'")
+        if new_instance.qs_strategy not in qs_dict:
+            raise ValueError(f"Unknown query strategy '{new_instance.qs_strategy}'")
+
+        instance_id = self.al_service.storage.reserve_instance_id(instance_id)
+        job_id = str(uuid.uuid4())
+        job = {
+            "job_id": job_id,
+            "instance_id": instance_id,
+            "status": QUEUED,
+            "phase": None,
+            "split": None,
+            "done": 0,
+            "total": 0,
+            "error": None,
+            "created_at": datetime.now(),
+            "finished_at": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._prune_finished_jobs()
+
+        self._executor.submit(self._run, job_id, instance_id, new_instance)
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a snapshot of the job state, or None if the job is unknown."""
+        with self._lock:
+            job = self._jobs.get(str(job_id))
+            return dict(job) if job is not None else None
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _run(self, job_id: str, instance_id: int, new_instance: NewInstance) -> None:
+        self._update(job_id, status=RUNNING)
+
+        def _progress(phase: str, done: int = 0, total: int = 0, split: Optional[str] = None):
+            self._update(job_id, phase=phase, done=done, total=total, split=split)
+
+        try:
+            self.al_service.create_instance(new_instance, instance_id=instance_id, progress_callback=_progress)
+        except Exception as e:
+            logger.exception(f"Creation of AL instance {instance_id} failed (job {job_id})")
+            # The row, artifacts and uploads written before the failure must not outlive the job
+            self.al_service.discard_instance(instance_id)
+            self._update(job_id, status=FAILED, error=str(e), finished_at=datetime.now())
+        else:
+            self._update(job_id, status=COMPLETED, phase="done", finished_at=datetime.now())
+        finally:
+            self.al_service.storage.release_instance_id(instance_id)
+
+    def _prune_finished_jobs(self) -> None:
+        finished = [j for j in self._jobs.values() if j["status"] in (COMPLETED, FAILED)]
+        finished.sort(key=lambda j: j["finished_at"])
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job["job_id"]]
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            self._jobs[job_id].update(fields)
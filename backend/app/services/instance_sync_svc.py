@@ -0,0 +1,46 @@
+import logging
+import os
+import threading
+
+from app.services.active_learning_svc import ActiveLearningService
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two polls of the instance change feed
+INSTANCE_SYNC_INTERVAL = float(os.getenv("AL_INSTANCE_SYNC_INTERVAL", "2"))
+
+
+class InstanceSyncService:
+    """
+    Polls the instance change feed in the background when several API workers share the instances
+    (AL_SHARED_STATE=1), so that instances created, labeled, retrained or deleted by another worker
+    are picked up by this one.
+    """
+
+    def __init__(self, al_service: ActiveLearningService, interval: float = INSTANCE_SYNC_INTERVAL):
+        self.al_service = al_service
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if not self.al_service.shared_state or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="al-instance-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                applied = self.al_service.sync_instance_changes()
+                if applied:
+                    logger.info(f"Applied {applied} instance change(s) from other workers")
+            except Exception:
+                logger.exception("Polling the instance change feed failed")
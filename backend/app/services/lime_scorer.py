@@ -0,0 +1,57 @@
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+
+class LimeTextScorer:
+    """
+    classifier_fn of LimeTextExplainer for the perturbations of one ticket.
+
+    LIME scores num_samples (1000) copies of the ticket text with random words removed; the
+    service and subcategory are the same for all of them. Instead of building a DataFrame and
+    running inference() on every call, the scorer:
+    - embeds each distinct perturbed text once (many masks remove the same words, short texts
+      repeat most of their perturbations) and keeps the embeddings in `embedding_cache`,
+      which the explanations of one request share
+    - writes the one-hot block of the ticket, computed once, into every row
+    - scores with the model it was given (loaded once per explanation)
+
+    The probabilities equal those of the pandas pipeline: the text of a perturbation is its
+    title (empty description) and the feature matrix is float64 like inference() output.
+    """
+
+    def __init__(
+            self,
+            model: Any,
+            sentence_model: SentenceTransformer,
+            categorical: np.ndarray,
+            embedding_cache: Optional[Dict[str, np.ndarray]] = None
+            ):
+        self.model = model
+        self.sentence_model = sentence_model
+        self.categorical = np.asarray(categorical, dtype=np.float64)
+        self.embedding_cache = embedding_cache if embedding_cache is not None else {}
+        # Texts scored and texts embedded (the rest came from the cache)
+        self.scored = 0
+        self.embedded = 0
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embeddings of texts (float64), each distinct text not in the cache embedded once."""
+        missing = [text for text in dict.fromkeys(texts) if text not in self.embedding_cache]
+        if missing:
+            embeddings = np.asarray(self.sentence_model.encode(missing, show_progress_bar=False), dtype=np.float64)
+            self.embedding_cache.update(zip(missing, embeddings))
+            self.embedded += len(missing)
+        return np.stack([self.embedding_cache[text] for text in texts])
+
+    def features(self, texts: Sequence[str]) -> np.ndarray:
+        embeddings = self.embed(texts)
+        X = np.empty((len(texts), embeddings.shape[1] + len(self.categorical)), dtype=np.float64)
+        X[:, :embeddings.shape[1]] = embeddings
+        X[:, embeddings.shape[1]:] = self.categorical
+        return X
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        self.scored += len(texts)
+        return self.model.predict_proba(self.features(texts))
@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+from lime.lime_text import IndexedString
+
+
+@dataclass
+class OcclusionVariants:
+    """Texts of a leave-one-out explanation: the text itself, then the text without each feature."""
+    features: List[str]
+    # texts[0] is the text, texts[i + 1] the text without every occurrence of features[i]
+    texts: List[str]
+
+
+def occlusion_variants(text: str, ngram: int = 1, split_expression: str = r"\W+") -> OcclusionVariants:
+    """
+    Variants of text with each distinct word (or n-gram of ngram consecutive words) removed.
+
+    The text is split into words like LimeTextExplainer (same split_expression), and a word that
+    occurs several times is removed everywhere at once like a LIME feature, so the features of
+    ngram=1 are the words LIME explains.
+    """
+    if ngram < 1:
+        raise ValueError("ngram must be at least 1")
+    indexed_string = IndexedString(text, bow=False, split_expression=split_expression, mask_string="")
+    words = [indexed_string.word(i) for i in range(indexed_string.num_words())]
+
+    # Positions of each distinct n-gram, in the order of their first occurrence
+    positions: Dict[str, List[int]] = {}
+    for start in range(len(words) - ngram + 1):
+        positions.setdefault(" ".join(words[start:start + ngram]), []).extend(range(start, start + ngram))
+
+    return OcclusionVariants(
+        features=list(positions),
+        texts=[indexed_string.raw_string()] + [
+            indexed_string.inverse_removing(sorted(set(removed))) for removed in positions.values()
+        ],
+    )
+
+
+def occlusion_top_words(
+        variants: OcclusionVariants,
+        probabilities: np.ndarray,
+        label: int,
+        num_features: int = 10
+        ) -> List[Tuple[str, float]]:
+    """
+    (feature, weight) of the num_features features with the largest weights in absolute value.
+
+    The weight of a feature is the probability of label for the text minus the probability
+    without the feature: positive if the feature supports label, as in LIME.
+    """
+    probabilities = np.asarray(probabilities)[:, label]
+    weights = probabilities[0] - probabilities[1:]
+    order = np.argsort(-np.abs(weights), kind="stable")[:num_features]
+    return [(variants.features[i], float(weights[i])) for i in order]
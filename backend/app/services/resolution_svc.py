@@ -1097,4 +1097,22 @@ class ResolutionService:
         result = self.generate_response(request.ticket_title, request.ticket_description, rag_system, retrieval_k=request.top_k)
 
         # NO FALLBACK - Let any errors propagate so we can see what's wrong
-        return result
\ No newline at end of file
+        return result
+
+
+def create_resolution_service() -> ResolutionService:
+    """Resolution service configured from the environment (API process and compute workers)."""
+    return ResolutionService(
+        knowledge_base_path=os.getenv(
+            "KNOWLEDGE_BASE_PATH",
+            "backend/data/tickets_large_first_reply_label.csv"
+        ),
+        ticket_classifier_path=os.getenv(
+            "TICKET_CLASSIFIER_PATH",
+            "./ticket_classifier_model"
+        ),
+        team_classifier_path=os.getenv(
+            "TEAM_CLASSIFIER_PATH",
+            "./perfect_team_classifier"
+        )
+    )
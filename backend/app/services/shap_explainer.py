@@ -0,0 +1,95 @@
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+import shap
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+from app.core.linear_scorer import LinearScorer
+
+TREE_MODELS = (RandomForestClassifier, ExtraTreesClassifier, DecisionTreeClassifier)
+
+
+def _native_model(model: Any) -> Tuple[Any, np.ndarray]:
+    """
+    (model SHAP can explain exactly, classes of its outputs) of a loaded model: the
+    (coef, intercept) of a linear model (LinearScorer or LogisticRegression) or the fitted tree
+    ensemble of a SklearnClassifier.
+    """
+    if isinstance(model, LinearScorer):
+        return (model.coef, model.intercept), model.estimator_classes
+    estimator = getattr(model, "estimator_", model)
+    if isinstance(estimator, LogisticRegression):
+        return (estimator.coef_, estimator.intercept_), estimator.classes_
+    if isinstance(estimator, TREE_MODELS):
+        return estimator, estimator.classes_
+    raise ValueError(f"SHAP explanations need a tree or linear model, not {type(estimator).__name__}")
+
+
+class ShapExplainer:
+    """
+    SHAP attributions of a trained model on the ticket feature vector.
+
+    Trees are explained by TreeExplainer (tree path dependent, exact, in probability space) and
+    linear models by LinearExplainer (exact, in log-odds space) with an independent masker built
+    from background, a summary of at most background_samples train rows. Building the explainer
+    walks the trees or summarises the background once, so it is kept per model version and an
+    explanation then costs a few milliseconds.
+
+    The embedding dimensions are meaningless one by one: their contributions are summed into one
+    "text" contribution, the one-hot service and subcategory features are reported individually.
+    """
+
+    def __init__(
+            self,
+            model: Any,
+            background: np.ndarray,
+            categorical_names: Sequence[str],
+            background_samples: int = 100
+            ):
+        native, self.estimator_classes = _native_model(model)
+        if isinstance(native, tuple):
+            self.kind, self.output = "linear", "log_odds"
+            masker = shap.maskers.Independent(np.asarray(background, dtype=np.float64), max_samples=background_samples)
+            self.explainer = shap.LinearExplainer(native, masker)
+        else:
+            self.kind, self.output = "tree", "probability"
+            self.explainer = shap.TreeExplainer(native)
+        self.categorical_names = list(categorical_names)
+
+    def explain(self, X: np.ndarray, labels: Sequence[Any], num_features: int = 10) -> List[Dict[str, Any]]:
+        """
+        {"base_value", "contributions"} of each row of X for its label (a class of the model).
+
+        contributions are (feature, contribution) pairs: "text" first, then the num_features - 1
+        non-zero one-hot features largest in absolute value. base_value plus the contributions
+        of all the features is the model output for the label.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        values = np.asarray(self.explainer.shap_values(X))
+        base_values = np.atleast_1d(np.asarray(self.explainer.expected_value, dtype=np.float64))
+        if values.ndim == 2:
+            values = values[:, :, np.newaxis]
+        n_embedding = X.shape[1] - len(self.categorical_names)
+
+        explanations = []
+        for row, label in zip(values, labels):
+            column = int(np.flatnonzero(self.estimator_classes == label)[0])
+            if row.shape[1] == 1:
+                # Binary linear model: one log-odds output, of the second class
+                sign = 1.0 if column == 1 else -1.0
+                row_values, base_value = sign * row[:, 0], sign * base_values[0]
+            else:
+                row_values, base_value = row[:, column], base_values[column]
+
+            categorical = [
+                (name, float(value))
+                for name, value in zip(self.categorical_names, row_values[n_embedding:]) if value != 0
+            ]
+            categorical.sort(key=lambda item: -abs(item[1]))
+            explanations.append({
+                "base_value": float(base_value),
+                "contributions": [("text", float(row_values[:n_embedding].sum()))] + categorical[:max(num_features - 1, 0)],
+            })
+        return explanations
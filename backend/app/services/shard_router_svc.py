@@ -0,0 +1,284 @@
+import hmac
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import requests
+
+from app.core.hash_ring import HashRing
+
+logger = logging.getLogger(__name__)
+
+# Backend nodes as comma separated name=url pairs, e.g. "a=http://127.0.0.1:8001,b=http://127.0.0.1:8002"
+SHARD_NODES = os.getenv("SHARD_NODES", "")
+# Points per node on the hash ring (more points = more even placement)
+SHARD_VNODES = int(os.getenv("SHARD_VNODES", "64"))
+# Router state (next instance id, instances placed outside their ring owner, node of the recent jobs)
+SHARD_STATE_PATH = Path(os.getenv("SHARD_STATE_PATH", "storage/shard_router.json"))
+# Timeout (seconds) of forwarded requests
+SHARD_TIMEOUT = float(os.getenv("SHARD_TIMEOUT", "300"))
+# Shared secret of the router and the nodes; a node only accepts an instance id sent with it
+SHARD_ROUTER_SECRET = os.getenv("SHARD_ROUTER_SECRET", "")
+# Number of most recent jobs whose node is kept in the router state
+SHARD_REMEMBERED_JOBS = int(os.getenv("SHARD_REMEMBERED_JOBS", "10000"))
+
+INSTANCE_ID_HEADER = "X-HumAL-Instance-Id"
+ROUTER_SECRET_HEADER = "X-HumAL-Router-Secret"
+# Hop-by-hop headers that are not forwarded
+_SKIPPED_HEADERS = {"host", "content-length", "connection", "transfer-encoding", "keep-alive"}
+# Headers only the router may set (dropped from the client's headers)
+_ROUTER_HEADERS = {INSTANCE_ID_HEADER.lower(), ROUTER_SECRET_HEADER.lower()}
+
+
+def parse_nodes(raw: str) -> Dict[str, str]:
+    """'a=http://host:8001,b=http://host:8002' -> {'a': 'http://host:8001', 'b': 'http://host:8002'}"""
+    nodes = {}
+    for item in raw.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, url = item.partition("=")
+        if not sep or not name.strip() or not url.strip():
+            raise ValueError(f"Invalid shard node '{item}', expected name=url")
+        nodes[name.strip()] = url.strip().rstrip("/")
+    return nodes
+
+
+def is_router_request(secret: Optional[str], expected: Optional[str] = None) -> bool:
+    """Whether a request carries the router secret (never true when no secret is configured)."""
+    expected = SHARD_ROUTER_SECRET if expected is None else expected
+    if not expected or not secret:
+        return False
+    return hmac.compare_digest(secret.encode(), expected.encode())
+
+
+class ShardRouterService:
+    """
+    Places AL instances on backend nodes and forwards requests to the owning node.
+
+    Instances are placed by consistent hashing of their id. The router assigns the ids itself
+    (the nodes do not share a database) and passes them to the node creating the instance.
+    Rebalancing moves the instances whose owner changes through MinIO: the old owner exports
+    (uploads its current state), the new owner restores from MinIO and the old owner releases.
+    """
+
+    def __init__(
+            self,
+            nodes: Dict[str, str],
+            state_path: Path = SHARD_STATE_PATH,
+            vnodes: int = SHARD_VNODES,
+            session: Optional[requests.Session] = None,
+            timeout: float = SHARD_TIMEOUT,
+            secret: str = SHARD_ROUTER_SECRET,
+            remembered_jobs: int = SHARD_REMEMBERED_JOBS
+            ):
+        if not nodes:
+            raise ValueError("At least one shard node is required (SHARD_NODES)")
+        if not secret:
+            logger.warning("SHARD_ROUTER_SECRET is not set, the nodes will refuse to create instances")
+        self.secret = secret
+        self.nodes = dict(nodes)
+        self.ring = HashRing(self.nodes.keys(), vnodes=vnodes)
+        self.vnodes = vnodes
+        self.state_path = Path(state_path)
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.remembered_jobs = remembered_jobs
+        self._lock = threading.RLock()
+        self._state = {"next_instance_id": 1, "instances": {}, "jobs": {}}
+        self._load_state()
+
+    # --- Placement ---
+    def node_for(self, al_instance_id: int) -> str:
+        """Node owning an instance (ring owner unless the instance could not be moved there)."""
+        with self._lock:
+            placed = self._state["instances"].get(str(al_instance_id))
+        if placed is not None and placed in self.nodes:
+            return placed
+        return self.ring.node_for(al_instance_id)
+
+    def default_node(self) -> str:
+        """Node serving the requests that are not scoped to an instance (config, data, ...)."""
+        return next(iter(self.nodes))
+
+    def job_node(self, job_id: str) -> Optional[str]:
+        with self._lock:
+            return self._state["jobs"].get(str(job_id))
+
+    def remember_job(self, job_id: Any, node: str) -> None:
+        """Keep the node of a job (in the state file, so that job status requests survive a restart)."""
+        with self._lock:
+            jobs = self._state["jobs"]
+            jobs.pop(str(job_id), None)
+            jobs[str(job_id)] = node
+            # Oldest jobs first (dicts keep their insertion order, also through the JSON state)
+            for old_job_id in list(jobs)[:max(len(jobs) - self.remembered_jobs, 0)]:
+                del jobs[old_job_id]
+            self._save_state()
+
+    def allocate_instance_id(self) -> int:
+        with self._lock:
+            instance_id = self._state["next_instance_id"]
+            self._state["next_instance_id"] = instance_id + 1
+            self._save_state()
+            return instance_id
+
+    def record_instance(self, al_instance_id: int, node: str) -> None:
+        with self._lock:
+            self._state["instances"][str(al_instance_id)] = node
+            self._save_state()
+
+    def forget_instance(self, al_instance_id: int) -> None:
+        with self._lock:
+            self._state["instances"].pop(str(al_instance_id), None)
+            self._save_state()
+
+    def discover_instances(self) -> Dict[int, str]:
+        """Ask every node for its instances (router restart or state lost); returns {id: node}."""
+        found = {}
+        for node in self.nodes:
+            try:
+                response = self.request(node, "GET", "/activelearning/instances")
+                response.raise_for_status()
+            except requests.RequestException:
+                logger.warning(f"Shard node {node} is not reachable, its instances are not discovered")
+                continue
+            for instance_id in response.json().get("instances", {}):
+                found[int(instance_id)] = node
+
+        with self._lock:
+            for instance_id, node in found.items():
+                self._state["instances"][str(instance_id)] = node
+            if found:
+                self._state["next_instance_id"] = max(self._state["next_instance_id"], max(found) + 1)
+            self._save_state()
+        return found
+
+    # --- Forwarding ---
+    def request(self, node: str, method: str, path: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, f"{self.nodes[node]}{path}", **kwargs)
+
+    def forward(
+            self,
+            node: str,
+            method: str,
+            path: str,
+            *,
+            params=None,
+            headers=None,
+            body: bytes = b"",
+            stream: bool = False,
+            router_headers: Optional[Dict[str, str]] = None
+            ) -> requests.Response:
+        headers = {
+            k: v for k, v in (headers or {}).items()
+            if k.lower() not in _SKIPPED_HEADERS and k.lower() not in _ROUTER_HEADERS
+        }
+        headers.update(router_headers or {})
+        return self.request(node, method, path, params=params, headers=headers, data=body or None, stream=stream)
+
+    def create_instance(self, body: bytes, headers=None) -> requests.Response:
+        """Assign an id, create the instance on its ring owner and remember the creation job."""
+        instance_id = self.allocate_instance_id()
+        node = self.ring.node_for(instance_id)
+        router_headers = {INSTANCE_ID_HEADER: str(instance_id), ROUTER_SECRET_HEADER: self.secret}
+
+        response = self.forward(node, "POST", "/activelearning/new", headers=headers, body=body, router_headers=router_headers)
+        if response.ok:
+            self.record_instance(instance_id, node)
+            job_id = response.json().get("job_id")
+            if job_id is not None:
+                self.remember_job(job_id, node)
+        return response
+
+    def list_instances(self) -> Dict[str, Any]:
+        instances = {}
+        for node in self.nodes:
+            response = self.request(node, "GET", "/activelearning/instances")
+            response.raise_for_status()
+            instances.update(response.json().get("instances", {}))
+        return {"instances": dict(sorted(instances.items(), key=lambda item: int(item[0])))}
+
+    def shard_status(self) -> Dict[str, Any]:
+        """Nodes, node of every instance of the reachable nodes and the nodes that did not answer."""
+        instance_ids, unreachable = [], {}
+        for node in list(self.nodes):
+            try:
+                response = self.request(node, "GET", "/activelearning/instances")
+                response.raise_for_status()
+            except requests.RequestException as e:
+                logger.warning(f"Shard node {node} is not reachable: {e}")
+                unreachable[node] = str(e)
+                continue
+            instance_ids.extend(int(i) for i in response.json().get("instances", {}))
+        return {
+            "nodes": self.nodes,
+            "placements": {str(i): self.node_for(i) for i in sorted(instance_ids)},
+            "unreachable": unreachable,
+        }
+
+    # --- Rebalancing ---
+    def rebalance(self, nodes: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Switch to a new set of nodes and move the instances whose owner changed.
+
+        Instances that fail to move stay on their current node (and keep being routed there).
+        """
+        if not nodes:
+            raise ValueError("At least one shard node is required")
+
+        with self._lock:
+            old_nodes = dict(self.nodes)
+            placements = {int(i): node for i, node in self._state["instances"].items()}
+            new_ring = HashRing(nodes.keys(), vnodes=self.vnodes)
+            # Nodes that are removed stay reachable until their instances are moved away
+            self.nodes = {**old_nodes, **nodes}
+
+        moved, failed = [], []
+        for instance_id, old_node in sorted(placements.items()):
+            new_node = new_ring.node_for(instance_id)
+            if new_node == old_node:
+                continue
+            try:
+                self._move_instance(instance_id, old_node, new_node)
+                moved.append({"instance_id": instance_id, "from": old_node, "to": new_node})
+            except Exception as e:
+                logger.exception(f"Moving AL instance {instance_id} from {old_node} to {new_node} failed")
+                failed.append({"instance_id": instance_id, "from": old_node, "to": new_node, "error": str(e)})
+
+        with self._lock:
+            self.ring = new_ring
+            stranded = {f["from"] for f in failed}
+            self.nodes = {name: url for name, url in self.nodes.items() if name in nodes or name in stranded}
+            self._save_state()
+
+        return {"nodes": list(self.nodes), "moved": moved, "failed": failed}
+
+    def _move_instance(self, instance_id: int, old_node: str, new_node: str) -> None:
+        export = self.request(old_node, "GET", f"/activelearning/{instance_id}/export")
+        export.raise_for_status()
+
+        restore = self.request(new_node, "POST", f"/activelearning/{instance_id}/restore", json=export.json())
+        restore.raise_for_status()
+        self.record_instance(instance_id, new_node)
+
+        release = self.request(old_node, "POST", f"/activelearning/{instance_id}/release")
+        if not release.ok:
+            logger.warning(f"AL instance {instance_id} moved to {new_node} but could not be released on {old_node}")
+
+    # --- State ---
+    def _load_state(self) -> None:
+        if self.state_path.exists():
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                self._state.update(json.load(f))
+
+    def _save_state(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._state, f)
+        os.replace(tmp_path, self.state_path)
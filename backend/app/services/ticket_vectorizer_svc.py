@@ -8,6 +8,9 @@ This service wraps TicketVectorizer for backend use and MinIO persistence.
 Preprocessing pipeline is consistent with backend/app/services/data_preprocessing.py:inference()
 """
 
+import threading
+from typing import Any, Dict, Optional, Tuple
+
 from humal_vectorizer import TicketVectorizer
 
 
@@ -26,6 +29,9 @@ class TicketVectorizerService:
             minio_service: MinioService instance for persisting vectorizers
         """
         self.minio_service = minio_service
+        # Storage info of the vectorizer saved for each (al_instance_id, encoder fingerprint)
+        self._saved_vectorizers: Dict[Tuple[int, Optional[str]], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
 
     def create_vectorizer(
         self,
@@ -53,11 +59,44 @@ class TicketVectorizerService:
             default_category_value=default_category_value,
         )
 
+    def ensure_vectorizer(
+        self,
+        *,
+        al_instance_id: int,
+        encoder_fingerprint: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Storage info of the portable vectorizer of an instance, saved at most once per encoder version.
+
+        The default vectorizer never changes for an instance, so it is serialized and saved (see
+        save_vectorizer, content-addressed) on the first call for an (al_instance_id,
+        encoder_fingerprint) only; later calls return the same object without serializing it again.
+
+        Args:
+            al_instance_id: Active Learning instance ID
+            encoder_fingerprint: Version of the instance's one-hot encoder (LocalArtifactsStore.encoder_fingerprint)
+
+        Returns:
+            Dictionary with bucket, object path and SHA256 of the saved vectorizer
+        """
+        key = (al_instance_id, encoder_fingerprint)
+        with self._lock:
+            saved = self._saved_vectorizers.get(key)
+            if saved is None:
+                saved = self.save_vectorizer(
+                    al_instance_id=al_instance_id,
+                    vectorizer=self.create_vectorizer(),
+                    encoder_fingerprint=encoder_fingerprint,
+                )
+                self._saved_vectorizers[key] = saved
+            return saved
+
     def save_vectorizer(
         self,
         *,
         al_instance_id: int,
         vectorizer: TicketVectorizer,
+        encoder_fingerprint: Optional[str] = None,
     ):
         """
         Persist a TicketVectorizer to MinIO (WITHOUT encoder).
@@ -69,6 +108,7 @@ class TicketVectorizerService:
         Args:
             al_instance_id: Active Learning instance ID
             vectorizer: TicketVectorizer instance to save (encoder will be removed if present)
+            encoder_fingerprint: Version of the instance's one-hot encoder, part of the content address (optional)
 
         Returns:
             Dictionary with bucket, object path, and metadata
@@ -80,6 +120,7 @@ class TicketVectorizerService:
             vectorizer_metadata = self.minio_service.save_ticket_vectorizer(
                 al_instance_id=al_instance_id,
                 vectorizer=vectorizer,
+                encoder_fingerprint=encoder_fingerprint,
             )
         finally:
             # Restore encoder to original instance if it existed
@@ -92,6 +133,7 @@ class TicketVectorizerService:
         self,
         *,
         al_instance_id: int,
+        object_name: str,
     ) -> TicketVectorizer:
         """
         Load a TicketVectorizer from MinIO with its encoder attached.
@@ -101,6 +143,7 @@ class TicketVectorizerService:
 
         Args:
             al_instance_id: Active Learning instance ID
+            object_name: Object returned by save_vectorizer (e.g. the preprocessor of an XAI job)
 
         Returns:
             TicketVectorizer instance with encoder attached, ready for inference
@@ -108,6 +151,7 @@ class TicketVectorizerService:
         # Load vectorizer (will have encoder=None)
         vectorizer = self.minio_service.load_ticket_vectorizer(
             al_instance_id=al_instance_id,
+            object_name=object_name,
         )
         
         # Load and attach encoder
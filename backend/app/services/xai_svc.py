@@ -2,15 +2,21 @@ from app.core.storage import ActiveLearningStorage
 from app.services.inference_svc import InferenceService
 from app.services.ticket_vectorizer_svc import TicketVectorizerService
 from lime.lime_text import LimeTextExplainer
-from app.services.data_preprocessing import inference
+from app.services.data_preprocessing import inference, inference_categorical
+from app.services.lime_scorer import LimeTextScorer
+from app.services.adaptive_lime import AdaptiveLimeConfig, explain_adaptive
+from app.services.occlusion import occlusion_top_words, occlusion_variants
+from app.services.shap_explainer import ShapExplainer
+from app.services.explanation_cache import ExplanationCache
+from app.services.data_service import DataService
 import joblib
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 from skactiveml.utils import MISSING_LABEL
 from app.data_models.active_learning_dm import Data
 from sentence_transformers import SentenceTransformer
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from app.persistence.local_artifacts import LocalArtifactsStore
 from app.persistence.duckdb.service import DuckDbPersistenceService
 from app.persistence.minio_storage import MinioService
@@ -18,10 +24,20 @@ from app.core.rabbitmq_client import RabbitMQClient
 import uuid
 import app.config.config as config
 import os
+import asyncio
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Tickets of one request explained in parallel by LIME (threads sharing the model and embeddings)
+LIME_WORKERS = int(os.getenv("LIME_WORKERS", "4"))
+# Train rows summarised into the background of the SHAP explainer of a linear model
+SHAP_BACKGROUND_SAMPLES = int(os.getenv("SHAP_BACKGROUND_SAMPLES", "100"))
+# Seconds after which a queued or processing XAI job is no longer reused for the same ticket (0 = never)
+XAI_PENDING_JOB_TTL = float(os.getenv("XAI_PENDING_JOB_TTL", "3600"))
+
 class XaiService:
     def __init__(
             self, 
@@ -31,57 +47,295 @@ class XaiService:
             minio_service: Optional[MinioService] = None,
             duckdb_service: Optional[DuckDbPersistenceService] = None,
             rabbitmq_client: Optional[RabbitMQClient] = None,
-            ticket_vectorizer_service: Optional[TicketVectorizerService] = None
+            ticket_vectorizer_service: Optional[TicketVectorizerService] = None,
+            sentence_model: Optional[SentenceTransformer] = None,
+            explanation_cache: Optional[ExplanationCache] = None,
+            data_service: Optional[DataService] = None
             ):
         self.storage = storage
         self.inference_service = inference_service
-        self.sentence_model = SentenceTransformer("all-MiniLM-L6-v2")
+        self.sentence_model = sentence_model if sentence_model is not None else SentenceTransformer("all-MiniLM-L6-v2")
         self.local_artifacts_store = local_artifacts_store
         self.minio_service = minio_service
         self.duckdb_service = duckdb_service
         self.rabbitmq_client = rabbitmq_client
         self.ticket_vectorizer_service = ticket_vectorizer_service
+        self.explanation_cache = explanation_cache
+        self.data_service = data_service
+        # SHAP explainer of each (al_instance_id, model_id), with the model version it was built for
+        self._shap_explainers: Dict[Tuple[int, int], Tuple[tuple, ShapExplainer]] = {}
+        self._shap_lock = threading.Lock()
+        # XAI requests being submitted, by (al_instance_id, model_id, ticket ref or sha, content sha)
+        self._xai_submissions: Dict[Tuple[int, int, str, str], asyncio.Future] = {}
+
+    def explain_lime(self, al_instance_id: int, tickets: list[Data], model_id: int = 0, adaptive: Optional[AdaptiveLimeConfig] = None):
+        """
+        This function returns a Lime explanation for the texts (in the order of the tickets).
 
-    def explain_lime(self, al_instance_id: int, tickets: list[Data], model_id: int = 0):
+        With adaptive, the perturbations are sampled in rounds until the explanation is stable
+        (see explain_adaptive) and every explanation reports its sampling.
         """
-        This function returns a Lime explanation for the texts.
+        lime_explanation_outputs = [None] * len(tickets)
+        for index, output in self.iter_explain_lime(al_instance_id, tickets, model_id, adaptive=adaptive):
+            lime_explanation_outputs[index] = output
+        return lime_explanation_outputs
+
+    def iter_explain_lime(
+            self,
+            al_instance_id: int,
+            tickets: list[Data],
+            model_id: int = 0,
+            max_workers: int = LIME_WORKERS,
+            adaptive: Optional[AdaptiveLimeConfig] = None
+            ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Lime explanations of the tickets as (ticket index, explanation), in the order they complete.
+
+        The tickets are explained by a pool of max_workers threads sharing the model (loaded once)
+        and the embeddings of the perturbed texts. Closing the iterator cancels the tickets not started.
         """
         le = self.storage.dataset_dict[al_instance_id]['le']
-        lime_explainer = LimeTextExplainer(class_names = le.classes_)
-        lime_explanation_outputs = []
+        # Embeddings of the perturbed texts, shared by the tickets of the request
+        embedding_cache = {}
+
+        try:
+            # Model loaded once for all tickets (the NumPy scorer for linear models)
+            model = self.inference_service.load_model(al_instance_id, model_id)
+        except Exception as e:
+            for index in range(len(tickets)):
+                yield index, {"top_words": [], "error": f"LIME error: {str(e)}"}
+            return
+
+        def _explain(ticket: Data) -> Dict[str, Any]:
+            return self._explain_lime_ticket(al_instance_id, ticket, model_id, model, le, embedding_cache, adaptive)
+
+        if max_workers <= 1 or len(tickets) <= 1:
+            for index, ticket in enumerate(tickets):
+                yield index, _explain(ticket)
+            return
+
+        pool = ThreadPoolExecutor(max_workers=min(max_workers, len(tickets)), thread_name_prefix="lime")
+        try:
+            futures = {pool.submit(_explain, ticket): index for index, ticket in enumerate(tickets)}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _explain_lime_ticket(
+            self,
+            al_instance_id: int,
+            ticket: Data,
+            model_id: int,
+            model,
+            le,
+            embedding_cache: dict,
+            adaptive: Optional[AdaptiveLimeConfig] = None
+            ) -> Dict[str, Any]:
+        """Lime explanation of one ticket for its predicted class ({"top_words", "error"})."""
+        try:
+            # One explainer per ticket with its own random state (random_state=None would be NumPy's
+            # global RandomState, shared by the threads explaining the tickets of the request)
+            lime_explainer = LimeTextExplainer(class_names = le.classes_, random_state=np.random.RandomState())
+            lime_scorer = self._lime_scorer(al_instance_id, ticket, model, embedding_cache)
+
+            # Predict the class of the ticket
+            pred_class_idx = le.transform(self.inference_service.infer(al_instance_id=al_instance_id, X=ticket, model_id=model_id))[0]
+
+            # Extract the text of the ticket (Title + Description)
+            text = (ticket.title_anon or "") + " " + (ticket.description_anon or "")
+
+            if adaptive is not None:
+                result = explain_adaptive(lime_explainer, text, lime_scorer, pred_class_idx, config=adaptive)
+                return {"top_words": result.top_words, "error": None, "sampling": result.sampling()}
+
+            # Explain instance for the predicted class
+            lime_explanation = lime_explainer.explain_instance(
+                text,
+                lime_scorer,
+                num_features=10,
+                num_samples=1000,
+                labels=(pred_class_idx,) # Explain only the predicted class index
+            )
+            # Extract (word, weight) pairs
+            return {
+                "top_words": [(w, float(s)) for w, s in lime_explanation.as_list(label=pred_class_idx)],
+                "error": None
+            }
+        except Exception as e:
+            return {
+                "top_words": [],
+                "error": f"LIME error: {str(e)}"
+            }
 
-        for ticket in tickets:
+    def explain_occlusion(self, al_instance_id: int, tickets: list[Data], model_id: int = 0, ngram: int = 1) -> Dict[str, Any]:
+        """
+        Leave-one-out (occlusion) explanations of the tickets for their predicted class.
+
+        Each distinct word (or n-gram of ngram words) of a ticket is removed in turn, the variants
+        of all the tickets are embedded in one batch and scored by the model loaded once: one
+        evaluation per feature instead of the 1000 samples of LIME.
+
+        Returns:
+            - explanations: list of {"top_words", "error", "evaluations"} in the order of the tickets
+            - elapsed_ms: float, latency of the request
+            - evaluations: int, variants scored
+            - embedded: int, variants embedded (the others were duplicates)
+        """
+        start = time.perf_counter()
+        le = self.storage.dataset_dict[al_instance_id]['le']
+        explanations = [None] * len(tickets)
+        # (ticket index, scorer, variants, predicted class index) of the tickets to score
+        prepared = []
+        embedding_cache = {}
+
+        try:
+            model = self.inference_service.load_model(al_instance_id, model_id)
+        except Exception as e:
+            model = None
+            explanations = [{"top_words": [], "error": f"Occlusion error: {str(e)}"} for _ in tickets]
+
+        if model is not None:
+            for index, ticket in enumerate(tickets):
+                try:
+                    pred_class_idx = le.transform(self.inference_service.infer(al_instance_id=al_instance_id, X=ticket, model_id=model_id))[0]
+                    text = (ticket.title_anon or "") + " " + (ticket.description_anon or "")
+                    variants = occlusion_variants(text, ngram=ngram)
+                    scorer = self._lime_scorer(al_instance_id, ticket, model, embedding_cache)
+                    prepared.append((index, scorer, variants, pred_class_idx))
+                except Exception as e:
+                    explanations[index] = {"top_words": [], "error": f"Occlusion error: {str(e)}"}
+
+        embedded = 0
+        if prepared:
             try:
-                def _predict_probabilities_wrapper(texts):
-                    return self._predict_probabilities(al_instance_id=al_instance_id, texts=texts, ticket=ticket, model_id=model_id)
-
-                # Predict the class of the ticket
-
-                pred_class_idx = le.transform(self.inference_service.infer(al_instance_id=al_instance_id, X=ticket, model_id=model_id))[0]
-                
-                # Extract the text of the ticket (Title + Description)
-                text = (ticket.title_anon or "") + " " + (ticket.description_anon or "")
-
-                # Explain instance for the predicted class
-                lime_explanation = lime_explainer.explain_instance(
-                    text,
-                    _predict_probabilities_wrapper,
-                    num_features=10,
-                    num_samples=1000,
-                    labels=(pred_class_idx,) # Explain only the predicted class index
-                )
-                # Extract (word, weight) pairs
-                lime_explanation_outputs.append({
-                    "top_words": [(w, float(s)) for w, s in lime_explanation.as_list(label=pred_class_idx)],
-                    "error": None
-                })
+                # One encode for the variants of all the tickets (the scorers share the cache)
+                batch_scorer = prepared[0][1]
+                batch_scorer.embed([text for _, _, variants, _ in prepared for text in variants.texts])
+                embedded = batch_scorer.embedded
             except Exception as e:
-                lime_explanation_outputs.append({
-                    "top_words": [],
-                    "error": f"LIME error: {str(e)}"
-                })
-        
-        return lime_explanation_outputs
+                for index, _, _, _ in prepared:
+                    explanations[index] = {"top_words": [], "error": f"Occlusion error: {str(e)}"}
+                prepared = []
+
+        evaluations = 0
+        for index, scorer, variants, pred_class_idx in prepared:
+            try:
+                probabilities = scorer(variants.texts)
+                evaluations += len(variants.texts)
+                explanations[index] = {
+                    "top_words": occlusion_top_words(variants, probabilities, pred_class_idx),
+                    "error": None,
+                    "evaluations": len(variants.texts)
+                }
+            except Exception as e:
+                explanations[index] = {"top_words": [], "error": f"Occlusion error: {str(e)}"}
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Occlusion explanations of {len(tickets)} tickets: {evaluations} variants scored in {elapsed_ms:.1f} ms")
+        return {
+            "explanations": explanations,
+            "elapsed_ms": round(elapsed_ms, 1),
+            "evaluations": evaluations,
+            "embedded": embedded
+        }
+
+    def explain_shap(self, al_instance_id: int, tickets: list[Data], model_id: int = 0, num_features: int = 10) -> Dict[str, Any]:
+        """
+        SHAP attributions of the tickets for their predicted class (tree and linear models).
+
+        The feature vectors of all the tickets are computed in one batch and explained by the
+        ShapExplainer of the model version (built on the first request after a retrain).
+
+        Returns:
+            - explanations: list of {"prediction", "base_value", "contributions", "error"} in the order of the tickets
+            - explainer: "tree" or "linear"
+            - output: "probability" (tree) or "log_odds" (linear), the unit of the contributions
+            - elapsed_ms: float, latency of the request
+        """
+        start = time.perf_counter()
+        explainer = None
+        try:
+            model = self.inference_service.load_model(al_instance_id, model_id)
+            explainer = self._shap_explainer(al_instance_id, model_id, model)
+            X = self.inference_service._features(al_instance_id, [ticket.model_dump() for ticket in tickets])
+            predictions = model.predict(X)
+            teams = self.storage.dataset_dict[al_instance_id]['le'].inverse_transform(predictions)
+            explanations = [
+                {"prediction": team, **attribution, "error": None}
+                for team, attribution in zip(teams.tolist(), explainer.explain(X, predictions, num_features))
+            ]
+        except Exception as e:
+            explanations = [{"prediction": None, "base_value": None, "contributions": [], "error": f"SHAP error: {str(e)}"} for _ in tickets]
+
+        return {
+            "explanations": explanations,
+            "explainer": explainer.kind if explainer is not None else None,
+            "output": explainer.output if explainer is not None else None,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+        }
+
+    def _shap_explainer(self, al_instance_id: int, model_id: int, model) -> ShapExplainer:
+        """ShapExplainer of the current version of the model, built once per version."""
+        version = self.storage.model_version(al_instance_id, model_id)
+        with self._shap_lock:
+            cached = self._shap_explainers.get((al_instance_id, model_id))
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+        dataset = self.storage.dataset_dict[al_instance_id]
+        explainer = ShapExplainer(
+            model,
+            background=dataset['X_train'],
+            categorical_names=dataset['oh'].get_feature_names_out(),
+            background_samples=SHAP_BACKGROUND_SAMPLES
+        )
+        with self._shap_lock:
+            self._shap_explainers[(al_instance_id, model_id)] = (version, explainer)
+        return explainer
+
+    def cached_explanations(
+            self,
+            al_instance_id: int,
+            model_id: int,
+            tickets: list[Data],
+            method: str,
+            params: Dict[str, Any]
+            ) -> Tuple[Optional[str], list]:
+        """
+        (model version, cached explanation of each ticket or None) of the explanation cache.
+
+        The model version is read before the missing explanations are computed and must be given
+        back to cache_explanations: explanations computed while the model is replaced are then
+        stored under the version they may come from, which is never served again.
+        """
+        version = self._model_version(al_instance_id, model_id)
+        if version is None:
+            return None, [None] * len(tickets)
+        payloads = [ticket.model_dump() for ticket in tickets]
+        return version, self.explanation_cache.get_many(al_instance_id, model_id, version, method, params, payloads)
+
+    def cache_explanations(
+            self,
+            al_instance_id: int,
+            model_id: int,
+            model_version: Optional[str],
+            tickets: list[Data],
+            method: str,
+            params: Dict[str, Any],
+            explanations: list
+            ) -> None:
+        """Store computed explanations in the explanation cache (see cached_explanations)."""
+        if model_version is None:
+            return
+        payloads = [ticket.model_dump() for ticket in tickets]
+        self.explanation_cache.put_many(al_instance_id, model_id, model_version, method, params, payloads, explanations)
+
+    def _model_version(self, al_instance_id: int, model_id: int) -> Optional[str]:
+        """Fingerprint of the saved model for the explanation cache, None if the cache is not used."""
+        if self.explanation_cache is None or not self.explanation_cache.enabled or self.local_artifacts_store is None:
+            return None
+        return self.local_artifacts_store.model_fingerprint(al_instance_id, model_id)
 
     def find_nearest_by_ticket(self, al_instance_id: int, ticket: Data, model_id: int = 0):
         """
@@ -92,39 +346,12 @@ class XaiService:
             - nearest_ticket_label: str
             - similarity_score: float
         """
-        target_embedding = inference(
-            df=pd.DataFrame([ticket.model_dump()]), 
-            le=self.storage.dataset_dict[al_instance_id]['le'], 
-            oh=self.storage.dataset_dict[al_instance_id]['oh'], 
-            sentence_model=self.sentence_model).values
-
-        # Extract the train data that is already labeled
-        X_train = self.storage.dataset_dict[al_instance_id]['X_train']
-        y_train = self.storage.dataset_dict[al_instance_id]['y_train']
-        labeled_mask = y_train.notna() # Check if the label is not missing
-        X_labeled = X_train[labeled_mask]
-
-        # Extract the indices of the labeled tickets
-        X_labeled_indices = np.where(labeled_mask)[0]
-            
-        # Get the most similar ticket
-        similarities = cosine_similarity(target_embedding, X_labeled.values)
-        nearest_ticket_idx = np.argmax(similarities[0])
-
-        # Convert the index to the X_train index
-        nearest_ticket_idx_X_train = X_labeled_indices[nearest_ticket_idx]
-
-        # Convert the index to the original reference id (Ref)
-        nearest_ticket_ref = self.storage.dataset_dict[al_instance_id]['X_train'].index[nearest_ticket_idx_X_train]
-
-        # Retrieve nearest ticket's true label
-        le = self.storage.dataset_dict[al_instance_id]['le']
-        nearest_ticket_label = le.inverse_transform([int(y_train[nearest_ticket_ref])])[0]
+        nearest = self.find_nearest_tickets(al_instance_id, tickets=[ticket], k=1)[0][0]
 
         return {
-            "nearest_ticket_ref": nearest_ticket_ref,
-            "nearest_ticket_label": nearest_ticket_label,
-            "similarity_score": float(similarities[0, nearest_ticket_idx])
+            "nearest_ticket_ref": nearest["ref"],
+            "nearest_ticket_label": nearest["label"],
+            "similarity_score": nearest["similarity_score"]
         }
 
     def find_nearest_by_query_idx(self, al_instance_id: int, indices: list[int], model_id: int = 0):
@@ -136,60 +363,130 @@ class XaiService:
             - nearest_ticket_labels: list[str]
             - similarity_score: list[float]
         """
-        # Indices are Ref values; select rows directly
-        target_embeddings = self.storage.dataset_dict[al_instance_id]['X_train'].loc[indices].values
-
-        # Extract the train data that is already labeled
-        X_train = self.storage.dataset_dict[al_instance_id]['X_train']
-        y_train = self.storage.dataset_dict[al_instance_id]['y_train']
-        labeled_mask = y_train.notna() # Check if the label is not missing
-        X_labeled = X_train[labeled_mask]
-
-        # Extract the indices of the labeled tickets
-        X_labeled_indices = np.where(labeled_mask)[0]
-            
-        # Get the most similar tickets
-        similarities = cosine_similarity(target_embeddings, X_labeled.values)
-        nearest_ticket_idxs = np.argmax(similarities, axis=1)
-
-        # Convert the indices to the X_train indices
-        nearest_ticket_idxs_X_train = X_labeled_indices[nearest_ticket_idxs]
-
-        # Convert the indices to the original reference ids (Ref)
-        nearest_ticket_refs = list(self.storage.dataset_dict[al_instance_id]['X_train'].index[nearest_ticket_idxs_X_train])
-
-        # Retrieve nearest tickets' true labels
-        le = self.storage.dataset_dict[al_instance_id]['le']
-        nearest_ticket_labels = le.inverse_transform([int(y_train[idx]) for idx in nearest_ticket_refs]).tolist()
-        similarity_scores = [similarities[i, nearest_ticket_idxs[i]] for i in range(len(nearest_ticket_idxs))]
+        nearest = [neighbors[0] for neighbors in self.find_nearest_tickets(al_instance_id, indices=indices, k=1)]
 
         return {
-            "nearest_ticket_ref": nearest_ticket_refs,
-            "nearest_ticket_label": nearest_ticket_labels,
-            "similarity_score": similarity_scores
+            "nearest_ticket_ref": [neighbor["ref"] for neighbor in nearest],
+            "nearest_ticket_label": [neighbor["label"] for neighbor in nearest],
+            "similarity_score": [neighbor["similarity_score"] for neighbor in nearest]
         }
 
+    def find_nearest_tickets(
+            self,
+            al_instance_id: int,
+            tickets: Optional[list[Data]] = None,
+            indices: Optional[list[str]] = None,
+            k: int = 1
+            ) -> list[list[Dict[str, Any]]]:
+        """
+        The k most similar labeled tickets of each query ticket, most similar first.
+
+        The queries are either tickets (embedded in one batch) or the refs of train tickets; all of
+        them are answered by one search of the labeled ticket index (see LabeledVectorIndex).
+        Returns one list of {"ref", "label", "similarity_score"} per query (fewer than k neighbours
+        if fewer tickets are labeled). Raises ValueError if no ticket is labeled yet.
+        """
+        index = self.storage.labeled_index(al_instance_id)
+        if len(index) == 0:
+            raise ValueError(f"No labeled tickets in instance {al_instance_id} yet, label tickets first")
+
+        dataset = self.storage.dataset_dict[al_instance_id]
+        if tickets is not None:
+            target_embeddings = inference(
+                df=pd.DataFrame([ticket.model_dump() for ticket in tickets]),
+                le=dataset['le'],
+                oh=dataset['oh'],
+                sentence_model=self.sentence_model).values
+        else:
+            # Indices are Ref values; select rows directly
+            target_embeddings = dataset['X_train'].loc[indices].values
+
+        refs, labels, similarities = index.search(target_embeddings, k=k)
+
+        # Labels of all the neighbours decoded at once
+        label_names = dataset['le'].inverse_transform(labels.ravel()).reshape(labels.shape) if labels.size else labels
+        return [
+            [
+                {"ref": ref, "label": label, "similarity_score": float(similarity)}
+                for ref, label, similarity in zip(refs[row].tolist(), label_names[row].tolist(), similarities[row])
+            ]
+            for row in range(len(refs))
+        ]
+
+    def attach_neighbor_tickets(self, neighbors: list[list[Dict[str, Any]]]) -> None:
+        """Add the ticket of every neighbour (under "ticket"), all of them read with one DuckDB query."""
+        refs = list(dict.fromkeys(str(neighbor["ref"]) for row in neighbors for neighbor in row))
+        tickets = self.data_service.get_tickets(refs)['tickets'] if refs else []
+        rows = {str(ticket['Ref']): ticket for ticket in tickets}
+        for row in neighbors:
+            for neighbor in row:
+                neighbor["ticket"] = rows.get(str(neighbor["ref"]))
+
     async def create_xai_request(self, al_instance_id: int, ticket_data: Data, model_id: int, ticket_ref: Optional[str] = None):
-        """Saves the ticket and vectorizer to MinIO.
+        """Saves the ticket to MinIO (and the vectorizer of the instance, once per encoder version).
            If ticket_ref is provided, it uses the ticket_ref as the object name in MinIO,
            otherwise, the minio method generates a sha256 hash.
-           It then generates a job_id and saves the XAI request information to the database for tracking."""
+           It then generates a job_id and saves the XAI request information to the database for tracking.
+           A ticket that already has a job for the instance and model that did not fail gets that job_id
+           (same ref or sha and same content: a ref resubmitted with an edited ticket gets a new job)."""
         if self.minio_service is None or self.duckdb_service is None:
             raise RuntimeError("XAI request dependencies are not configured")
 
+        # Identical requests in flight in this process share one submission
+        ticket_sha = self.minio_service.xai_ticket_sha(ticket_data, ticket_ref)
+        content_sha = self.minio_service.xai_ticket_content_sha(ticket_data)
+        key = (al_instance_id, model_id, ticket_sha, content_sha)
+        submission = self._xai_submissions.get(key)
+        if submission is None:
+            submission = asyncio.ensure_future(
+                self._submit_xai_request(al_instance_id, ticket_data, model_id, ticket_ref, ticket_sha, content_sha)
+            )
+            self._xai_submissions[key] = submission
+            submission.add_done_callback(lambda task: self._forget_xai_submission(key, task))
+        # Shielded: a cancelled request does not cancel the submission shared with the others
+        return await asyncio.shield(submission)
+
+    def _forget_xai_submission(self, key: tuple, task: asyncio.Future) -> None:
+        if self._xai_submissions.get(key) is task:
+            del self._xai_submissions[key]
+        # Mark the error as retrieved if every request waiting for it was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def _submit_xai_request(
+            self,
+            al_instance_id: int,
+            ticket_data: Data,
+            model_id: int,
+            ticket_ref: Optional[str],
+            ticket_sha: str,
+            content_sha: str
+            ) -> uuid.UUID:
+        # Job of the same ticket and model that is queued, processing or completed (not failed)
+        existing_job = self.duckdb_service.find_xai_job(
+            al_instance_id, model_id, ticket_sha,
+            ticket_content_sha=content_sha,
+            pending_max_age_seconds=XAI_PENDING_JOB_TTL if XAI_PENDING_JOB_TTL > 0 else None
+        )
+        if existing_job is not None:
+            logger.info(f"Serving XAI request of instance {al_instance_id} with {existing_job['status']} job {existing_job['job_id']}")
+            return uuid.UUID(existing_job["job_id"])
+
         ticket_storage_info = self.minio_service.save_ticket_for_xai(
             al_instance_id=al_instance_id,
             X=ticket_data,
             ticket_ref=ticket_ref,
         )
 
-        # Create and save the ticket vectorizer
+        # Ticket vectorizer of the instance (content-addressed, serialized and uploaded once per encoder version)
         vectorizer_path = None
         if self.ticket_vectorizer_service is not None:
-            vectorizer = self.ticket_vectorizer_service.create_vectorizer()
-            vectorizer_storage_info = self.ticket_vectorizer_service.save_vectorizer(
+            encoder_fingerprint = None
+            if self.local_artifacts_store is not None:
+                encoder_fingerprint = self.local_artifacts_store.encoder_fingerprint(al_instance_id)
+            vectorizer_storage_info = self.ticket_vectorizer_service.ensure_vectorizer(
                 al_instance_id=al_instance_id,
-                vectorizer=vectorizer,
+                encoder_fingerprint=encoder_fingerprint,
             )
             vectorizer_path = vectorizer_storage_info["object"]
 
@@ -202,6 +499,7 @@ class XaiService:
             "job_id": job_id,
             "model_id": model_id,
             "ticket_ref_or_sha": ticket_storage_info["ticket_sha"],
+            "ticket_content_sha": content_sha,
             "request_ticket_location": ticket_storage_info["object"],
             "request_model_location": config.model_location(al_instance_id, model_id),
             "request_preprocessor_location": vectorizer_path,
@@ -280,32 +578,14 @@ class XaiService:
         
 
 
-    def _predict_probabilities(self, al_instance_id, texts, ticket, model_id: int = 0):
-        """
-        This function predicts the probabilities of the texts.
-        It adds other features to the texts and then predicts the probabilities.
-        """
-
-        # Load the model
-        model = self.local_artifacts_store.load_model(al_instance_id, model_id)
-        
-        le = self.storage.dataset_dict[al_instance_id]['le']
-        oh = self.storage.dataset_dict[al_instance_id]['oh']
-        
-        tickets = self._create_ticket(texts, ticket)
-        texts = inference(tickets, le, oh, self.sentence_model)
-        
-        probabilities = model.predict_proba(texts)
-        return probabilities
-
-    def _create_ticket(self, texts, ticket):
+    def _lime_scorer(self, al_instance_id: int, ticket: Data, model, embedding_cache: dict) -> LimeTextScorer:
         """
-        This function creates a ticket from the text and other ticket data.
+        classifier_fn of LIME for the perturbations of a ticket: the perturbed texts replace the
+        title and description, the one-hot block of the service and subcategory is computed once.
         """
-        tickets = pd.DataFrame({
-            'title_anon': texts,
-            'description_anon': ["" for _ in range(len(texts))],
-            'service_subcategory_name': [ticket.service_subcategory_name for _ in range(len(texts))],
-            'service_name': [ticket.service_name for _ in range(len(texts))]
-        })
-        return tickets
\ No newline at end of file
+        categorical = inference_categorical(
+            ticket.model_dump(),
+            self.storage.dataset_dict[al_instance_id]['oh'],
+            oh_lookup=self.inference_service._onehot_lookup(al_instance_id)
+        )
+        return LimeTextScorer(model, self.sentence_model, categorical, embedding_cache=embedding_cache)
@@ -0,0 +1,229 @@
+"""
+Shard router: spreads AL instances over several backend nodes.
+
+Instance scoped calls (/activelearning/{id}/*, /xai/{id}/*) are forwarded to the node owning the
+instance, all other calls to the first node. Run locally with several node processes:
+    python -m app.shard_router --spawn-nodes 3
+or against running nodes:
+    SHARD_NODES="a=http://127.0.0.1:8001,b=http://127.0.0.1:8002" python -m app.shard_router
+"""
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load project-root .env before importing modules that read os.getenv at import time
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+load_dotenv(PROJECT_ROOT / ".env")
+
+import logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+import argparse
+import secrets
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+import requests
+from fastapi import Body, FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+
+from app.services.shard_router_svc import SHARD_NODES, SHARD_ROUTER_SECRET, ShardRouterService, parse_nodes
+
+logger = logging.getLogger(__name__)
+
+FORWARDED_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE"]
+
+
+def create_app(router_service: Optional[ShardRouterService] = None) -> FastAPI:
+    shards = router_service
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        nonlocal shards
+        if shards is None:
+            shards = ShardRouterService(
+                parse_nodes(os.getenv("SHARD_NODES", SHARD_NODES)),
+                secret=os.getenv("SHARD_ROUTER_SECRET", SHARD_ROUTER_SECRET),
+            )
+        # Learn the instances of the nodes (the router state may be missing or outdated)
+        await run_in_threadpool(shards.discover_instances)
+        yield
+
+    app = FastAPI(title="HumAL Shard Router", version="1.0.0", lifespan=lifespan)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    def _node_for_segment(segment: str) -> str:
+        """Owner of the instance in /activelearning/{id}/..., first node for paths without an instance id."""
+        return shards.node_for(int(segment)) if segment.isdigit() else shards.default_node()
+
+    async def _forward(node: str, request: Request, path: str) -> Response:
+        body = await request.body()
+        try:
+            upstream = await run_in_threadpool(
+                shards.forward,
+                node,
+                request.method,
+                path,
+                params=list(request.query_params.multi_items()),
+                headers=dict(request.headers),
+                body=body,
+                stream=True,
+            )
+        except requests.RequestException as e:
+            raise HTTPException(status_code=502, detail=f"Shard node {node} unavailable: {e}")
+
+        media_type = upstream.headers.get("content-type")
+        if media_type and media_type.startswith("application/json"):
+            content = upstream.content
+            # Remember job ids so that job status requests reach the node running the job
+            if upstream.ok:
+                try:
+                    payload = upstream.json()
+                except ValueError:
+                    payload = None
+                if isinstance(payload, dict) and payload.get("job_id") is not None:
+                    shards.remember_job(payload["job_id"], node)
+            return Response(content=content, status_code=upstream.status_code, media_type=media_type)
+
+        return StreamingResponse(upstream.iter_content(chunk_size=64 * 1024), status_code=upstream.status_code, media_type=media_type)
+
+    # --- Router administration ---
+    @app.get("/shards")
+    def get_shards():
+        # Nodes that are down are reported instead of failing the status request
+        return shards.shard_status()
+
+    @app.post("/shards/rebalance")
+    def rebalance(nodes: Dict[str, str] = Body(..., embed=True)):
+        try:
+            return shards.rebalance(nodes)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    # --- Routes that need the router's bookkeeping ---
+    @app.post("/activelearning/new", status_code=202)
+    async def create_instance(request: Request):
+        body = await request.body()
+        upstream = await run_in_threadpool(shards.create_instance, body, dict(request.headers))
+        return Response(content=upstream.content, status_code=upstream.status_code, media_type=upstream.headers.get("content-type"))
+
+    @app.get("/activelearning/instances")
+    def get_instances():
+        return shards.list_instances()
+
+    @app.get("/activelearning/jobs/{job_id}")
+    async def get_instance_job(job_id: str, request: Request):
+        node = shards.job_node(job_id)
+        if node is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return await _forward(node, request, request.url.path)
+
+    @app.get("/xai/jobs/{job_id}")
+    async def get_xai_job(job_id: str, request: Request):
+        node = shards.job_node(job_id)
+        if node is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return await _forward(node, request, request.url.path)
+
+    # --- Instance scoped routes ---
+    @app.delete("/activelearning/{al_instance_id}")
+    async def delete_instance(al_instance_id: int, request: Request):
+        response = await _forward(shards.node_for(al_instance_id), request, request.url.path)
+        if response.status_code < 400:
+            shards.forget_instance(al_instance_id)
+        return response
+
+    @app.api_route("/activelearning/{al_instance_id}/{rest:path}", methods=FORWARDED_METHODS)
+    async def forward_activelearning(al_instance_id: str, rest: str, request: Request):
+        return await _forward(_node_for_segment(al_instance_id), request, request.url.path)
+
+    @app.api_route("/xai/{al_instance_id}/{rest:path}", methods=FORWARDED_METHODS)
+    async def forward_xai(al_instance_id: str, rest: str, request: Request):
+        return await _forward(_node_for_segment(al_instance_id), request, request.url.path)
+
+    # --- Everything else (config, data, resolution) ---
+    @app.api_route("/{rest:path}", methods=FORWARDED_METHODS)
+    async def forward_default(rest: str, request: Request):
+        return await _forward(shards.default_node(), request, request.url.path)
+
+    return app
+
+
+app = create_app()
+
+
+def _spawn_nodes(count: int, base_port: int, storage_root: Path) -> Dict[str, subprocess.Popen]:
+    """Start `count` backend nodes on consecutive ports, each with its own storage folder."""
+    processes = {}
+    for i in range(count):
+        name = f"node{i}"
+        node_dir = storage_root / name
+        env = dict(
+            os.environ,
+            DUCKDB_PATH=str(node_dir / "db" / "humal.duckdb"),
+            MODELS_DIR=str(node_dir / "models"),
+            ENCODERS_DIR=str(node_dir / "encoders"),
+            VECTORIZED_DATA_DIR=str(node_dir / "vectorized_data"),
+        )
+        port = base_port + i
+        processes[f"{name}=http://127.0.0.1:{port}"] = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+            env=env,
+        )
+    return processes
+
+
+def _wait_until_up(nodes: Dict[str, str], timeout: float = 600) -> None:
+    deadline = time.time() + timeout
+    for name, url in nodes.items():
+        while True:
+            try:
+                requests.get(f"{url}/config/models", timeout=5)
+                break
+            except requests.RequestException:
+                if time.time() > deadline:
+                    raise RuntimeError(f"Shard node {name} did not start")
+                time.sleep(1)
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="HumAL shard router")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--spawn-nodes", type=int, default=0, help="Start this many local backend nodes")
+    parser.add_argument("--base-port", type=int, default=8001, help="Port of the first spawned node")
+    parser.add_argument("--storage-root", type=Path, default=Path("storage/shards"))
+    args = parser.parse_args()
+
+    processes = {}
+    try:
+        if args.spawn_nodes:
+            # The spawned nodes inherit the secret that lets them accept the router's instance ids
+            os.environ.setdefault("SHARD_ROUTER_SECRET", secrets.token_hex(16))
+            processes = _spawn_nodes(args.spawn_nodes, args.base_port, args.storage_root)
+            os.environ["SHARD_NODES"] = ",".join(processes)
+            _wait_until_up(parse_nodes(os.environ["SHARD_NODES"]))
+        uvicorn.run(create_app(), host=args.host, port=args.port)
+    finally:
+        for process in processes.values():
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark of adaptive-sample LIME against the fixed 1000 samples, by ticket length.
+
+For tickets of increasing length, explains the predicted class with 1000 samples and with
+explain_adaptive (default AdaptiveLimeConfig), and compares both top words with a reference
+explanation of 5000 samples (share of the reference top 5 found in the top 5).
+
+Embeddings are the mean of deterministic per-word vectors and cost --embed-ms per sentence,
+so the probabilities depend on the words as with a real sentence model (the per-text random
+embeddings of bench_lime make every perturbation unrelated and LIME never stabilises).
+
+Usage (from backend/):
+    python -m benchmarks.bench_adaptive_lime
+    python -m benchmarks.bench_adaptive_lime --words 5,30,200 --time-budget-ms 500
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+import warnings
+import zlib
+from pathlib import Path
+
+import numpy as np
+from lime.lime_text import LimeTextExplainer
+from sklearn.exceptions import ConvergenceWarning
+
+from app.services.adaptive_lime import AdaptiveLimeConfig, explain_adaptive
+from app.services.data_preprocessing import inference_categorical
+from app.services.lime_scorer import LimeTextScorer
+from benchmarks.bench_infer_batch import WORDS, _prepare, _tickets
+
+
+class _BagOfWordsSentenceModel:
+    """384-d embeddings averaging a vector seeded by each word, with a simulated cost per sentence."""
+
+    def __init__(self, embed_ms: float):
+        self.embed_ms = embed_ms
+
+    def encode(self, sentences, show_progress_bar=False):
+        time.sleep(len(sentences) * self.embed_ms / 1000)
+        return np.stack([
+            np.mean(
+                [np.random.default_rng(zlib.crc32(w.encode())).random(384, dtype=np.float32) for w in s.split()]
+                or [np.zeros(384, dtype=np.float32)],
+                axis=0,
+            )
+            for s in sentences
+        ])
+
+
+def _top5_overlap(top_words, reference) -> float:
+    return len({w for w, _ in top_words[:5]} & {w for w, _ in reference[:5]}) / 5
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", default="5,30,200", help="Comma separated ticket lengths in words")
+    parser.add_argument("--embed-ms", type=float, default=1.0, help="Simulated embedding cost per sentence")
+    parser.add_argument("--time-budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=ConvergenceWarning)
+    config = AdaptiveLimeConfig(time_budget_ms=args.time_budget_ms)
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        service = _prepare(Path(tmpdir), fake_embeddings=True)
+        service.sentence_model = _BagOfWordsSentenceModel(args.embed_ms)
+        model = service.load_model(1, 0)
+        ticket = _tickets(1, rng)[0]
+        categorical = inference_categorical(ticket.model_dump(), service.storage.dataset_dict[1]["oh"])
+
+        print(f"{'words':>6} {'mode':<9} {'ms':>8} {'samples':>8} {'stability':>10} {'top-5 overlap':>14}")
+        for words in (int(w) for w in args.words.split(",")):
+            text = " ".join(rng.choices(WORDS + [f"word{i}" for i in range(words)], k=words))
+            label = int(LimeTextScorer(model, service.sentence_model, categorical)([text]).argmax())
+
+            def _scorer():
+                # No embeddings shared between the runs
+                return LimeTextScorer(model, service.sentence_model, categorical)
+
+            reference = LimeTextExplainer(random_state=1).explain_instance(
+                text, _scorer(), num_samples=5000, labels=(label,)
+            ).as_list(label=label)
+
+            start = time.perf_counter()
+            fixed = LimeTextExplainer(random_state=0).explain_instance(
+                text, _scorer(), num_samples=1000, labels=(label,)
+            ).as_list(label=label)
+            fixed_ms = (time.perf_counter() - start) * 1000
+            print(f"{words:>6} {'fixed':<9} {fixed_ms:>8.0f} {1000:>8} {'':>10} {_top5_overlap(fixed, reference):>14.1f}")
+
+            result = explain_adaptive(LimeTextExplainer(random_state=0), text, _scorer(), label, config=config)
+            print(
+                f"{words:>6} {'adaptive':<9} {result.elapsed_ms:>8.0f} {result.num_samples:>8} "
+                f"{result.stability:>10.3f} {_top5_overlap(result.top_words, reference):>14.1f}  ({result.stop_reason})"
+            )
+
+
+if __name__ == "__main__":
+    main()
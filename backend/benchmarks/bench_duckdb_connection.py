@@ -0,0 +1,73 @@
+"""
+Micro-benchmark of the per-call overhead of DuckDB access.
+
+Compares opening the database on every call (the former `connect()`) with the pooled
+process-wide handle, for a trivial query and for `load_labels` on a small instance.
+
+Usage (from backend/):
+    python -m benchmarks.bench_duckdb_connection --calls 500
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+from app.persistence.duckdb import DuckDbPersistenceService
+from app.persistence.duckdb.connection import close_all, connect
+
+
+def _per_call(db_path: Path, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        with duckdb.connect(str(db_path)) as conn:
+            conn.execute("SELECT 1").fetchone()
+    return (time.perf_counter() - start) / calls
+
+
+def _pooled(db_path: Path, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        with connect(db_path) as conn:
+            conn.execute("SELECT 1").fetchone()
+    return (time.perf_counter() - start) / calls
+
+
+def _load_labels(service: DuckDbPersistenceService, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        service.load_labels(1, split="train")
+    return (time.perf_counter() - start) / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = Path(tmpdir) / "bench.duckdb"
+        service = DuckDbPersistenceService(db_path=db_path)
+        service.save_al_instance(1, {"model_name": "bench", "query_strategy": "bench", "classes": []})
+        user_id = service.upsert_user(username="bench", password=None)
+        refs = [f"R{i:05d}" for i in range(1000)]
+        service.upsert_tickets_df(pd.DataFrame({"Ref": refs}), split="train")
+        service.save_labels(1, user_id, {ref: f"Team{i % 10}" for i, ref in enumerate(refs)}, split="train")
+
+        pooled_labels = _load_labels(service, args.calls)
+        pooled = _pooled(db_path, args.calls)
+        # The pooled handle holds the file lock, release it before opening per call
+        close_all()
+        per_call = _per_call(db_path, args.calls)
+
+    print(f"{'SELECT 1, connect per call':<34} {per_call * 1e6:>10.1f} us")
+    print(f"{'SELECT 1, pooled cursor':<34} {pooled * 1e6:>10.1f} us")
+    print(f"{'load_labels (1k labels), pooled':<34} {pooled_labels * 1e6:>10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark of batch inference in tickets/second.
+
+Compares one `infer_batch` call for all tickets with the per-ticket path of `/infer`
+(one embedding call, one model load and one prediction per ticket) on a synthetic
+instance (random tickets, logistic regression on all-MiniLM-L6-v2 embeddings).
+
+Usage (from backend/):
+    python -m benchmarks.bench_infer_batch --tickets 1000
+    python -m benchmarks.bench_infer_batch --tickets 1000 --fake-embeddings   # no model download
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from skactiveml.classifier import SklearnClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import LabelEncoder, OneHotEncoder
+
+from app.core.inference_cache import InferenceCache
+from app.core.storage import ActiveLearningStorage
+from app.data_models.active_learning_dm import Data
+from app.persistence.local_artifacts import LocalArtifactsStore
+from app.services.inference_svc import InferenceService
+
+TEAMS = [f"Team {i}" for i in range(12)]
+SUBCATEGORIES = [f"Subcategory {i}" for i in range(40)]
+SERVICES = [f"Service {i}" for i in range(15)]
+WORDS = "vpn printer password laptop email outlook network access account reset license install".split()
+
+
+class _FakeSentenceModel:
+    """Random 384-d embeddings: measures everything but the embedding model."""
+
+    def encode(self, sentences, show_progress_bar=False):
+        return np.random.default_rng(len(sentences)).random((len(sentences), 384), dtype=np.float32)
+
+
+def _tickets(count: int, rng: random.Random) -> list[Data]:
+    return [
+        Data(
+            title_anon=" ".join(rng.choices(WORDS, k=4)),
+            description_anon=" ".join(rng.choices(WORDS, k=30)),
+            service_subcategory_name=rng.choice(SUBCATEGORIES),
+            service_name=rng.choice(SERVICES),
+        )
+        for _ in range(count)
+    ]
+
+
+def _prepare(tmpdir: Path, fake_embeddings: bool, cache: InferenceCache = None) -> InferenceService:
+    storage = ActiveLearningStorage()
+    artifacts = LocalArtifactsStore(tmpdir / "models", tmpdir / "encoders", tmpdir / "vectorized_data")
+
+    # Without the inference cache by default: the runs below score the same tickets
+    cache = cache if cache is not None else InferenceCache(max_entries=0)
+    if fake_embeddings:
+        with patch("app.services.inference_svc.SentenceTransformer", return_value=_FakeSentenceModel()):
+            service = InferenceService(storage, local_artifacts_store=artifacts, cache=cache)
+    else:
+        service = InferenceService(storage, local_artifacts_store=artifacts, cache=cache)
+
+    le = LabelEncoder().fit(TEAMS + [np.nan])
+    oh = OneHotEncoder(handle_unknown="ignore").fit(pd.DataFrame({
+        "Service subcategory->Name": SUBCATEGORIES,
+        "Service->Name": [SERVICES[i % len(SERVICES)] for i in range(len(SUBCATEGORIES))],
+    }))
+    classes = list(range(len(TEAMS) + 1))
+    storage.al_instances_dict[1] = {"classes": classes}
+    storage.dataset_dict[1] = {"le": le, "oh": oh}
+
+    n_features = 384 + sum(len(c) for c in oh.categories_)
+    rng = np.random.default_rng(0)
+    X = rng.random((2_000, n_features))
+    y = rng.integers(0, len(TEAMS), size=len(X))
+    artifacts.save_model(1, 0, SklearnClassifier(LogisticRegression(max_iter=200), classes=classes).fit(X, y))
+    storage.model_paths_dict[1] = {0: "models/1/0.joblib"}
+    return service
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=1_000)
+    parser.add_argument("--single-max", type=int, default=500, help="Tickets scored one by one (per-ticket path)")
+    parser.add_argument("--fake-embeddings", action="store_true", help="Skip the SentenceTransformer model")
+    args = parser.parse_args()
+
+    tickets = _tickets(args.tickets, random.Random(0))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        service = _prepare(Path(tmpdir), args.fake_embeddings)
+        service.infer_batch(1, tickets[:8])  # warm-up (model weights, tokenizer)
+
+        single = tickets[:args.single_max]
+        start = time.perf_counter()
+        for ticket in single:
+            service.infer_batch(1, [ticket])
+        single_rate = len(single) / (time.perf_counter() - start)
+
+        results = {}
+        for return_proba in (False, True):
+            start = time.perf_counter()
+            service.infer_batch(1, tickets, return_proba=return_proba)
+            results[return_proba] = len(tickets) / (time.perf_counter() - start)
+
+    print(f"{'path':<28} {'tickets/s':>12} {'speed-up':>9}")
+    print(f"{'per ticket':<28} {single_rate:>12,.1f} {1:>8.1f}x")
+    print(f"{'infer_batch':<28} {results[False]:>12,.1f} {results[False] / single_rate:>8.1f}x")
+    print(f"{'infer_batch + probabilities':<28} {results[True]:>12,.1f} {results[True] / single_rate:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Latency of repeated inference with the inference result cache.
+
+Measures a cold prediction (embedding + model) and repeated predictions of the same
+ticket served from the cache (payload hash + lookup), on the synthetic instance of
+bench_infer_batch.
+
+Usage (from backend/):
+    python -m benchmarks.bench_inference_cache --repeats 10000
+    python -m benchmarks.bench_inference_cache --fake-embeddings   # no model download
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from app.core.inference_cache import InferenceCache
+from benchmarks.bench_infer_batch import _prepare, _tickets
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=10_000)
+    parser.add_argument("--fake-embeddings", action="store_true", help="Skip the SentenceTransformer model")
+    args = parser.parse_args()
+
+    ticket, warmup = _tickets(2, random.Random(0))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        service = _prepare(Path(tmpdir), args.fake_embeddings, cache=InferenceCache(max_entries=10_000, ttl_seconds=0))
+        service.infer_batch(1, [warmup])  # warm-up (model weights, tokenizer)
+
+        start = time.perf_counter()
+        service.infer_batch(1, [ticket])
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            service.infer_batch(1, [ticket])
+        cached = (time.perf_counter() - start) / args.repeats
+
+    print(f"{'cold prediction':<20} {cold * 1e6:>12,.1f} us")
+    print(f"{'cached prediction':<20} {cached * 1e6:>12,.1f} us  ({cold / cached:,.0f}x)")
+    print(service.cache.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark of LIME explanations: the per-call pipeline against LimeTextScorer.
+
+The per-call pipeline is the classifier_fn explain_lime used before: every call loads the
+model, builds a DataFrame of the perturbed texts, runs inference() (embedding of every text,
+OneHotEncoder) and predicts. LimeTextScorer embeds each distinct perturbed text once, reuses
+the one-hot block of the ticket and the model. Both explain the same tickets with the same
+LIME random state, the explanations must be identical.
+
+Embeddings are deterministic per text and cost --embed-ms per sentence (all-MiniLM-L6-v2 on
+one CPU core takes a few ms per ticket sentence), so no model is downloaded.
+
+Usage (from backend/):
+    python -m benchmarks.bench_lime --tickets 5
+    python -m benchmarks.bench_lime --tickets 5 --num-samples 1000 --embed-ms 2
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+import warnings
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from lime.lime_text import LimeTextExplainer
+from sklearn.exceptions import ConvergenceWarning
+
+from app.services.data_preprocessing import inference, inference_categorical
+from app.services.lime_scorer import LimeTextScorer
+from benchmarks.bench_infer_batch import _prepare, _tickets
+
+
+class _TextSentenceModel:
+    """384-d embeddings seeded by the text, with a simulated cost per sentence."""
+
+    def __init__(self, embed_ms: float):
+        self.embed_ms = embed_ms
+        self.sentences = 0
+
+    def encode(self, sentences, show_progress_bar=False):
+        self.sentences += len(sentences)
+        time.sleep(len(sentences) * self.embed_ms / 1000)
+        return np.stack([
+            np.random.default_rng(zlib.crc32(s.encode())).random(384, dtype=np.float32) for s in sentences
+        ])
+
+
+def _per_call_classifier(service, ticket):
+    """classifier_fn of the per-call pipeline (model, DataFrame and inference() on every call)."""
+    def _predict(texts):
+        model = service.load_model(1, 0)
+        tickets = pd.DataFrame({
+            "title_anon": texts,
+            "description_anon": ["" for _ in range(len(texts))],
+            "service_subcategory_name": [ticket.service_subcategory_name for _ in range(len(texts))],
+            "service_name": [ticket.service_name for _ in range(len(texts))],
+        })
+        dataset = service.storage.dataset_dict[1]
+        return model.predict_proba(inference(tickets, dataset["le"], dataset["oh"], service.sentence_model).to_numpy())
+    return _predict
+
+
+def _explain(tickets, classifier_for, num_samples: int) -> tuple[list, float]:
+    explanations = []
+    start = time.perf_counter()
+    for ticket in tickets:
+        text = ticket.title_anon + " " + ticket.description_anon
+        explanation = LimeTextExplainer(random_state=0).explain_instance(
+            text, classifier_for(ticket), num_features=10, num_samples=num_samples, labels=(0,)
+        )
+        explanations.append(explanation.as_list(label=0))
+    return explanations, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=5)
+    parser.add_argument("--num-samples", type=int, default=1_000)
+    parser.add_argument("--embed-ms", type=float, default=1.0, help="Simulated embedding cost per sentence")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=ConvergenceWarning)
+    tickets = _tickets(args.tickets, random.Random(0))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        service = _prepare(Path(tmpdir), fake_embeddings=True)
+        service.sentence_model = _TextSentenceModel(args.embed_ms)
+        dataset = service.storage.dataset_dict[1]
+
+        baseline, baseline_s = _explain(tickets, lambda t: _per_call_classifier(service, t), args.num_samples)
+        baseline_sentences = service.sentence_model.sentences
+
+        service.sentence_model.sentences = 0
+        model = service.load_model(1, 0)
+        cache = {}
+        scorers = []
+
+        def _scorer(ticket):
+            categorical = inference_categorical(ticket.model_dump(), dataset["oh"], service._onehot_lookup(1))
+            scorers.append(LimeTextScorer(model, service.sentence_model, categorical, embedding_cache=cache))
+            return scorers[-1]
+
+        fast, fast_s = _explain(tickets, _scorer, args.num_samples)
+        fast_sentences = service.sentence_model.sentences
+
+    assert fast == baseline, "explanations differ"
+    print(f"{args.tickets} tickets x {args.num_samples} samples, embedding {args.embed_ms} ms/sentence")
+    print(f"{'path':<16} {'ms/ticket':>10} {'sentences embedded':>19} {'speed-up':>9}")
+    print(f"{'per call':<16} {baseline_s / args.tickets * 1000:>10.1f} {baseline_sentences:>19,} {1:>8.1f}x")
+    print(f"{'LimeTextScorer':<16} {fast_s / args.tickets * 1000:>10.1f} {fast_sentences:>19,} {baseline_s / fast_s:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
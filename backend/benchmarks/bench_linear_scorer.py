@@ -0,0 +1,62 @@
+"""
+Benchmark of the NumPy scorer of linear models against the scikit-learn model.
+
+Times predict_proba of a SklearnClassifier(LogisticRegression) and of its LinearScorer for one
+row (single ticket inference) and for the 1000 rows of a LIME explanation, and checks that the
+outputs agree.
+
+Usage (from backend/):
+    python -m benchmarks.bench_linear_scorer
+    python -m benchmarks.bench_linear_scorer --classes 30 --features 500
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+import warnings
+
+import numpy as np
+from skactiveml.classifier import SklearnClassifier
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.linear_model import LogisticRegression
+
+from app.core.linear_scorer import LinearScorer
+
+
+def _median_us(fn, X, repeat: int) -> float:
+    fn(X)
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--classes", type=int, default=12)
+    parser.add_argument("--features", type=int, default=439, help="384 embedding dims + one-hot columns")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=ConvergenceWarning)
+    rng = np.random.default_rng(0)
+    X_train = rng.random((2_000, args.features))
+    y_train = rng.integers(0, args.classes, size=len(X_train))
+    model = SklearnClassifier(LogisticRegression(max_iter=200), classes=list(range(args.classes))).fit(X_train, y_train)
+    scorer = LinearScorer.from_model(model)
+
+    print(f"{'rows':>6} {'sklearn (us)':>14} {'numpy (us)':>12} {'speed-up':>9} {'max |dP|':>10}")
+    for rows in (1, 1_000):
+        X = rng.random((rows, args.features)).astype(np.float32)
+        sklearn_us = _median_us(model.predict_proba, X, args.repeat)
+        numpy_us = _median_us(scorer.predict_proba, X, args.repeat)
+        diff = np.abs(model.predict_proba(X) - scorer.predict_proba(X)).max()
+        assert (model.predict(X) == scorer.predict(X)).all()
+        print(f"{rows:>6} {sklearn_us:>14,.1f} {numpy_us:>12,.1f} {sklearn_us / numpy_us:>8.1f}x {diff:>10.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark of the nearest labeled ticket search.
+
+Compares the previous search (cosine_similarity against a fresh X_train[labeled_mask] copy on
+every call) with LabeledVectorIndex (normalized float32 matrix of the labeled rows, updated in
+place when tickets are labeled), for single-ticket queries and one batch of --queries tickets.
+The build of the index is reported apart (once per loaded instance).
+
+Usage (from backend/):
+    python -m benchmarks.bench_nearest_ticket --rows 50000 --labeled 0.3
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import cosine_similarity
+
+from app.core.labeled_index import LabeledVectorIndex
+
+
+def _brute_force(X_train: pd.DataFrame, y_train: pd.Series, queries: np.ndarray) -> np.ndarray:
+    labeled_mask = y_train.notna()
+    X_labeled = X_train[labeled_mask]
+    similarities = cosine_similarity(queries, X_labeled.values)
+    return X_labeled.index.to_numpy()[np.argmax(similarities, axis=1)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--dims", type=int, default=400, help="Embedding and one-hot columns")
+    parser.add_argument("--labeled", type=float, default=0.3, help="Fraction of labeled rows")
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X_train = pd.DataFrame(rng.standard_normal((args.rows, args.dims)), index=[f"T{i}" for i in range(args.rows)])
+    y_train = pd.Series(rng.integers(0, 10, size=args.rows).astype(float), index=X_train.index)
+    y_train[rng.random(args.rows) >= args.labeled] = np.nan
+    queries = rng.standard_normal((args.queries, args.dims))
+
+    start = time.perf_counter()
+    index = LabeledVectorIndex.from_dataset(X_train, y_train)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = np.concatenate([_brute_force(X_train, y_train, query[None]) for query in queries])
+    brute_single_s = time.perf_counter() - start
+    start = time.perf_counter()
+    brute_batch = _brute_force(X_train, y_train, queries)
+    brute_batch_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single = np.concatenate([index.search(query[None], k=1)[0][:, 0] for query in queries])
+    index_single_s = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = index.search(queries, k=1)[0][:, 0]
+    index_batch_s = time.perf_counter() - start
+
+    # Label 100 more tickets in place
+    unlabeled = list(y_train[y_train.isna()].index[:100])
+    start = time.perf_counter()
+    index.update(unlabeled, X_train.loc[unlabeled].to_numpy(), [0.0] * len(unlabeled))
+    update_s = time.perf_counter() - start
+
+    agreement = float(np.mean((single == expected) & (batch == brute_batch)))
+    print(f"{args.rows} rows x {args.dims} dims, {len(index) - len(unlabeled)} labeled, {args.queries} queries")
+    print(f"index build {build_s * 1000:.1f} ms, labeling 100 tickets {update_s * 1000:.2f} ms, agreement {agreement:.2f}")
+    print(f"{'search':<12} {'ms/query (single)':>18} {'ms/query (batch)':>17}")
+    print(f"{'brute force':<12} {brute_single_s / args.queries * 1000:>18.2f} {brute_batch_s / args.queries * 1000:>17.2f}")
+    print(f"{'index':<12} {index_single_s / args.queries * 1000:>18.2f} {index_batch_s / args.queries * 1000:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
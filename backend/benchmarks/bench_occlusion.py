@@ -0,0 +1,91 @@
+"""
+Benchmark of leave-one-out (occlusion) explanations against LIME.
+
+Explains the predicted class of the same tickets with LIME (LimeTextScorer, --num-samples
+perturbations per ticket) and with occlusion (each distinct word removed, the variants of all
+the tickets embedded in one batch, like XaiService.explain_occlusion), and reports the
+latency, the texts scored and the share of the LIME top 5 words found in the occlusion top 5.
+
+Embeddings are the mean of per-word vectors and cost --embed-ms per sentence (see
+bench_adaptive_lime).
+
+Usage (from backend/):
+    python -m benchmarks.bench_occlusion --tickets 10
+    python -m benchmarks.bench_occlusion --tickets 10 --num-samples 1000 --embed-ms 2
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+from lime.lime_text import LimeTextExplainer
+from sklearn.exceptions import ConvergenceWarning
+
+from app.services.data_preprocessing import inference_categorical
+from app.services.lime_scorer import LimeTextScorer
+from app.services.occlusion import occlusion_top_words, occlusion_variants
+from benchmarks.bench_adaptive_lime import _BagOfWordsSentenceModel, _top5_overlap
+from benchmarks.bench_infer_batch import _prepare, _tickets
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=10)
+    parser.add_argument("--num-samples", type=int, default=1_000)
+    parser.add_argument("--embed-ms", type=float, default=1.0, help="Simulated embedding cost per sentence")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=ConvergenceWarning)
+    tickets = _tickets(args.tickets, random.Random(0))
+    texts = [ticket.title_anon + " " + ticket.description_anon for ticket in tickets]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        service = _prepare(Path(tmpdir), fake_embeddings=True)
+        sentence_model = _BagOfWordsSentenceModel(args.embed_ms)
+        model = service.load_model(1, 0)
+        oh = service.storage.dataset_dict[1]["oh"]
+
+        def _scorers(cache):
+            return [
+                LimeTextScorer(model, sentence_model, inference_categorical(t.model_dump(), oh), embedding_cache=cache)
+                for t in tickets
+            ]
+
+        labels = [int(scorer([text]).argmax()) for scorer, text in zip(_scorers({}), texts)]
+
+        start = time.perf_counter()
+        lime_scorers = _scorers({})
+        lime = [
+            LimeTextExplainer(random_state=0).explain_instance(
+                text, scorer, num_samples=args.num_samples, labels=(label,)
+            ).as_list(label=label)
+            for text, scorer, label in zip(texts, lime_scorers, labels)
+        ]
+        lime_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        occlusion_scorers = _scorers({})
+        variants = [occlusion_variants(text) for text in texts]
+        occlusion_scorers[0].embed([text for v in variants for text in v.texts])
+        occlusion = [
+            occlusion_top_words(v, scorer(v.texts), label)
+            for v, scorer, label in zip(variants, occlusion_scorers, labels)
+        ]
+        occlusion_s = time.perf_counter() - start
+
+    overlap = sum(_top5_overlap(o, l) for o, l in zip(occlusion, lime)) / len(tickets)
+    print(f"{args.tickets} tickets, LIME {args.num_samples} samples, embedding {args.embed_ms} ms/sentence")
+    print(f"{'mode':<10} {'ms/ticket':>10} {'texts scored':>13} {'speed-up':>9}")
+    print(f"{'LIME':<10} {lime_s / args.tickets * 1000:>10.1f} {sum(s.scored for s in lime_scorers):>13,} {1:>8.1f}x")
+    print(
+        f"{'occlusion':<10} {occlusion_s / args.tickets * 1000:>10.1f} {sum(s.scored for s in occlusion_scorers):>13,} "
+        f"{lime_s / occlusion_s:>8.1f}x"
+    )
+    print(f"top-5 overlap with LIME: {overlap:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark of the per-request latency of the inference feature path.
+
+Compares OneHotEncoder.transform (DataFrame, validation, sparse matrix) with the precompiled
+CategoricalLookupEncoder, for the categorical encoding alone and for a full `/infer` request
+(embedding, encoding, prediction) on the synthetic instance of bench_infer_batch.
+
+Usage (from backend/):
+    python -m benchmarks.bench_onehot_lookup --requests 500
+    python -m benchmarks.bench_onehot_lookup --requests 500 --fake-embeddings   # no model download
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_infer_batch import _prepare, _tickets
+from humal_vectorizer import CategoricalLookupEncoder
+
+
+def _latencies(fn, items) -> list[float]:
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+
+def _row(name: str, latencies: list[float], baseline: float) -> str:
+    p50 = statistics.median(latencies)
+    p95 = float(np.percentile(latencies, 95))
+    return f"{name:<32} {p50:>10,.1f} {p95:>10,.1f} {baseline / p50:>8.1f}x"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--fake-embeddings", action="store_true", help="Skip the SentenceTransformer model")
+    args = parser.parse_args()
+
+    tickets = _tickets(args.requests, random.Random(0))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        service = _prepare(Path(tmpdir), args.fake_embeddings)
+        dataset = service.storage.dataset_dict[1]
+        oh = dataset["oh"]
+        lookup = CategoricalLookupEncoder.from_one_hot_encoder(oh)
+
+        # Categorical encoding of one ticket
+        columns = ["Service subcategory->Name", "Service->Name"]
+        encoder = _latencies(
+            lambda t: oh.transform(pd.DataFrame([[t.service_subcategory_name, t.service_name]], columns=columns)).toarray(),
+            tickets,
+        )
+        compiled = _latencies(lambda t: lookup.transform([[t.service_subcategory_name], [t.service_name]]), tickets)
+
+        # Full /infer requests (the inference cache is disabled by _prepare)
+        service.infer(1, tickets[0])  # warm-up (model weights, tokenizer)
+        dataset["oh_lookup"] = False  # OneHotEncoder.transform path
+        requests_encoder = _latencies(lambda t: service.infer(1, t), tickets)
+        dataset["oh_lookup"] = lookup
+        requests_compiled = _latencies(lambda t: service.infer(1, t), tickets)
+
+    encoder_p50 = statistics.median(encoder)
+    request_p50 = statistics.median(requests_encoder)
+    print(f"{'path':<32} {'p50 (us)':>10} {'p95 (us)':>10} {'speed-up':>9}")
+    print(_row("encode: OneHotEncoder", encoder, encoder_p50))
+    print(_row("encode: lookup", compiled, encoder_p50))
+    print(_row("/infer: OneHotEncoder", requests_encoder, request_p50))
+    print(_row("/infer: lookup", requests_compiled, request_p50))
+
+
+if __name__ == "__main__":
+    main()
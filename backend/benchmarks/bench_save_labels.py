@@ -0,0 +1,81 @@
+"""
+Benchmark DuckDbPersistenceService.save_labels for 1k / 100k / 1M labels.
+
+Compares the set-based upsert with the former row-by-row INSERT OR REPLACE loop
+(the loop is only run up to --legacy-max labels, it takes minutes beyond that).
+
+Usage (from backend/):
+    python -m benchmarks.bench_save_labels
+    python -m benchmarks.bench_save_labels --sizes 1000 100000 --legacy-max 100000
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import pandas as pd
+
+from app.persistence.duckdb import DuckDbPersistenceService
+from app.persistence.duckdb.connection import connect
+
+
+def _legacy_save_labels(service: DuckDbPersistenceService, al_instance_id, user_id, labels_dict, split, timestamp=None) -> int:
+    saved = 0
+    with connect(service.db_path) as conn:
+        for ref, label in labels_dict.items():
+            if pd.isna(label):
+                continue
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO labels (al_instance_id, user_id, ref, label, split, labeled_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                [al_instance_id, str(uuid.UUID(str(user_id))), str(ref), str(label), split, timestamp],
+            )
+            saved += 1
+    return saved
+
+
+def _prepare(db_path: Path, size: int):
+    service = DuckDbPersistenceService(db_path=db_path)
+    service.save_al_instance(1, {"model_name": "bench", "query_strategy": "bench", "classes": []})
+    user_id = service.upsert_user(username="bench", password=None)
+    refs = [f"R{i:07d}" for i in range(size)]
+    service.upsert_tickets_df(pd.DataFrame({"Ref": refs}), split="train")
+    labels = {ref: f"Team{i % 20}" for i, ref in enumerate(refs)}
+    return service, user_id, labels
+
+
+def _time(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-max", type=int, default=10_000, help="Largest size the row-by-row loop is run for")
+    args = parser.parse_args()
+
+    print(f"{'labels':>10} {'bulk (s)':>10} {'rows/s':>12} {'legacy (s)':>11} {'speed-up':>9}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            service, user_id, labels = _prepare(Path(tmpdir) / "bench.duckdb", size)
+            bulk = _time(lambda: service.save_labels(1, user_id, labels, split="train"))
+
+            legacy = None
+            if size <= args.legacy_max:
+                with connect(service.db_path) as conn:
+                    conn.execute("DELETE FROM labels WHERE al_instance_id = 1")
+                legacy = _time(lambda: _legacy_save_labels(service, 1, user_id, labels, split="train"))
+
+        legacy_col = f"{legacy:>11.3f} {legacy / bulk:>8.1f}x" if legacy is not None else f"{'-':>11} {'-':>9}"
+        print(f"{size:>10} {bulk:>10.3f} {size / bulk:>12,.0f} {legacy_col}")
+
+
+if __name__ == "__main__":
+    main()
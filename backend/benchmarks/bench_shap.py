@@ -0,0 +1,83 @@
+"""
+Benchmark of SHAP attributions against LIME, for the logistic regression and random forest.
+
+Explains the predicted class of the same tickets with LIME (LimeTextScorer, --num-samples
+perturbations per ticket) and with ShapExplainer on the feature vectors of the tickets (one
+batch), and reports the build of the explainer (once per model version) apart from the
+explanations.
+
+Embeddings are the mean of per-word vectors and cost --embed-ms per sentence (see
+bench_adaptive_lime).
+
+Usage (from backend/):
+    python -m benchmarks.bench_shap --tickets 10
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+from lime.lime_text import LimeTextExplainer
+from skactiveml.classifier import SklearnClassifier
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.exceptions import ConvergenceWarning
+
+from app.services.data_preprocessing import inference_categorical
+from app.services.lime_scorer import LimeTextScorer
+from app.services.shap_explainer import ShapExplainer
+from benchmarks.bench_adaptive_lime import _BagOfWordsSentenceModel
+from benchmarks.bench_infer_batch import _prepare, _tickets
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=10)
+    parser.add_argument("--num-samples", type=int, default=1_000)
+    parser.add_argument("--embed-ms", type=float, default=1.0, help="Simulated embedding cost per sentence")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=ConvergenceWarning)
+    tickets = _tickets(args.tickets, random.Random(0))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        service = _prepare(Path(tmpdir), fake_embeddings=True)
+        service.sentence_model = _BagOfWordsSentenceModel(args.embed_ms)
+        oh = service.storage.dataset_dict[1]["oh"]
+        linear = service.load_model(1, 0)
+        X_train = np.random.default_rng(0).random((2_000, linear.n_features_in_))
+        forest = SklearnClassifier(
+            RandomForestClassifier(n_estimators=100, max_depth=12, random_state=0), classes=list(linear.classes_)
+        ).fit(X_train, linear.predict(X_train))
+
+        print(f"{args.tickets} tickets, LIME {args.num_samples} samples, embedding {args.embed_ms} ms/sentence")
+        print(f"{'model':<20} {'LIME ms/ticket':>15} {'SHAP build ms':>14} {'SHAP ms/ticket':>15}")
+        for name, model in (("logistic regression", linear), ("random forest", forest)):
+            start = time.perf_counter()
+            for ticket in tickets:
+                scorer = LimeTextScorer(model, service.sentence_model, inference_categorical(ticket.model_dump(), oh))
+                text = ticket.title_anon + " " + ticket.description_anon
+                label = int(scorer([text]).argmax())
+                LimeTextExplainer(random_state=0).explain_instance(text, scorer, num_samples=args.num_samples, labels=(label,))
+            lime_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            explainer = ShapExplainer(model, X_train, oh.get_feature_names_out())
+            build_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            X = service._features(1, [ticket.model_dump() for ticket in tickets])
+            explainer.explain(X, model.predict(X))
+            shap_s = time.perf_counter() - start
+
+            print(
+                f"{name:<20} {lime_s / args.tickets * 1000:>15.1f} {build_s * 1000:>14.1f} "
+                f"{shap_s / args.tickets * 1000:>15.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Throughput and p99 latency of concurrent requests for different thread budgets.
+
+Each request runs the CPU work of an inference: a forward pass of a small transformer
+encoder in torch (the shape of all-MiniLM-L6-v2: 384 dims, 64 tokens) and a BLAS matrix
+product. Requests are sent by `concurrency` threads (like the threadpool of the API) for
+every thread budget (torch and BLAS threads per process; 0 = the library default, one
+thread per core).
+
+Usage (from backend/):
+    python -m benchmarks.bench_thread_budget
+    python -m benchmarks.bench_thread_budget --budgets 0,1,2,4 --concurrency 1,4,16 --duration 5
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+from app.core.thread_budget import ThreadBudget
+
+
+def _workload():
+    encoder = torch.nn.TransformerEncoder(
+        torch.nn.TransformerEncoderLayer(d_model=384, nhead=12, dim_feedforward=1536, batch_first=True),
+        num_layers=2,
+    ).eval()
+    tokens = torch.randn(8, 64, 384)
+    features = np.random.default_rng(0).random((256, 439))
+    coef = np.random.default_rng(1).random((439, 64))
+
+    def request() -> None:
+        with torch.no_grad():
+            encoder(tokens)
+        features @ coef
+
+    return request
+
+
+def _run(request, concurrency: int, duration: float) -> tuple[float, float]:
+    latencies = []
+    lock = threading.Lock()
+    stop = time.perf_counter() + duration
+
+    def client():
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            request()
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    elapsed = time.perf_counter() - started
+    p99 = statistics.quantiles(latencies, n=100)[-1] if len(latencies) > 1 else latencies[0]
+    return len(latencies) / elapsed, p99
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budgets", default="0,1,2,4", help="Comma separated torch/BLAS threads (0 = default)")
+    parser.add_argument("--concurrency", default="1,4,8", help="Comma separated concurrent requests")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per cell")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    request = _workload()
+    request()  # warm-up (allocations, kernels)
+
+    print(f"{cores} core(s)")
+    print(f"{'threads':>8} {'concurrency':>12} {'req/s':>9} {'p99 (ms)':>10}")
+    for budget in (int(b) for b in args.budgets.split(",")):
+        threads = budget or cores
+        ThreadBudget(torch_threads=threads, blas_threads=threads).apply()
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            throughput, p99 = _run(request, concurrency, args.duration)
+            print(f"{budget or 'default':>8} {concurrency:>12} {throughput:>9.1f} {p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Load test: latency of lightweight requests while CPU-bound requests run.
+
+Mimics the endpoints of the API in one event loop: heavy requests run a GIL-bound task
+(tokenizing and re-joining perturbed texts, like LIME) either on Starlette's threadpool (as
+sync endpoints do, COMPUTE_WORKERS=0) or through the ComputeExecutor, while light requests
+(a small threadpool call, like GET /config) are sent at a fixed rate and timed.
+
+Usage (from backend/):
+    python -m benchmarks.load_test_compute
+    python -m benchmarks.load_test_compute --heavy 8 --workers 4 --duration 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.compute_executor import ComputeExecutor
+
+WORDS = "vpn printer password outlook access network laptop error login account".split()
+
+
+def _heavy(samples: int) -> int:
+    """GIL-bound work of a LIME explanation: perturb a text and rebuild it samples times."""
+    rng = random.Random(samples)
+    words = [rng.choice(WORDS) for _ in range(60)]
+    total = 0
+    for _ in range(samples):
+        kept = [w for w in words if rng.random() < 0.5]
+        total += len(" ".join(kept).split())
+    return total
+
+
+def _light() -> dict:
+    return {"status": "ok"}
+
+
+async def _run(executor: ComputeExecutor, heavy: int, samples: int, duration: float, rate: float) -> list[float]:
+    stop = time.perf_counter() + duration
+
+    async def heavy_client():
+        while time.perf_counter() < stop:
+            await executor.run(_heavy, samples)
+
+    async def light_client():
+        latencies = []
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            await run_in_threadpool(_light)
+            latencies.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(1 / rate)
+        return latencies
+
+    results = await asyncio.gather(light_client(), *(heavy_client() for _ in range(heavy)))
+    return results[0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--heavy", type=int, default=4, help="Concurrent CPU-bound requests")
+    parser.add_argument("--workers", type=int, default=4, help="COMPUTE_WORKERS of the process pool run")
+    parser.add_argument("--samples", type=int, default=20_000, help="Perturbations per heavy request")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per run")
+    parser.add_argument("--rate", type=float, default=50.0, help="Light requests per second")
+    args = parser.parse_args()
+
+    print(f"{'mode':<24} {'light p50 (ms)':>15} {'light p95 (ms)':>15} {'requests':>9}")
+    for label, workers in (("threadpool", 0), (f"process pool ({args.workers})", args.workers)):
+        executor = ComputeExecutor(max_workers=workers)
+        executor.start()
+        try:
+            latencies = asyncio.run(_run(executor, args.heavy, args.samples, args.duration, args.rate))
+        finally:
+            executor.shutdown()
+        p95 = statistics.quantiles(latencies, n=20)[-1]
+        print(f"{label:<24} {statistics.median(latencies):>15.2f} {p95:>15.2f} {len(latencies):>9}")
+
+
+if __name__ == "__main__":
+    main()
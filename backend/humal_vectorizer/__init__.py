@@ -8,6 +8,7 @@ For external machines loading precompiled vectorizers from MinIO:
     vectorizer.set_one_hot_encoder(encoder)
 """
 
+from .categorical_encoder import CategoricalLookupEncoder
 from .ticket_vectorizer import TicketVectorizer
 
-__all__ = ["TicketVectorizer"]
+__all__ = ["CategoricalLookupEncoder", "TicketVectorizer"]
@@ -0,0 +1,141 @@
+"""
+Lookup-table version of a fitted OneHotEncoder for the per-request inference path.
+
+OneHotEncoder.transform validates a DataFrame, encodes it, builds a sparse matrix that is
+then densified - several milliseconds for two categorical fields. CategoricalLookupEncoder
+maps every (feature, category) straight to its output column and writes the ones into a
+preallocated buffer; the result is identical to `one_hot_encoder.transform(X).toarray()`.
+
+Like TicketVectorizer this module has no dependency on the backend, so it is serialized by
+value together with the vectorizer.
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def is_missing(value: Any) -> bool:
+    """None, NaN or pd.NA (the values OneHotEncoder treats as missing)."""
+    if value is None:
+        return True
+    if isinstance(value, float):
+        return math.isnan(value)
+    return type(value).__name__ == "NAType"
+
+
+def combine_texts(titles: Sequence[Any], descriptions: Sequence[Any]) -> List[str]:
+    """
+    Title+Description sentences as built by the pandas pipeline:
+    `(df['Title_anon'] + df['Description_anon']).astype(str)` gives 'nan' if either text is missing.
+    """
+    return [
+        "nan" if is_missing(title) or is_missing(description) else str(title + description)
+        for title, description in zip(titles, descriptions)
+    ]
+
+
+class CategoricalLookupEncoder:
+    """
+    Precompiled OneHotEncoder: {category: output column} per feature.
+
+    Supports the encoders used by HumAL (no `drop`, no infrequent categories, handle_unknown
+    'ignore' or 'error'); `from_one_hot_encoder` raises ValueError for other configurations.
+    Missing values (None, NaN) map to the missing category seen during fit, None and NaN
+    separately if both were seen; without a missing category they are unknown.
+    """
+
+    def __init__(self, lookups: List[Dict[Any, int]], missing: List[Dict[str, int]], n_features_out: int, handle_unknown: str = "ignore"):
+        self.lookups = lookups
+        self.missing = missing
+        self.n_features_out = n_features_out
+        self.handle_unknown = handle_unknown
+
+    @classmethod
+    def from_one_hot_encoder(cls, one_hot_encoder) -> "CategoricalLookupEncoder":
+        if not hasattr(one_hot_encoder, "categories_"):
+            raise ValueError("OneHotEncoder is not fitted")
+        if getattr(one_hot_encoder, "drop_idx_", None) is not None:
+            raise ValueError("OneHotEncoder with drop is not supported")
+        if getattr(one_hot_encoder, "_infrequent_enabled", False):
+            raise ValueError("OneHotEncoder with infrequent categories is not supported")
+        if one_hot_encoder.handle_unknown not in ("ignore", "error"):
+            raise ValueError(f"handle_unknown='{one_hot_encoder.handle_unknown}' is not supported")
+
+        lookups, missing = [], []
+        offset = 0
+        for categories in one_hot_encoder.categories_:
+            lookup, missing_columns = {}, {}
+            for i, category in enumerate(categories):
+                if category is None:
+                    missing_columns["none"] = offset + i
+                elif is_missing(category):
+                    missing_columns["nan"] = offset + i
+                else:
+                    lookup[category] = offset + i
+            lookups.append(lookup)
+            missing.append(missing_columns)
+            offset += len(categories)
+
+        return cls(lookups, missing, n_features_out=offset, handle_unknown=one_hot_encoder.handle_unknown)
+
+    def column(self, feature: int, value: Any) -> Optional[int]:
+        """Output column of a value of a feature, None if the value is unknown (all zeros)."""
+        if is_missing(value):
+            # pandas turns None into NaN in string columns, so either missing category matches
+            missing = self.missing[feature]
+            if value is None:
+                column = missing.get("none", missing.get("nan"))
+            else:
+                column = missing.get("nan", missing.get("none"))
+        else:
+            column = self.lookups[feature].get(value)
+        if column is None and self.handle_unknown == "error":
+            raise ValueError(f"Found unknown category {value!r} in column {feature} during transform")
+        return column
+
+    def transform_into(self, columns: Sequence[Sequence[Any]], out: np.ndarray) -> np.ndarray:
+        """
+        One-hot encode into `out` (n_samples x n_features_out, e.g. a view of the feature buffer).
+
+        `columns` holds the values of each categorical feature, in the order of the encoder.
+        """
+        if len(columns) != len(self.lookups):
+            raise ValueError(f"Expected {len(self.lookups)} categorical columns, got {len(columns)}")
+
+        out[...] = 0
+        rows, cols = [], []
+        for feature, values in enumerate(columns):
+            for row, value in enumerate(values):
+                column = self.column(feature, value)
+                if column is not None:
+                    rows.append(row)
+                    cols.append(column)
+        out[rows, cols] = 1
+        return out
+
+    def transform(self, columns: Sequence[Sequence[Any]], dtype=np.float64) -> np.ndarray:
+        n_samples = len(columns[0]) if len(columns) else 0
+        return self.transform_into(columns, np.empty((n_samples, self.n_features_out), dtype=dtype))
+
+    def features(self, embeddings: np.ndarray, columns: Sequence[Sequence[Any]]) -> np.ndarray:
+        """
+        Feature matrix [embeddings | one-hot] written into one preallocated buffer.
+
+        The buffer is float32 for float32 embeddings (SentenceTransformer output): 0/1 and the
+        embeddings are exact in float32, so the values equal the float64 pandas pipeline output.
+        """
+        embeddings = np.asarray(embeddings)
+        if embeddings.ndim != 2:
+            embeddings = embeddings.reshape(len(embeddings), -1)
+        dtype = np.float32 if embeddings.dtype == np.float32 else np.float64
+        n_samples, n_embedding = embeddings.shape
+        out = np.empty((n_samples, n_embedding + self.n_features_out), dtype=dtype)
+        out[:, :n_embedding] = embeddings
+        self.transform_into(columns, out[:, n_embedding:])
+        return out
+
+    def feature_names(self, n_embedding: int) -> List[str]:
+        """Column names of the pandas pipeline ('0'..'n_embedding-1' then '0'..'n_one_hot-1')."""
+        return [str(i) for i in range(n_embedding)] + [str(i) for i in range(self.n_features_out)]
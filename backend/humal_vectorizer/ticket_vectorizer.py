@@ -12,6 +12,8 @@ expected by trained models. Preprocessing pipeline is consistent with backend da
 from typing import Union, Dict, Any, List
 import pandas as pd
 
+from .categorical_encoder import CategoricalLookupEncoder, combine_texts
+
 
 class TicketVectorizer:
     """
@@ -48,6 +50,7 @@ class TicketVectorizer:
         self.cat_cols = ["Service subcategory->Name", "Service->Name"]
         self._sentence_model = None
         self._base_ticket = None
+        self._lookup = None
 
     def set_one_hot_encoder(self, one_hot_encoder):
         """
@@ -63,8 +66,30 @@ class TicketVectorizer:
             self (for chaining if desired)
         """
         self.one_hot_encoder = one_hot_encoder
+        self._lookup = None
         return self
 
+    def __getstate__(self):
+        # The lookup is compiled again from the encoder after loading
+        state = self.__dict__.copy()
+        state["_lookup"] = None
+        return state
+
+    def _get_lookup(self):
+        """
+        Lazily compile the one-hot encoder into a CategoricalLookupEncoder.
+
+        Returns None for encoder configurations the lookup does not support
+        (OneHotEncoder.transform is used for those).
+        """
+        if self._lookup is None or self._lookup[0] is not self.one_hot_encoder:
+            try:
+                lookup = CategoricalLookupEncoder.from_one_hot_encoder(self.one_hot_encoder)
+            except ValueError:
+                lookup = None
+            self._lookup = (self.one_hot_encoder, lookup)
+        return self._lookup[1]
+
     def _get_sentence_model(self):
         """
         Lazily load and cache the sentence transformer model.
@@ -232,6 +257,10 @@ class TicketVectorizer:
                 "or load the vectorizer with humal_vectorizer.artifact.load_vectorizer_with_encoder()"
             )
         
+        lookup = self._get_lookup()
+        if lookup is not None:
+            return self._vectorize_with_lookup(df, lookup)
+
         # Make a copy to avoid modifying the input
         df = df.copy()
         
@@ -248,7 +277,8 @@ class TicketVectorizer:
 
         # Generate sentence embeddings
         sentence_model = self._get_sentence_model()
-        sentences = df['Title+Description'].astype(str).tolist()
+        # str() per value: missing texts become 'nan' also with the pandas string dtype
+        sentences = [str(s) for s in df['Title+Description'].tolist()]
         embeddings = sentence_model.encode(sentences, show_progress_bar=False)
         X = pd.DataFrame(embeddings)
 
@@ -261,3 +291,25 @@ class TicketVectorizer:
         X.columns = X.columns.astype(str)
 
         return X
+
+    def _vectorize_with_lookup(self, df: pd.DataFrame, lookup: CategoricalLookupEncoder) -> pd.DataFrame:
+        """
+        Same features as the OneHotEncoder path, with the categories written straight into the
+        feature buffer (no DataFrame copy, validation or sparse matrix per call).
+        """
+        def _field(raw_name, name):
+            return df[raw_name] if raw_name in df.columns else df[name]
+
+        sentences = combine_texts(
+            _field('title_anon', 'Title_anon').tolist(),
+            _field('description_anon', 'Description_anon').tolist(),
+        )
+        embeddings = self._get_sentence_model().encode(sentences, show_progress_bar=False)
+        columns = [
+            _field('service_subcategory_name', 'Service subcategory->Name').tolist(),
+            _field('service_name', 'Service->Name').tolist(),
+        ]
+        features = lookup.features(embeddings, columns)
+
+        n_embedding = features.shape[1] - lookup.n_features_out
+        return pd.DataFrame(features, index=df.index, columns=lookup.feature_names(n_embedding))
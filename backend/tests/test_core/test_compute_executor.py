@@ -0,0 +1,97 @@
+"""Tests for the process pool running the CPU-bound work."""
+from __future__ import annotations
+
+import asyncio
+import os
+
+import pytest
+
+from app.core.compute_executor import ComputeExecutor, progress_reporter
+from app.core.thread_budget import ThreadBudget
+
+_initialized = []
+
+
+def _init(value: str) -> None:
+    _initialized.append(value)
+
+
+def _initialized_values() -> list:
+    return list(_initialized)
+
+
+def _environ(name: str):
+    return os.environ.get(name)
+
+
+def _square(x: int) -> int:
+    return x * x
+
+
+def _count(n: int, progress_queue=None) -> int:
+    report = progress_reporter(progress_queue)
+    for i in range(n):
+        report(i + 1, total=n)
+    return os.getpid()
+
+
+@pytest.fixture(scope="module")
+def executor():
+    executor = ComputeExecutor(
+        max_workers=1,
+        initializer=_init,
+        initargs=("warm",),
+        warmup_timeout=120,
+        thread_budget=ThreadBudget(blas_threads=1, tokenizers_parallelism=False),
+    )
+    executor.start()
+    yield executor
+    executor.shutdown()
+
+
+def test_workers_run_the_initializer_before_the_tasks(executor):
+    assert executor.call(_initialized_values) == ["warm"]
+
+
+def test_workers_apply_their_thread_budget(executor):
+    assert executor.call(_environ, "OMP_NUM_THREADS") == "1"
+    assert executor.call(_environ, "TOKENIZERS_PARALLELISM") == "false"
+
+
+def test_default_budget_divides_the_cores_between_the_workers(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+
+    budget = ComputeExecutor(max_workers=4).thread_budget
+
+    assert (budget.torch_threads, budget.blas_threads, budget.model_n_jobs) == (2, 2, 2)
+
+
+def test_call_returns_the_result(executor):
+    assert executor.call(_square, 7) == 49
+
+
+def test_call_replays_the_progress_in_the_caller(executor):
+    calls = []
+
+    pid = executor.call(_count, 3, progress=lambda done, total: calls.append((done, total)))
+
+    assert pid != os.getpid()
+    assert calls == [(1, 3), (2, 3), (3, 3)]
+
+
+def test_run_awaits_the_worker(executor):
+    assert asyncio.run(executor.run(_square, 3, inline=lambda x: -1)) == 9
+
+
+def test_disabled_executor_runs_inline():
+    executor = ComputeExecutor(max_workers=0)
+
+    assert not executor.enabled
+    assert asyncio.run(executor.run(_square, 3)) == 9
+    assert asyncio.run(executor.run(_square, 3, inline=lambda x: -x)) == -3
+    with pytest.raises(RuntimeError, match="disabled"):
+        executor.submit(_square, 3)
+
+
+def test_progress_reporter_without_queue():
+    assert progress_reporter(None) is None
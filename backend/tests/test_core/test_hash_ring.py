@@ -0,0 +1,50 @@
+"""Tests for the consistent hash ring used to place AL instances on nodes."""
+from __future__ import annotations
+
+from collections import Counter
+
+import pytest
+
+from app.core.hash_ring import HashRing
+
+
+def test_placement_is_deterministic():
+    first = HashRing(["a", "b", "c"])
+    second = HashRing(["c", "a", "b"])
+
+    assert [first.node_for(i) for i in range(200)] == [second.node_for(i) for i in range(200)]
+
+
+def test_instances_are_spread_over_all_nodes():
+    ring = HashRing(["a", "b", "c"], vnodes=128)
+
+    counts = Counter(ring.node_for(i) for i in range(3000))
+
+    assert set(counts) == {"a", "b", "c"}
+    assert min(counts.values()) > 600
+
+
+def test_adding_a_node_only_moves_instances_to_it():
+    old = HashRing(["a", "b", "c"])
+    new = HashRing(["a", "b", "c", "d"])
+
+    moves = old.moves(new, range(2000))
+
+    assert moves and all(target == "d" for _, target in moves.values())
+    assert len(moves) < 2000 / 2
+
+
+def test_removing_a_node_only_moves_its_instances():
+    old = HashRing(["a", "b", "c"])
+    new = HashRing(["a", "b", "c"])
+    new.remove_node("b")
+
+    moves = old.moves(new, range(2000))
+
+    assert all(source == "b" for source, _ in moves.values())
+    assert all(new.node_for(i) != "b" for i in range(2000))
+
+
+def test_empty_ring_raises():
+    with pytest.raises(LookupError):
+        HashRing().node_for(1)
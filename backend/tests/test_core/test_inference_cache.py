@@ -0,0 +1,61 @@
+"""Tests for the inference result cache."""
+from __future__ import annotations
+
+from app.core.inference_cache import InferenceCache, payload_sha
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_payload_sha_ignores_key_order():
+    assert payload_sha({"a": 1, "b": None}) == payload_sha({"b": None, "a": 1})
+    assert payload_sha({"a": 1}) != payload_sha({"a": 2})
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = InferenceCache(max_entries=2, ttl_seconds=0)
+    cache.put((1, 0, 0, "a"), "A")
+    cache.put((1, 0, 0, "b"), "B")
+    cache.get((1, 0, 0, "a"))
+    cache.put((1, 0, 0, "c"), "C")
+
+    assert cache.get((1, 0, 0, "b")) is None
+    assert cache.get((1, 0, 0, "a")) == "A"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl():
+    clock = _Clock()
+    cache = InferenceCache(max_entries=10, ttl_seconds=60, clock=clock)
+    cache.put((1, 0, 0, "a"), "A")
+
+    clock.now = 59
+    assert cache.get((1, 0, 0, "a")) == "A"
+    clock.now = 60
+    assert cache.get((1, 0, 0, "a")) is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["entries"]) == (1, 1, 1, 0)
+
+
+def test_invalidate_instance_or_model():
+    cache = InferenceCache()
+    for key in [(1, 0, 0, "a"), (1, 1, 0, "a"), (2, 0, 0, "a")]:
+        cache.put(key, "X")
+
+    assert cache.invalidate(1, model_id=1) == 1
+    assert cache.invalidate(1) == 1
+    assert cache.stats()["entries"] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = InferenceCache(max_entries=0)
+    cache.put((1, 0, 0, "a"), "A")
+
+    assert cache.get((1, 0, 0, "a")) is None
+    assert cache.stats()["enabled"] is False
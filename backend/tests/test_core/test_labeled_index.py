@@ -0,0 +1,87 @@
+"""Tests for the nearest-neighbour index of the labeled train rows."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import cosine_similarity
+
+from app.core.labeled_index import LabeledVectorIndex
+from app.core.storage import ActiveLearningStorage
+
+
+def _dataset(rows: int = 200, dims: int = 16):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.standard_normal((rows, dims)), index=[f"T{i:03d}" for i in range(rows)])
+    y = pd.Series(rng.integers(0, 4, size=rows).astype(float), index=X.index)
+    y[rng.random(rows) < 0.5] = np.nan  # unlabeled tickets
+    return X, y
+
+
+def _expected(X, y, queries, k):
+    """Brute force over X_train[labeled_mask], as the nearest-ticket search did before the index."""
+    X_labeled = X[y.notna()]
+    similarities = cosine_similarity(queries, X_labeled.values)
+    top = np.argsort(-similarities, axis=1, kind="stable")[:, :k]
+    return X_labeled.index.to_numpy()[top], np.take_along_axis(similarities, top, axis=1)
+
+
+def test_search_matches_cosine_similarity():
+    X, y = _dataset()
+    queries = np.random.default_rng(1).standard_normal((20, X.shape[1]))
+
+    refs, labels, similarities = LabeledVectorIndex.from_dataset(X, y).search(queries, k=5)
+    expected_refs, expected_similarities = _expected(X, y, queries, k=5)
+
+    np.testing.assert_array_equal(refs, expected_refs)
+    np.testing.assert_array_equal(labels, y.loc[refs.ravel()].to_numpy().reshape(refs.shape))
+    np.testing.assert_allclose(similarities, expected_similarities, atol=1e-5)
+
+
+def test_updates_match_a_rebuilt_index():
+    X, y = _dataset()
+    index = LabeledVectorIndex(X.shape[1])
+    index.update(list(X.index), X.to_numpy(), y.to_numpy())
+
+    # Label new tickets, relabel some and remove others (missing label)
+    labeled, unlabeled = list(y[y.notna()].index), list(y[y.isna()].index)
+    refs = unlabeled[:30] + labeled[:10] + labeled[10:20]
+    new_labels = [1.0] * 30 + [3.0] * 10 + [np.nan] * 10
+    y.loc[refs] = new_labels
+    index.update(refs, X.loc[refs].to_numpy(), new_labels)
+
+    queries = np.random.default_rng(2).standard_normal((10, X.shape[1]))
+    refs, labels, similarities = index.search(queries, k=len(X))
+    expected_refs, expected_similarities = _expected(X, y, queries, k=len(X))
+
+    assert len(index) == int(y.notna().sum())
+    np.testing.assert_array_equal(np.sort(refs, axis=1), np.sort(expected_refs, axis=1))
+    np.testing.assert_array_equal(labels[:, 0], y.loc[refs[:, 0]].to_numpy())
+    np.testing.assert_allclose(similarities, expected_similarities, atol=1e-5)
+
+
+def test_k_is_capped_and_zero_vectors_have_no_similarity():
+    X = pd.DataFrame([[0.0, 0.0], [1.0, 0.0]], index=["T1", "T2"])
+    index = LabeledVectorIndex.from_dataset(X, pd.Series([0.0, 1.0], index=X.index))
+
+    refs, labels, similarities = index.search([[1.0, 1.0]], k=10)
+
+    assert refs.tolist() == [["T2", "T1"]]
+    assert labels.tolist() == [[1, 0]]
+    np.testing.assert_allclose(similarities, [[np.sqrt(0.5), 0.0]], atol=1e-6)
+
+
+def test_storage_index_follows_labels_of_loaded_dataset():
+    X, y = _dataset(rows=20)
+    storage = ActiveLearningStorage()
+    storage.dataset_dict[1] = {"X_train": X, "y_train": y}
+    unlabeled = y[y.isna()].index[0]
+
+    index = storage.labeled_index(1)
+    assert storage.labeled_index(1) is index
+    assert unlabeled not in index
+
+    y.loc[[unlabeled]] = [2.0]
+    storage.update_labeled_index(1, [unlabeled])
+
+    refs, labels, _ = index.search(X.loc[[unlabeled]].to_numpy(), k=1)
+    assert (refs[0, 0], labels[0, 0]) == (unlabeled, 2)
@@ -0,0 +1,59 @@
+"""Tests for the NumPy scorer of linear models."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from skactiveml.classifier import SklearnClassifier
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from app.core.linear_scorer import LinearScorer
+
+
+def _fit(n_classes: int, classes: list[int]) -> SklearnClassifier:
+    rng = np.random.default_rng(n_classes)
+    X = rng.random((200, 12))
+    y = rng.integers(0, n_classes, size=len(X)).astype(float)
+    y[:40] = np.nan  # unlabeled tickets
+    return SklearnClassifier(LogisticRegression(random_state=0), classes=classes).fit(X, y)
+
+
+@pytest.mark.parametrize("n_classes, classes", [
+    (2, [0, 1]),
+    (4, [0, 1, 2, 3]),
+    (3, [0, 1, 2, 3, 4]),  # classes without labeled tickets
+])
+def test_matches_sklearn(n_classes, classes):
+    model = _fit(n_classes, classes)
+    scorer = LinearScorer.from_model(model)
+    X = np.random.default_rng(1).random((50, 12)).astype(np.float32)
+
+    np.testing.assert_allclose(scorer.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(scorer.predict(X), model.predict(X))
+    np.testing.assert_array_equal(scorer.classes_, model.classes_)
+
+
+def test_save_and_load(tmp_path):
+    model = _fit(4, [0, 1, 2, 3])
+    LinearScorer.from_model(model).save(tmp_path / "0.linear.npz")
+
+    scorer = LinearScorer.load(tmp_path / "0.linear.npz")
+
+    X = np.random.default_rng(2).random((5, 12))
+    np.testing.assert_allclose(scorer.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+
+
+def test_wrong_number_of_features_raises():
+    scorer = LinearScorer.from_model(_fit(2, [0, 1]))
+
+    with pytest.raises(ValueError, match="expects 12 features"):
+        scorer.predict(np.zeros((1, 11)))
+
+
+@pytest.mark.parametrize("model", [
+    SklearnClassifier(RandomForestClassifier(n_estimators=2), classes=[0, 1]).fit(np.eye(4), [0, 1, 0, 1]),
+    SklearnClassifier(LogisticRegression(), classes=[0, 1]),
+    LogisticRegression().fit(np.eye(4), [0, 1, 0, 1]),
+])
+def test_other_models_have_no_scorer(model):
+    assert LinearScorer.from_model(model) is None
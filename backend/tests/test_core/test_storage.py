@@ -0,0 +1,119 @@
+"""Tests for the lazily loaded AL instance dictionaries."""
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from app.core.storage import ActiveLearningStorage, LazyInstanceDict
+
+
+def test_registered_instance_is_loaded_on_access():
+    loaded = []
+    lazy = LazyInstanceDict(loader=lambda i: loaded.append(i) or {"id": i})
+    lazy.register(1)
+
+    assert 1 in lazy
+    assert loaded == []
+    assert lazy[1] == {"id": 1}
+    assert loaded == [1]
+
+
+def test_unknown_instance_raises_key_error():
+    lazy = LazyInstanceDict(loader=lambda i: i)
+
+    with pytest.raises(KeyError):
+        lazy[5]
+    assert lazy.get(5) is None
+
+
+def test_concurrent_access_loads_once():
+    calls = []
+
+    def _loader(instance_id):
+        calls.append(instance_id)
+        time.sleep(0.05)
+        return instance_id
+
+    lazy = LazyInstanceDict(loader=_loader)
+    lazy.register(1)
+    threads = [threading.Thread(target=lambda: lazy[1]) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls == [1]
+
+
+def test_prefetch_loads_instances_in_parallel():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def _loader(instance_id):
+        # Only passes if the three instances are loaded at the same time
+        barrier.wait()
+        return instance_id
+
+    lazy = LazyInstanceDict(loader=_loader)
+    for i in (1, 2, 3):
+        lazy.register(i)
+
+    lazy.prefetch([1, 2, 3], max_workers=3)
+
+    assert all(lazy.is_loaded(i) for i in (1, 2, 3))
+
+
+def test_budget_never_evicts_values_without_loader():
+    lazy = LazyInstanceDict(memory_budget_bytes=1, sizeof=lambda value: 10)
+    lazy[1] = "a"
+    lazy[2] = "b"
+
+    assert lazy.is_loaded(1) and lazy.is_loaded(2)
+
+
+def test_pop_does_not_load():
+    lazy = LazyInstanceDict(loader=lambda i: pytest.fail("must not load"))
+    lazy.register(1)
+
+    assert lazy.pop(1, None) is None
+    assert 1 not in lazy
+    assert lazy.pop(1, "default") == "default"
+
+
+def test_storage_reserves_distinct_ids():
+    storage = ActiveLearningStorage()
+    storage.al_instances_dict[1] = {}
+
+    first = storage.reserve_instance_id()
+    second = storage.reserve_instance_id()
+    storage.release_instance_id(first)
+
+    assert (first, second) == (2, 3)
+    assert storage.get_next_instance_id() == 4
+
+
+def test_storage_reserves_requested_id_once():
+    storage = ActiveLearningStorage()
+    storage.al_instances_dict[1] = {}
+
+    assert storage.reserve_instance_id(7) == 7
+    with pytest.raises(ValueError):
+        storage.reserve_instance_id(7)
+    with pytest.raises(ValueError):
+        storage.reserve_instance_id(1)
+
+
+def test_model_versions_change_per_model_and_instance():
+    storage = ActiveLearningStorage()
+    initial = storage.model_version(1, 0)
+
+    storage.bump_model_version(1, 0)
+    retrained = storage.model_version(1, 0)
+    assert retrained != initial
+    assert storage.model_version(1, 1) == storage.model_version(2, 0) == initial
+
+    storage.bump_model_version(1)
+    assert storage.model_version(1, 0) not in (initial, retrained)
+    assert storage.model_version(1, 1) != initial
+    assert storage.model_version(2, 0) == initial
@@ -0,0 +1,66 @@
+"""Tests for the thread budget of the torch, BLAS and tokenizer thread pools."""
+from __future__ import annotations
+
+import os
+
+import pytest
+import torch
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.svm import SVC
+from threadpoolctl import threadpool_info, threadpool_limits
+
+from app.core import thread_budget
+from app.core.thread_budget import ThreadBudget, current_thread_budget
+
+
+@pytest.fixture
+def restore_threads(monkeypatch):
+    """Give back the thread pools, environment and applied budget of the test process."""
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "TOKENIZERS_PARALLELISM"):
+        monkeypatch.setenv(name, os.environ.get(name, ""))
+    monkeypatch.setattr(thread_budget, "_applied", None)
+    torch_threads = torch.get_num_threads()
+    with threadpool_limits(limits=None):
+        yield
+    torch.set_num_threads(torch_threads)
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("THREAD_BUDGET_TORCH", "2")
+    monkeypatch.setenv("THREAD_BUDGET_TORCH_INTEROP", "0")
+    monkeypatch.setenv("THREAD_BUDGET_BLAS", "1")
+    monkeypatch.setenv("THREAD_BUDGET_TOKENIZERS_PARALLELISM", "false")
+    monkeypatch.delenv("THREAD_BUDGET_MODEL_N_JOBS", raising=False)
+
+    assert ThreadBudget.from_env() == ThreadBudget(torch_threads=2, blas_threads=1, tokenizers_parallelism=False)
+
+
+def test_for_workers_keeps_the_configured_threads(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 16)
+
+    budget = ThreadBudget(torch_threads=1).for_workers(4)
+
+    assert budget == ThreadBudget(
+        torch_threads=1, torch_interop_threads=1, blas_threads=4, tokenizers_parallelism=False, model_n_jobs=4
+    )
+    assert ThreadBudget().for_workers(32).blas_threads == 1
+
+
+def test_apply_limits_torch_blas_and_tokenizers(restore_threads):
+    budget = ThreadBudget(torch_threads=1, blas_threads=1, tokenizers_parallelism=False)
+
+    budget.apply()
+
+    assert torch.get_num_threads() == 1
+    assert os.environ["OMP_NUM_THREADS"] == "1"
+    assert os.environ["TOKENIZERS_PARALLELISM"] == "false"
+    assert all(pool["num_threads"] == 1 for pool in threadpool_info())
+    assert current_thread_budget() is budget
+
+
+def test_apply_to_model_sets_n_jobs_where_supported():
+    budget = ThreadBudget(model_n_jobs=3)
+
+    assert budget.apply_to_model(RandomForestClassifier()).n_jobs == 3
+    assert budget.apply_to_model(SVC()).get_params() == SVC().get_params()  # no n_jobs
+    assert ThreadBudget().apply_to_model(RandomForestClassifier(n_jobs=2)).n_jobs == 2
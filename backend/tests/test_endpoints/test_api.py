@@ -32,6 +32,16 @@ init_data = {
 }
 response = requests.post("http://127.0.0.1:8000/activelearning/new", json=init_data)
 instance_id = response.json()["instance_id"]
+job_id = response.json()["job_id"]
+
+# The instance is created in the background, wait for the job to finish
+import time
+while True:
+    job = requests.get(f"http://127.0.0.1:8000/activelearning/jobs/{job_id}").json()
+    print(f"Instance creation job: {job['status']} ({job['phase']} {job['done']}/{job['total']})")
+    if job["status"] in ("completed", "failed"):
+        break
+    time.sleep(1)
 print("\n")
 print(f"Created new AL instance with ID: {instance_id}")
 print("\n")
@@ -191,6 +201,20 @@ response = requests.post(
 print(f"LIME explanation (ticket_data): {response.json()}")
 print("\n")
 
+# Test streamed LIME explanations of several tickets (one JSON line per ticket, as they complete)
+print("Testing streamed LIME explanations with query_idx...")
+response = requests.post(
+    f"http://127.0.0.1:8000/xai/{instance_id}/explain_lime/stream",
+    params={
+        "query_idx": query_indices[:3],
+        "model_id": model_id
+    },
+    stream=True
+)
+for line in response.iter_lines():
+    print(f"LIME explanation (stream): {line.decode()}")
+print("\n")
+
 #---------------------------------
 # XAI part - Nearest Ticket
 #---------------------------------
@@ -2,11 +2,13 @@
 from __future__ import annotations
 
 import tempfile
+import threading
 from pathlib import Path
 
+import duckdb
 import pytest
 
-from app.persistence.duckdb.connection import connect, resolve_db_path, DEFAULT_DB_PATH
+from app.persistence.duckdb.connection import close_all, connect, resolve_db_path, DEFAULT_DB_PATH
 
 
 class TestResolveDbPath:
@@ -66,3 +68,75 @@ class TestConnect:
         # Cleanup
         if DEFAULT_DB_PATH.exists():
             DEFAULT_DB_PATH.unlink()
+
+
+class TestConnectionPool:
+    def test_thread_reuses_its_cursor(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = Path(tmpdir) / "test.duckdb"
+
+            with connect(db_path) as first:
+                pass
+            with connect(db_path) as second:
+                pass
+
+            assert first is second
+
+    def test_threads_get_their_own_cursor(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = Path(tmpdir) / "test.duckdb"
+            with connect(db_path) as conn:
+                conn.execute("CREATE TABLE t (x INTEGER)")
+                main_cursor = conn
+
+            seen = []
+
+            def _insert(value):
+                with connect(db_path) as conn:
+                    conn.execute("INSERT INTO t VALUES (?)", [value])
+                    seen.append(conn)
+
+            threads = [threading.Thread(target=_insert, args=(i,)) for i in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            with connect(db_path) as conn:
+                assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 4
+            assert main_cursor not in seen
+
+    def test_nested_connect_does_not_clobber_outer_result(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = Path(tmpdir) / "test.duckdb"
+
+            with connect(db_path) as outer:
+                outer.execute("SELECT * FROM range(3)")
+                with connect(db_path) as inner:
+                    assert inner is not outer
+                    inner.execute("SELECT 42").fetchone()
+                assert len(outer.fetchall()) == 3
+
+    def test_reopens_database_when_file_was_removed(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = Path(tmpdir) / "test.duckdb"
+            with connect(db_path) as conn:
+                conn.execute("CREATE TABLE t (x INTEGER)")
+
+            db_path.unlink()
+
+            with connect(db_path) as conn:
+                tables = conn.execute("SELECT table_name FROM information_schema.tables").fetchall()
+            assert tables == []
+
+    def test_close_all_releases_database(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = Path(tmpdir) / "test.duckdb"
+            with connect(db_path) as conn:
+                conn.execute("CREATE TABLE t (x INTEGER)")
+
+            close_all()
+
+            # The file lock is released, another connection can open it
+            other = duckdb.connect(str(db_path), config={"access_mode": "READ_ONLY"})
+            other.close()
@@ -41,6 +41,8 @@ class TestInitDatabase:
             assert "labels" in table_names
             assert "metrics" in table_names
             assert "model_paths" in table_names
+            assert "predictions" in table_names
+            assert "explanation_cache" in table_names
 
     def test_al_instances_schema(self, temp_db):
         init_database(temp_db)
@@ -166,6 +168,45 @@ class TestInitDatabase:
             assert "path_to_model" in col_dict
             assert "created_at" in col_dict
 
+    def test_xai_jobs_of_older_databases_get_the_content_sha(self, temp_db):
+        init_database(temp_db)
+        with connect(temp_db) as conn:
+            # xai_jobs as created before the column (with its indexes)
+            conn.execute("DROP INDEX idx_xai_jobs_instance")
+            conn.execute("DROP INDEX idx_xai_jobs_ticket")
+            conn.execute("DROP TABLE xai_jobs")
+            conn.execute(
+                """
+                CREATE TABLE xai_jobs (
+                    job_id UUID PRIMARY KEY,
+                    al_instance_id INTEGER NOT NULL,
+                    model_id INTEGER NOT NULL,
+                    ticket_ref_or_sha VARCHAR NOT NULL,
+                    status VARCHAR NOT NULL,
+                    request_ticket_location VARCHAR NOT NULL,
+                    request_model_location VARCHAR NOT NULL,
+                    request_preprocessor_location VARCHAR,
+                    request_one_hot_encoder_location VARCHAR,
+                    request_raw_tickets_locations VARCHAR[] NOT NULL,
+                    result_location VARCHAR,
+                    result_file_names VARCHAR[],
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    finished_at TIMESTAMP,
+                    FOREIGN KEY (al_instance_id) REFERENCES al_instances(al_instance_id)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX idx_xai_jobs_instance ON xai_jobs(al_instance_id)")
+            conn.execute("CREATE INDEX idx_xai_jobs_ticket ON xai_jobs(al_instance_id, model_id, ticket_ref_or_sha)")
+
+        init_database(temp_db)
+
+        with connect(temp_db) as conn:
+            columns = conn.execute(
+                "SELECT column_name FROM information_schema.columns WHERE table_name = 'xai_jobs'"
+            ).fetchall()
+        assert ("ticket_content_sha",) in columns
+
     def test_idempotent_initialization(self, temp_db):
         """Test that running init_database multiple times doesn't error."""
         init_database(temp_db)
@@ -3,12 +3,16 @@ from __future__ import annotations
 
 import tempfile
 import uuid
+from datetime import datetime
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pytest
 
+from app.config.config import TEAM_NAME
 from app.persistence.duckdb import DuckDbPersistenceService
+from app.persistence.duckdb.connection import connect
 
 
 @pytest.fixture
@@ -106,6 +110,27 @@ class TestALInstances:
         instances = service.get_all_instances()
         assert instances == {}
 
+    def test_next_instance_id_skips_existing_ids(self, service):
+        service.save_al_instance(3, {"model_name": "M1", "query_strategy": "qs1", "classes": []})
+
+        assert service.next_al_instance_id() == 4
+        assert service.next_al_instance_id() == 5
+
+
+class TestInstanceChanges:
+    def test_record_and_load_changes(self, service):
+        first = service.record_instance_change(1, "created", origin="worker-a")
+        service.record_instance_change(1, "labels", origin="worker-b")
+
+        changes = service.load_instance_changes(first)
+
+        assert [(c["al_instance_id"], c["kind"], c["origin"]) for c in changes] == [(1, "labels", "worker-b")]
+        assert service.get_latest_instance_change_id() == changes[0]["change_id"]
+
+    def test_unknown_change_kind_rejected(self, service):
+        with pytest.raises(Exception):
+            service.record_instance_change(1, "renamed")
+
 
 class TestTickets:
     def test_upsert_tickets_df_basic(self, service):
@@ -185,6 +210,30 @@ class TestTickets:
         with pytest.raises(ValueError, match="must be 'train' or 'test'"):
             service.load_tickets("invalid")
 
+    def test_load_tickets_page_by_keyset(self, service):
+        service.upsert_tickets_df(pd.DataFrame({"Ref": [f"T{i}" for i in range(5)], "Title_anon": ["t"] * 5}), split="train")
+        service.upsert_tickets_df(pd.DataFrame({"Ref": ["X1"]}), split="test")
+
+        first = service.load_tickets_page(split="train", limit=2)
+        second = service.load_tickets_page(split="train", after_ref="T1", limit=2)
+        last = service.load_tickets_page(split="train", after_ref="T3", limit=2)
+
+        assert first.column("ref").to_pylist() == ["T0", "T1"]
+        assert second.column("ref").to_pylist() == ["T2", "T3"]
+        assert last.column("ref").to_pylist() == ["T4"]
+        assert service.load_tickets_page(split="train", after_ref="T4").num_rows == 0
+        assert "title_anon" in first.schema.names
+
+    def test_load_tickets_page_filters_dataset_timestamp(self, service):
+        service.upsert_tickets_df(pd.DataFrame({"Ref": ["OLD"]}), split="train", dataset_timestamp=datetime(2024, 1, 1))
+        service.upsert_tickets_df(pd.DataFrame({"Ref": ["NEW"]}), split="test", dataset_timestamp=datetime(2024, 6, 1))
+
+        refs = lambda **kw: service.load_tickets_page(**kw).column("ref").to_pylist()
+
+        assert refs() == ["NEW", "OLD"]
+        assert refs(start=datetime(2024, 3, 1)) == ["NEW"]
+        assert refs(end=datetime(2024, 6, 1)) == ["OLD"]
+
 
 class TestLabels:
     def test_save_and_load_labels(self, service):
@@ -235,6 +284,32 @@ class TestLabels:
         count = service.save_labels(1, user_id, {}, split="train")
         assert count == 0
 
+    def test_save_labels_keeps_labeled_at_semantics(self, service):
+        service.save_al_instance(1, {"model_name": "M1", "query_strategy": "qs1", "classes": []})
+        user_id = service.upsert_user(username="labeler6", password="pwd")
+        service.upsert_tickets_df(pd.DataFrame({"Ref": ["T001", "T002"]}), split="train")
+
+        service.save_labels(1, user_id, {"T001": "ClassA"}, split="train", timestamp=datetime(2026, 3, 1, 8, 30))
+        service.save_labels(1, user_id, {"T002": "ClassB"}, split="train")
+
+        with connect(service.db_path) as conn:
+            rows = dict(conn.execute("SELECT ref, labeled_at FROM labels ORDER BY ref").fetchall())
+        assert rows == {"T001": datetime(2026, 3, 1, 8, 30), "T002": None}
+
+    def test_save_labels_bulk_upsert(self, service):
+        service.save_al_instance(1, {"model_name": "M1", "query_strategy": "qs1", "classes": []})
+        user_id = service.upsert_user(username="labeler7", password="pwd")
+        refs = [f"T{i:04d}" for i in range(1000)]
+        service.upsert_tickets_df(pd.DataFrame({"Ref": refs}), split="train")
+
+        service.save_labels(1, user_id, {ref: "Old" for ref in refs}, split="train")
+        count = service.save_labels(1, user_id, {ref: ("New" if i % 2 else np.nan) for i, ref in enumerate(refs)}, split="train")
+
+        loaded = service.load_labels(1, user_id, split="train").sort_index()
+        assert count == 500
+        assert len(loaded) == 1000
+        assert (loaded.iloc[1::2] == "New").all() and (loaded.iloc[::2] == "Old").all()
+
     def test_load_labels_nonexistent(self, service):
         user_id = service.upsert_user(username="labeler4", password="pwd")
         loaded = service.load_labels(999, user_id, split="train")
@@ -306,6 +381,45 @@ class TestLabels:
         assert resolved.loc[resolved["ref"] == "T002", "label"].iloc[0] == "ClassB"
 
 
+    def test_load_labels_includes_ground_truth_and_resolves_conflicts(self, service):
+        service.save_al_instance(1, {"model_name": "M1", "query_strategy": "qs1", "classes": []})
+        users = [service.upsert_user(username=f"voter{i}", password="pwd") for i in range(3)]
+        service.upsert_tickets_df(pd.DataFrame({"Ref": ["T001", "T002", "T003"]}), split="train")
+
+        service.save_labels(0, users[0], {"T003": "Truth"}, split="train")
+        service.save_labels(1, users[0], {"T001": "ClassA", "T002": "ClassA"}, split="train", timestamp=datetime(2026, 1, 1, 9))
+        service.save_labels(1, users[1], {"T001": "ClassB", "T002": "ClassB"}, split="train", timestamp=datetime(2026, 1, 1, 10))
+        service.save_labels(1, users[2], {"T001": "ClassA"}, split="train", timestamp=datetime(2026, 1, 1, 8))
+
+        loaded = service.load_labels(1, split="train")
+
+        assert loaded.name == TEAM_NAME
+        assert loaded.index.name == "ref"
+        assert loaded.to_dict() == {"T001": "ClassA", "T002": "ClassB", "T003": "Truth"}
+
+    def test_load_labels_matches_python_resolution(self, service):
+        rng = np.random.default_rng(7)
+        refs = [f"T{i:03d}" for i in range(50)]
+        service.save_al_instance(1, {"model_name": "M1", "query_strategy": "qs1", "classes": []})
+        service.upsert_tickets_df(pd.DataFrame({"Ref": refs}), split="train")
+        users = [service.upsert_user(username=f"annotator{i}", password="pwd") for i in range(5)]
+
+        # Distinct timestamps per user so ties are always broken deterministically
+        for minute, user in enumerate(users):
+            labels = {ref: rng.choice(["ClassA", "ClassB", "ClassC"]) for ref in refs if rng.random() < 0.7}
+            service.save_labels(1, user, labels, split="train", timestamp=datetime(2026, 1, 1, 12, minute))
+
+        with connect(service.db_path) as conn:
+            raw = conn.execute("SELECT ref, label, labeled_at FROM labels WHERE al_instance_id = 1").df()
+        expected = service._keep_majority_or_latest_label(raw).set_index("ref")["label"]
+
+        loaded = service.load_labels(1, split="train")
+
+        pd.testing.assert_series_equal(
+            loaded.sort_index(), expected.sort_index(), check_names=False, check_dtype=False
+        )
+
+
 class TestModelPaths:
     def test_save_and_load_model_paths(self, service):
         # Create AL instance first (required by foreign key)
@@ -439,6 +553,126 @@ class TestMetrics:
         assert all_metrics[2]["f1_score"] == 0.85
 
 
+class TestPredictions:
+    def test_save_and_load_predictions(self, service):
+        predictions = pd.DataFrame({
+            "ref": ["T2", "T1"],
+            "prediction": ["B", "A"],
+            "probabilities": [{"A": 0.3, "B": 0.7}, {"A": 0.9, "B": 0.1}],
+        })
+
+        assert service.save_predictions(1, 0, predictions) == 2
+
+        loaded = service.load_predictions(1, 0)
+        assert loaded["ref"].tolist() == ["T1", "T2"]
+        assert loaded["prediction"].tolist() == ["A", "B"]
+        assert loaded["probabilities"].tolist() == [{"A": 0.9, "B": 0.1}, {"A": 0.3, "B": 0.7}]
+        assert service.load_predictions(1, 1).empty
+
+    def test_save_predictions_replaces_existing(self, service):
+        service.save_predictions(1, 0, pd.DataFrame({"ref": ["T1", "T2"], "prediction": ["A", "A"], "probabilities": [None, None]}))
+        service.save_predictions(1, 0, pd.DataFrame({"ref": ["T1"], "prediction": ["B"], "probabilities": [None]}))
+
+        loaded = service.load_predictions(1, 0, refs=["T1"])
+
+        assert loaded["prediction"].tolist() == ["B"]
+        assert len(service.load_predictions(1, 0)) == 2
+
+    def test_load_predictions_page_by_keyset(self, service):
+        refs = ["T1", "T2", "T3"]
+        service.save_predictions(1, 0, pd.DataFrame({"ref": refs, "prediction": ["A"] * 3, "probabilities": [None] * 3}))
+
+        assert service.load_predictions(1, 0, limit=2)["ref"].tolist() == ["T1", "T2"]
+        assert service.load_predictions(1, 0, after_ref="T2", limit=2)["ref"].tolist() == ["T3"]
+
+
+class TestExplanationCache:
+    def test_save_and_load_explanations(self, service):
+        service.save_explanations(1, 0, "v1", "lime", "p", {"a": {"top_words": [["vpn", 0.4]], "error": None}, "b": {"top_words": []}})
+
+        assert service.load_explanations(1, 0, "v1", "lime", "p", ["a", "c"]) == {"a": {"top_words": [["vpn", 0.4]], "error": None}}
+        assert service.load_explanations(1, 0, "v2", "lime", "p", ["a"]) == {}
+        assert service.load_explanations(1, 0, "v1", "lime", "other", ["a"]) == {}
+        assert service.load_explanations(1, 0, "v1", "lime", "p", []) == {}
+
+    def test_least_recently_accessed_are_evicted(self, service):
+        service.save_explanations(1, 0, "v1", "lime", "p", {"a": {}, "b": {}})
+        service.load_explanations(1, 0, "v1", "lime", "p", ["a"])
+
+        evicted = service.save_explanations(1, 0, "v1", "lime", "p", {"c": {}}, max_entries=2)
+
+        assert evicted == 1
+        assert set(service.load_explanations(1, 0, "v1", "lime", "p", ["a", "b", "c"])) == {"a", "c"}
+
+    def test_expired_explanations_are_not_served(self, service):
+        service.save_explanations(1, 0, "v1", "lime", "p", {"a": {}})
+
+        assert service.load_explanations(1, 0, "v1", "lime", "p", ["a"], max_age_seconds=3600) == {"a": {}}
+        assert service.load_explanations(1, 0, "v1", "lime", "p", ["a"], max_age_seconds=0) == {}
+        assert service.save_explanations(1, 0, "v1", "lime", "p", {}, max_age_seconds=0) == 1
+
+    def test_delete_explanations(self, service):
+        for model_id in (0, 1):
+            service.save_explanations(1, model_id, "v1", "lime", "p", {"a": {}})
+        service.save_explanations(2, 0, "v1", "lime", "p", {"a": {}})
+
+        service.delete_explanations(1, 0)
+        assert service.load_explanations(1, 0, "v1", "lime", "p", ["a"]) == {}
+        assert service.load_explanations(1, 1, "v1", "lime", "p", ["a"]) == {"a": {}}
+
+        service.delete_explanations(1)
+        assert service.load_explanations(1, 1, "v1", "lime", "p", ["a"]) == {}
+        assert service.load_explanations(2, 0, "v1", "lime", "p", ["a"]) == {"a": {}}
+
+
+class TestXaiJobs:
+    def _create_job(self, service, ticket_sha="sha", model_id=0, status="queued", content_sha=None):
+        job_id = uuid.uuid4()
+        service.create_xai_job(
+            al_instance_id=1, job_id=job_id, model_id=model_id, ticket_ref_or_sha=ticket_sha,
+            request_ticket_location=f"xai_tickets/1/{ticket_sha}.json", request_model_location="models/1/0",
+            request_preprocessor_location=None, request_one_hot_encoder_location=None,
+            request_raw_tickets_locations=[], status=status, ticket_content_sha=content_sha,
+        )
+        return str(job_id)
+
+    def test_find_xai_job_of_ticket_and_model(self, service):
+        service.save_al_instance(1, {"model_name": "M1", "query_strategy": "qs1", "classes": []})
+        service.save_model_path(1, 0, "models/1/0.joblib")
+        job_id = self._create_job(service)
+        self._create_job(service, ticket_sha="other")
+        self._create_job(service, model_id=1)
+
+        assert service.find_xai_job(1, 0, "sha") == {"job_id": job_id, "status": "queued"}
+        service.update_xai_job_status(uuid.UUID(job_id), "completed", result_location="r", result_file_names=[])
+        assert service.find_xai_job(1, 0, "sha") == {"job_id": job_id, "status": "completed"}
+        assert service.find_xai_job(1, 0, "missing") is None
+
+    def test_find_xai_job_of_ticket_ref_matches_the_content(self, service):
+        service.save_al_instance(1, {"model_name": "M1", "query_strategy": "qs1", "classes": []})
+        job_id = self._create_job(service, ticket_sha="T1", content_sha="c1")
+
+        assert service.find_xai_job(1, 0, "T1", ticket_content_sha="c1") == {"job_id": job_id, "status": "queued"}
+        assert service.find_xai_job(1, 0, "T1", ticket_content_sha="c2") is None
+        assert service.find_xai_job(1, 0, "T1") is not None
+
+    def test_failed_jobs_and_jobs_of_older_models_are_not_found(self, service):
+        service.save_al_instance(1, {"model_name": "M1", "query_strategy": "qs1", "classes": []})
+        self._create_job(service, status="failed")
+        assert service.find_xai_job(1, 0, "sha") is None
+
+        self._create_job(service, status="completed")
+        service.save_model_path(1, 0, "models/1/0.joblib")  # model retrained after the job
+        assert service.find_xai_job(1, 0, "sha") is None
+
+    def test_pending_jobs_expire(self, service):
+        service.save_al_instance(1, {"model_name": "M1", "query_strategy": "qs1", "classes": []})
+        self._create_job(service, status="processing")
+
+        assert service.find_xai_job(1, 0, "sha", pending_max_age_seconds=3600) is not None
+        assert service.find_xai_job(1, 0, "sha", pending_max_age_seconds=0) is None
+
+
 class TestDeletion:
     def test_delete_instance_cascade(self, service):
         # Create user first
@@ -454,6 +688,8 @@ class TestDeletion:
         service.save_metrics(1, f1_score=0.85)
         service.save_model_path(1, 1, "path/to/model.joblib")
         service.save_labels(1, user_id, {"T001": "ClassA"}, split="train")
+        service.save_predictions(1, 0, pd.DataFrame({"ref": ["T001"], "prediction": ["ClassA"], "probabilities": [None]}))
+        service.save_explanations(1, 0, "v1", "lime", "p", {"sha": {"top_words": []}})
         
         # Delete instance
         service.delete_instance(1)
@@ -463,6 +699,8 @@ class TestDeletion:
         assert service.load_metrics(1)["f1_score"] is None
         assert service.load_model_paths(1) == {}
         assert len(service.load_labels(1, user_id, split="train")) == 0
+        assert service.load_predictions(1, 0).empty
+        assert service.load_explanations(1, 0, "v1", "lime", "p", ["sha"]) == {}
 
     def test_delete_nonexistent_instance(self, service):
         # Should not raise an error
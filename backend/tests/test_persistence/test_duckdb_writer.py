@@ -0,0 +1,103 @@
+"""Tests for the single-writer DuckDB process and its client."""
+from __future__ import annotations
+
+import tempfile
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from app.persistence.duckdb.writer import DuckDbWriterClient, DuckDbWriterServer, parse_address
+
+
+@pytest.fixture
+def writer():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        server = DuckDbWriterServer(str(Path(tmpdir) / "writer.sock"), authkey="test", db_path=Path(tmpdir) / "test.duckdb")
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.close()
+
+
+@pytest.fixture
+def client(writer):
+    client = DuckDbWriterClient(address=writer.address, authkey="test")
+    yield client
+    client.close()
+
+
+def test_parse_address():
+    assert parse_address("127.0.0.1:6200") == ("127.0.0.1", 6200)
+    assert parse_address(":6200") == ("127.0.0.1", 6200)
+    assert parse_address("/tmp/humal-writer.sock") == "/tmp/humal-writer.sock"
+
+
+def test_client_forwards_calls(client):
+    client.save_al_instance(1, {"model_name": "M1", "query_strategy": "qs1", "classes": []})
+    user_id = client.upsert_user(username="labeler", password="pwd")
+    client.upsert_tickets_df(pd.DataFrame({"Ref": ["T001", "T002"]}), split="train")
+
+    assert client.save_labels(1, user_id, {"T001": "ClassA", "T002": "ClassB"}, split="train") == 2
+    assert client.load_labels(1, user_id, split="train").to_dict() == {"T001": "ClassA", "T002": "ClassB"}
+    assert str(client.get_user_by_username(username="labeler")["user_id"]) == str(user_id)
+
+
+def test_ticket_pages_are_read_through_client(client):
+    client.upsert_tickets_df(pd.DataFrame({"Ref": ["T001", "T002", "T003"]}), split="train")
+
+    first = client.load_tickets_page(split="train", limit=2)
+    second = client.load_tickets_page(split="train", after_ref=first.column("ref")[-1].as_py(), limit=2)
+
+    assert first.column("ref").to_pylist() + second.column("ref").to_pylist() == ["T001", "T002", "T003"]
+
+
+def test_service_errors_are_raised_in_client(client):
+    with pytest.raises(ValueError, match="split must be"):
+        client.load_tickets(split="validation")
+
+
+def test_unknown_methods_are_rejected(client):
+    with pytest.raises(AttributeError):
+        client.drop_database()
+
+
+def test_concurrent_writers_are_serialized(client):
+    errors = []
+
+    def _create_users(offset):
+        try:
+            for i in range(10):
+                client.upsert_user(username=f"user{offset}-{i}", password=None)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=_create_users, args=(t,)) for t in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert all(client.get_user_by_username(username=f"user{t}-9") is not None for t in range(4))
+
+
+def test_writer_and_client_require_an_authkey(monkeypatch, tmp_path):
+    monkeypatch.delenv("DUCKDB_WRITER_AUTHKEY", raising=False)
+
+    with pytest.raises(ValueError, match="DUCKDB_WRITER_AUTHKEY"):
+        DuckDbWriterServer(str(tmp_path / "writer.sock"), db_path=tmp_path / "test.duckdb")
+    with pytest.raises(ValueError, match="DUCKDB_WRITER_AUTHKEY"):
+        DuckDbWriterClient(address="127.0.0.1:6200")
+
+
+def test_client_reads_authkey_from_environment(monkeypatch, writer):
+    monkeypatch.setenv("DUCKDB_WRITER_AUTHKEY", "test")
+    client = DuckDbWriterClient(address=writer.address)
+    try:
+        assert client.get_user_by_username(username="nobody") is None
+    finally:
+        client.close()
@@ -6,6 +6,7 @@ from pathlib import Path
 
 import numpy as np
 import pytest
+from skactiveml.classifier import SklearnClassifier
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import LabelEncoder, OneHotEncoder
@@ -94,6 +95,21 @@ class TestEncoders:
         assert (encoder_dir / "label_encoder.joblib").exists()
         assert (encoder_dir / "onehot_encoder.joblib").exists()
 
+    def test_save_encoders_compiles_onehot_lookup(self, temp_storage):
+        onehot_enc = OneHotEncoder(handle_unknown="ignore").fit([["a"], ["b"]])
+
+        temp_storage.save_encoders(3, LabelEncoder().fit(["A"]), onehot_enc)
+
+        lookup = temp_storage.load_onehot_lookup(3)
+        assert lookup.transform([["b", "c"]]).tolist() == [[0.0, 1.0], [0.0, 0.0]]
+
+    def test_load_onehot_lookup_missing_returns_none(self, temp_storage):
+        # Unfitted encoders (and instances saved before the lookup existed) have no lookup
+        temp_storage.save_encoders(4, LabelEncoder(), OneHotEncoder())
+
+        assert temp_storage.load_onehot_lookup(4) is None
+        assert temp_storage.load_onehot_lookup(999) is None
+
     def test_load_encoders_nonexistent_raises(self, temp_storage):
         with pytest.raises(FileNotFoundError):
             temp_storage.load_encoders(999)
@@ -117,6 +133,24 @@ class TestEncoders:
         loaded_label, _ = temp_storage.load_encoders(1)
         assert list(loaded_label.classes_) == ["X", "Y", "Z"]
 
+    def test_encoder_fingerprint_changes_when_the_encoders_are_saved(self, temp_storage):
+        assert temp_storage.encoder_fingerprint(1) is None
+
+        temp_storage.save_encoders(1, LabelEncoder().fit(["A", "B"]), OneHotEncoder().fit([["a"], ["b"]]))
+        first = temp_storage.encoder_fingerprint(1)
+        temp_storage.save_encoders(1, LabelEncoder().fit(["A", "B"]), OneHotEncoder().fit([["a"], ["b"], ["c"]]))
+
+        assert first is not None and temp_storage.encoder_fingerprint(1) not in (None, first)
+
+    def test_vectorized_dataset_fingerprint_changes_when_the_features_are_saved(self, temp_storage):
+        assert temp_storage.vectorized_dataset_fingerprint(1, "train") is None
+
+        temp_storage.save_vectorized_dataset(1, np.ones((1, 2)), split="train")
+        first = temp_storage.vectorized_dataset_fingerprint(1, "train")
+        temp_storage.save_vectorized_dataset(1, np.ones((2, 2)), split="train")
+
+        assert first is not None and temp_storage.vectorized_dataset_fingerprint(1, "train") not in (None, first)
+
 
 class TestModels:
     def test_save_and_load_svc_model(self, temp_storage):
@@ -169,6 +203,41 @@ class TestModels:
         predictions = loaded.predict(X)
         assert len(predictions) == 4
 
+    def test_save_linear_model_exports_scorer(self, temp_storage):
+        model = SklearnClassifier(LogisticRegression(), classes=[0, 1]).fit([[0.0], [1.0], [2.0], [3.0]], [0, 0, 1, 1])
+
+        temp_storage.save_model(1, 0, model)
+
+        scorer = temp_storage.load_linear_scorer(1, 0)
+        np.testing.assert_allclose(scorer.predict_proba([[1.5]]), model.predict_proba([[1.5]]))
+
+    def test_replacing_linear_model_removes_scorer(self, temp_storage):
+        X, y = [[0.0], [1.0], [2.0], [3.0]], [0, 0, 1, 1]
+        temp_storage.save_model(1, 0, SklearnClassifier(LogisticRegression(), classes=[0, 1]).fit(X, y))
+
+        temp_storage.save_model(1, 0, SklearnClassifier(RandomForestClassifier(n_estimators=2), classes=[0, 1]).fit(X, y))
+
+        assert temp_storage.load_linear_scorer(1, 0) is None
+
+    def test_scorer_export_can_be_disabled(self, tmp_path):
+        store = LocalArtifactsStore(models_dir=tmp_path / "models", encoders_dir=tmp_path / "encoders", export_linear_scorers=False)
+        model = SklearnClassifier(LogisticRegression(), classes=[0, 1]).fit([[0.0], [1.0], [2.0], [3.0]], [0, 0, 1, 1])
+
+        store.save_model(1, 0, model)
+
+        assert store.load_linear_scorer(1, 0) is None
+
+    def test_model_fingerprint_changes_when_the_model_is_saved(self, temp_storage):
+        model = SklearnClassifier(LogisticRegression(), classes=[0, 1]).fit([[0.0], [1.0], [2.0], [3.0]], [0, 0, 1, 1])
+        assert temp_storage.model_fingerprint(1, 0) is None
+
+        temp_storage.save_model(1, 0, model)
+        first = temp_storage.model_fingerprint(1, 0)
+        temp_storage.save_model(1, 0, model)
+
+        assert first is not None and temp_storage.model_fingerprint(1, 0) not in (None, first)
+        assert temp_storage.model_fingerprint(1, 0) == temp_storage.model_fingerprint(1, 0)
+
     def test_save_model_creates_directory(self, temp_storage):
         model = SVC()
         model.fit([[1, 2], [3, 4]], [0, 1])
@@ -8,7 +8,9 @@ import pandas as pd
 import pytest
 
 from app.core.minio_client import MinioClient
+from app.data_models.active_learning_dm import Data
 from app.persistence.minio_storage import DATA_BUCKET, MODELS_BUCKET, MinioService
+from humal_vectorizer import TicketVectorizer
 
 
 @pytest.fixture
@@ -100,3 +102,53 @@ def test_lowercase_minio_prefix_env_is_supported(
 
     assert bucket_name == MODELS_BUCKET
     assert object_name == "dev/encoders/5/label_encoder.joblib"
+
+
+def test_ticket_vectorizer_is_content_addressed(monkeypatch: pytest.MonkeyPatch, mock_client: MagicMock):
+    monkeypatch.setenv("MINIO_PREFIX", "test")
+    mock_client.list_objects.return_value = {"matches": []}
+
+    svc = MinioService(mock_client)
+    first = svc.save_ticket_vectorizer(al_instance_id=7, vectorizer=TicketVectorizer(), encoder_fingerprint="enc-1")
+    same = svc.save_ticket_vectorizer(al_instance_id=7, vectorizer=TicketVectorizer(), encoder_fingerprint="enc-1")
+    other_encoder = svc.save_ticket_vectorizer(al_instance_id=7, vectorizer=TicketVectorizer(), encoder_fingerprint="enc-2")
+
+    assert first["object"] == same["object"] == f"test/vectorizers/7/ticket_vectorizer-{first['sha256']}.pkl"
+    assert other_encoder["object"] != first["object"]
+    bucket_name, object_name, _ = mock_client.upload_file_bytes.call_args_list[0].args
+    assert (bucket_name, object_name) == (MODELS_BUCKET, first["object"])
+
+
+def test_stored_ticket_vectorizer_is_not_uploaded_again(mock_client: MagicMock):
+    svc = MinioService(mock_client)
+    mock_client.list_objects.return_value = {"matches": []}
+    saved = svc.save_ticket_vectorizer(al_instance_id=7, vectorizer=TicketVectorizer())
+
+    mock_client.list_objects.return_value = {"matches": [saved["object"]]}
+    again = svc.save_ticket_vectorizer(al_instance_id=7, vectorizer=TicketVectorizer())
+
+    assert (saved["uploaded"], again["uploaded"]) == (True, False)
+    assert again["object"] == saved["object"]
+    mock_client.upload_file_bytes.assert_called_once()
+
+
+def test_ticket_vectorizer_is_loaded_from_its_saved_object(mock_client: MagicMock):
+    svc = MinioService(mock_client)
+    mock_client.list_objects.return_value = {"matches": []}
+    saved = svc.save_ticket_vectorizer(al_instance_id=7, vectorizer=TicketVectorizer())
+    mock_client.download_object.return_value = mock_client.upload_file_bytes.call_args.args[2]
+
+    loaded = svc.load_ticket_vectorizer(al_instance_id=7, object_name=saved["object"])
+
+    assert isinstance(loaded, TicketVectorizer)
+    mock_client.download_object.assert_called_once_with(MODELS_BUCKET, saved["object"])
+
+
+def test_xai_ticket_content_sha_ignores_the_ticket_ref(mock_client: MagicMock):
+    svc = MinioService(mock_client)
+    ticket = Data(title_anon="VPN down", description_anon="", service_subcategory_name="Sub", service_name="Srv")
+    edited = ticket.model_copy(update={"title_anon": "VPN down since monday"})
+
+    assert svc.xai_ticket_sha(ticket, "T1") == svc.xai_ticket_sha(edited, "T1") == "T1"
+    assert svc.xai_ticket_content_sha(ticket) == svc.xai_ticket_sha(ticket)
+    assert svc.xai_ticket_content_sha(edited) != svc.xai_ticket_content_sha(ticket)
@@ -9,8 +9,11 @@ import pytest
 from skactiveml.utils import MISSING_LABEL
 
 from app.core.storage import ActiveLearningStorage
+from app.data_models.active_learning_dm import LabelRequest, NewInstance
+from app.persistence.minio_storage import MinioService
 from app.persistence.duckdb import DuckDbPersistenceService
 from app.persistence.local_artifacts import LocalArtifactsStore
+from app.services import active_learning_svc, data_preprocessing
 from app.services.active_learning_svc import ActiveLearningService
 
 
@@ -48,7 +51,7 @@ class TestLoadFromPersistence:
         assert len(storage.dataset_dict) == 0
 
     def test_load_from_persistence_missing_encoders(self, storage, mock_duckdb_service, mock_local_artifacts):
-        """Test that it skips instances when encoders are missing."""
+        """Test that it skips instances whose encoders or vectorized datasets are missing on disk."""
         instances = {
             1: {
                 "model_name": "svm",
@@ -59,7 +62,7 @@ class TestLoadFromPersistence:
             }
         }
         mock_duckdb_service.get_all_instances.return_value = instances
-        mock_local_artifacts.load_encoders.side_effect = FileNotFoundError("Encoders not found")
+        mock_local_artifacts.has_instance_artifacts.return_value = False
         
         service = ActiveLearningService(
             storage,
@@ -72,7 +75,7 @@ class TestLoadFromPersistence:
         assert 1 not in storage.dataset_dict
 
     def test_load_from_persistence_missing_vectorized_dataset(self, storage, mock_duckdb_service, mock_local_artifacts):
-        """Test that it skips instances when vectorized datasets are missing."""
+        """Test that an instance whose datasets fail to load on first access is dropped."""
         instances = {
             1: {
                 "model_name": "svm",
@@ -95,8 +98,12 @@ class TestLoadFromPersistence:
             local_artifacts_store=mock_local_artifacts,
         )
         
+        with pytest.raises(KeyError):
+            storage.dataset_dict[1]
+
         # Should skip instance 1
         assert 1 not in storage.al_instances_dict
+        assert 1 not in storage.dataset_dict
 
     def test_load_from_persistence_invalid_model(self, storage, mock_duckdb_service, mock_local_artifacts):
         """Test that it skips instances with invalid model names."""
@@ -361,3 +368,423 @@ class TestLoadFromPersistence:
         assert 2 in storage.al_instances_dict
         assert 1 in storage.dataset_dict
         assert 2 in storage.dataset_dict
+
+
+class TestLazyLoading:
+    @pytest.fixture
+    def instances(self):
+        return {
+            i: {
+                "model_name": "svm",
+                "qs": "uncertainty sampling entropy",
+                "classes": ["A", "B"],
+                "train_data_path": "data/train.csv",
+                "test_data_path": "data/test.csv",
+            }
+            for i in (1, 2)
+        }
+
+    @pytest.fixture
+    def persisted(self, mock_duckdb_service, mock_local_artifacts, instances):
+        mock_duckdb_service.get_all_instances.return_value = instances
+        mock_duckdb_service.load_labels.return_value = pd.Series([], dtype=object)
+        mock_duckdb_service.load_all_metrics.return_value = []
+        mock_duckdb_service.load_model_paths.return_value = {}
+        le_mock = MagicMock()
+        le_mock.transform = MagicMock(side_effect=lambda x: np.zeros(len(x), dtype=int))
+        mock_local_artifacts.load_encoders.return_value = (le_mock, MagicMock())
+        mock_local_artifacts.load_vectorized_dataset.side_effect = lambda instance_id, split: pd.DataFrame(
+            np.zeros((1000, 8)), index=[f"T{i}" for i in range(1000)]
+        )
+
+    def test_construction_only_reads_metadata(self, storage, mock_duckdb_service, mock_local_artifacts, persisted):
+        ActiveLearningService(storage, duckdb_service=mock_duckdb_service, local_artifacts_store=mock_local_artifacts)
+
+        assert set(storage.al_instances_dict) == {1, 2}
+        assert 1 in storage.dataset_dict and 2 in storage.dataset_dict
+        mock_local_artifacts.load_encoders.assert_not_called()
+        mock_local_artifacts.load_vectorized_dataset.assert_not_called()
+        mock_duckdb_service.load_labels.assert_not_called()
+        mock_duckdb_service.load_all_metrics.assert_not_called()
+
+    def test_instance_is_loaded_once_on_first_access(self, storage, mock_duckdb_service, mock_local_artifacts, persisted):
+        ActiveLearningService(storage, duckdb_service=mock_duckdb_service, local_artifacts_store=mock_local_artifacts)
+
+        first = storage.dataset_dict[1]
+        second = storage.dataset_dict[1]
+
+        assert first is second
+        assert mock_local_artifacts.load_encoders.call_count == 1
+        assert storage.dataset_dict.is_loaded(1)
+        assert not storage.dataset_dict.is_loaded(2)
+
+    def test_memory_budget_evicts_least_recently_used_dataset(self, storage, mock_duckdb_service, mock_local_artifacts, persisted):
+        ActiveLearningService(storage, duckdb_service=mock_duckdb_service, local_artifacts_store=mock_local_artifacts)
+        storage.dataset_dict[1]
+        one_instance = storage.dataset_dict.memory_usage()
+        storage.dataset_dict.memory_budget_bytes = one_instance * 1.5
+
+        storage.dataset_dict[2]
+
+        assert not storage.dataset_dict.is_loaded(1)
+        assert storage.dataset_dict.is_loaded(2)
+        # Evicted instances stay known and are reloaded on access
+        assert 1 in storage.dataset_dict
+        assert len(storage.dataset_dict[1]["X_train"]) == 1000
+        assert mock_local_artifacts.load_encoders.call_count == 3
+
+    def test_warm_instances_are_preloaded(self, monkeypatch, storage, mock_duckdb_service, mock_local_artifacts, persisted):
+        monkeypatch.setenv("AL_WARM_INSTANCES", "2")
+        service = ActiveLearningService(storage, duckdb_service=mock_duckdb_service, local_artifacts_store=mock_local_artifacts)
+
+        assert service._warm_instance_ids() == [2]
+        storage.dataset_dict.prefetch(service._warm_instance_ids())
+        assert storage.dataset_dict.is_loaded(2)
+        assert not storage.dataset_dict.is_loaded(1)
+
+
+class TestCreateInstance:
+    @pytest.fixture
+    def fake_dispatch_team(self, monkeypatch):
+        le_mock = MagicMock()
+        le_mock.transform.return_value = np.array([2])
+        oh_mock = MagicMock()
+
+        def _dispatch_team(duckdb_service, test_set=False, le=None, oh=None, classes=None, progress_callback=None, sentence_model=None):
+            if progress_callback is not None:
+                progress_callback("embedding", 2, 2, split="test" if test_set else "train")
+            X = pd.DataFrame([[0.1, 0.2], [0.3, 0.4]], index=["T001", "T002"], columns=["0", "1"])
+            y = pd.Series([0, 2], index=["T001", "T002"])
+            return X, y, le or le_mock, oh or oh_mock
+
+        fake = MagicMock(side_effect=_dispatch_team)
+        monkeypatch.setattr(data_preprocessing, "dispatch_team", fake)
+        return fake
+
+    @pytest.fixture
+    def service(self, storage, mock_duckdb_service, mock_local_artifacts):
+        mock_duckdb_service.get_all_instances.return_value = {}
+        mock_duckdb_service.get_ticket_counts_by_split.return_value = {"train": 2, "test": 2}
+        mock_duckdb_service.get_latest_dataset_timestamp.return_value = None
+        return ActiveLearningService(
+            storage,
+            duckdb_service=mock_duckdb_service,
+            local_artifacts_store=mock_local_artifacts,
+            minio_service=MagicMock(spec=MinioService),
+        )
+
+    def _new_instance(self, class_list=("A", "B")):
+        return NewInstance(
+            model_name="svm",
+            qs_strategy="random sampling",
+            class_list=list(class_list),
+            train_data_path="train.csv",
+            test_data_path="test.csv",
+        )
+
+    def test_create_instance_preprocesses_every_time_by_default(self, service, fake_dispatch_team):
+        service.create_instance(self._new_instance())
+        service.create_instance(self._new_instance())
+
+        assert fake_dispatch_team.call_count == 4
+        assert len(service._preprocessing_cache) == 0
+
+    def test_create_instance_reuses_preprocessing_for_same_data(self, service, storage, fake_dispatch_team, monkeypatch):
+        monkeypatch.setattr(active_learning_svc, "PREPROCESSING_CACHE_SIZE", 2)
+        first = service.create_instance(self._new_instance())
+        second = service.create_instance(self._new_instance())
+
+        assert fake_dispatch_team.call_count == 2  # train + test, only for the first instance
+        assert first != second
+        assert storage.dataset_dict[first]["y_train"] is not storage.dataset_dict[second]["y_train"]
+        assert pd.isna(storage.dataset_dict[first]["y_train"].loc["T002"])
+
+    def test_create_instance_preprocesses_again_for_other_classes(self, service, fake_dispatch_team):
+        service.create_instance(self._new_instance())
+        service.create_instance(self._new_instance(class_list=("A", "B", "C")))
+
+        assert fake_dispatch_team.call_count == 4
+
+    def test_create_instance_reports_progress_and_persists_artifacts(self, service, storage, fake_dispatch_team):
+        phases = []
+        instance_id = service.create_instance(
+            self._new_instance(),
+            instance_id=7,
+            progress_callback=lambda phase, done=0, total=0, split=None: phases.append(phase),
+        )
+
+        assert instance_id == 7
+        assert phases == ["embedding", "embedding", "persisting"]
+        assert 7 in storage.al_instances_dict
+        service.local_artifacts_store.save_encoders.assert_called_once()
+        assert service.local_artifacts_store.save_vectorized_dataset.call_count == 2
+        assert service.minio_service.save_vectorized_tickets.call_count == 2
+        assert service.minio_service.save_labels.call_count == 2
+
+    def test_create_instance_not_visible_when_persisting_fails(self, service, storage, fake_dispatch_team):
+        service.minio_service.save_label_encoder.side_effect = RuntimeError("upload failed")
+
+        with pytest.raises(RuntimeError, match="upload failed"):
+            service.create_instance(self._new_instance(), instance_id=3)
+
+        assert 3 not in storage.al_instances_dict
+
+    def test_discard_instance_removes_partial_state(self, service, storage, fake_dispatch_team):
+        service.minio_service.save_label_encoder.side_effect = RuntimeError("upload failed")
+        with pytest.raises(RuntimeError):
+            service.create_instance(self._new_instance(), instance_id=3)
+        service.local_artifacts_store.delete_instance_artifacts.side_effect = OSError("busy")
+
+        service.discard_instance(3)
+
+        assert 3 not in storage.dataset_dict
+        service.local_artifacts_store.delete_instance_artifacts.assert_called_once_with(3)
+        service.duckdb_service.delete_instance.assert_called_once_with(3)
+        service.minio_service.delete_instance_objects.assert_called_once_with(3)
+
+    @pytest.mark.parametrize("cache_size", [0, 2])
+    def test_preprocessing_locks_are_dropped_when_nothing_is_cached(self, service, fake_dispatch_team, monkeypatch, cache_size):
+        monkeypatch.setattr(active_learning_svc, "PREPROCESSING_CACHE_SIZE", cache_size)
+        service.create_instance(self._new_instance())
+        assert len(service._preprocessing_key_locks) == len(service._preprocessing_cache) == min(cache_size, 1)
+
+        fake_dispatch_team.side_effect = RuntimeError("embedding failed")
+        with pytest.raises(RuntimeError):
+            service.create_instance(self._new_instance(class_list=("A", "B", "C")))
+        assert len(service._preprocessing_key_locks) == len(service._preprocessing_cache)
+
+
+class TestSharedState:
+    """Two services in one process stand in for two API workers sharing DuckDB and the artifacts."""
+
+    @pytest.fixture
+    def fake_dispatch_team(self, monkeypatch):
+        from sklearn.preprocessing import LabelEncoder
+
+        label_encoder = LabelEncoder().fit(np.array(["A", "B", np.nan], dtype=object))
+
+        def _dispatch_team(duckdb_service, test_set=False, le=None, oh=None, classes=None, progress_callback=None, sentence_model=None):
+            X = pd.DataFrame([[0.1, 0.2], [0.3, 0.4]], index=["T001", "T002"], columns=["0", "1"])
+            y = pd.Series([0, 2], index=["T001", "T002"])
+            return X, y, le or label_encoder, oh
+
+        monkeypatch.setattr(data_preprocessing, "dispatch_team", _dispatch_team)
+
+    @pytest.fixture
+    def workers(self, tmp_path, fake_dispatch_team):
+        duckdb_service = DuckDbPersistenceService(db_path=tmp_path / "test.duckdb")
+        duckdb_service.upsert_tickets_df(pd.DataFrame({"Ref": ["T001", "T002"]}), split="train")
+        artifacts = LocalArtifactsStore(
+            models_dir=tmp_path / "models",
+            encoders_dir=tmp_path / "encoders",
+            vectorized_data_dir=tmp_path / "vectorized",
+        )
+
+        def _worker():
+            return ActiveLearningService(
+                ActiveLearningStorage(),
+                duckdb_service=duckdb_service,
+                local_artifacts_store=artifacts,
+                minio_service=MagicMock(spec=MinioService),
+                shared_state=True,
+            )
+
+        return _worker(), _worker()
+
+    def _new_instance(self):
+        return NewInstance(
+            model_name="svm",
+            qs_strategy="random sampling",
+            class_list=["A", "B"],
+            train_data_path="train.csv",
+            test_data_path="test.csv",
+        )
+
+    def test_instance_ids_are_unique_across_workers(self, workers):
+        first, second = workers
+
+        ids = {first.storage.reserve_instance_id(), second.storage.reserve_instance_id(), first.storage.get_next_instance_id()}
+
+        assert len(ids) == 3
+
+    def test_created_instance_is_picked_up_with_memory_mapped_features(self, workers):
+        first, second = workers
+        instance_id = first.create_instance(self._new_instance())
+
+        assert instance_id not in second.storage.al_instances_dict
+        assert second.sync_instance_changes() == 1
+        assert first.sync_instance_changes() == 0  # own changes are skipped
+
+        X_train = second.storage.dataset_dict[instance_id]["X_train"]
+        assert not X_train.to_numpy().flags.writeable  # read-only memory map
+        assert list(X_train.index) == ["T001", "T002"]
+
+    def test_labels_of_other_worker_are_reloaded(self, workers):
+        first, second = workers
+        instance_id = first.create_instance(self._new_instance())
+        second.sync_instance_changes()
+        assert pd.isna(second.storage.dataset_dict[instance_id]["y_train"].loc["T002"])
+
+        first.label_instance(instance_id, LabelRequest(query_idx=["T002"], labels=["B"]))
+        second.sync_instance_changes()
+
+        assert not second.storage.dataset_dict.is_loaded(instance_id)
+        assert second.storage.dataset_dict[instance_id]["y_train"].loc["T002"] == 1
+
+    def test_labeling_with_stale_labels_keeps_labels_of_other_worker(self, workers):
+        first, second = workers
+        instance_id = first.create_instance(self._new_instance())
+        second.sync_instance_changes()
+        y_second = second.storage.dataset_dict[instance_id]["y_train"]
+
+        # Both label before the other one polls the change feed
+        first.label_instance(instance_id, LabelRequest(query_idx=["T001"], labels=["A"]))
+        with patch.object(second, "sync_instance_changes"):
+            second.label_instance(instance_id, LabelRequest(query_idx=["T002"], labels=["B"]))
+
+        uploaded = second.minio_service.save_labels.call_args.kwargs["df"]
+        assert uploaded.to_dict() == {"T001": 0, "T002": 1}
+        assert y_second.to_dict() == {"T001": 0, "T002": 1}
+        assert "T001" in second.storage.labeled_index(instance_id)
+
+    def test_operations_sync_before_using_labels(self, workers):
+        first, second = workers
+        instance_id = first.create_instance(self._new_instance())
+        second.sync_instance_changes()
+        assert pd.isna(second.storage.dataset_dict[instance_id]["y_train"].loc["T001"])
+
+        first.label_instance(instance_id, LabelRequest(query_idx=["T001"], labels=["A"]))
+        assert second.get_next_instances(instance_id, batch_size=2) == ["T002"]
+
+        first.label_instance(instance_id, LabelRequest(query_idx=["T002"], labels=["B"]))
+        second.update_model(instance_id)
+        assert second.storage.dataset_dict[instance_id]["y_train"].to_dict() == {"T001": 0, "T002": 1}
+
+    def test_retrained_model_gets_new_version_in_both_workers(self, workers):
+        first, second = workers
+        instance_id = first.create_instance(self._new_instance())
+        second.sync_instance_changes()
+        first.label_instance(instance_id, LabelRequest(query_idx=["T002"], labels=["B"]))
+        versions = (first.storage.model_version(instance_id, 0), second.storage.model_version(instance_id, 0))
+
+        first.update_model(instance_id)
+        second.sync_instance_changes()
+
+        assert first.storage.model_version(instance_id, 0) != versions[0]
+        assert second.storage.model_version(instance_id, 0) != versions[1]
+
+        model_id = first.save_model(instance_id)
+        assert first.storage.model_version(instance_id, model_id) != first.storage.model_version(instance_id, 99)
+
+    def test_deleted_instance_disappears_from_other_worker(self, workers):
+        first, second = workers
+        instance_id = first.create_instance(self._new_instance())
+        second.sync_instance_changes()
+
+        first.delete_instance(instance_id)
+        second.sync_instance_changes()
+
+        assert instance_id not in second.storage.al_instances_dict
+        assert instance_id not in second.storage.dataset_dict
+
+
+class _InMemoryMinio:
+    """The MinioService methods used to move an instance between nodes, backed by a dict."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def save_label_encoder(self, *, al_instance_id, encoder):
+        self.objects[("le", al_instance_id)] = encoder
+
+    def load_label_encoder(self, *, al_instance_id):
+        return self.objects[("le", al_instance_id)]
+
+    def save_one_hot_encoder(self, *, al_instance_id, encoder):
+        self.objects[("oh", al_instance_id)] = encoder
+
+    def load_one_hot_encoder(self, *, al_instance_id):
+        return self.objects[("oh", al_instance_id)]
+
+    def save_vectorized_tickets(self, *, al_instance_id, tickets_version, split, df):
+        self.objects[("X", al_instance_id, tickets_version, split)] = df
+
+    def load_vectorized_tickets(self, *, al_instance_id, tickets_version, split):
+        return self.objects[("X", al_instance_id, tickets_version, split)]
+
+    def save_labels(self, *, al_instance_id, labels_version, split, df):
+        self.objects[("y", al_instance_id, labels_version, split)] = df.copy()
+
+    def load_labels(self, *, al_instance_id, labels_version, split):
+        return self.objects[("y", al_instance_id, labels_version, split)]
+
+    def save_model(self, *, al_instance_id, model_version, model, metadata=None):
+        self.objects[("model", al_instance_id, model_version)] = model
+
+    def load_model(self, *, al_instance_id, model_version):
+        return self.objects[("model", al_instance_id, model_version)]
+
+    def delete_instance_objects(self, al_instance_id):
+        self.objects = {k: v for k, v in self.objects.items() if k[1] != al_instance_id}
+
+
+class TestMoveInstance:
+    """Export an instance on one node and restore it on another through MinIO (sharding)."""
+
+    @pytest.fixture
+    def nodes(self, tmp_path, monkeypatch):
+        from sklearn.preprocessing import LabelEncoder
+
+        label_encoder = LabelEncoder().fit(np.array(["A", "B", np.nan], dtype=object))
+
+        def _dispatch_team(duckdb_service, test_set=False, le=None, oh=None, classes=None, progress_callback=None, sentence_model=None):
+            X = pd.DataFrame([[0.1, 0.2], [0.3, 0.4]], index=["T001", "T002"], columns=["0", "1"])
+            y = pd.Series(["A", np.nan], index=["T001", "T002"]) if test_set else pd.Series([0, 2], index=["T001", "T002"])
+            return X, y, le or label_encoder, oh
+
+        monkeypatch.setattr(data_preprocessing, "dispatch_team", _dispatch_team)
+        minio = _InMemoryMinio()
+
+        def _node(name):
+            duckdb_service = DuckDbPersistenceService(db_path=tmp_path / name / "test.duckdb")
+            duckdb_service.upsert_tickets_df(pd.DataFrame({"Ref": ["T001", "T002"]}), split="train")
+            artifacts = LocalArtifactsStore(
+                models_dir=tmp_path / name / "models",
+                encoders_dir=tmp_path / name / "encoders",
+                vectorized_data_dir=tmp_path / name / "vectorized",
+            )
+            return ActiveLearningService(ActiveLearningStorage(), duckdb_service, artifacts, minio)
+
+        return _node("a"), _node("b"), minio
+
+    def test_instance_moves_with_labels_model_and_metrics(self, nodes):
+        old, new, minio = nodes
+        instance_id = old.storage.reserve_instance_id(5)
+        old.create_instance(NewInstance(
+            model_name="svm",
+            qs_strategy="random sampling",
+            class_list=["A", "B"],
+            train_data_path="train.csv",
+            test_data_path="test.csv",
+        ), instance_id=instance_id)
+        old.label_instance(5, LabelRequest(query_idx=["T002"], labels=["B"]))
+        old.update_model(5)
+        old.duckdb_service.save_metrics(5, f1_score=0.5, mean_entropy=0.1, num_labeled=2)
+
+        export = old.export_instance(5)
+        new.restore_instance(5, export)
+        old.release_instance(5)
+
+        assert 5 not in old.storage.al_instances_dict
+        assert not old.local_artifacts_store.has_instance_artifacts(5)
+        assert ("le", 5) in minio.objects  # MinIO objects are kept
+        assert new.storage.dataset_dict[5]["y_train"].tolist() == [0, 1]
+        assert new.storage.results_dict[5]["f1_scores"] == [0.5]
+        assert 0 in new.storage.model_paths_dict[5]
+
+    def test_restore_refuses_existing_instance(self, nodes):
+        old, _, _ = nodes
+        old.storage.al_instances_dict[3] = {}
+
+        with pytest.raises(ValueError):
+            old.restore_instance(3, {})
@@ -0,0 +1,122 @@
+"""Tests for adaptive-sample LIME explanations."""
+from __future__ import annotations
+
+import itertools
+
+import numpy as np
+import pytest
+from lime.lime_text import LimeTextExplainer
+
+from app.services.adaptive_lime import PROBE_SAMPLES, AdaptiveLimeConfig, explain_adaptive
+
+TEXT = "vpn down cannot connect from home office since the update"
+
+
+def _classifier(texts):
+    """Probability of class 1 grows with 'vpn' and 'connect', drops with 'update'."""
+    scores = np.array([
+        0.5 * ("vpn" in t.split()) + 0.3 * ("connect" in t.split()) - 0.2 * ("update" in t.split()) for t in texts
+    ])
+    positive = 1 / (1 + np.exp(-3 * scores))
+    return np.column_stack([1 - positive, positive])
+
+
+class _CountingClassifier:
+    def __init__(self):
+        self.scored = 0
+
+    def __call__(self, texts):
+        self.scored += len(texts)
+        return _classifier(texts)
+
+
+def test_one_round_equals_lime():
+    config = AdaptiveLimeConfig(initial_samples=300, max_samples=300)
+
+    result = explain_adaptive(LimeTextExplainer(random_state=0), TEXT, _classifier, 1, config=config)
+
+    expected = LimeTextExplainer(random_state=0).explain_instance(TEXT, _classifier, num_samples=300, labels=(1,))
+    assert result.top_words == pytest.approx(expected.as_list(label=1))
+    assert (result.num_samples, result.rounds, result.stop_reason) == (300, 1, "sample_budget")
+    assert not result.converged
+
+
+def test_stops_once_the_top_words_are_stable():
+    classifier = _CountingClassifier()
+    config = AdaptiveLimeConfig(initial_samples=100, max_samples=6400, tolerance=0.1, num_features=3)
+
+    result = explain_adaptive(LimeTextExplainer(random_state=0), TEXT, classifier, 1, config=config)
+
+    assert result.converged and result.stop_reason == "converged"
+    assert result.stability <= 0.1
+    assert result.num_samples < 6400
+    assert classifier.scored == result.num_samples  # earlier samples are never scored again
+    assert [word for word, _ in result.top_words][:2] == ["vpn", "connect"]
+
+
+def test_sample_budget_caps_the_explanation():
+    config = AdaptiveLimeConfig(initial_samples=50, max_samples=120, tolerance=0)
+
+    result = explain_adaptive(LimeTextExplainer(random_state=0), TEXT, _classifier, 1, config=config)
+
+    assert (result.num_samples, result.rounds, result.stop_reason) == (120, 3, "sample_budget")
+
+
+def test_time_budget_caps_the_explanation():
+    clock = itertools.count(step=0.05)  # every reading advances 50 ms
+    config = AdaptiveLimeConfig(initial_samples=50, max_samples=10_000, time_budget_ms=60, tolerance=0)
+
+    result = explain_adaptive(LimeTextExplainer(random_state=0), TEXT, _classifier, 1, config=config, clock=lambda: next(clock))
+
+    assert result.stop_reason == "time_budget"
+    assert result.rounds == 1
+    assert result.sampling()["time_budget_ms"] == 60
+
+
+class _TimedClassifier:
+    """Scoring takes 1 ms per text on a simulated clock (refitting is free)."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def clock(self):
+        return self.now
+
+    def __call__(self, texts):
+        self.now += len(texts) / 1000
+        return _classifier(texts)
+
+
+def test_last_round_is_shrunk_to_the_time_budget():
+    classifier = _TimedClassifier()
+    config = AdaptiveLimeConfig(initial_samples=250, max_samples=10_000, time_budget_ms=800, tolerance=0)
+
+    result = explain_adaptive(LimeTextExplainer(random_state=0), TEXT, classifier, 1, config=config, clock=classifier.clock)
+
+    # 250, then 500 samples; the third round would double to 1000 (1 s), only 300 new samples fit
+    assert result.stop_reason == "time_budget"
+    assert (result.rounds, result.num_samples) == (3, 800)
+    assert result.elapsed_ms <= 800
+
+
+def test_first_round_is_shrunk_to_the_time_budget():
+    classifier = _TimedClassifier()
+    config = AdaptiveLimeConfig(initial_samples=250, max_samples=10_000, time_budget_ms=50.5, tolerance=0)
+
+    result = explain_adaptive(LimeTextExplainer(random_state=0), TEXT, classifier, 1, config=config, clock=classifier.clock)
+
+    # The text itself and the probe take 26 ms, 24 more samples fit instead of the other 224
+    assert (result.stop_reason, result.rounds, result.num_samples) == ("time_budget", 1, 1 + PROBE_SAMPLES + 24)
+    assert result.elapsed_ms <= 50.5
+    assert result.top_words
+
+
+def test_text_without_words_raises():
+    with pytest.raises(ValueError, match="no words"):
+        explain_adaptive(LimeTextExplainer(random_state=0), "  ", _classifier, 1)
+
+
+@pytest.mark.parametrize("kwargs", [{"initial_samples": 1}, {"max_samples": 10}, {"tolerance": -1}])
+def test_invalid_config_rejected(kwargs):
+    with pytest.raises(ValueError):
+        AdaptiveLimeConfig(**kwargs)
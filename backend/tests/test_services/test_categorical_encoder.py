@@ -0,0 +1,143 @@
+"""Tests for the lookup-table one-hot encoding of the inference path."""
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import cloudpickle
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import OneHotEncoder
+
+from app.services import data_preprocessing as dp
+from humal_vectorizer import CategoricalLookupEncoder, TicketVectorizer
+
+CAT_COLS = ["Service subcategory->Name", "Service->Name"]
+
+
+class _KeywordSentenceModel:
+    """float32 embeddings like SentenceTransformer, derived from the sentence."""
+
+    def encode(self, sentences, show_progress_bar=False):
+        return np.array([[len(s), s.count("a") / 7] for s in sentences], dtype=np.float32)
+
+
+@pytest.fixture
+def oh():
+    return OneHotEncoder(handle_unknown="ignore").fit(pd.DataFrame({
+        CAT_COLS[0]: ["Sub A", "Sub B", "Sub C", None],
+        CAT_COLS[1]: ["Srv A", "Srv B", np.nan, "Srv A"],
+    }))
+
+
+def _records():
+    return [
+        {"title_anon": "VPN", "description_anon": " down", "service_subcategory_name": "Sub A", "service_name": "Srv B"},
+        {"title_anon": "Printer", "description_anon": " jam", "service_subcategory_name": "Sub C", "service_name": "Srv A"},
+        {"title_anon": "Password", "description_anon": None, "service_subcategory_name": None, "service_name": np.nan},
+        {"title_anon": "Laptop", "description_anon": "", "service_subcategory_name": "Unknown", "service_name": "Unknown"},
+    ]
+
+
+class TestCategoricalLookupEncoder:
+    def test_matches_one_hot_encoder(self, oh):
+        X = pd.DataFrame({
+            CAT_COLS[0]: ["Sub B", "Unknown", None, np.nan, "Sub A"],
+            CAT_COLS[1]: [np.nan, "Srv A", None, "Srv B", "Other"],
+        })
+        lookup = CategoricalLookupEncoder.from_one_hot_encoder(oh)
+
+        encoded = lookup.transform([X[c].tolist() for c in CAT_COLS])
+
+        np.testing.assert_array_equal(encoded, oh.transform(X).toarray())
+
+    def test_unknown_category_raises_like_the_encoder(self):
+        oh = OneHotEncoder(handle_unknown="error").fit([["a"], ["b"]])
+        lookup = CategoricalLookupEncoder.from_one_hot_encoder(oh)
+
+        np.testing.assert_array_equal(lookup.transform([["b", "a"]]), oh.transform([["b"], ["a"]]).toarray())
+        with pytest.raises(ValueError, match="unknown category"):
+            lookup.transform([["c"]])
+
+    @pytest.mark.parametrize("encoder", [
+        OneHotEncoder(drop="first").fit([["a"], ["b"]]),
+        OneHotEncoder(handle_unknown="infrequent_if_exist", min_frequency=2).fit([["a"], ["a"], ["b"]]),
+        OneHotEncoder(),
+    ])
+    def test_unsupported_encoders_are_rejected(self, encoder):
+        with pytest.raises(ValueError):
+            CategoricalLookupEncoder.from_one_hot_encoder(encoder)
+
+    def test_features_are_written_into_a_float32_buffer(self, oh):
+        lookup = CategoricalLookupEncoder.from_one_hot_encoder(oh)
+        embeddings = np.array([[0.25, 1.5]], dtype=np.float32)
+
+        features = lookup.features(embeddings, [["Sub C"], ["Srv B"]])
+
+        assert features.dtype == np.float32
+        np.testing.assert_array_equal(features, [[0.25, 1.5, 0, 0, 1, 0, 0, 1, 0]])
+
+
+class TestInferenceFeatures:
+    def test_equals_pandas_pipeline(self, oh):
+        sentence_model = _KeywordSentenceModel()
+        df = pd.DataFrame(_records())
+
+        expected = dp.inference(df=df, le=MagicMock(), oh=oh, sentence_model=sentence_model)
+        lookup = CategoricalLookupEncoder.from_one_hot_encoder(oh)
+        features = dp.inference_features(_records(), lookup, sentence_model=sentence_model)
+
+        # Same values bit for bit (float32 embeddings and 0/1 are exact in float32)
+        np.testing.assert_array_equal(features.astype(np.float64), expected.to_numpy(dtype=np.float64))
+
+    def test_inference_with_lookup_keeps_the_frame_layout(self, oh):
+        sentence_model = _KeywordSentenceModel()
+        df = pd.DataFrame(_records())
+
+        expected = dp.inference(df=df, le=MagicMock(), oh=oh, sentence_model=sentence_model)
+        X = dp.inference(
+            df=df,
+            le=MagicMock(),
+            oh=oh,
+            sentence_model=sentence_model,
+            oh_lookup=CategoricalLookupEncoder.from_one_hot_encoder(oh),
+        )
+
+        assert list(X.columns) == list(expected.columns)
+        assert list(X.index) == list(expected.index)
+        np.testing.assert_array_equal(X.to_numpy(dtype=np.float64), expected.to_numpy(dtype=np.float64))
+
+
+class TestTicketVectorizer:
+    def test_lookup_path_equals_one_hot_encoder_path(self, oh):
+        vectorizer = TicketVectorizer(one_hot_encoder=oh)
+        vectorizer._sentence_model = _KeywordSentenceModel()
+        reference = TicketVectorizer(one_hot_encoder=oh)
+        reference._sentence_model = vectorizer._sentence_model
+        reference._get_lookup = lambda: None
+
+        X = vectorizer.transform_full_ticket(_records())
+        expected = reference.transform_full_ticket(_records())
+
+        assert list(X.columns) == list(expected.columns)
+        np.testing.assert_array_equal(X.to_numpy(dtype=np.float64), expected.to_numpy(dtype=np.float64))
+
+    def test_compiled_lookup_is_not_pickled(self, oh):
+        vectorizer = TicketVectorizer(one_hot_encoder=oh)
+        vectorizer._sentence_model = _KeywordSentenceModel()
+        vectorizer.transform("VPN down")
+
+        restored = cloudpickle.loads(cloudpickle.dumps(vectorizer))
+
+        assert restored._lookup is None
+        assert restored.one_hot_encoder is not None
+
+    def test_new_encoder_is_compiled_again(self, oh):
+        vectorizer = TicketVectorizer(one_hot_encoder=oh)
+        vectorizer._sentence_model = _KeywordSentenceModel()
+        vectorizer.transform("VPN down")
+
+        other = OneHotEncoder(handle_unknown="ignore").fit(pd.DataFrame({CAT_COLS[0]: ["Sub A"], CAT_COLS[1]: ["Srv A"]}))
+        vectorizer.one_hot_encoder = other
+
+        assert vectorizer.transform("VPN down").shape == (1, 4)
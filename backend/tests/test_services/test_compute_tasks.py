@@ -0,0 +1,163 @@
+"""Tests for the tasks of the compute workers, run in-process."""
+from __future__ import annotations
+
+import queue
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import LabelEncoder, OneHotEncoder
+
+from app.config.config import GROUND_TRUTH_AL_INSTANCE_ID
+from app.core.storage import ActiveLearningStorage
+from app.data_models.active_learning_dm import LabelRequest, NewInstance
+from app.persistence.duckdb import DuckDbPersistenceService
+from app.persistence.local_artifacts import LocalArtifactsStore
+from app.persistence.minio_storage import MinioService
+from app.services import compute_tasks, data_preprocessing
+from app.services.active_learning_svc import ActiveLearningService
+
+
+class _InlineExecutor:
+    """ComputeExecutor running the tasks in the calling thread (records the tasks it ran)."""
+
+    enabled = True
+    max_workers = 1
+
+    def __init__(self):
+        self.tasks = []
+
+    def call(self, fn, *args, progress=None, **kwargs):
+        self.tasks.append(fn.__name__)
+        if progress is None:
+            return fn(*args, **kwargs)
+        progress_queue = queue.Queue()
+        result = fn(*args, progress_queue=progress_queue, **kwargs)
+        while not progress_queue.empty():
+            call_args, call_kwargs = progress_queue.get()
+            progress(*call_args, **call_kwargs)
+        return result
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_result(self.call(fn, *args, **kwargs))
+        return future
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    return LocalArtifactsStore(tmp_path / "models", tmp_path / "encoders", tmp_path / "vectorized")
+
+
+@pytest.fixture
+def worker(artifacts):
+    with patch("app.services.inference_svc.SentenceTransformer"):
+        compute_tasks.init_worker(artifacts)
+    yield compute_tasks._context
+    compute_tasks._context = None
+
+
+@pytest.fixture
+def fake_dispatch_team(monkeypatch):
+    label_encoder = LabelEncoder().fit(np.array(["A", "B", np.nan], dtype=object))
+    sentence_models = []
+
+    def _dispatch_team(duckdb_service, test_set=False, le=None, oh=None, classes=None, progress_callback=None, sentence_model=None):
+        # The worker reads the tickets from the frames sent by the API process
+        tickets = duckdb_service.load_tickets(split="test" if test_set else "train")
+        sentence_models.append(sentence_model)
+        if progress_callback is not None:
+            progress_callback("embedding", len(tickets), len(tickets), split="test" if test_set else "train")
+        X = pd.DataFrame([[0.0, 1.0], [1.0, 0.0], [0.9, 0.1]], index=["T001", "T002", "T003"], columns=["0", "1"])
+        y = pd.Series([0, 1, 2], index=["T001", "T002", "T003"])
+        return X, y, le or label_encoder, oh
+
+    monkeypatch.setattr(data_preprocessing, "dispatch_team", _dispatch_team)
+    return sentence_models
+
+
+def test_tasks_need_an_initialized_worker():
+    with pytest.raises(RuntimeError, match="init_worker"):
+        compute_tasks.process_new_ticket(None)
+
+
+def test_ticket_frames_replace_the_duckdb_reads():
+    duckdb_service = MagicMock(spec=DuckDbPersistenceService)
+    duckdb_service.load_tickets.side_effect = lambda split: pd.DataFrame({"Ref": [f"{split}-1"]})
+    duckdb_service.load_labels.side_effect = lambda al_instance_id, split: pd.Series(["A"], index=[f"{split}-1"])
+
+    frames = compute_tasks.TicketFrames.load(duckdb_service)
+
+    assert frames.load_tickets(split="test")["Ref"].tolist() == ["test-1"]
+    assert frames.load_labels(al_instance_id=GROUND_TRUTH_AL_INSTANCE_ID, split="train").index.tolist() == ["train-1"]
+    assert frames.load_tickets(split="train") is not frames.tickets["train"]  # dispatch_team edits the frame
+
+
+def test_active_learning_steps_run_in_the_worker(tmp_path, artifacts, worker, fake_dispatch_team):
+    duckdb_service = DuckDbPersistenceService(db_path=tmp_path / "test.duckdb")
+    duckdb_service.upsert_tickets_df(pd.DataFrame({"Ref": ["T001", "T002", "T003"]}), split="train")
+    executor = _InlineExecutor()
+    service = ActiveLearningService(
+        ActiveLearningStorage(),
+        duckdb_service=duckdb_service,
+        local_artifacts_store=artifacts,
+        minio_service=MagicMock(spec=MinioService),
+        compute_executor=executor,
+    )
+    phases = []
+
+    instance_id = service.create_instance(
+        NewInstance(
+            model_name="logistic regression",
+            qs_strategy="random sampling",
+            class_list=["A", "B"],
+            train_data_path="train.csv",
+            test_data_path="test.csv",
+        ),
+        progress_callback=lambda phase, done=0, total=0, split=None: phases.append(phase),
+    )
+    service.label_instance(instance_id, LabelRequest(query_idx=["T001", "T002"], labels=["B", "A"]))
+    service.update_model(instance_id)
+
+    assert executor.tasks == ["preprocess_dataset", "fit_model"]
+    assert phases[:2] == ["embedding", "embedding"]
+    assert fake_dispatch_team == [worker.inference_service.sentence_model] * 2
+    # The model was trained on the features the worker read from the local artifacts
+    model = artifacts.load_model(instance_id, 0)
+    assert list(model.predict(service.storage.dataset_dict[instance_id]["X_train"].to_numpy())) == [1, 0, 0]
+
+
+def test_worker_reloads_an_instance_recreated_under_the_same_id(artifacts, worker):
+    def _create(classes, rows):
+        artifacts.save_encoders(1, LabelEncoder().fit(classes), OneHotEncoder().fit([["a"], ["b"]]))
+        X = pd.DataFrame(np.ones((rows, 2)), index=[f"T{i}" for i in range(rows)], columns=["0", "1"])
+        artifacts.save_vectorized_dataset(1, X, split="train")
+
+    _create(["A", "B"], rows=2)
+    worker.instance(1)
+    assert list(worker.storage.dataset_dict[1]["le"].classes_) == ["A", "B"]
+    assert len(worker.features(1)) == 2
+
+    artifacts.delete_instance_artifacts(1)
+    _create(["C", "D", "E"], rows=3)
+    worker.instance(1)
+
+    assert list(worker.storage.dataset_dict[1]["le"].classes_) == ["C", "D", "E"]
+    assert len(worker.features(1)) == 3
+
+
+def test_worker_forgets_deleted_instances(artifacts, worker):
+    for al_instance_id in (1, 2):
+        artifacts.save_encoders(al_instance_id, LabelEncoder().fit(["A", "B"]), OneHotEncoder().fit([["a"], ["b"]]))
+        artifacts.save_vectorized_dataset(al_instance_id, pd.DataFrame([[1.0]], index=["T1"]), split="train")
+    worker.instance(1)
+    worker.features(1)
+
+    artifacts.delete_instance_artifacts(1)
+    worker.instance(2)
+    worker.features(2)
+
+    assert 1 not in worker.storage.dataset_dict
+    assert list(worker._features) == [2]
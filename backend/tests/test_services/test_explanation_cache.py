@@ -0,0 +1,70 @@
+"""Tests for the explanation cache persisted in DuckDB."""
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.persistence.duckdb import DuckDbPersistenceService
+from app.services.explanation_cache import ExplanationCache
+
+VPN = {"title_anon": "VPN down", "description_anon": "cannot connect", "service_name": "Srv", "service_subcategory_name": "Sub"}
+PRINTER = {**VPN, "title_anon": "Printer jam"}
+PARAMS = {"num_samples": 1000}
+
+
+@pytest.fixture
+def duckdb_service(tmp_path):
+    return DuckDbPersistenceService(db_path=tmp_path / "test.duckdb")
+
+
+def test_explanations_are_served_for_the_same_key(duckdb_service):
+    cache = ExplanationCache(duckdb_service)
+    explanation = {"top_words": [["vpn", 0.4]], "error": None}
+
+    cache.put_many(1, 0, "v1", "lime", PARAMS, [VPN], [explanation])
+
+    # Key order of the payload does not matter, duplicates are answered once
+    assert cache.get_many(1, 0, "v1", "lime", PARAMS, [dict(reversed(list(VPN.items()))), PRINTER, VPN]) == [explanation, None, explanation]
+    assert cache.get_many(1, 0, "v2", "lime", PARAMS, [VPN]) == [None]
+    assert cache.get_many(1, 0, "v1", "lime", {"num_samples": 500}, [VPN]) == [None]
+    assert cache.get_many(1, 0, "v1", "occlusion", PARAMS, [VPN]) == [None]
+
+
+def test_explanations_with_error_are_not_cached(duckdb_service):
+    cache = ExplanationCache(duckdb_service)
+
+    cache.put_many(1, 0, "v1", "lime", PARAMS, [VPN, PRINTER], [{"top_words": [], "error": "LIME error: boom"}, None])
+
+    assert cache.get_many(1, 0, "v1", "lime", PARAMS, [VPN, PRINTER]) == [None, None]
+
+
+def test_least_recently_used_explanations_are_evicted(duckdb_service):
+    cache = ExplanationCache(duckdb_service, max_entries=1)
+
+    cache.put_many(1, 0, "v1", "lime", PARAMS, [VPN], [{"top_words": []}])
+    cache.put_many(1, 0, "v1", "lime", PARAMS, [PRINTER], [{"top_words": []}])
+
+    assert cache.get_many(1, 0, "v1", "lime", PARAMS, [VPN, PRINTER]) == [None, {"top_words": []}]
+
+
+def test_disabled_cache_never_reads_duckdb():
+    duckdb_service = MagicMock()
+    cache = ExplanationCache(duckdb_service, max_entries=0)
+
+    cache.put_many(1, 0, "v1", "lime", PARAMS, [VPN], [{"top_words": []}])
+
+    assert not cache.enabled
+    assert cache.get_many(1, 0, "v1", "lime", PARAMS, [VPN]) == [None]
+    assert duckdb_service.method_calls == []
+
+
+def test_duckdb_failures_are_misses():
+    duckdb_service = MagicMock()
+    duckdb_service.load_explanations.side_effect = RuntimeError("database is locked")
+    duckdb_service.save_explanations.side_effect = RuntimeError("database is locked")
+    cache = ExplanationCache(duckdb_service)
+
+    cache.put_many(1, 0, "v1", "lime", PARAMS, [VPN], [{"top_words": []}])
+
+    assert cache.get_many(1, 0, "v1", "lime", PARAMS, [VPN]) == [None]
@@ -0,0 +1,257 @@
+"""Tests for InferenceService (single and batch inference)."""
+from __future__ import annotations
+
+from concurrent.futures import Future
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from skactiveml.classifier import SklearnClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import LabelEncoder, OneHotEncoder
+
+from app.core.storage import ActiveLearningStorage
+from app.data_models.active_learning_dm import Data
+from app.persistence.duckdb import DuckDbPersistenceService
+from app.persistence.local_artifacts import LocalArtifactsStore
+from app.services import compute_tasks
+from app.services.inference_svc import InferenceService
+
+TEAMS = ["Network", "Printing"]
+
+
+class _KeywordSentenceModel:
+    """Deterministic stand-in for SentenceTransformer: 2-d embeddings from keywords."""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, sentences, show_progress_bar=False):
+        self.calls.append(len(sentences))
+        return np.array([[float("vpn" in s.lower()), float("printer" in s.lower())] for s in sentences])
+
+
+def _done(result) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def _ticket(title: str, service: str = "Srv A") -> Data:
+    return Data(title_anon=title, description_anon=" please help", service_subcategory_name="Sub", service_name=service)
+
+
+@pytest.fixture
+def service(tmp_path):
+    storage = ActiveLearningStorage()
+    artifacts = LocalArtifactsStore(tmp_path / "models", tmp_path / "encoders", tmp_path / "vectorized_data")
+
+    le = LabelEncoder().fit(TEAMS + [np.nan])
+    oh = OneHotEncoder(handle_unknown="ignore").fit(
+        pd.DataFrame({"Service subcategory->Name": ["Sub", "Sub"], "Service->Name": ["Srv A", "Srv B"]})
+    )
+    storage.al_instances_dict[1] = {"classes": [0, 1, 2]}
+    storage.dataset_dict[1] = {"le": le, "oh": oh}
+
+    # [vpn, printer] embedding + one-hot of [Sub] and [Srv A, Srv B]
+    X = np.array([[1.0, 0.0, 1.0, 1.0, 0.0], [0.0, 1.0, 1.0, 0.0, 1.0]] * 5)
+    y = le.transform(["Network", "Printing"] * 5)
+    clf = SklearnClassifier(LogisticRegression(), classes=[0, 1, 2]).fit(X, y)
+    artifacts.save_model(1, 0, clf)
+    storage.model_paths_dict[1] = {0: "models/1/0.joblib"}
+
+    duckdb_service = DuckDbPersistenceService(db_path=tmp_path / "db" / "test.duckdb")
+    with patch("app.services.inference_svc.SentenceTransformer", return_value=_KeywordSentenceModel()):
+        return InferenceService(storage, local_artifacts_store=artifacts, duckdb_service=duckdb_service)
+
+
+class TestInferBatch:
+    def test_predicts_every_ticket(self, service):
+        tickets = [_ticket("VPN down"), _ticket("Printer jam", "Srv B"), _ticket("vpn slow", "Unknown")]
+
+        assert service.infer_batch(1, tickets) == {"predictions": ["Network", "Printing", "Network"]}
+
+    def test_embeds_in_batches(self, service):
+        tickets = [_ticket(f"VPN {i}") for i in range(5)]
+
+        service.infer_batch(1, tickets, batch_size=2)
+
+        assert service.sentence_model.calls == [2, 2, 1]
+
+    def test_returns_probabilities_per_team(self, service):
+        result = service.infer_batch(1, [_ticket("VPN down"), _ticket("Printer jam", "Srv B")], return_proba=True)
+
+        assert result["predictions"] == ["Network", "Printing"]
+        assert [set(p) for p in result["probabilities"]] == [set(TEAMS), set(TEAMS)]
+        for probabilities, predicted in zip(result["probabilities"], result["predictions"]):
+            assert max(probabilities, key=probabilities.get) == predicted
+            assert sum(probabilities.values()) == pytest.approx(1.0)
+
+    def test_empty_batch(self, service):
+        assert service.infer_batch(1, []) == {"predictions": []}
+
+    def test_prediction_comes_from_predict_not_from_probabilities(self, service):
+        # Like SVC(probability=True): predict and the most probable class can disagree
+        model = SimpleNamespace(
+            classes_=np.array([0, 1, 2]),
+            predict=lambda X: np.ones(len(X), dtype=int),
+            predict_proba=lambda X: np.tile([0.7, 0.2, 0.1], (len(X), 1)),
+        )
+
+        with patch.object(service, "load_model", return_value=model):
+            result = service.infer_batch(1, [_ticket("VPN down")], return_proba=True)
+
+        assert result["predictions"] == ["Printing"]
+        assert result["probabilities"] == [{"Network": pytest.approx(0.7), "Printing": pytest.approx(0.2)}]
+
+
+class TestLinearScorer:
+    def test_linear_model_is_scored_with_numpy(self, service):
+        assert type(service.load_model(1, 0)).__name__ == "LinearScorer"
+
+    def test_same_results_as_the_saved_model(self, service, tmp_path):
+        tickets = [_ticket("VPN down"), _ticket("Printer jam", "Srv B"), _ticket("vpn and printer", "Unknown")]
+        scored = service.infer_batch(1, tickets, return_proba=True)
+
+        (tmp_path / "models" / "1" / "0.linear.npz").unlink()
+        service.cache.clear()
+        expected = service.infer_batch(1, tickets, return_proba=True)
+
+        assert scored["predictions"] == expected["predictions"]
+        for probabilities, reference in zip(scored["probabilities"], expected["probabilities"]):
+            assert probabilities == pytest.approx(reference, abs=1e-12)
+
+
+class TestInferenceCache:
+    def test_repeated_ticket_is_served_from_cache(self, service):
+        ticket = _ticket("VPN down")
+
+        first = service.infer_batch(1, [ticket])
+        second = service.infer_batch(1, [_ticket("VPN down")])
+
+        assert first == second
+        assert service.sentence_model.calls == [1]
+        assert service.cache.stats()["hits"] == 1
+
+    def test_batch_predicts_only_new_tickets_once(self, service):
+        service.infer_batch(1, [_ticket("VPN down")])
+
+        result = service.infer_batch(1, [_ticket("VPN down"), _ticket("Printer jam", "Srv B"), _ticket("Printer jam", "Srv B")])
+
+        assert result["predictions"] == ["Network", "Printing", "Printing"]
+        assert service.sentence_model.calls == [1, 1]
+
+    def test_probabilities_are_computed_if_not_cached(self, service):
+        service.infer_batch(1, [_ticket("VPN down")])
+
+        result = service.infer_batch(1, [_ticket("VPN down")], return_proba=True)
+
+        assert set(result["probabilities"][0]) == set(TEAMS)
+        assert service.sentence_model.calls == [1, 1]
+        # Cached with probabilities now, a plain prediction is a hit as well
+        service.infer_batch(1, [_ticket("VPN down")])
+        assert service.sentence_model.calls == [1, 1]
+
+    def test_infer_and_batch_share_the_predict_result(self, service):
+        # Like SVC(probability=True): predict and the most probable class can disagree
+        model = SimpleNamespace(
+            classes_=np.array([0, 1, 2]),
+            predict=lambda X: np.ones(len(X), dtype=int),
+            predict_proba=lambda X: np.tile([0.7, 0.2, 0.1], (len(X), 1)),
+        )
+
+        with patch.object(service, "load_model", return_value=model):
+            batch = service.infer_batch(1, [_ticket("VPN down")], return_proba=True)
+            single = service.infer(1, _ticket("VPN down"))
+            service.infer(1, _ticket("Printer jam", "Srv B"))
+            later = service.infer_batch(1, [_ticket("Printer jam", "Srv B")], return_proba=True)
+
+        assert batch["predictions"] == single == later["predictions"] == ["Printing"]
+        # The single prediction is served from the entry of the batch
+        assert service.sentence_model.calls == [1, 1, 1]
+
+    def test_new_model_version_misses(self, service):
+        service.infer_batch(1, [_ticket("VPN down")])
+
+        service.storage.bump_model_version(1, 0)
+        service.infer_batch(1, [_ticket("VPN down")])
+
+        assert service.sentence_model.calls == [1, 1]
+
+
+class TestScoreTickets:
+    @pytest.fixture
+    def tickets(self, service):
+        refs = [f"T{i:02d}" for i in range(7)]
+        titles = ["VPN down" if i % 2 == 0 else "Printer jam" for i in range(7)]
+        service.duckdb_service.upsert_tickets_df(
+            pd.DataFrame({
+                "Ref": refs,
+                "Title_anon": titles,
+                "Description_anon": [" please help"] * 7,
+                "Service subcategory->Name": ["Sub"] * 7,
+                "Service->Name": ["Srv A" if t.startswith("VPN") else "Srv B" for t in titles],
+            }),
+            split="train",
+        )
+        service.duckdb_service.upsert_tickets_df(pd.DataFrame({"Ref": ["X1"], "Title_anon": ["VPN"]}), split="test")
+        return dict(zip(refs, ["Network" if t.startswith("VPN") else "Printing" for t in titles]))
+
+    def test_scores_and_saves_in_chunks(self, service, tickets):
+        chunks = list(service.score_tickets(1, split="train", chunk_size=3))
+
+        assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+        scored = pd.concat(chunks)
+        assert dict(zip(scored["ref"], scored["prediction"])) == tickets
+
+        saved = service.duckdb_service.load_predictions(1, 0)
+        assert dict(zip(saved["ref"], saved["prediction"])) == tickets
+        assert set(saved["probabilities"].iloc[0]) == set(TEAMS)
+
+    def test_matches_batch_inference(self, service, tickets):
+        scored = pd.concat(service.score_tickets(1, split="train", chunk_size=4))
+
+        batch = service.infer_batch(
+            1,
+            [_ticket(t, "Srv A" if t.startswith("VPN") else "Srv B") for t in ["VPN down", "Printer jam"]],
+            return_proba=True,
+        )
+        assert scored.iloc[0]["probabilities"] == pytest.approx(batch["probabilities"][0])
+        assert scored.iloc[1]["probabilities"] == pytest.approx(batch["probabilities"][1])
+
+    def test_chunks_are_scored_by_the_compute_workers(self, service, tickets, monkeypatch):
+        # Worker context of this process: the tasks run on the service itself
+        monkeypatch.setattr(compute_tasks, "_context", SimpleNamespace(instance=lambda al_instance_id: None, inference_service=service))
+        executor = MagicMock(enabled=True, max_workers=2)
+        executor.submit.side_effect = lambda fn, *args: _done(fn(*args))
+        service.compute_executor = executor
+
+        scored = pd.concat(service.score_tickets(1, split="train", chunk_size=3))
+
+        assert dict(zip(scored["ref"], scored["prediction"])) == tickets
+        assert [c.args[0] for c in executor.submit.call_args_list] == [compute_tasks.score_records] * 3
+        assert len(service.duckdb_service.load_predictions(1, 0)) == 7
+
+    def test_stopping_early_stops_scoring(self, service, tickets):
+        chunks = service.score_tickets(1, chunk_size=2)
+        first = next(chunks)
+        chunks.close()
+
+        assert len(first) == 2
+        assert len(service.duckdb_service.load_predictions(1, 0)) == 2
+        # The database is still usable by the test thread and a new scoring run
+        assert len(pd.concat(service.score_tickets(1, chunk_size=2))) == 8
+
+    def test_saved_predictions_are_read_in_pages(self, service, tickets):
+        list(service.score_tickets(1, split="train"))
+
+        pages = list(service.iter_predictions(1, page_size=3))
+
+        assert [len(page) for page in pages] == [3, 3, 1]
+        assert [ref for page in pages for ref in page["ref"]] == sorted(tickets)
+
+    def test_invalid_split_rejected_before_scoring(self, service):
+        with pytest.raises(ValueError, match="split must be"):
+            service.score_tickets(1, split="validation")
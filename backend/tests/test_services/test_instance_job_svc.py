@@ -0,0 +1,111 @@
+"""Tests for background creation of AL instances."""
+from __future__ import annotations
+
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core.storage import ActiveLearningStorage
+from app.data_models.active_learning_dm import NewInstance
+from app.services.active_learning_svc import ActiveLearningService
+from app.services.instance_job_svc import InstanceJobService
+
+
+def _new_instance(**overrides) -> NewInstance:
+    data = {
+        "model_name": "svm",
+        "qs_strategy": "random sampling",
+        "class_list": ["A", "B"],
+        "train_data_path": "train.csv",
+        "test_data_path": "test.csv",
+    }
+    data.update(overrides)
+    return NewInstance(**data)
+
+
+@pytest.fixture
+def storage():
+    return ActiveLearningStorage()
+
+
+@pytest.fixture
+def al_service(storage):
+    service = MagicMock(spec=ActiveLearningService)
+    service.storage = storage
+    return service
+
+
+@pytest.fixture
+def job_service(al_service):
+    service = InstanceJobService(al_service)
+    yield service
+    service.shutdown(wait=True)
+
+
+def test_submit_returns_job_before_instance_is_created(job_service, al_service):
+    release = threading.Event()
+    al_service.create_instance.side_effect = lambda *args, **kwargs: release.wait(5)
+
+    job = job_service.submit(_new_instance())
+
+    assert job["status"] in ("queued", "running")
+    assert job["instance_id"] == 1
+    release.set()
+    job_service.shutdown(wait=True)
+    assert job_service.get_job(job["job_id"])["status"] == "completed"
+    al_service.discard_instance.assert_not_called()
+
+
+def test_concurrent_submissions_reserve_distinct_instance_ids(job_service, al_service):
+    release = threading.Event()
+    al_service.create_instance.side_effect = lambda *args, **kwargs: release.wait(5)
+
+    first = job_service.submit(_new_instance())
+    second = job_service.submit(_new_instance())
+    release.set()
+
+    assert first["instance_id"] != second["instance_id"]
+
+
+def test_progress_is_reported_per_phase(job_service, al_service):
+    snapshots = []
+    release = threading.Event()
+
+    def _create(new_instance, instance_id=None, progress_callback=None):
+        release.wait(5)
+        progress_callback("embedding", 128, 512, split="train")
+        snapshots.append(job_service.get_job(job["job_id"]))
+
+    al_service.create_instance.side_effect = _create
+
+    job = job_service.submit(_new_instance())
+    release.set()
+    job_service.shutdown(wait=True)
+
+    assert snapshots[0]["phase"] == "embedding"
+    assert snapshots[0]["split"] == "train"
+    assert (snapshots[0]["done"], snapshots[0]["total"]) == (128, 512)
+    assert job_service.get_job(job["job_id"])["phase"] == "done"
+
+
+def test_failed_job_reports_error_and_releases_reserved_id(job_service, al_service, storage):
+    al_service.create_instance.side_effect = RuntimeError("MinIO unavailable")
+
+    job = job_service.submit(_new_instance())
+    job_service.shutdown(wait=True)
+
+    result = job_service.get_job(job["job_id"])
+    assert result["status"] == "failed"
+    assert result["error"] == "MinIO unavailable"
+    assert storage.get_next_instance_id() == 1
+    al_service.discard_instance.assert_called_once_with(job["instance_id"])
+
+
+def test_submit_rejects_unknown_model(job_service):
+    with pytest.raises(ValueError, match="Unknown model"):
+        job_service.submit(_new_instance(model_name="unknown"))
+
+
+def test_get_job_unknown_returns_none(job_service):
+    assert job_service.get_job("does-not-exist") is None
@@ -0,0 +1,57 @@
+"""Tests for the background polling of the instance change feed."""
+from __future__ import annotations
+
+import threading
+import time
+from unittest.mock import MagicMock
+
+from app.services.active_learning_svc import ActiveLearningService
+from app.services.instance_sync_svc import InstanceSyncService
+
+
+def test_start_is_a_no_op_without_shared_state():
+    al_service = MagicMock(spec=ActiveLearningService)
+    al_service.shared_state = False
+    service = InstanceSyncService(al_service, interval=0.01)
+
+    service.start()
+    service.stop()
+
+    al_service.sync_instance_changes.assert_not_called()
+
+
+def test_polls_change_feed_until_stopped():
+    polled = threading.Event()
+    al_service = MagicMock(spec=ActiveLearningService)
+    al_service.shared_state = True
+    al_service.sync_instance_changes.side_effect = lambda: polled.set() or 0
+    service = InstanceSyncService(al_service, interval=0.01)
+
+    service.start()
+    assert polled.wait(5)
+    service.stop()
+
+    calls = al_service.sync_instance_changes.call_count
+    time.sleep(0.05)
+    assert al_service.sync_instance_changes.call_count == calls
+
+
+def test_polling_errors_do_not_stop_the_thread():
+    second_poll = threading.Event()
+    al_service = MagicMock(spec=ActiveLearningService)
+    al_service.shared_state = True
+    results = iter([RuntimeError("DuckDB busy")])
+
+    def _sync():
+        error = next(results, None)
+        if error is not None:
+            raise error
+        second_poll.set()
+        return 0
+
+    al_service.sync_instance_changes.side_effect = _sync
+    service = InstanceSyncService(al_service, interval=0.01)
+
+    service.start()
+    assert second_poll.wait(5)
+    service.stop()
@@ -0,0 +1,109 @@
+"""Tests for the LIME classifier_fn of XaiService."""
+from __future__ import annotations
+
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+from lime.lime_text import LimeTextExplainer
+from skactiveml.classifier import SklearnClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import LabelEncoder, OneHotEncoder
+
+from app.data_models.active_learning_dm import Data
+from app.services.data_preprocessing import inference, inference_categorical
+from app.services.lime_scorer import LimeTextScorer
+from humal_vectorizer import CategoricalLookupEncoder
+
+
+class _TextSentenceModel:
+    """Deterministic stand-in for SentenceTransformer: 8-d float32 embeddings seeded by the text."""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, sentences, show_progress_bar=False):
+        self.calls.append(list(sentences))
+        return np.stack([
+            np.random.default_rng(zlib.crc32(s.encode())).random(8, dtype=np.float32) for s in sentences
+        ])
+
+
+@pytest.fixture
+def encoders():
+    le = LabelEncoder().fit(["Network", "Printing", "Access", np.nan])
+    oh = OneHotEncoder(handle_unknown="ignore").fit(
+        pd.DataFrame({"Service subcategory->Name": ["Sub", "Other"], "Service->Name": ["Srv A", "Srv B"]})
+    )
+    return le, oh
+
+
+@pytest.fixture
+def model():
+    rng = np.random.default_rng(0)
+    X = rng.random((60, 12))
+    return SklearnClassifier(LogisticRegression(), classes=[0, 1, 2, 3]).fit(X, rng.integers(0, 3, size=len(X)))
+
+
+def _pipeline_probabilities(model, encoders, texts, ticket):
+    """classifier_fn of the pandas pipeline: DataFrame of the perturbed texts and inference()."""
+    le, oh = encoders
+    tickets = pd.DataFrame({
+        "title_anon": texts,
+        "description_anon": [""] * len(texts),
+        "service_subcategory_name": [ticket.service_subcategory_name] * len(texts),
+        "service_name": [ticket.service_name] * len(texts),
+    })
+    return model.predict_proba(inference(tickets, le, oh, _TextSentenceModel()).to_numpy())
+
+
+TICKET = Data(title_anon="VPN down", description_anon=" cannot connect", service_subcategory_name="Sub", service_name="Srv B")
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_inference_categorical_matches_one_hot_encoder(encoders, compiled):
+    _, oh = encoders
+    lookup = CategoricalLookupEncoder.from_one_hot_encoder(oh) if compiled else None
+
+    for record in (TICKET.model_dump(), {"service_subcategory_name": "Unknown", "service_name": None}):
+        expected = oh.transform(pd.DataFrame({
+            "Service subcategory->Name": [record["service_subcategory_name"]],
+            "Service->Name": [record["service_name"]],
+        })).toarray()[0]
+        np.testing.assert_array_equal(inference_categorical(record, oh, oh_lookup=lookup), expected)
+
+
+def test_probabilities_equal_the_pandas_pipeline(model, encoders):
+    texts = ["VPN down cannot connect", "VPN  cannot ", "", "VPN down cannot connect"]
+    scorer = LimeTextScorer(model, _TextSentenceModel(), inference_categorical(TICKET.model_dump(), encoders[1]))
+
+    np.testing.assert_array_equal(scorer(texts), _pipeline_probabilities(model, encoders, texts, TICKET))
+
+
+def test_distinct_texts_are_embedded_once(model, encoders):
+    sentence_model = _TextSentenceModel()
+    cache = {}
+    categorical = inference_categorical(TICKET.model_dump(), encoders[1])
+    scorer = LimeTextScorer(model, sentence_model, categorical, embedding_cache=cache)
+
+    scorer(["a b", "a", "a b", "b", "a"])
+    scorer(["a", "c"])
+    # Another ticket of the same request shares the cache
+    LimeTextScorer(model, sentence_model, categorical, embedding_cache=cache)(["b", "c"])
+
+    assert sentence_model.calls == [["a b", "a", "b"], ["c"]]
+    assert (scorer.scored, scorer.embedded) == (7, 4)
+
+
+def test_lime_explanation_is_unchanged(model, encoders):
+    text = TICKET.title_anon + " " + TICKET.description_anon
+    scorer = LimeTextScorer(model, _TextSentenceModel(), inference_categorical(TICKET.model_dump(), encoders[1]))
+
+    expected = LimeTextExplainer(random_state=0).explain_instance(
+        text, lambda texts: _pipeline_probabilities(model, encoders, texts, TICKET), num_samples=200, labels=(1,)
+    )
+    explanation = LimeTextExplainer(random_state=0).explain_instance(text, scorer, num_samples=200, labels=(1,))
+
+    assert explanation.as_list(label=1) == expected.as_list(label=1)
+    assert scorer.embedded < scorer.scored
@@ -0,0 +1,62 @@
+"""Tests for the leave-one-out (occlusion) explanations."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from lime.lime_text import IndexedString
+
+from app.services.occlusion import occlusion_top_words, occlusion_variants
+
+TEXT = "VPN down, vpn cannot connect; VPN down"
+
+
+def _classifier(texts):
+    """Probability of class 1 grows with 'VPN' and 'connect', drops with 'down'."""
+    scores = np.array([
+        0.5 * ("VPN" in t.split()) + 0.3 * ("connect;" in t.split()) - 0.2 * ("down" in t.split()) for t in texts
+    ])
+    positive = 1 / (1 + np.exp(-3 * scores))
+    return np.column_stack([1 - positive, positive])
+
+
+def test_words_are_the_lime_features():
+    variants = occlusion_variants(TEXT)
+
+    lime_string = IndexedString(TEXT)
+    assert variants.features == [lime_string.word(i) for i in range(lime_string.num_words())]
+    assert variants.texts[0] == TEXT
+    # Every occurrence of a word is removed, like a LIME feature
+    assert variants.texts[1:] == [lime_string.inverse_removing([i]) for i in range(lime_string.num_words())]
+
+
+def test_ngrams_remove_consecutive_words():
+    variants = occlusion_variants(TEXT, ngram=2)
+
+    assert variants.features == ["VPN down", "down vpn", "vpn cannot", "cannot connect", "connect VPN"]
+    assert variants.texts[1] == " , vpn cannot connect;  "
+
+
+@pytest.mark.parametrize("text", ["", "  ,; "])
+def test_text_without_words_has_no_features(text):
+    variants = occlusion_variants(text)
+
+    assert variants.features == [] and variants.texts == [text]
+    assert occlusion_top_words(variants, _classifier(variants.texts), 1) == []
+
+
+def test_invalid_ngram_rejected():
+    with pytest.raises(ValueError):
+        occlusion_variants(TEXT, ngram=0)
+
+
+def test_top_words_are_probability_drops():
+    variants = occlusion_variants(TEXT)
+    probabilities = _classifier(variants.texts)
+
+    top_words = occlusion_top_words(variants, probabilities, 1, num_features=3)
+
+    assert [word for word, _ in top_words] == ["VPN", "connect", "down"]
+    assert top_words[0][1] == pytest.approx(probabilities[0, 1] - probabilities[1, 1])
+    assert top_words[0][1] > 0 > top_words[2][1]
+    # Occluding a word the classifier ignores changes nothing
+    assert dict(occlusion_top_words(variants, probabilities, 1))["cannot"] == 0
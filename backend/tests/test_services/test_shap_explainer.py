@@ -0,0 +1,78 @@
+"""Tests for the SHAP attributions of tree and linear models."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from skactiveml.classifier import SklearnClassifier
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.svm import SVC
+
+from app.core.linear_scorer import LinearScorer
+from app.services.shap_explainer import ShapExplainer
+
+N_EMBEDDING = 8
+CATEGORICAL = ["Service->Name_Srv A", "Service->Name_Srv B", "Service subcategory->Name_Sub"]
+
+
+def _data(n_classes: int, n: int = 120):
+    rng = np.random.default_rng(0)
+    X = np.hstack([rng.random((n, N_EMBEDDING)), np.eye(len(CATEGORICAL))[rng.integers(0, len(CATEGORICAL), n)]])
+    return X, rng.integers(0, n_classes, size=n)
+
+
+def _total(explanation) -> float:
+    return explanation["base_value"] + sum(value for _, value in explanation["contributions"])
+
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+@pytest.mark.parametrize("scorer", [False, True])
+def test_linear_attributions_add_up_to_the_log_odds(n_classes, scorer):
+    X, y = _data(n_classes)
+    # Class 3 never labeled: the estimator knows fewer classes than the wrapper
+    model = SklearnClassifier(LogisticRegression(), classes=list(range(n_classes + 1))).fit(X, y)
+    explainer = ShapExplainer(LinearScorer.from_model(model) if scorer else model, X, CATEGORICAL)
+
+    labels = model.predict(X[:5])
+    explanations = explainer.explain(X[:5], labels, num_features=len(CATEGORICAL) + 1)
+
+    assert (explainer.kind, explainer.output) == ("linear", "log_odds")
+    decision = model.estimator_.decision_function(X[:5])
+    if n_classes == 2:
+        decision = np.column_stack([-decision, decision])
+    expected = [decision[i, list(model.estimator_.classes_).index(label)] for i, label in enumerate(labels)]
+    assert [_total(e) for e in explanations] == pytest.approx(expected)
+
+
+def test_tree_attributions_add_up_to_the_probability():
+    X, y = _data(3)
+    model = SklearnClassifier(RandomForestClassifier(n_estimators=20, random_state=0), classes=[0, 1, 2]).fit(X, y)
+    explainer = ShapExplainer(model, X, CATEGORICAL)
+
+    explanations = explainer.explain(X[:5], [0, 1, 2, 1, 0], num_features=len(CATEGORICAL) + 1)
+
+    assert (explainer.kind, explainer.output) == ("tree", "probability")
+    probabilities = model.predict_proba(X[:5])
+    assert [_total(e) for e in explanations] == pytest.approx([probabilities[i, c] for i, c in enumerate([0, 1, 2, 1, 0])])
+
+
+def test_embedding_dimensions_are_one_text_contribution():
+    X, y = _data(3)
+    model = SklearnClassifier(LogisticRegression(), classes=[0, 1, 2]).fit(X, y)
+    explainer = ShapExplainer(model, X, CATEGORICAL)
+
+    explanation = explainer.explain(X[:1], model.predict(X[:1]), num_features=2)[0]
+
+    names = [name for name, _ in explanation["contributions"]]
+    assert names[0] == "text" and len(names) == 2 and names[1] in CATEGORICAL
+    values = np.asarray(explainer.explainer.shap_values(X[:1]))[0, :, list(model.classes_).index(model.predict(X[:1])[0])]
+    assert explanation["contributions"][0][1] == pytest.approx(values[:N_EMBEDDING].sum())
+    assert abs(explanation["contributions"][1][1]) == pytest.approx(np.abs(values[N_EMBEDDING:]).max())
+
+
+def test_other_models_rejected():
+    X, y = _data(2)
+    model = SklearnClassifier(SVC(probability=True), classes=[0, 1]).fit(X, y)
+
+    with pytest.raises(ValueError, match="tree or linear"):
+        ShapExplainer(model, X, CATEGORICAL)
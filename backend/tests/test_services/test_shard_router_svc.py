@@ -0,0 +1,222 @@
+"""Tests for the shard router placing AL instances on backend nodes."""
+from __future__ import annotations
+
+import json
+
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+from app.services.shard_router_svc import (
+    INSTANCE_ID_HEADER,
+    ROUTER_SECRET_HEADER,
+    ShardRouterService,
+    is_router_request,
+    parse_nodes,
+)
+from app.shard_router import create_app
+
+NODES = {"a": "http://node-a", "b": "http://node-b", "c": "http://node-c"}
+
+
+def _response(status_code=200, payload=None, content_type="application/json"):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(payload if payload is not None else {}).encode()
+    response.headers["content-type"] = content_type
+    return response
+
+
+class FakeNodes:
+    """Stands in for requests.Session: every node keeps its instances in a dict."""
+
+    def __init__(self, nodes):
+        self.urls = {url: name for name, url in nodes.items()}
+        self.instances = {name: {} for name in nodes}
+        self.calls = []
+        self.fail_restore_on = set()
+        self.down = set()
+
+    def add_node(self, name, url):
+        self.urls[url] = name
+        self.instances[name] = {}
+
+    def request(self, method, url, **kwargs):
+        base = next(u for u in self.urls if url.startswith(u))
+        node, path = self.urls[base], url[len(base):]
+        self.calls.append((node, method, path, kwargs))
+        if node in self.down:
+            raise requests.ConnectionError(f"{node} is down")
+        parts = path.strip("/").split("/")
+
+        if path == "/activelearning/new":
+            instance_id = int(kwargs["headers"][INSTANCE_ID_HEADER])
+            self.instances[node][instance_id] = {"model_name": "svm"}
+            return _response(202, {"instance_id": instance_id, "job_id": f"job-{instance_id}", "status": "queued"})
+        if path == "/activelearning/instances":
+            return _response(200, {"instances": {str(i): v for i, v in self.instances[node].items()}})
+        if parts[0] == "activelearning" and parts[-1] == "export":
+            return _response(200, {"model_name": "svm", "instance_id": int(parts[1])})
+        if parts[0] == "activelearning" and parts[-1] == "restore":
+            if node in self.fail_restore_on:
+                return _response(500, {"detail": "MinIO unavailable"})
+            self.instances[node][int(parts[1])] = {"model_name": "svm"}
+            return _response(200, {"message": "Instance restored"})
+        if parts[0] == "activelearning" and parts[-1] == "release":
+            self.instances[node].pop(int(parts[1]))
+            return _response(200, {"message": "Instance released"})
+        return _response(200, {"node": node, "path": path})
+
+
+@pytest.fixture
+def fake_nodes():
+    return FakeNodes(NODES)
+
+
+@pytest.fixture
+def shards(tmp_path, fake_nodes):
+    return ShardRouterService(NODES, state_path=tmp_path / "router.json", session=fake_nodes, secret="s3cret")
+
+
+def test_parse_nodes():
+    assert parse_nodes("a=http://127.0.0.1:8001, b=http://127.0.0.1:8002/") == {
+        "a": "http://127.0.0.1:8001",
+        "b": "http://127.0.0.1:8002",
+    }
+    with pytest.raises(ValueError):
+        parse_nodes("http://127.0.0.1:8001")
+
+
+def test_create_instance_assigns_id_and_uses_ring_owner(shards, fake_nodes):
+    for _ in range(20):
+        shards.create_instance(b"{}")
+
+    for instance_id in range(1, 21):
+        owner = shards.ring.node_for(instance_id)
+        assert instance_id in fake_nodes.instances[owner]
+        assert shards.job_node(f"job-{instance_id}") == owner
+
+
+def test_state_survives_router_restart(tmp_path, shards, fake_nodes):
+    shards.create_instance(b"{}")
+    shards.create_instance(b"{}")
+
+    restarted = ShardRouterService(NODES, state_path=tmp_path / "router.json", session=fake_nodes)
+
+    assert restarted.allocate_instance_id() == 3
+
+
+def test_discover_instances_sets_next_id(tmp_path, fake_nodes):
+    fake_nodes.instances["b"][41] = {}
+    shards = ShardRouterService(NODES, state_path=tmp_path / "router.json", session=fake_nodes)
+
+    assert shards.discover_instances() == {41: "b"}
+    assert shards.node_for(41) == "b"
+    assert shards.allocate_instance_id() == 42
+
+
+def test_rebalance_moves_instances_through_export_restore_release(shards, fake_nodes):
+    for _ in range(30):
+        shards.create_instance(b"{}")
+    fake_nodes.add_node("d", "http://node-d")
+
+    result = shards.rebalance({**NODES, "d": "http://node-d"})
+
+    assert result["moved"] and not result["failed"]
+    assert all(move["to"] == "d" for move in result["moved"])
+    for move in result["moved"]:
+        assert move["instance_id"] in fake_nodes.instances["d"]
+        assert move["instance_id"] not in fake_nodes.instances[move["from"]]
+        assert shards.node_for(move["instance_id"]) == "d"
+    steps = [(node, path.rsplit("/", 1)[-1]) for node, _, path, _ in fake_nodes.calls if path.endswith(("export", "restore", "release"))]
+    first = result["moved"][0]
+    assert steps[:3] == [(first["from"], "export"), ("d", "restore"), (first["from"], "release")]
+
+
+def test_failed_move_keeps_instance_on_old_node(shards, fake_nodes):
+    for _ in range(30):
+        shards.create_instance(b"{}")
+    fake_nodes.add_node("d", "http://node-d")
+    fake_nodes.fail_restore_on.add("d")
+
+    result = shards.rebalance({**NODES, "d": "http://node-d"})
+
+    assert result["failed"] and not result["moved"]
+    for failure in result["failed"]:
+        assert shards.node_for(failure["instance_id"]) == failure["from"]
+
+
+def test_removed_node_is_drained(shards, fake_nodes):
+    for _ in range(30):
+        shards.create_instance(b"{}")
+    on_c = set(fake_nodes.instances["c"])
+
+    result = shards.rebalance({"a": NODES["a"], "b": NODES["b"]})
+
+    assert {m["instance_id"] for m in result["moved"]} == on_c
+    assert fake_nodes.instances["c"] == {}
+    assert "c" not in shards.nodes
+
+
+def test_router_app_forwards_to_owning_node(shards, fake_nodes):
+    with TestClient(create_app(shards)) as client:
+        created = client.post("/activelearning/new", json={}).json()
+        owner = shards.node_for(created["instance_id"])
+
+        assert client.get(f"/activelearning/{created['instance_id']}/next").json()["node"] == owner
+        assert client.post(f"/xai/{created['instance_id']}/explain_lime", json={}).json()["node"] == owner
+        assert client.get(f"/activelearning/jobs/{created['job_id']}").json()["node"] == owner
+        assert client.get("/config/models").json()["node"] == "a"
+        assert client.get("/activelearning/jobs/unknown").status_code == 404
+
+
+def test_paths_without_instance_id_go_to_the_first_node(shards, fake_nodes):
+    with TestClient(create_app(shards)) as client:
+        response = client.get("/activelearning/inference/cache")
+
+    assert response.status_code == 200
+    assert response.json() == {"node": "a", "path": "/activelearning/inference/cache"}
+
+
+def test_job_nodes_survive_router_restart(tmp_path, shards, fake_nodes):
+    created = [shards.create_instance(b"{}").json() for _ in range(5)]
+
+    restarted = ShardRouterService(NODES, state_path=tmp_path / "router.json", session=fake_nodes, remembered_jobs=3)
+    restarted.remember_job("job-6", "b")
+
+    assert restarted.job_node(created[-1]["job_id"]) == shards.node_for(created[-1]["instance_id"])
+    assert restarted.job_node("job-6") == "b"
+    # Only the most recent jobs are kept
+    assert [restarted.job_node(c["job_id"]) for c in created[:3]] == [None, None, None]
+
+
+def test_router_secret_is_required_for_instance_ids():
+    assert is_router_request("s3cret", expected="s3cret")
+    assert not is_router_request("guess", expected="s3cret")
+    assert not is_router_request(None, expected="s3cret")
+    assert not is_router_request("", expected="")
+
+
+def test_create_instance_sends_secret_and_drops_client_instance_id(shards, fake_nodes):
+    shards.create_instance(b"{}", headers={"x-humal-instance-id": "99", "x-humal-router-secret": "guess"})
+
+    _, _, _, kwargs = fake_nodes.calls[-1]
+    assert kwargs["headers"] == {INSTANCE_ID_HEADER: "1", ROUTER_SECRET_HEADER: "s3cret"}
+
+    shards.forward("a", "GET", "/activelearning/1/next", headers={"X-HumAL-Instance-Id": "99"})
+    assert INSTANCE_ID_HEADER not in fake_nodes.calls[-1][3]["headers"]
+
+
+def test_shards_status_reports_unreachable_nodes(shards, fake_nodes):
+    for _ in range(10):
+        shards.create_instance(b"{}")
+    fake_nodes.down.add("c")
+
+    with TestClient(create_app(shards)) as client:
+        status = client.get("/shards")
+
+    assert status.status_code == 200
+    body = status.json()
+    assert list(body["unreachable"]) == ["c"]
+    assert set(body["placements"].values()) <= {"a", "b"}
+    assert {int(i) for i in body["placements"]} == set(fake_nodes.instances["a"]) | set(fake_nodes.instances["b"])
@@ -0,0 +1,38 @@
+"""Tests for the ticket vectorizer saved for the XAI jobs."""
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+from app.persistence.minio_storage import MinioService
+from app.services.ticket_vectorizer_svc import TicketVectorizerService
+
+
+def _minio_service() -> MagicMock:
+    minio_service = MagicMock(spec=MinioService)
+    minio_service.save_ticket_vectorizer.side_effect = lambda al_instance_id, vectorizer, encoder_fingerprint: {
+        "object": f"vectorizers/{al_instance_id}/ticket_vectorizer-{encoder_fingerprint}.pkl"
+    }
+    return minio_service
+
+
+def test_vectorizer_is_saved_once_per_instance_and_encoder():
+    minio_service = _minio_service()
+    service = TicketVectorizerService(minio_service)
+
+    first = service.ensure_vectorizer(al_instance_id=1, encoder_fingerprint="enc-1")
+    again = service.ensure_vectorizer(al_instance_id=1, encoder_fingerprint="enc-1")
+
+    assert first == again == {"object": "vectorizers/1/ticket_vectorizer-enc-1.pkl"}
+    minio_service.save_ticket_vectorizer.assert_called_once()
+    assert minio_service.save_ticket_vectorizer.call_args.kwargs["vectorizer"].one_hot_encoder is None
+
+
+def test_new_encoder_or_instance_saves_the_vectorizer_again():
+    minio_service = _minio_service()
+    service = TicketVectorizerService(minio_service)
+
+    service.ensure_vectorizer(al_instance_id=1, encoder_fingerprint="enc-1")
+    service.ensure_vectorizer(al_instance_id=1, encoder_fingerprint="enc-2")
+    service.ensure_vectorizer(al_instance_id=2, encoder_fingerprint="enc-1")
+
+    assert minio_service.save_ticket_vectorizer.call_count == 3
@@ -0,0 +1,360 @@
+"""Tests for XaiService (nearest labeled tickets and XAI job submission)."""
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from skactiveml.utils import MISSING_LABEL
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import LabelEncoder, OneHotEncoder
+
+from app.core.rabbitmq_client import RabbitMQClient
+from app.core.storage import ActiveLearningStorage
+from app.data_models.active_learning_dm import Data
+from app.persistence.duckdb import DuckDbPersistenceService
+from app.persistence.minio_storage import MinioService
+from app.services.data_service import DataService
+from app.services.inference_svc import InferenceService
+from app.services.xai_svc import XaiService
+
+TEAMS = ["Network", "Printing"]
+
+
+class _KeywordSentenceModel:
+    """Deterministic stand-in for SentenceTransformer: 2-d embeddings from keywords."""
+
+    def encode(self, sentences, show_progress_bar=False):
+        return np.array([[float("vpn" in s.lower()), float("printer" in s.lower())] for s in sentences])
+
+
+def _ticket(title: str, service: str = "Srv A") -> Data:
+    return Data(title_anon=title, description_anon=" please help", service_subcategory_name="Sub", service_name=service)
+
+
+@pytest.fixture
+def storage():
+    storage = ActiveLearningStorage()
+    le = LabelEncoder().fit(TEAMS + [np.nan])
+    oh = OneHotEncoder(handle_unknown="ignore").fit(
+        pd.DataFrame({"Service subcategory->Name": ["Sub", "Sub"], "Service->Name": ["Srv A", "Srv B"]})
+    )
+    # [vpn, printer] embedding + one-hot of [Sub] and [Srv A, Srv B]
+    X_train = pd.DataFrame(
+        [
+            [1.0, 0.0, 1.0, 1.0, 0.0],
+            [0.9, 0.1, 1.0, 1.0, 0.0],
+            [0.0, 1.0, 1.0, 0.0, 1.0],
+            [0.1, 0.9, 1.0, 0.0, 1.0],
+        ],
+        index=["T1", "T2", "T3", "T4"],
+    )
+    y_train = pd.Series([0, MISSING_LABEL, 1, MISSING_LABEL], index=X_train.index, dtype=float)
+    storage.al_instances_dict[1] = {"classes": [0, 1, 2]}
+    storage.dataset_dict[1] = {"X_train": X_train, "y_train": y_train, "le": le, "oh": oh}
+    return storage
+
+
+@pytest.fixture
+def data_service():
+    service = MagicMock(spec=DataService)
+    service.get_tickets.side_effect = lambda refs: {"tickets": [{"Ref": ref, "Title_anon": f"title {ref}"} for ref in refs]}
+    return service
+
+
+@pytest.fixture
+def xai_service(storage, data_service):
+    return XaiService(
+        storage,
+        MagicMock(spec=InferenceService),
+        sentence_model=_KeywordSentenceModel(),
+        data_service=data_service,
+    )
+
+
+class TestNearestTickets:
+    def test_batch_of_tickets_is_answered_in_order(self, xai_service):
+        results = xai_service.find_nearest_tickets(1, tickets=[_ticket("Printer jam", "Srv B"), _ticket("VPN down")], k=1)
+
+        assert [[(n["ref"], n["label"]) for n in row] for row in results] == [[("T3", "Printing")], [("T1", "Network")]]
+        assert results[1][0]["similarity_score"] == pytest.approx(1.0)
+
+    def test_batch_of_train_refs(self, xai_service):
+        results = xai_service.find_nearest_tickets(1, indices=["T2", "T4"], k=1)
+
+        assert [row[0]["ref"] for row in results] == ["T1", "T3"]
+
+    def test_k_larger_than_the_labeled_tickets_returns_all_of_them(self, xai_service):
+        results = xai_service.find_nearest_tickets(1, indices=["T2"], k=10)
+
+        assert [n["ref"] for n in results[0]] == ["T1", "T3"]
+        assert results[0][0]["similarity_score"] > results[0][1]["similarity_score"]
+
+    def test_single_nearest_ticket_keeps_its_response(self, xai_service):
+        result = xai_service.find_nearest_by_query_idx(1, ["T2"])
+
+        assert (result["nearest_ticket_ref"], result["nearest_ticket_label"]) == (["T1"], ["Network"])
+        assert result["similarity_score"][0] == pytest.approx(0.99, abs=0.01)
+
+    def test_neighbor_tickets_are_read_with_one_query(self, xai_service, data_service):
+        results = xai_service.find_nearest_tickets(1, indices=["T1", "T2", "T4"], k=2)
+
+        xai_service.attach_neighbor_tickets(results)
+
+        data_service.get_tickets.assert_called_once_with(["T1", "T3"])
+        assert all(n["ticket"]["Ref"] == n["ref"] for row in results for n in row)
+
+    def test_no_labeled_tickets_raises(self, xai_service, storage):
+        storage.dataset_dict[1]["y_train"][:] = MISSING_LABEL
+
+        with pytest.raises(ValueError, match="No labeled tickets"):
+            xai_service.find_nearest_by_ticket(1, _ticket("VPN down"))
+        with pytest.raises(ValueError, match="No labeled tickets"):
+            xai_service.find_nearest_tickets(1, indices=["T1"], k=3)
+
+
+class TestExplainLime:
+    @pytest.fixture
+    def lime_service(self, storage):
+        dataset = storage.dataset_dict[1]
+        inference_service = MagicMock(spec=InferenceService)
+        inference_service.load_model.return_value = LogisticRegression().fit(dataset["X_train"], [0, 0, 1, 1])
+        inference_service._onehot_lookup.return_value = None
+
+        def _infer(al_instance_id, X, model_id=0):
+            if "boom" in X.title_anon:
+                raise RuntimeError("model exploded")
+            return ["Printing" if "printer" in X.title_anon.lower() else "Network"]
+
+        inference_service.infer.side_effect = _infer
+        return XaiService(storage, inference_service, sentence_model=_KeywordSentenceModel())
+
+    @staticmethod
+    def _words(ticket: Data) -> set:
+        return set(f"{ticket.title_anon} {ticket.description_anon}".split())
+
+    def test_every_ticket_is_explained_once(self, lime_service):
+        tickets = [_ticket(f"{topic} issue {i}") for i, topic in enumerate(["Printer", "VPN"] * 3)]
+
+        indices = [index for index, _ in lime_service.iter_explain_lime(1, tickets, max_workers=4)]
+
+        assert sorted(indices) == list(range(len(tickets)))
+
+    def test_explanations_keep_ticket_order(self, lime_service):
+        tickets = [_ticket("Printer jam tray"), _ticket("VPN down again"), _ticket("Printer offline now")]
+
+        explanations = lime_service.explain_lime(1, tickets)
+
+        for ticket, explanation in zip(tickets, explanations):
+            assert explanation["error"] is None
+            assert explanation["top_words"] and {w for w, _ in explanation["top_words"]} <= self._words(ticket)
+
+    def test_failing_ticket_gets_its_own_error(self, lime_service):
+        explanations = lime_service.explain_lime(1, [_ticket("VPN down"), _ticket("boom"), _ticket("Printer jam")])
+
+        assert [e["error"] for e in explanations] == [None, "LIME error: model exploded", None]
+        assert explanations[1]["top_words"] == []
+
+    def test_model_load_failure_gives_an_error_for_every_ticket(self, lime_service):
+        lime_service.inference_service.load_model.side_effect = FileNotFoundError("no model 0")
+
+        explanations = lime_service.explain_lime(1, [_ticket("VPN down"), _ticket("Printer jam")])
+
+        assert explanations == [{"top_words": [], "error": "LIME error: no model 0"}] * 2
+
+    def test_explanations_do_not_use_the_global_random_state(self, lime_service):
+        np.random.seed(0)
+        state = np.random.get_state()[1].copy()
+
+        lime_service.explain_lime(1, [_ticket("VPN down"), _ticket("Printer jam")])
+
+        np.testing.assert_array_equal(np.random.get_state()[1], state)
+
+
+@pytest.fixture(scope="module")
+def xai_router(tmp_path_factory):
+    """The xai router module, its services built on temporary storage (no MinIO login, no model download)."""
+    storage_dir = tmp_path_factory.mktemp("storage")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("DUCKDB_PATH", str(storage_dir / "humal.duckdb"))
+        for name in ("MODELS_DIR", "ENCODERS_DIR", "VECTORIZED_DATA_DIR"):
+            monkeypatch.setenv(name, str(storage_dir / name.lower()))
+        with patch("app.core.minio_client.MinioClient"), patch("app.services.inference_svc.SentenceTransformer"), \
+                patch("app.services.xai_svc.SentenceTransformer"):
+            from app.routers import xai_router
+    return xai_router
+
+
+class TestExplainLimeStream:
+    @pytest.fixture
+    def stream_service(self, storage, data_service, xai_router, monkeypatch):
+        storage.model_paths_dict[1] = {0: "models/1/0.joblib"}
+        service = MagicMock(spec=XaiService)
+        service.storage = storage
+        compute_executor = MagicMock()
+        compute_executor.enabled = False
+        monkeypatch.setattr(xai_router, "xai_service", service)
+        monkeypatch.setattr(xai_router, "data_service", data_service)
+        monkeypatch.setattr(xai_router, "compute_executor", compute_executor)
+        data_service.get_tickets.side_effect = lambda refs: {"tickets": [
+            {"Ref": ref, "Title_anon": f"title {ref}", "Description_anon": "", "Service->Name": "Srv A", "Service subcategory->Name": "Sub"}
+            for ref in refs if ref != "T404"
+        ]}
+        return service
+
+    @pytest.fixture
+    def client(self, xai_router):
+        app = FastAPI()
+        app.include_router(xai_router.router)
+        return TestClient(app)
+
+    def test_cached_tickets_first_then_computed_ones_as_they_complete(self, stream_service, client):
+        stream_service.cached_explanations.return_value = ("v1", [None, {"top_words": [["vpn", 0.5]], "error": None}, None])
+        computed = {0: {"top_words": [["title", 0.1]], "error": None}, 1: {"top_words": [], "error": "LIME error: x"}}
+        # Position among the missing tickets, last ticket completes first
+        stream_service.iter_explain_lime.return_value = iter([(1, computed[1]), (0, computed[0])])
+
+        response = client.post("/xai/1/explain_lime/stream", params={"query_idx": ["T1", "T2", "T3"]})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [(line["index"], line["ref"]) for line in lines] == [(1, "T2"), (2, "T3"), (0, "T1")]
+        assert lines[1]["error"] == "LIME error: x"
+        missing_tickets = stream_service.iter_explain_lime.call_args.args[1]
+        assert [t.title_anon for t in missing_tickets] == ["title T1", "title T3"]
+        # Computed explanations are cached in the order of the missing tickets
+        assert stream_service.cache_explanations.call_args.args[-1] == [computed[0], computed[1]]
+
+    def test_unknown_refs_are_not_found(self, stream_service, client, data_service):
+        response = client.post("/xai/1/explain_lime/stream", params={"query_idx": ["T1", "T404"]})
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Tickets not found: T404"
+        data_service.get_tickets.assert_called_once_with(["T1", "T404"])
+        stream_service.cached_explanations.assert_not_called()
+
+    def test_worker_tasks_not_started_are_cancelled_when_the_client_leaves(self, xai_router, monkeypatch):
+        futures = [Future() for _ in range(3)]
+        compute_executor = MagicMock()
+        compute_executor.submit.side_effect = futures
+        monkeypatch.setattr(xai_router, "compute_executor", compute_executor)
+
+        async def _first_explanation():
+            explanations = xai_router._worker_explanations(1, [_ticket("a"), _ticket("b"), _ticket("c")], 0)
+            futures[1].set_result([{"top_words": [], "error": None}])
+            first = await explanations.__anext__()
+            await explanations.aclose()
+            return first
+
+        assert asyncio.run(_first_explanation())[0] == 1
+        assert [f.cancelled() for f in futures] == [True, False, True]
+
+
+class TestXaiRequests:
+    @pytest.fixture
+    def release(self):
+        """Publishing waits for this event, so that the submissions overlap."""
+        return asyncio.Event()
+
+    @pytest.fixture
+    def request_service(self, tmp_path, storage, release, monkeypatch):
+        monkeypatch.setenv("USE_RABBITMQ", "1")
+        monkeypatch.setenv("TASK_QUEUE", "xai_tasks")
+        minio_service = MagicMock(spec=MinioService)
+        minio_service.xai_ticket_sha.side_effect = lambda X, ticket_ref=None: ticket_ref or "sha"
+        minio_service.xai_ticket_content_sha.side_effect = lambda X: f"content-{X.title_anon}"
+        minio_service.save_ticket_for_xai.side_effect = lambda al_instance_id, X, ticket_ref=None: {
+            "ticket_sha": ticket_ref or "sha", "object": f"xai_tickets/1/{ticket_ref or 'sha'}.json"
+        }
+        minio_service.return_data_names.return_value = []
+        rabbitmq_client = MagicMock(spec=RabbitMQClient)
+
+        async def _publish(queue_name, message):
+            await release.wait()
+
+        rabbitmq_client.publish.side_effect = _publish
+        duckdb_service = DuckDbPersistenceService(db_path=tmp_path / "test.duckdb")
+        duckdb_service.save_al_instance(1, {"model_name": "svm", "query_strategy": "random sampling", "classes": [0, 1, 2]})
+        return XaiService(
+            storage,
+            MagicMock(spec=InferenceService),
+            minio_service=minio_service,
+            duckdb_service=duckdb_service,
+            rabbitmq_client=rabbitmq_client,
+            sentence_model=_KeywordSentenceModel(),
+        )
+
+    def test_concurrent_identical_requests_share_one_submission(self, request_service, release):
+        async def _requests():
+            first = asyncio.ensure_future(request_service.create_xai_request(1, _ticket("VPN down"), 0))
+            second = asyncio.ensure_future(request_service.create_xai_request(1, _ticket("VPN down"), 0))
+            await asyncio.sleep(0.01)
+            release.set()
+            return await first, await second
+
+        first, second = asyncio.run(_requests())
+
+        assert first == second
+        request_service.minio_service.save_ticket_for_xai.assert_called_once()
+        request_service.rabbitmq_client.publish.assert_awaited_once()
+        assert request_service.duckdb_service.find_xai_job(1, 0, "sha")["job_id"] == str(first)
+        assert request_service._xai_submissions == {}
+
+    def test_cancelled_request_does_not_cancel_the_shared_submission(self, request_service, release):
+        async def _requests():
+            cancelled = asyncio.ensure_future(request_service.create_xai_request(1, _ticket("VPN down"), 0))
+            waiting = asyncio.ensure_future(request_service.create_xai_request(1, _ticket("VPN down"), 0))
+            await asyncio.sleep(0.01)
+            cancelled.cancel()
+            await asyncio.sleep(0)
+            release.set()
+            with pytest.raises(asyncio.CancelledError):
+                await cancelled
+            return await waiting
+
+        job_id = asyncio.run(_requests())
+
+        request_service.rabbitmq_client.publish.assert_awaited_once()
+        assert request_service.duckdb_service.find_xai_job(1, 0, "sha")["job_id"] == str(job_id)
+
+    @staticmethod
+    def _completed_job(request_service, ticket_ref_or_sha="sha", ticket_content_sha="content-VPN down") -> uuid.UUID:
+        job_id = uuid.uuid4()
+        request_service.duckdb_service.create_xai_job(
+            al_instance_id=1, job_id=job_id, model_id=0, ticket_ref_or_sha=ticket_ref_or_sha,
+            request_ticket_location=f"xai_tickets/1/{ticket_ref_or_sha}.json", request_model_location="models/1/0",
+            request_preprocessor_location=None, request_one_hot_encoder_location=None,
+            request_raw_tickets_locations=[], ticket_content_sha=ticket_content_sha,
+        )
+        request_service.duckdb_service.update_xai_job_status(job_id, "completed", result_location="r", result_file_names=[])
+        return job_id
+
+    def test_existing_completed_job_is_returned_without_upload(self, request_service):
+        job_id = self._completed_job(request_service)
+
+        assert asyncio.run(request_service.create_xai_request(1, _ticket("VPN down"), 0)) == job_id
+        request_service.minio_service.save_ticket_for_xai.assert_not_called()
+        request_service.rabbitmq_client.publish.assert_not_awaited()
+
+    def test_ticket_ref_resubmitted_with_edited_content_gets_a_new_job(self, request_service, release):
+        job_id = self._completed_job(request_service, ticket_ref_or_sha="T1")
+        release.set()
+
+        same = asyncio.run(request_service.create_xai_request(1, _ticket("VPN down"), 0, ticket_ref="T1"))
+        edited = asyncio.run(request_service.create_xai_request(1, _ticket("VPN down since monday"), 0, ticket_ref="T1"))
+
+        assert same == job_id and edited != job_id
+        request_service.minio_service.save_ticket_for_xai.assert_called_once()
+        assert request_service.minio_service.save_ticket_for_xai.call_args.kwargs["X"].title_anon == "VPN down since monday"
+        request_service.rabbitmq_client.publish.assert_awaited_once()
+        assert request_service.duckdb_service.find_xai_job(1, 0, "T1", ticket_content_sha="content-VPN down since monday") == {
+            "job_id": str(edited), "status": "queued"
+        }
@@ -85,6 +85,16 @@ const Training = () => {
       });
 
       if (response.success && response.data) {
+        // The instance is created in the background, wait until the job has finished
+        let job = await apiService.getInstanceJob(response.data.job_id);
+        while (job.success && job.data && (job.data.status === 'queued' || job.data.status === 'running')) {
+          await new Promise(resolve => setTimeout(resolve, 1000));
+          job = await apiService.getInstanceJob(response.data.job_id);
+        }
+        if (!job.success || !job.data || job.data.status !== 'completed') {
+          throw new Error(job.data?.error || job.error?.detail || "Failed to create instance");
+        }
+
         setInstanceId(response.data.instance_id);
         
         toast({
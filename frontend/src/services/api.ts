@@ -3,6 +3,7 @@ import type {
   LabelRequest,
   InferenceData,
   CreateInstanceResponse,
+  InstanceJobResponse,
   NextInstancesResponse,
   LabelInstanceResponse,
   InstanceInfo,
@@ -32,6 +33,7 @@ const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000
 export const API_ENDPOINTS = {
   // Active Learning
   CREATE_INSTANCE: '/activelearning/new',
+  GET_INSTANCE_JOB: (jobId: string) => `/activelearning/jobs/${jobId}`,
   GET_NEXT_INSTANCES: (id: number) => `/activelearning/${id}/next`,
   LABEL_INSTANCE: (id: number) => `/activelearning/${id}/label`,
   GET_INFO: (id: number) => `/activelearning/${id}/info`,
@@ -120,6 +122,9 @@ export const apiService = {
       body: JSON.stringify(data),
     }),
 
+  getInstanceJob: (jobId: string) =>
+    apiCall<InstanceJobResponse>(API_ENDPOINTS.GET_INSTANCE_JOB(jobId)),
+
   getNextInstances: (id: number, batchSize: number = 1) => 
     apiCall<NextInstancesResponse>(API_ENDPOINTS.GET_NEXT_INSTANCES(id) + `?batch_size=${batchSize}`),
 
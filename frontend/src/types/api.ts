@@ -25,6 +25,19 @@ export interface InferenceData {
 // API Response Types
 export interface CreateInstanceResponse {
   instance_id: number;
+  job_id: string;
+  status: string;
+}
+
+export interface InstanceJobResponse {
+  job_id: string;
+  instance_id: number;
+  status: 'queued' | 'running' | 'completed' | 'failed';
+  phase: string | null;
+  split: string | null;
+  done: number;
+  total: number;
+  error: string | null;
 }
 
 export interface NextInstancesResponse {